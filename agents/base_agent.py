@@ -17,9 +17,10 @@ import os
 import json
 import asyncio
 import subprocess
+import time
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
 from pydantic import BaseModel
@@ -31,6 +32,13 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent / "lib"))
 from memory_orchestrator import MemoryOrchestrator
+from claude_runner import ClaudeRunner, ClaudeRunError, FencedFileExtractor
+from context_packer import pack_files
+from prompt_layout import PromptLayout
+from hook_metrics import record_event
+from call_accounting import accountant
+from context_cache import context_cache, entry_key
+from project_snapshot import SnapshotClient
 
 # Simple TaskPayload class for agent execution
 class TaskPayload(BaseModel):
@@ -70,6 +78,12 @@ class BaseAgent(ABC):
         # Initialize memory manager
         self.memory = MemoryOrchestrator()
         
+        # Files written from the last Claude response (see _run_claude extract_files)
+        self.streamed_files: List[str] = []
+        
+        # Task being executed; tags Claude call accounting with its phase and id
+        self.current_task: Optional[TaskPayload] = None
+        
     def _load_project_id(self) -> str:
         """Load project ID from CLAUDE.md"""
         claude_md = Path("CLAUDE.md")
@@ -83,6 +97,9 @@ class BaseAgent(ABC):
     async def execute(self, task: TaskPayload) -> AgentResult:
         """Main execution method"""
         console.print(f"[bold blue]🤖 {self.agent_name} starting...[/bold blue]")
+        self.current_task = task
+        started = time.monotonic()
+        success = False
         
         try:
             # 1. Load context from memory
@@ -98,12 +115,19 @@ class BaseAgent(ABC):
             await self._update_task_status(task.task_id, "completed", result)
             
             console.print(f"[bold green]✅ {self.agent_name} completed[/bold green]")
+            success = True
             return result
             
         except Exception as e:
             console.print(f"[bold red]❌ {self.agent_name} failed: {str(e)}[/bold red]")
             await self._update_task_status(task.task_id, "failed", error=str(e))
             raise
+        
+        finally:
+            accountant().record_agent_run(
+                self.agent_name, self.project_id, round((time.monotonic() - started) * 1000, 1), success,
+                phase=task.phase, task_id=task.task_id
+            )
     
     async def _load_context(self, task: TaskPayload) -> Dict[str, Any]:
         """Load relevant context from memory systems"""
@@ -115,18 +139,40 @@ class BaseAgent(ABC):
             "current_phase": task.phase
         }
         
-        # Load project state
-        context["project_state"] = await self.memory.get_project_state()
-        
-        # Load agent history
-        context["previous_decisions"] = await self.memory.get_agent_history(self.agent_name)
+        # Project state and code search are shared by every agent of this phase in the run;
+        # agent history is per agent and always fetched fresh
+        cache = context_cache()
+        fetches = [
+            cache.get_or_fetch(entry_key("project_state", self.project_id, task.phase),
+                               self._load_project_state, self.project_id),
+            self._off_loop(self.memory.get_agent_history, self.agent_name)
+        ]
+        if task.description:
+            fetches.append(cache.get_or_fetch(
+                entry_key("code_search", self.project_id, task.phase, task.description),
+                lambda: self._off_loop(self.memory.search_code, task.description), self.project_id
+            ))
         
-        # Semantic search for relevant files
+        results = await asyncio.gather(*fetches)
+        context["project_state"], context["previous_decisions"] = results[0], results[1]
         if task.description:
-            context["relevant_files"] = await self.memory.search_code(task.description)
+            context["relevant_files"] = results[2]
         
         return context
     
+    async def _load_project_state(self) -> Dict[str, Any]:
+        """Versioned project snapshot (only changes since the local copy are fetched)"""
+        try:
+            return await asyncio.to_thread(SnapshotClient(self.memory.supabase, self.project_id).get)
+        except Exception as e:
+            console.print(f"[yellow]⚠️ Project snapshot unavailable, loading full state: {str(e)}[/yellow]")
+            return await self._off_loop(self.memory.get_project_state)
+    
+    @staticmethod
+    async def _off_loop(method, *args):
+        """Run a memory coroutine on a worker thread: its Supabase calls are synchronous"""
+        return await asyncio.to_thread(asyncio.run, method(*args))
+    
     async def _save_results(self, task: TaskPayload, result: AgentResult) -> None:
         """Save agent results to memory systems"""
         # Save context
@@ -143,6 +189,11 @@ class BaseAgent(ABC):
         # Index any created files
         for file_path in result.files_created:
             await self.memory.index_file(file_path)
+        
+        # Later agents in this run must see the state this one just changed
+        await asyncio.to_thread(context_cache().invalidate, "project_state")
+        if result.files_created:
+            await asyncio.to_thread(context_cache().invalidate, "code_search")
     
     async def _update_task_status(self, task_id: str, status: str, 
                                  result: Optional[AgentResult] = None,
@@ -165,54 +216,41 @@ class BaseAgent(ABC):
         except Exception as e:
             console.print(f"[red]Error updating task status: {str(e)}[/red]")
     
-    async def _run_claude(self, prompt: str, max_tokens: int = 50000) -> str:
-        """Process prompt with Claude Code via subprocess"""
+    async def _run_claude(self, prompt: str, max_tokens: int = 50000, extract_files: bool = False,
+                          artifacts: Optional[List[str]] = None) -> str:
+        """Process prompt with Claude Code via subprocess (artifacts: inputs the prompt was built from, for the cache key)"""
         console.print(f"[cyan]🤖 {self.agent_name} requesting Claude Code execution...[/cyan]")
         
         # The agents are designed to be run via uv run commands
         # They call Claude Code as a subprocess to do the actual work
         # This is the correct architecture: Agent -> Claude Code -> Results
         
-        try:
-            # Create a temporary file with the prompt
-            temp_prompt_file = f"/tmp/sparc_prompt_{self.agent_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            with open(temp_prompt_file, 'w') as f:
-                f.write(prompt)
-            
-            # Call Claude Code with the prompt
-            # Using echo to pipe the prompt since claude-code reads from stdin
-            cmd = f'echo "{prompt}" | claude-code'
-            
-            console.print(f"[dim]Executing: {cmd[:100]}...[/dim]")
-            
-            # Execute the command
-            process = await asyncio.create_subprocess_shell(
-                cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=os.getcwd()
+        # With extract_files, fenced file blocks are written as soon as each one closes
+        extractor = None
+        if extract_files:
+            extractor = FencedFileExtractor(
+                Path.cwd(), on_file=lambda path: console.print(f"[dim]📝 {path.relative_to(Path.cwd())}[/dim]")
             )
-            
-            stdout, stderr = await process.communicate()
-            
-            # Clean up temp file
-            if os.path.exists(temp_prompt_file):
-                os.remove(temp_prompt_file)
-            
-            if process.returncode != 0:
-                error_msg = f"Claude Code execution failed: {stderr.decode()}"
-                console.print(f"[red]❌ {error_msg}[/red]")
-                return f"ERROR: {error_msg}"
-            
-            response = stdout.decode().strip()
+        
+        try:
+            task = self.current_task
+            runner = ClaudeRunner(agent_name=self.agent_name, namespace=self.project_id,
+                                  phase=task.phase if task else None, task_id=task.task_id if task else None)
+            response = await runner.run_claude(prompt, max_tokens, extractor=extractor, artifacts=artifacts)
             console.print(f"[green]✅ Claude Code response received ({len(response)} chars)[/green]")
             
             return response
             
+        except ClaudeRunError as e:
+            error_msg = f"Claude Code execution failed: {str(e)}"
+            console.print(f"[red]❌ {error_msg}[/red]")
+            return f"ERROR: {error_msg}"
         except Exception as e:
             error_msg = f"Failed to execute Claude Code: {str(e)}"
             console.print(f"[red]❌ {error_msg}[/red]")
             return f"ERROR: {error_msg}"
+        finally:
+            self.streamed_files = [str(path) for path in extractor.files] if extractor else []
     
     async def _delegate_task(self, to_agent: str, task_description: str, 
                            task_context: Dict[str, Any], priority: int = 5) -> str:
@@ -248,22 +286,25 @@ class BaseAgent(ABC):
         """Build comprehensive prompt for Claude"""
         relevant_files_text = ""
         if context.get("relevant_files"):
-            relevant_files_text = "\\n\\nRelevant Files:\\n"
-            for file_info in context["relevant_files"][:5]:  # Limit to top 5
-                relevant_files_text += f"File: {file_info['file_path']}\\n"
-                relevant_files_text += f"Content: {file_info['content'][:1000]}...\\n\\n"
+            # Most relevant chunks within the token budget (SPARC_CONTEXT_BUDGET_TOKENS)
+            query = " ".join([task.description] + [str(req) for req in task.requirements])
+            packed = pack_files(context["relevant_files"], query)
+            report = packed.report()
+            record_event('context_pack', self.project_id, agent=self.agent_name,
+                         **{k: v for k, v in report.items() if k not in ('selected_sources', 'dropped_sources')})
+            if packed.dropped:
+                console.print(f"[dim]📦 Context: {packed.used_tokens}/{packed.budget} tokens, "
+                              f"{report['selected']} chunks kept, {report['dropped']} dropped "
+                              f"({', '.join(f'{n} {reason}' for reason, n in report['dropped_reasons'].items())})[/dim]")
+            if packed.selected:
+                relevant_files_text = "Relevant Files:\n" + packed.render()
         
-        # Replace dynamic project ID in custom instructions
-        custom_instructions = self.custom_instructions.replace(
-            "project_id = 'yjnrxnacpxdvseyetsgi'",
-            f"project_id = '{self.project_id}'"
-        )
+        # Byte-stable blocks first so repeated calls share a cacheable prefix; task data last
+        layout = PromptLayout(self.agent_name, self.project_id)
+        for name, text in self._stable_prompt_blocks():
+            layout.stable(name, text)
         
-        return f"""
-{self.role_definition}
-
-{custom_instructions}
-
+        layout.variable("task", f"""
 Current Task:
 {task.description}
 
@@ -281,11 +322,20 @@ Requirements:
 
 AI-Verifiable Outcomes:
 {chr(10).join(f"- {outcome}" for outcome in task.ai_verifiable_outcomes)}
-
-{relevant_files_text}
-
-Execute your task and provide a detailed response with specific actions taken.
-"""
+""")
+        layout.variable("relevant_files", relevant_files_text)
+        layout.variable("closing", "Execute your task and provide a detailed response with specific actions taken.")
+        
+        return layout.render()
+    
+    def _stable_prompt_blocks(self) -> List[Tuple[str, str]]:
+        """Prompt blocks that are identical on every call (extend with static, agent-specific instructions)"""
+        # Replace dynamic project ID in custom instructions
+        custom_instructions = self.custom_instructions.replace(
+            "project_id = 'yjnrxnacpxdvseyetsgi'",
+            f"project_id = '{self.project_id}'"
+        )
+        return [("role", self.role_definition), ("instructions", custom_instructions)]
     
     @abstractmethod
     async def _execute_task(self, task: TaskPayload, context: Dict[str, Any]) -> AgentResult:
@@ -332,15 +382,19 @@ def main(namespace: str, task_id: str, goal: str):
         agent_class = globals()[agent_class_name[0]]
         agent = agent_class()
         
-        async def run():
+        async def run() -> bool:
             try:
                 result = await agent._execute_task(task, task.context)
                 console.print(f"[green]✅ {agent.agent_name} completed successfully[/green]")
                 console.print(f"Result: {result}")
+                return result.success
             except Exception as e:
                 console.print(f"[red]❌ {agent.agent_name} failed: {e}[/red]")
+                return False
         
-        asyncio.run(run())
+        # The dispatcher takes the exit code as the task outcome
+        if not asyncio.run(run()):
+            raise SystemExit(1)
     else:
         console.print("[red]❌ No agent class found[/red]")
 
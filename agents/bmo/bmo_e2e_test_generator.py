@@ -483,15 +483,19 @@ def main(namespace: str, task_id: str, goal: str):
         agent_class = globals()[agent_class_name[0]]
         agent = agent_class()
         
-        async def run():
+        async def run() -> bool:
             try:
                 result = await agent._execute_task(task, task.context)
                 console.print(f"[green]✅ {agent.agent_name} completed successfully[/green]")
                 console.print(f"Result: {result}")
+                return result.success
             except Exception as e:
                 console.print(f"[red]❌ {agent.agent_name} failed: {e}[/red]")
+                return False
         
-        asyncio.run(run())
+        # The dispatcher takes the exit code as the task outcome
+        if not asyncio.run(run()):
+            raise SystemExit(1)
     else:
         console.print("[red]❌ No agent class found[/red]")
 
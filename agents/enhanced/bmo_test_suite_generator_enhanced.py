@@ -378,11 +378,12 @@ Create executable test files for each test category using memory-informed patter
    - Input validation tests
    - Use memory knowledge of common edge cases
 
-Generate complete, executable test code for each category.
+Generate complete, executable test code for each category. Output each test file as
+a fenced code block whose info string names its path, e.g. ```python tests/unit/test_models.py
 """
         
-        # Use Claude for test implementation
-        claude_response = await self._run_claude(implementation_prompt)
+        # Use Claude for test implementation; file blocks are written as they stream in
+        claude_response = await self._run_claude(implementation_prompt, extract_files=True)
         
         # Create test directories and files
         test_files = await self._create_test_files(claude_response, test_design)
@@ -405,6 +406,12 @@ Generate complete, executable test code for each category.
     async def _create_test_files(self, claude_response: str, test_design: Dict[str, Any]) -> List[str]:
         """Create actual test files from Claude response"""
         
+        if self.streamed_files:
+            for path in self.streamed_files:
+                console.print(f"[green]✅ Created test file: {path}[/green]")
+            return list(self.streamed_files)
+        
+        # No file blocks in the response; keep it all in one suite file
         test_files = []
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
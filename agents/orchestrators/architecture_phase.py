@@ -6,6 +6,7 @@
 #   "rich",
 #   "pydantic",
 #   "python-dotenv",
+#   "psycopg2-binary",
 #   "click",
 # ]
 # ///
@@ -19,6 +20,7 @@ from datetime import datetime
 
 
 # Base agent classes embedded for UV standalone execution
+import sys
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
 from datetime import datetime
@@ -29,6 +31,13 @@ try:
     from rich.console import Console
     from supabase import create_client, Client
     from dotenv import load_dotenv
+    
+    # Subtask DAG execution
+    lib_path = Path(__file__).parent.parent.parent / 'lib'
+    sys.path.insert(0, str(lib_path))
+    from dag_executor import TaskGraph, DAGResult, run_task_graph, wait_for_agent_tasks
+    from task_memo import enqueue_task
+    from artifact_index import ProjectArtifacts, project_artifacts, watch_artifacts
 except ImportError as e:
     print(f"Missing dependency: {e}")
     exit(1)
@@ -61,6 +70,9 @@ class BaseAgent(ABC):
         # Load project context
         self.project_id = self._load_project_id()
         self.supabase = self._init_supabase()
+        # Phase checks query the tree while subtasks write it: one watched index per
+        # process, its start-up scan overlapping the subtask run
+        watch_artifacts()
         
     def _load_project_id(self) -> str:
         sparc_dir = Path('.sparc')
@@ -88,8 +100,13 @@ class BaseAgent(ABC):
         """Check if a namespaced file exists"""
         return Path(self._get_namespaced_path(path)).exists()
     
+    @property
+    def artifacts(self) -> ProjectArtifacts:
+        """Project tree queries, answered from the watched index"""
+        return project_artifacts()
+    
     async def delegate_task(self, to_agent: str, task_description: str, 
-                          context: Dict[str, Any], priority: int = 5) -> str:
+                          context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         task_data = {
             'namespace': self.project_id,
             'from_agent': self.agent_name,
@@ -105,20 +122,28 @@ class BaseAgent(ABC):
                 'priority': priority
             },
             'status': 'pending',
+            'priority': priority,
             'created_at': datetime.now().isoformat()
         }
         
-        result = self.supabase.table('agent_tasks').insert(task_data).execute()
-        return result.data[0]['id'] if result.data else None
+        # Equivalent delegations reuse the in-flight or completed task
+        return enqueue_task(self.supabase, task_data, bypass=bypass_memo)
     
     async def _delegate_task(self, to_agent: str, task_description: str, 
-                           task_context: Dict[str, Any], priority: int = 5) -> str:
+                           task_context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         """Delegate task to another agent"""
-        return await self.delegate_task(to_agent, task_description, task_context, priority)
+        return await self.delegate_task(to_agent, task_description, task_context, priority, bypass_memo)
 
     async def _wait_for_tasks(self, task_ids: List[str]) -> Dict[str, Any]:
-        """Wait for delegated tasks to complete - placeholder implementation"""
-        return {task_id: {"success": True, "output": f"Mock completion for {task_id}"} for task_id in task_ids}
+        """Wait for delegated tasks to complete"""
+        return await wait_for_agent_tasks(self, task_ids)
+
+    async def _run_task_graph(self, graph: TaskGraph) -> DAGResult:
+        """Delegate subtasks as soon as their dependencies complete"""
+        result = await run_task_graph(self, graph)
+        console.print(f"[blue]🧭 Critical path: {' → '.join(result.critical_path)} "
+                      f"({result.critical_path_seconds:.1f}s of {result.wall_seconds:.1f}s)[/blue]")
+        return result
 
     async def _request_approval(self, phase_name: str, artifacts: Dict[str, Any], message: str = "") -> str:
         """Request approval for phase completion - placeholder implementation"""
@@ -192,11 +217,14 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 errors=[f"Prerequisites not met: {prereqs['missing']}"]
             )
         
+        graph = TaskGraph()
+        
         # Step 1: Create high-level system architecture
-        system_design_task_id = await self._delegate_task(
+        graph.add(
+            "system_design",
             to_agent="architect-highlevel-module",
-            task_description="Create comprehensive system architecture design",
-            task_context={
+            description="Create comprehensive system architecture design",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "output_file": self._get_namespaced_path("docs/architecture/system_design.md"),
                 "architecture_focus": "system_design",
@@ -219,13 +247,13 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 2: Create component interfaces specification
-        interfaces_task_id = await self._delegate_task(
+        graph.add(
+            "interfaces",
             to_agent="architect-highlevel-module",
-            task_description="Create detailed component interfaces specification",
-            task_context={
+            description="Create detailed component interfaces specification",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "prerequisites_valid": prereqs["valid"],
-                "system_design_task_id": system_design_task_id,
                 "output_file": self._get_namespaced_path("docs/architecture/component_interfaces.md"),
                 "architecture_focus": "component_interfaces",
                 "requirements": [
@@ -243,17 +271,18 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Error handling strategies defined"
                 ]
             },
-            priority=8
+            priority=8,
+            depends_on=["system_design"]
         )
         
         # Step 3: Create deployment architecture
-        deployment_task_id = await self._delegate_task(
+        graph.add(
+            "deployment",
             to_agent="architect-highlevel-module",
-            task_description="Create deployment and infrastructure architecture",
-            task_context={
+            description="Create deployment and infrastructure architecture",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "prerequisites_valid": prereqs["valid"],
-                "system_design_task_id": system_design_task_id,
                 "output_file": self._get_namespaced_path("docs/architecture/deployment_architecture.md"),
                 "architecture_focus": "deployment_infrastructure",
                 "requirements": [
@@ -271,17 +300,18 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "CI/CD pipeline designed"
                 ]
             },
-            priority=8
+            priority=8,
+            depends_on=["system_design"]
         )
         
         # Step 4: Create data architecture
-        data_architecture_task_id = await self._delegate_task(
+        graph.add(
+            "data_architecture",
             to_agent="architect-highlevel-module",
-            task_description="Create data architecture and flow design",
-            task_context={
+            description="Create data architecture and flow design",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "prerequisites_valid": prereqs["valid"],
-                "system_design_task_id": system_design_task_id,
                 "output_file": self._get_namespaced_path("docs/architecture/data_architecture.md"),
                 "architecture_focus": "data_architecture",
                 "requirements": [
@@ -299,17 +329,16 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Migration plans created"
                 ]
             },
-            priority=7
+            priority=7,
+            depends_on=["system_design"]
         )
         
         # Step 5: Security architecture review
-        security_task_id = await self._delegate_task(
+        graph.add(
+            "security",
             to_agent="security-reviewer-module",
-            task_description="Create security architecture and threat analysis",
-            task_context={
-                "system_design_task_id": system_design_task_id,
-                "interfaces_task_id": interfaces_task_id,
-                "deployment_task_id": deployment_task_id,
+            description="Create security architecture and threat analysis",
+            context={
                 "output_file": self._get_namespaced_path("docs/architecture/security_architecture.md"),
                 "security_focus": "architecture_security",
                 "requirements": [
@@ -327,17 +356,16 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Security monitoring designed"
                 ]
             },
-            priority=7
+            priority=7,
+            depends_on=["system_design", "interfaces", "deployment"]
         )
         
         # Step 6: Performance optimization analysis
-        optimization_task_id = await self._delegate_task(
+        graph.add(
+            "optimization",
             to_agent="optimizer-module",
-            task_description="Analyze and optimize architecture for performance",
-            task_context={
-                "system_design_task_id": system_design_task_id,
-                "data_architecture_task_id": data_architecture_task_id,
-                "deployment_task_id": deployment_task_id,
+            description="Analyze and optimize architecture for performance",
+            context={
                 "optimization_focus": "architecture_performance",
                 "requirements": [
                     "Analyze architecture for performance bottlenecks",
@@ -353,18 +381,16 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Capacity planning completed"
                 ]
             },
-            priority=6
+            priority=6,
+            depends_on=["system_design", "data_architecture", "deployment"]
         )
         
         # Step 7: Critical architecture validation
-        validation_task_id = await self._delegate_task(
+        graph.add(
+            "validation",
             to_agent="devils-advocate-critical-evaluator",
-            task_description="Validate architecture design and identify potential issues",
-            task_context={
-                "system_design_task_id": system_design_task_id,
-                "interfaces_task_id": interfaces_task_id,
-                "deployment_task_id": deployment_task_id,
-                "security_task_id": security_task_id,
+            description="Validate architecture design and identify potential issues",
+            context={
                 "evaluation_focus": "architecture_validation",
                 "requirements": [
                     "Validate architecture against requirements",
@@ -380,13 +406,27 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Risk analysis performed"
                 ]
             },
-            priority=6
+            priority=6,
+            depends_on=["system_design", "interfaces", "deployment", "security"]
         )
         
-        # Wait for all tasks to complete
-        all_tasks = [system_design_task_id, interfaces_task_id, deployment_task_id, 
-                    data_architecture_task_id, security_task_id, optimization_task_id, validation_task_id]
-        completed_tasks = await self._wait_for_tasks(all_tasks)
+        # Run subtasks as their dependencies complete
+        dag_result = await self._run_task_graph(graph)
+        completed_tasks = dag_result.completed_tasks()
+        
+        if not dag_result.success:
+            return AgentResult(
+                success=False,
+                outputs={
+                    "error": "Delegated subtasks failed",
+                    "failed_tasks": dag_result.failed,
+                    "cancelled_tasks": dag_result.cancelled,
+                    "completed_tasks": completed_tasks
+                },
+                files_created=[],
+                files_modified=[],
+                errors=[f"{key}: {completed_tasks[key]['error']}" for key in dag_result.failed]
+            )
         
         # Identify created documents
         documents_created = await self._identify_created_documents()
@@ -417,6 +457,7 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 "phase": "architecture",
                 "documents_created": documents_created,
                 "completed_tasks": completed_tasks,
+                "critical_path": dag_result.critical_path,
                 "approval_requested": approval_id,
                 "next_phase": "refinement-testing",
                 "message": "Architecture phase completed, approval requested"
@@ -487,7 +528,9 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         ]
         
         for path, doc_type, description in architecture_files:
-            if Path(path).exists():
+            # Written by subtask agents in other processes: re-stat it instead of waiting for the watcher
+            self.artifacts.refresh(path)
+            if self.artifacts.exists(path):
                 docs_created.append({
                     "path": path,
                     "type": doc_type,
@@ -496,8 +539,8 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 })
         
         # Check for additional architecture files
-        if Path(self._get_namespaced_path("docs/architecture")).exists():
-            for arch_file in Path(self._get_namespaced_path("docs/architecture")).glob("*.md"):
+        if self.artifacts.exists(self._get_namespaced_path("docs/architecture")):
+            for arch_file in self.artifacts.files(self._get_namespaced_path("docs/architecture"), "*.md"):
                 file_path = str(arch_file)
                 if not any(doc["path"] == file_path for doc in docs_created):
                     docs_created.append({
@@ -508,8 +551,8 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     })
         
         # Check for reports
-        if Path(self._get_namespaced_path("docs/reports")).exists():
-            for report_file in Path(self._get_namespaced_path("docs/reports")).glob("*architecture*.md"):
+        if self.artifacts.exists(self._get_namespaced_path("docs/reports")):
+            for report_file in self.artifacts.files(self._get_namespaced_path("docs/reports"), "*architecture*.md"):
                 docs_created.append({
                     "path": str(report_file),
                     "type": "architecture_report",
@@ -582,15 +625,19 @@ def main(namespace: str, task_id: str, goal: str):
     # Create agent and execute
     agent = ArchitecturePhaseOrchestrator()
     
-    async def run():
+    async def run() -> bool:
         try:
             result = await agent._execute_task(task, task.context)
             console.print(f"[green]✅ {agent.agent_name} completed successfully[/green]")
             console.print(f"Result: {result}")
+            return result.success
         except Exception as e:
             console.print(f"[red]❌ {agent.agent_name} failed: {e}[/red]")
+            return False
     
-    asyncio.run(run())
+    # The dispatcher takes the exit code as the task outcome
+    if not asyncio.run(run()):
+        raise SystemExit(1)
 
 if __name__ == "__main__":
     main()
@@ -6,17 +6,20 @@
 #   "rich",
 #   "pydantic",
 #   "python-dotenv",
+#   "psycopg2-binary",
 # ]
 # ///
 
 """BMO Completion Phase Orchestrator"""
 
+import os
 from typing import Dict, Any, List
 from pathlib import Path
 from datetime import datetime
 
 
 # Base agent classes embedded for UV standalone execution
+import sys
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
 from datetime import datetime
@@ -27,6 +30,13 @@ try:
     from rich.console import Console
     from supabase import create_client, Client
     from dotenv import load_dotenv
+    
+    # Subtask DAG execution
+    lib_path = Path(__file__).parent.parent.parent / 'lib'
+    sys.path.insert(0, str(lib_path))
+    from dag_executor import TaskGraph, DAGResult, run_task_graph, wait_for_agent_tasks
+    from task_memo import enqueue_task
+    from artifact_index import ProjectArtifacts, project_artifacts, watch_artifacts
 except ImportError as e:
     print(f"Missing dependency: {e}")
     exit(1)
@@ -59,6 +69,9 @@ class BaseAgent(ABC):
         # Load project context
         self.project_id = self._load_project_id()
         self.supabase = self._init_supabase()
+        # Phase checks query the tree while subtasks write it: one watched index per
+        # process, its start-up scan overlapping the subtask run
+        watch_artifacts()
         
     def _load_project_id(self) -> str:
         sparc_dir = Path('.sparc')
@@ -86,8 +99,13 @@ class BaseAgent(ABC):
         """Check if a namespaced file exists"""
         return Path(self._get_namespaced_path(path)).exists()
     
+    @property
+    def artifacts(self) -> ProjectArtifacts:
+        """Project tree queries, answered from the watched index"""
+        return project_artifacts()
+    
     async def delegate_task(self, to_agent: str, task_description: str, 
-                          context: Dict[str, Any], priority: int = 5) -> str:
+                          context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         task_data = {
             'namespace': self.project_id,
             'from_agent': self.agent_name,
@@ -103,11 +121,33 @@ class BaseAgent(ABC):
                 'priority': priority
             },
             'status': 'pending',
+            'priority': priority,
             'created_at': datetime.now().isoformat()
         }
         
-        result = self.supabase.table('agent_tasks').insert(task_data).execute()
-        return result.data[0]['id'] if result.data else None
+        # Equivalent delegations reuse the in-flight or completed task
+        return enqueue_task(self.supabase, task_data, bypass=bypass_memo)
+    
+    async def _delegate_task(self, to_agent: str, task_description: str, 
+                           task_context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
+        """Delegate task to another agent"""
+        return await self.delegate_task(to_agent, task_description, task_context, priority, bypass_memo)
+
+    async def _wait_for_tasks(self, task_ids: List[str]) -> Dict[str, Any]:
+        """Wait for delegated tasks to complete"""
+        return await wait_for_agent_tasks(self, task_ids)
+
+    async def _run_task_graph(self, graph: TaskGraph) -> DAGResult:
+        """Delegate subtasks as soon as their dependencies complete"""
+        result = await run_task_graph(self, graph)
+        console.print(f"[blue]🧭 Critical path: {' → '.join(result.critical_path)} "
+                      f"({result.critical_path_seconds:.1f}s of {result.wall_seconds:.1f}s)[/blue]")
+        return result
+
+    async def _request_approval(self, phase_name: str, artifacts: Dict[str, Any], message: str = "") -> str:
+        """Request approval for phase completion - placeholder implementation"""
+        approval_id = f"approval_request_{phase_name}_{datetime.now().isoformat()}"
+        return approval_id
     
     @abstractmethod
     async def _execute_task(self, task: TaskPayload, context: Dict[str, Any]) -> AgentResult:
@@ -179,11 +219,14 @@ This phase requires human approval before proceeding to completion phases.
                 errors=[f"Prerequisites not met: {prereqs['missing']}"]
             )
         
+        graph = TaskGraph()
+        
         # Step 1: Triangulate original intent against implementation
-        intent_triangulation_task_id = await self._delegate_task(
+        graph.add(
+            "intent_triangulation",
             to_agent="bmo-intent-triangulator",
-            task_description="Triangulate original intent against final implementation",
-            task_context={
+            description="Triangulate original intent against final implementation",
+            context={
                 "original_goal": prereqs["original_goal"],
                 "mutual_understanding": prereqs["mutual_understanding"],
                 "comprehensive_spec": prereqs["comprehensive_spec"],
@@ -208,14 +251,14 @@ This phase requires human approval before proceeding to completion phases.
         )
         
         # Step 2: Generate comprehensive BMO test suite
-        bmo_test_generation_task_id = await self._delegate_task(
+        graph.add(
+            "bmo_test_generation",
             to_agent="bmo-test-suite-generator",
-            task_description="Generate comprehensive BMO validation test suite",
-            task_context={
+            description="Generate comprehensive BMO validation test suite",
+            context={
                 "original_goal": prereqs["original_goal"],
                 "comprehensive_spec": prereqs["comprehensive_spec"],
                 "implementation_summary": prereqs["implementation_summary"],
-                "intent_analysis_task_id": intent_triangulation_task_id,
                 "output_file": self._get_namespaced_path("docs/bmo_test_suite.md"),
                 "requirements": [
                     "Generate tests that validate original intent fulfillment",
@@ -232,18 +275,19 @@ This phase requires human approval before proceeding to completion phases.
                     "Regression tests for intent created"
                 ]
             },
-            priority=9
+            priority=9,
+            depends_on=["intent_triangulation"]
         )
         
         # Step 3: Verify contracts and behavioral expectations
-        contract_verification_task_id = await self._delegate_task(
+        graph.add(
+            "contract_verification",
             to_agent="bmo-contract-verifier",
-            task_description="Verify contracts and behavioral expectations",
-            task_context={
+            description="Verify contracts and behavioral expectations",
+            context={
                 "comprehensive_spec": prereqs["comprehensive_spec"],
                 "implementation_summary": prereqs["implementation_summary"],
                 "architecture_design": prereqs.get("architecture_design", ""),
-                "intent_analysis_task_id": intent_triangulation_task_id,
                 "output_file": self._get_namespaced_path("docs/bmo_contract_verification.md"),
                 "requirements": [
                     "Verify all specified contracts are implemented",
@@ -260,19 +304,20 @@ This phase requires human approval before proceeding to completion phases.
                     "Performance contracts verified"
                 ]
             },
-            priority=9
+            priority=9,
+            depends_on=["intent_triangulation"]
         )
         
         # Step 4: Synthesize system-wide mental model
-        system_model_task_id = await self._delegate_task(
+        graph.add(
+            "system_model",
             to_agent="bmo-system-model-synthesizer",
-            task_description="Synthesize comprehensive system mental model",
-            task_context={
+            description="Synthesize comprehensive system mental model",
+            context={
                 "original_goal": prereqs["original_goal"],
                 "comprehensive_spec": prereqs["comprehensive_spec"],
                 "architecture_design": prereqs.get("architecture_design", ""),
                 "implementation_summary": prereqs["implementation_summary"],
-                "intent_analysis_task_id": intent_triangulation_task_id,
                 "output_file": self._get_namespaced_path("docs/bmo_system_model.md"),
                 "requirements": [
                     "Create comprehensive system mental model",
@@ -289,18 +334,17 @@ This phase requires human approval before proceeding to completion phases.
                     "System properties synthesized"
                 ]
             },
-            priority=8
+            priority=8,
+            depends_on=["intent_triangulation"]
         )
         
         # Step 5: Generate end-to-end BMO validation tests
-        e2e_validation_task_id = await self._delegate_task(
+        graph.add(
+            "e2e_validation",
             to_agent="bmo-e2e-test-generator",
-            task_description="Generate end-to-end BMO validation tests",
-            task_context={
+            description="Generate end-to-end BMO validation tests",
+            context={
                 "original_goal": prereqs["original_goal"],
-                "bmo_test_suite_task_id": bmo_test_generation_task_id,
-                "system_model_task_id": system_model_task_id,
-                "contract_verification_task_id": contract_verification_task_id,
                 "output_directory": self._get_namespaced_path("tests/bmo_e2e/"),
                 "requirements": [
                     "Create end-to-end validation test scenarios",
@@ -317,19 +361,17 @@ This phase requires human approval before proceeding to completion phases.
                     "Intent preservation tests implemented"
                 ]
             },
-            priority=8
+            priority=8,
+            depends_on=["bmo_test_generation", "system_model", "contract_verification"]
         )
         
         # Step 6: Conduct holistic intent verification
-        holistic_verification_task_id = await self._delegate_task(
+        graph.add(
+            "holistic_verification",
             to_agent="bmo-holistic-intent-verifier",
-            task_description="Conduct final holistic intent verification",
-            task_context={
+            description="Conduct final holistic intent verification",
+            context={
                 "original_goal": prereqs["original_goal"],
-                "intent_analysis_task_id": intent_triangulation_task_id,
-                "contract_verification_task_id": contract_verification_task_id,
-                "system_model_task_id": system_model_task_id,
-                "e2e_validation_task_id": e2e_validation_task_id,
                 "output_file": self._get_namespaced_path("docs/bmo_validation_report.md"),
                 "requirements": [
                     "Conduct comprehensive intent verification",
@@ -346,14 +388,27 @@ This phase requires human approval before proceeding to completion phases.
                     "Final validation summary created"
                 ]
             },
-            priority=10
+            priority=10,
+            depends_on=["intent_triangulation", "contract_verification", "system_model", "e2e_validation"]
         )
         
-        # Wait for all tasks to complete
-        all_tasks = [intent_triangulation_task_id, bmo_test_generation_task_id, 
-                    contract_verification_task_id, system_model_task_id, 
-                    e2e_validation_task_id, holistic_verification_task_id]
-        completed_tasks = await self._wait_for_tasks(all_tasks)
+        # Run subtasks as their dependencies complete
+        dag_result = await self._run_task_graph(graph)
+        completed_tasks = dag_result.completed_tasks()
+        
+        if not dag_result.success:
+            return AgentResult(
+                success=False,
+                outputs={
+                    "error": "Delegated subtasks failed",
+                    "failed_tasks": dag_result.failed,
+                    "cancelled_tasks": dag_result.cancelled,
+                    "completed_tasks": completed_tasks
+                },
+                files_created=[],
+                files_modified=[],
+                errors=[f"{key}: {completed_tasks[key]['error']}" for key in dag_result.failed]
+            )
         
         # Identify created documents
         documents_created = await self._identify_created_documents()
@@ -388,6 +443,7 @@ This phase requires human approval before proceeding to completion phases.
                 "phase": "bmo-completion",
                 "documents_created": documents_created,
                 "completed_tasks": completed_tasks,
+                "critical_path": dag_result.critical_path,
                 "validation_results": validation_results,
                 "approval_requested": approval_id,
                 "next_phase": "maintenance",
@@ -477,7 +533,9 @@ This phase requires human approval before proceeding to completion phases.
         ]
         
         for path, doc_type, description in bmo_docs:
-            if Path(path).exists():
+            # Written by subtask agents in other processes: re-stat it instead of waiting for the watcher
+            self.artifacts.refresh(path)
+            if self.artifacts.exists(path):
                 docs_created.append({
                     "path": path,
                     "type": doc_type,
@@ -486,8 +544,8 @@ This phase requires human approval before proceeding to completion phases.
                 })
         
         # BMO E2E test files
-        if Path(self._get_namespaced_path("tests/bmo_e2e/")).exists():
-            for test_file in Path(self._get_namespaced_path("tests/bmo_e2e/")).rglob("*.py"):
+        if self.artifacts.exists(self._get_namespaced_path("tests/bmo_e2e/")):
+            for test_file in self.artifacts.files(self._get_namespaced_path("tests/bmo_e2e/"), "*.py", recursive=True):
                 docs_created.append({
                     "path": str(test_file),
                     "type": "bmo_e2e_test",
@@ -496,8 +554,8 @@ This phase requires human approval before proceeding to completion phases.
                 })
         
         # Additional BMO reports
-        if Path(self._get_namespaced_path("docs/reports")).exists():
-            for report_file in Path(self._get_namespaced_path("docs/reports")).glob("*bmo*.md"):
+        if self.artifacts.exists(self._get_namespaced_path("docs/reports")):
+            for report_file in self.artifacts.files(self._get_namespaced_path("docs/reports"), "*bmo*.md"):
                 docs_created.append({
                     "path": str(report_file),
                     "type": "bmo_report",
@@ -612,15 +670,19 @@ def main(namespace: str, task_id: str, goal: str):
         agent_class = globals()[agent_class_name[0]]
         agent = agent_class()
         
-        async def run():
+        async def run() -> bool:
             try:
                 result = await agent._execute_task(task, task.context)
                 console.print(f"[green]✅ {agent.agent_name} completed successfully[/green]")
                 console.print(f"Result: {result}")
+                return result.success
             except Exception as e:
                 console.print(f"[red]❌ {agent.agent_name} failed: {e}[/red]")
+                return False
         
-        asyncio.run(run())
+        # The dispatcher takes the exit code as the task outcome
+        if not asyncio.run(run()):
+            raise SystemExit(1)
     else:
         console.print("[red]❌ No agent class found[/red]")
 
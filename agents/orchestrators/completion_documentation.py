@@ -6,6 +6,7 @@
 #   "rich",
 #   "pydantic",
 #   "python-dotenv",
+#   "psycopg2-binary",
 #   "click",
 # ]
 # ///
@@ -19,6 +20,7 @@ from datetime import datetime
 
 
 # Base agent classes embedded for UV standalone execution
+import sys
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
 from datetime import datetime
@@ -29,6 +31,13 @@ try:
     from rich.console import Console
     from supabase import create_client, Client
     from dotenv import load_dotenv
+    
+    # Subtask DAG execution
+    lib_path = Path(__file__).parent.parent.parent / 'lib'
+    sys.path.insert(0, str(lib_path))
+    from dag_executor import TaskGraph, DAGResult, run_task_graph, wait_for_agent_tasks
+    from task_memo import enqueue_task
+    from artifact_index import ProjectArtifacts, project_artifacts, watch_artifacts
 except ImportError as e:
     print(f"Missing dependency: {e}")
     exit(1)
@@ -61,6 +70,9 @@ class BaseAgent(ABC):
         # Load project context
         self.project_id = self._load_project_id()
         self.supabase = self._init_supabase()
+        # Phase checks query the tree while subtasks write it: one watched index per
+        # process, its start-up scan overlapping the subtask run
+        watch_artifacts()
         
     def _load_project_id(self) -> str:
         sparc_dir = Path('.sparc')
@@ -89,8 +101,13 @@ class BaseAgent(ABC):
         """Check if a namespaced file exists"""
         return Path(self._get_namespaced_path(path)).exists()
     
+    @property
+    def artifacts(self) -> ProjectArtifacts:
+        """Project tree queries, answered from the watched index"""
+        return project_artifacts()
+    
     async def delegate_task(self, to_agent: str, task_description: str, 
-                          context: Dict[str, Any], priority: int = 5) -> str:
+                          context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         task_data = {
             'namespace': self.project_id,
             'from_agent': self.agent_name,
@@ -106,20 +123,28 @@ class BaseAgent(ABC):
                 'priority': priority
             },
             'status': 'pending',
+            'priority': priority,
             'created_at': datetime.now().isoformat()
         }
         
-        result = self.supabase.table('agent_tasks').insert(task_data).execute()
-        return result.data[0]['id'] if result.data else None
+        # Equivalent delegations reuse the in-flight or completed task
+        return enqueue_task(self.supabase, task_data, bypass=bypass_memo)
     
     async def _delegate_task(self, to_agent: str, task_description: str, 
-                           task_context: Dict[str, Any], priority: int = 5) -> str:
+                           task_context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         """Delegate task to another agent"""
-        return await self.delegate_task(to_agent, task_description, task_context, priority)
+        return await self.delegate_task(to_agent, task_description, task_context, priority, bypass_memo)
 
     async def _wait_for_tasks(self, task_ids: List[str]) -> Dict[str, Any]:
-        """Wait for delegated tasks to complete - placeholder implementation"""
-        return {task_id: {"success": True, "output": f"Mock completion for {task_id}"} for task_id in task_ids}
+        """Wait for delegated tasks to complete"""
+        return await wait_for_agent_tasks(self, task_ids)
+
+    async def _run_task_graph(self, graph: TaskGraph) -> DAGResult:
+        """Delegate subtasks as soon as their dependencies complete"""
+        result = await run_task_graph(self, graph)
+        console.print(f"[blue]🧭 Critical path: {' → '.join(result.critical_path)} "
+                      f"({result.critical_path_seconds:.1f}s of {result.wall_seconds:.1f}s)[/blue]")
+        return result
 
     async def _request_approval(self, phase_name: str, artifacts: Dict[str, Any], message: str = "") -> str:
         """Request approval for phase completion - placeholder implementation"""
@@ -195,11 +220,14 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 errors=[f"Prerequisites not met: {prereqs['missing']}"]
             )
         
+        graph = TaskGraph()
+        
         # Step 1: Create comprehensive user documentation with Context7 enhancement
-        user_docs_task_id = await self._delegate_task(
+        graph.add(
+            "user_docs",
             to_agent="docs-writer-feature",
-            task_description="Create comprehensive user documentation with Context7 analysis",
-            task_context={
+            description="Create comprehensive user documentation with Context7 analysis",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "bmo_validation": prereqs.get("bmo_validation", ""),
                 "feature_focus": "user_documentation",
@@ -227,10 +255,11 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 2: Generate API documentation and developer guides with Context7 enhancement
-        api_docs_task_id = await self._delegate_task(
+        graph.add(
+            "api_docs",
             to_agent="code-comprehension-assistant-v2",
-            task_description="Generate API documentation and developer guides with Context7 analysis",
-            task_context={
+            description="Generate API documentation and developer guides with Context7 analysis",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "analysis_focus": "api_documentation",
                 "output_directory": self._get_namespaced_path("docs/api/"),
@@ -257,10 +286,11 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 3: Create developer documentation and guides
-        developer_docs_task_id = await self._delegate_task(
+        graph.add(
+            "developer_docs",
             to_agent="docs-writer-feature",
-            task_description="Create developer documentation and contribution guides",
-            task_context={
+            description="Create developer documentation and contribution guides",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "architecture_design": prereqs.get("architecture_design", ""),
                 "operations_docs": prereqs.get("operations_docs", ""),
@@ -285,10 +315,11 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 4: Create project README and overview
-        readme_task_id = await self._delegate_task(
+        graph.add(
+            "readme",
             to_agent="docs-writer-feature",
-            task_description="Create project README and overview documentation",
-            task_context={
+            description="Create project README and overview documentation",
+            context={
                 "original_goal": prereqs.get("original_goal", ""),
                 "prerequisites_valid": prereqs["valid"],
                 "bmo_validation": prereqs.get("bmo_validation", ""),
@@ -313,10 +344,11 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 5: Create project completion report
-        completion_report_task_id = await self._delegate_task(
+        graph.add(
+            "completion_report",
             to_agent="research-planner-strategic",
-            task_description="Create comprehensive project completion report",
-            task_context={
+            description="Create comprehensive project completion report",
+            context={
                 "original_goal": prereqs.get("original_goal", ""),
                 "prerequisites_valid": prereqs["valid"],
                 "bmo_validation": prereqs.get("bmo_validation", ""),
@@ -342,10 +374,11 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 6: Create changelog and version history
-        changelog_task_id = await self._delegate_task(
+        graph.add(
+            "changelog",
             to_agent="docs-writer-feature",
-            task_description="Create changelog and version history documentation",
-            task_context={
+            description="Create changelog and version history documentation",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "all_project_files": prereqs.get("all_project_files", []),
                 "feature_focus": "changelog_history",
@@ -369,10 +402,11 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 7: Create project handover documentation
-        handover_docs_task_id = await self._delegate_task(
+        graph.add(
+            "handover_docs",
             to_agent="docs-writer-feature",
-            task_description="Create project handover and transition documentation",
-            task_context={
+            description="Create project handover and transition documentation",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "operations_docs": prereqs.get("operations_docs", ""),
                 "bmo_validation": prereqs.get("bmo_validation", ""),
@@ -397,15 +431,11 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 8: Quality review and consistency check
-        quality_review_task_id = await self._delegate_task(
+        graph.add(
+            "quality_review",
             to_agent="devils-advocate-critical-evaluator",
-            task_description="Review documentation quality and consistency",
-            task_context={
-                "user_docs_task_id": user_docs_task_id,
-                "api_docs_task_id": api_docs_task_id,
-                "developer_docs_task_id": developer_docs_task_id,
-                "readme_task_id": readme_task_id,
-                "completion_report_task_id": completion_report_task_id,
+            description="Review documentation quality and consistency",
+            context={
                 "evaluation_focus": "documentation_quality",
                 "requirements": [
                     "Review documentation for completeness and accuracy",
@@ -422,18 +452,16 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Improvement recommendations provided"
                 ]
             },
-            priority=6
+            priority=6,
+            depends_on=["user_docs", "api_docs", "developer_docs", "readme", "completion_report"]
         )
         
         # Step 9: Create documentation index and organization
-        documentation_index_task_id = await self._delegate_task(
+        graph.add(
+            "documentation_index",
             to_agent="docs-writer-feature",
-            task_description="Create documentation index and organization structure",
-            task_context={
-                "user_docs_task_id": user_docs_task_id,
-                "api_docs_task_id": api_docs_task_id,
-                "developer_docs_task_id": developer_docs_task_id,
-                "quality_review_task_id": quality_review_task_id,
+            description="Create documentation index and organization structure",
+            context={
                 "feature_focus": "documentation_organization",
                 "output_file": self._get_namespaced_path("docs/index.md"),
                 "requirements": [
@@ -451,14 +479,27 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Table of contents generated"
                 ]
             },
-            priority=5
+            priority=5,
+            depends_on=["user_docs", "api_docs", "developer_docs", "quality_review"]
         )
         
-        # Wait for all tasks to complete
-        all_tasks = [user_docs_task_id, api_docs_task_id, developer_docs_task_id, readme_task_id, 
-                    completion_report_task_id, changelog_task_id, handover_docs_task_id, 
-                    quality_review_task_id, documentation_index_task_id]
-        completed_tasks = await self._wait_for_tasks(all_tasks)
+        # Run subtasks as their dependencies complete
+        dag_result = await self._run_task_graph(graph)
+        completed_tasks = dag_result.completed_tasks()
+        
+        if not dag_result.success:
+            return AgentResult(
+                success=False,
+                outputs={
+                    "error": "Delegated subtasks failed",
+                    "failed_tasks": dag_result.failed,
+                    "cancelled_tasks": dag_result.cancelled,
+                    "completed_tasks": completed_tasks
+                },
+                files_created=[],
+                files_modified=[],
+                errors=[f"{key}: {completed_tasks[key]['error']}" for key in dag_result.failed]
+            )
         
         # Identify created documents
         documents_created = await self._identify_created_documents()
@@ -490,6 +531,7 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 "phase": "completion-documentation",
                 "documents_created": documents_created,
                 "completed_tasks": completed_tasks,
+                "critical_path": dag_result.critical_path,
                 "documentation_validation": documentation_validation,
                 "project_summary": project_summary,
                 "github_deployment": github_deployment,
@@ -573,7 +615,9 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         ]
         
         for path, doc_type, description in root_docs:
-            if Path(path).exists():
+            # Written by subtask agents in other processes: re-stat it instead of waiting for the watcher
+            self.artifacts.refresh(path)
+            if self.artifacts.exists(path):
                 docs_created.append({
                     "path": path,
                     "type": doc_type,
@@ -590,8 +634,8 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         ]
         
         for doc_dir, doc_type, description in doc_directories:
-            if Path(doc_dir).exists():
-                for doc_file in Path(doc_dir).rglob("*.md"):
+            if self.artifacts.exists(doc_dir):
+                for doc_file in self.artifacts.files(doc_dir, "*.md", recursive=True):
                     docs_created.append({
                         "path": str(doc_file),
                         "type": doc_type,
@@ -602,8 +646,8 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         # Additional documentation files
         additional_doc_dirs = ["docs/guides/", "docs/tutorials/", "docs/examples/"]
         for doc_dir in additional_doc_dirs:
-            if Path(doc_dir).exists():
-                for doc_file in Path(doc_dir).rglob("*.md"):
+            if self.artifacts.exists(doc_dir):
+                for doc_file in self.artifacts.files(doc_dir, "*.md", recursive=True):
                     docs_created.append({
                         "path": str(doc_file),
                         "type": "additional_documentation",
@@ -779,15 +823,19 @@ def main(namespace: str, task_id: str, goal: str):
         agent_class = globals()[agent_class_name]
         agent = agent_class()
         
-        async def run():
+        async def run() -> bool:
             try:
                 result = await agent._execute_task(task, task.context)
                 console.print(f"[green]✅ {agent.agent_name} completed successfully[/green]")
                 console.print(f"Result: {result}")
+                return result.success
             except Exception as e:
                 console.print(f"[red]❌ {agent.agent_name} failed: {e}[/red]")
+                return False
         
-        asyncio.run(run())
+        # The dispatcher takes the exit code as the task outcome
+        if not asyncio.run(run()):
+            raise SystemExit(1)
     else:
         console.print("[red]❌ No agent class found[/red]")
 
@@ -6,17 +6,20 @@
 #   "rich",
 #   "pydantic",
 #   "python-dotenv",
+#   "psycopg2-binary",
 # ]
 # ///
 
 """Completion Maintenance Orchestrator"""
 
+import os
 from typing import Dict, Any, List
 from pathlib import Path
 from datetime import datetime
 
 
 # Base agent classes embedded for UV standalone execution
+import sys
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
 from datetime import datetime
@@ -27,6 +30,13 @@ try:
     from rich.console import Console
     from supabase import create_client, Client
     from dotenv import load_dotenv
+    
+    # Subtask DAG execution
+    lib_path = Path(__file__).parent.parent.parent / 'lib'
+    sys.path.insert(0, str(lib_path))
+    from dag_executor import TaskGraph, DAGResult, run_task_graph, wait_for_agent_tasks
+    from task_memo import enqueue_task
+    from artifact_index import ProjectArtifacts, project_artifacts, watch_artifacts
 except ImportError as e:
     print(f"Missing dependency: {e}")
     exit(1)
@@ -59,6 +69,9 @@ class BaseAgent(ABC):
         # Load project context
         self.project_id = self._load_project_id()
         self.supabase = self._init_supabase()
+        # Phase checks query the tree while subtasks write it: one watched index per
+        # process, its start-up scan overlapping the subtask run
+        watch_artifacts()
         
     def _load_project_id(self) -> str:
         sparc_dir = Path('.sparc')
@@ -86,8 +99,13 @@ class BaseAgent(ABC):
         """Check if a namespaced file exists"""
         return Path(self._get_namespaced_path(path)).exists()
     
+    @property
+    def artifacts(self) -> ProjectArtifacts:
+        """Project tree queries, answered from the watched index"""
+        return project_artifacts()
+    
     async def delegate_task(self, to_agent: str, task_description: str, 
-                          context: Dict[str, Any], priority: int = 5) -> str:
+                          context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         task_data = {
             'namespace': self.project_id,
             'from_agent': self.agent_name,
@@ -103,11 +121,33 @@ class BaseAgent(ABC):
                 'priority': priority
             },
             'status': 'pending',
+            'priority': priority,
             'created_at': datetime.now().isoformat()
         }
         
-        result = self.supabase.table('agent_tasks').insert(task_data).execute()
-        return result.data[0]['id'] if result.data else None
+        # Equivalent delegations reuse the in-flight or completed task
+        return enqueue_task(self.supabase, task_data, bypass=bypass_memo)
+    
+    async def _delegate_task(self, to_agent: str, task_description: str, 
+                           task_context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
+        """Delegate task to another agent"""
+        return await self.delegate_task(to_agent, task_description, task_context, priority, bypass_memo)
+
+    async def _wait_for_tasks(self, task_ids: List[str]) -> Dict[str, Any]:
+        """Wait for delegated tasks to complete"""
+        return await wait_for_agent_tasks(self, task_ids)
+
+    async def _run_task_graph(self, graph: TaskGraph) -> DAGResult:
+        """Delegate subtasks as soon as their dependencies complete"""
+        result = await run_task_graph(self, graph)
+        console.print(f"[blue]🧭 Critical path: {' → '.join(result.critical_path)} "
+                      f"({result.critical_path_seconds:.1f}s of {result.wall_seconds:.1f}s)[/blue]")
+        return result
+
+    async def _request_approval(self, phase_name: str, artifacts: Dict[str, Any], message: str = "") -> str:
+        """Request approval for phase completion - placeholder implementation"""
+        approval_id = f"approval_request_{phase_name}_{datetime.now().isoformat()}"
+        return approval_id
     
     @abstractmethod
     async def _execute_task(self, task: TaskPayload, context: Dict[str, Any]) -> AgentResult:
@@ -180,11 +220,14 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 errors=[f"Prerequisites not met: {prereqs['missing']}"]
             )
         
+        graph = TaskGraph()
+        
         # Step 1: Create comprehensive deployment guide
-        deployment_guide_task_id = await self._delegate_task(
+        graph.add(
+            "deployment_guide",
             to_agent="docs-writer-feature",
-            task_description="Create comprehensive deployment and operations guide",
-            task_context={
+            description="Create comprehensive deployment and operations guide",
+            context={
                 "architecture_design": prereqs["architecture_design"],
                 "implementation_summary": prereqs["implementation_summary"],
                 "bmo_validation": prereqs.get("bmo_validation", ""),
@@ -209,10 +252,11 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 2: Create monitoring and alerting setup
-        monitoring_setup_task_id = await self._delegate_task(
+        graph.add(
+            "monitoring_setup",
             to_agent="docs-writer-feature",
-            task_description="Create monitoring, logging, and alerting setup guide",
-            task_context={
+            description="Create monitoring, logging, and alerting setup guide",
+            context={
                 "architecture_design": prereqs["architecture_design"],
                 "implementation_summary": prereqs["implementation_summary"],
                 "feature_focus": "monitoring_alerting",
@@ -236,10 +280,11 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 3: Create backup and disaster recovery procedures
-        backup_recovery_task_id = await self._delegate_task(
+        graph.add(
+            "backup_recovery",
             to_agent="docs-writer-feature",
-            task_description="Create backup and disaster recovery procedures",
-            task_context={
+            description="Create backup and disaster recovery procedures",
+            context={
                 "architecture_design": prereqs["architecture_design"],
                 "implementation_summary": prereqs["implementation_summary"],
                 "feature_focus": "backup_disaster_recovery",
@@ -263,10 +308,11 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 4: Create maintenance runbook
-        maintenance_runbook_task_id = await self._delegate_task(
+        graph.add(
+            "maintenance_runbook",
             to_agent="docs-writer-feature",
-            task_description="Create operational maintenance runbook",
-            task_context={
+            description="Create operational maintenance runbook",
+            context={
                 "architecture_design": prereqs["architecture_design"],
                 "implementation_summary": prereqs["implementation_summary"],
                 "feature_focus": "maintenance_operations",
@@ -290,10 +336,11 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 5: Create troubleshooting guide
-        troubleshooting_task_id = await self._delegate_task(
+        graph.add(
+            "troubleshooting",
             to_agent="docs-writer-feature",
-            task_description="Create comprehensive troubleshooting guide",
-            task_context={
+            description="Create comprehensive troubleshooting guide",
+            context={
                 "architecture_design": prereqs["architecture_design"],
                 "implementation_summary": prereqs["implementation_summary"],
                 "feature_focus": "troubleshooting_support",
@@ -317,10 +364,11 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 6: Create scaling and performance optimization guide
-        scaling_optimization_task_id = await self._delegate_task(
+        graph.add(
+            "scaling_optimization",
             to_agent="optimizer-module",
-            task_description="Create scaling and performance optimization guide",
-            task_context={
+            description="Create scaling and performance optimization guide",
+            context={
                 "architecture_design": prereqs["architecture_design"],
                 "implementation_summary": prereqs["implementation_summary"],
                 "optimization_focus": "scaling_performance",
@@ -344,12 +392,12 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 7: Create deployment scripts and configurations
-        deployment_automation_task_id = await self._delegate_task(
+        graph.add(
+            "deployment_automation",
             to_agent="architect-highlevel-module",
-            task_description="Create deployment automation and configuration",
-            task_context={
+            description="Create deployment automation and configuration",
+            context={
                 "architecture_design": prereqs["architecture_design"],
-                "deployment_guide_task_id": deployment_guide_task_id,
                 "architecture_focus": "deployment_automation",
                 "output_directory": self._get_namespaced_path("deploy/"),
                 "requirements": [
@@ -367,16 +415,17 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Environment configs created"
                 ]
             },
-            priority=6
+            priority=6,
+            depends_on=["deployment_guide"]
         )
         
         # Step 8: Create operational security hardening guide
-        security_hardening_task_id = await self._delegate_task(
+        graph.add(
+            "security_hardening",
             to_agent="security-reviewer-module",
-            task_description="Create operational security hardening guide",
-            task_context={
+            description="Create operational security hardening guide",
+            context={
                 "architecture_design": prereqs["architecture_design"],
-                "deployment_guide_task_id": deployment_guide_task_id,
                 "security_focus": "operational_security",
                 "output_file": self._get_namespaced_path("docs/operations/security_hardening.md"),
                 "requirements": [
@@ -394,16 +443,17 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Incident response procedures documented"
                 ]
             },
-            priority=6
+            priority=6,
+            depends_on=["deployment_guide"]
         )
         
         # Step 9: Create operational resilience testing
-        resilience_testing_task_id = await self._delegate_task(
+        graph.add(
+            "resilience_testing",
             to_agent="chaos-engineer",
-            task_description="Create operational resilience testing procedures",
-            task_context={
+            description="Create operational resilience testing procedures",
+            context={
                 "architecture_design": prereqs["architecture_design"],
-                "monitoring_setup_task_id": monitoring_setup_task_id,
                 "chaos_testing_focus": "operational_resilience",
                 "output_file": self._get_namespaced_path("docs/operations/resilience_testing.md"),
                 "requirements": [
@@ -421,14 +471,27 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Recovery time validation procedures created"
                 ]
             },
-            priority=5
+            priority=5,
+            depends_on=["monitoring_setup"]
         )
         
-        # Wait for all tasks to complete
-        all_tasks = [deployment_guide_task_id, monitoring_setup_task_id, backup_recovery_task_id, 
-                    maintenance_runbook_task_id, troubleshooting_task_id, scaling_optimization_task_id,
-                    deployment_automation_task_id, security_hardening_task_id, resilience_testing_task_id]
-        completed_tasks = await self._wait_for_tasks(all_tasks)
+        # Run subtasks as their dependencies complete
+        dag_result = await self._run_task_graph(graph)
+        completed_tasks = dag_result.completed_tasks()
+        
+        if not dag_result.success:
+            return AgentResult(
+                success=False,
+                outputs={
+                    "error": "Delegated subtasks failed",
+                    "failed_tasks": dag_result.failed,
+                    "cancelled_tasks": dag_result.cancelled,
+                    "completed_tasks": completed_tasks
+                },
+                files_created=[],
+                files_modified=[],
+                errors=[f"{key}: {completed_tasks[key]['error']}" for key in dag_result.failed]
+            )
         
         # Identify created documents
         documents_created = await self._identify_created_documents()
@@ -454,6 +517,7 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 "phase": "completion-maintenance",
                 "documents_created": documents_created,
                 "completed_tasks": completed_tasks,
+                "critical_path": dag_result.critical_path,
                 "maintenance_validation": maintenance_validation,
                 "next_phase": "documentation",
                 "message": "Completion maintenance phase completed successfully"
@@ -537,7 +601,9 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         ]
         
         for path, doc_type, description in operations_docs:
-            if Path(path).exists():
+            # Written by subtask agents in other processes: re-stat it instead of waiting for the watcher
+            self.artifacts.refresh(path)
+            if self.artifacts.exists(path):
                 docs_created.append({
                     "path": path,
                     "type": doc_type,
@@ -548,19 +614,18 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         # Deployment scripts and configurations
         deploy_directories = ["deploy/", "monitoring/", "scripts/"]
         for deploy_dir in deploy_directories:
-            if Path(deploy_dir).exists():
-                for deploy_file in Path(deploy_dir).rglob("*"):
-                    if deploy_file.is_file():
-                        docs_created.append({
-                            "path": str(deploy_file),
-                            "type": "deployment_config",
-                            "description": f"Deployment configuration: {deploy_file.name}",
-                            "memory_type": "configuration"
-                        })
+            if self.artifacts.exists(deploy_dir):
+                for deploy_file in self.artifacts.files(deploy_dir, "*", recursive=True):
+                    docs_created.append({
+                        "path": str(deploy_file),
+                        "type": "deployment_config",
+                        "description": f"Deployment configuration: {deploy_file.name}",
+                        "memory_type": "configuration"
+                    })
         
         # Additional operations files
-        if Path(self._get_namespaced_path("docs/operations")).exists():
-            for ops_file in Path(self._get_namespaced_path("docs/operations")).glob("*.md"):
+        if self.artifacts.exists(self._get_namespaced_path("docs/operations")):
+            for ops_file in self.artifacts.files(self._get_namespaced_path("docs/operations"), "*.md"):
                 file_path = str(ops_file)
                 if not any(doc["path"] == file_path for doc in docs_created):
                     docs_created.append({
@@ -657,15 +722,19 @@ def main(namespace: str, task_id: str, goal: str):
         agent_class = globals()[agent_class_name[0]]
         agent = agent_class()
         
-        async def run():
+        async def run() -> bool:
             try:
                 result = await agent._execute_task(task, task.context)
                 console.print(f"[green]✅ {agent.agent_name} completed successfully[/green]")
                 console.print(f"Result: {result}")
+                return result.success
             except Exception as e:
                 console.print(f"[red]❌ {agent.agent_name} failed: {e}[/red]")
+                return False
         
-        asyncio.run(run())
+        # The dispatcher takes the exit code as the task outcome
+        if not asyncio.run(run()):
+            raise SystemExit(1)
     else:
         console.print("[red]❌ No agent class found[/red]")
 
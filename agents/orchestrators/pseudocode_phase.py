@@ -6,6 +6,7 @@
 #   "rich",
 #   "pydantic",
 #   "python-dotenv",
+#   "psycopg2-binary",
 #   "click",
 # ]
 # ///
@@ -19,6 +20,7 @@ from datetime import datetime
 
 
 # Base agent classes embedded for UV standalone execution
+import sys
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
 from datetime import datetime
@@ -29,6 +31,13 @@ try:
     from rich.console import Console
     from supabase import create_client, Client
     from dotenv import load_dotenv
+    
+    # Subtask DAG execution
+    lib_path = Path(__file__).parent.parent.parent / 'lib'
+    sys.path.insert(0, str(lib_path))
+    from dag_executor import TaskGraph, DAGResult, run_task_graph, wait_for_agent_tasks
+    from task_memo import enqueue_task
+    from artifact_index import ProjectArtifacts, project_artifacts, watch_artifacts
 except ImportError as e:
     print(f"Missing dependency: {e}")
     exit(1)
@@ -61,6 +70,9 @@ class BaseAgent(ABC):
         # Load project context
         self.project_id = self._load_project_id()
         self.supabase = self._init_supabase()
+        # Phase checks query the tree while subtasks write it: one watched index per
+        # process, its start-up scan overlapping the subtask run
+        watch_artifacts()
         
     def _load_project_id(self) -> str:
         sparc_dir = Path('.sparc')
@@ -88,8 +100,13 @@ class BaseAgent(ABC):
         """Check if a namespaced file exists"""
         return Path(self._get_namespaced_path(path)).exists()
     
+    @property
+    def artifacts(self) -> ProjectArtifacts:
+        """Project tree queries, answered from the watched index"""
+        return project_artifacts()
+    
     async def delegate_task(self, to_agent: str, task_description: str, 
-                          context: Dict[str, Any], priority: int = 5) -> str:
+                          context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         task_data = {
             'namespace': self.project_id,
             'from_agent': self.agent_name,
@@ -105,20 +122,28 @@ class BaseAgent(ABC):
                 'priority': priority
             },
             'status': 'pending',
+            'priority': priority,
             'created_at': datetime.now().isoformat()
         }
         
-        result = self.supabase.table('agent_tasks').insert(task_data).execute()
-        return result.data[0]['id'] if result.data else None
+        # Equivalent delegations reuse the in-flight or completed task
+        return enqueue_task(self.supabase, task_data, bypass=bypass_memo)
     
     async def _delegate_task(self, to_agent: str, task_description: str, 
-                           task_context: Dict[str, Any], priority: int = 5) -> str:
+                           task_context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         """Delegate task to another agent"""
-        return await self.delegate_task(to_agent, task_description, task_context, priority)
+        return await self.delegate_task(to_agent, task_description, task_context, priority, bypass_memo)
 
     async def _wait_for_tasks(self, task_ids: List[str]) -> Dict[str, Any]:
-        """Wait for delegated tasks to complete - placeholder implementation"""
-        return {task_id: {"success": True, "output": f"Mock completion for {task_id}"} for task_id in task_ids}
+        """Wait for delegated tasks to complete"""
+        return await wait_for_agent_tasks(self, task_ids)
+
+    async def _run_task_graph(self, graph: TaskGraph) -> DAGResult:
+        """Delegate subtasks as soon as their dependencies complete"""
+        result = await run_task_graph(self, graph)
+        console.print(f"[blue]🧭 Critical path: {' → '.join(result.critical_path)} "
+                      f"({result.critical_path_seconds:.1f}s of {result.wall_seconds:.1f}s)[/blue]")
+        return result
 
     async def _request_approval(self, phase_name: str, artifacts: Dict[str, Any], message: str = "") -> str:
         """Request approval for phase completion - placeholder implementation"""
@@ -192,11 +217,14 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 errors=[f"Prerequisites not met: {prereqs['missing']}"]
             )
         
+        graph = TaskGraph()
+        
         # Step 1: Analyze specifications for test-driven pseudocode approach
-        test_analysis_task_id = await self._delegate_task(
+        graph.add(
+            "test_analysis",
             to_agent="researcher-high-level-tests",
-            task_description="Analyze specifications for test-driven pseudocode development",
-            task_context={
+            description="Analyze specifications for test-driven pseudocode development",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "research_focus": "test_driven_pseudocode_analysis",
                 "requirements": [
@@ -215,12 +243,12 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 2: Create main system pseudocode
-        main_pseudocode_task_id = await self._delegate_task(
+        graph.add(
+            "main_pseudocode",
             to_agent="pseudocode-writer",
-            task_description="Create main system algorithms pseudocode",
-            task_context={
+            description="Create main system algorithms pseudocode",
+            context={
                 "prerequisites_valid": prereqs["valid"],
-                "test_analysis_task_id": test_analysis_task_id,
                 "output_file": self._get_namespaced_path("docs/pseudocode/main_algorithms.md"),
                 "pseudocode_focus": "core_algorithms",
                 "requirements": [
@@ -237,16 +265,17 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Control flow clearly specified"
                 ]
             },
-            priority=9
+            priority=9,
+            depends_on=["test_analysis"]
         )
         
         # Step 3: Create data structures pseudocode
-        data_structures_task_id = await self._delegate_task(
+        graph.add(
+            "data_structures",
             to_agent="pseudocode-writer",
-            task_description="Create data structures and models pseudocode",
-            task_context={
+            description="Create data structures and models pseudocode",
+            context={
                 "prerequisites_valid": prereqs["valid"],
-                "main_pseudocode_task_id": main_pseudocode_task_id,
                 "output_file": self._get_namespaced_path("docs/pseudocode/data_structures.md"),
                 "pseudocode_focus": "data_structures",
                 "requirements": [
@@ -263,16 +292,17 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Relationships documented"
                 ]
             },
-            priority=8
+            priority=8,
+            depends_on=["main_pseudocode"]
         )
         
         # Step 4: Create API/interface pseudocode
-        api_pseudocode_task_id = await self._delegate_task(
+        graph.add(
+            "api_pseudocode",
             to_agent="pseudocode-writer",
-            task_description="Create API endpoints and interfaces pseudocode",
-            task_context={
+            description="Create API endpoints and interfaces pseudocode",
+            context={
                 "prerequisites_valid": prereqs["valid"],
-                "main_pseudocode_task_id": main_pseudocode_task_id,
                 "output_file": self._get_namespaced_path("docs/pseudocode/api_endpoints.md"),
                 "pseudocode_focus": "api_interfaces",
                 "requirements": [
@@ -289,16 +319,17 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Authentication logic documented"
                 ]
             },
-            priority=8
+            priority=8,
+            depends_on=["main_pseudocode"]
         )
         
         # Step 5: Analyze edge cases for pseudocode coverage
-        edge_case_task_id = await self._delegate_task(
+        graph.add(
+            "edge_case",
             to_agent="edge-case-synthesizer",
-            task_description="Analyze edge cases and create corresponding pseudocode",
-            task_context={
+            description="Analyze edge cases and create corresponding pseudocode",
+            context={
                 "prerequisites_valid": prereqs["valid"],
-                "main_pseudocode_task_id": main_pseudocode_task_id,
                 "output_file": self._get_namespaced_path("docs/pseudocode/edge_cases.md"),
                 "requirements": [
                     "Identify all edge cases and boundary conditions",
@@ -314,18 +345,16 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Recovery mechanisms defined"
                 ]
             },
-            priority=7
+            priority=7,
+            depends_on=["main_pseudocode"]
         )
         
         # Step 6: Critical validation of pseudocode
-        validation_task_id = await self._delegate_task(
+        graph.add(
+            "validation",
             to_agent="devils-advocate-critical-evaluator",
-            task_description="Validate pseudocode completeness and correctness",
-            task_context={
-                "main_pseudocode_task_id": main_pseudocode_task_id,
-                "data_structures_task_id": data_structures_task_id,
-                "api_pseudocode_task_id": api_pseudocode_task_id,
-                "edge_case_task_id": edge_case_task_id,
+            description="Validate pseudocode completeness and correctness",
+            context={
                 "evaluation_focus": "pseudocode_validation",
                 "requirements": [
                     "Validate pseudocode against specifications",
@@ -341,13 +370,27 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Implementation gaps documented"
                 ]
             },
-            priority=7
+            priority=7,
+            depends_on=["main_pseudocode", "data_structures", "api_pseudocode", "edge_case"]
         )
         
-        # Wait for all tasks to complete
-        all_tasks = [test_analysis_task_id, main_pseudocode_task_id, data_structures_task_id, 
-                    api_pseudocode_task_id, edge_case_task_id, validation_task_id]
-        completed_tasks = await self._wait_for_tasks(all_tasks)
+        # Run subtasks as their dependencies complete
+        dag_result = await self._run_task_graph(graph)
+        completed_tasks = dag_result.completed_tasks()
+        
+        if not dag_result.success:
+            return AgentResult(
+                success=False,
+                outputs={
+                    "error": "Delegated subtasks failed",
+                    "failed_tasks": dag_result.failed,
+                    "cancelled_tasks": dag_result.cancelled,
+                    "completed_tasks": completed_tasks
+                },
+                files_created=[],
+                files_modified=[],
+                errors=[f"{key}: {completed_tasks[key]['error']}" for key in dag_result.failed]
+            )
         
         # Identify created documents
         documents_created = await self._identify_created_documents()
@@ -370,6 +413,7 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 "phase": "pseudocode",
                 "documents_created": documents_created,
                 "completed_tasks": completed_tasks,
+                "critical_path": dag_result.critical_path,
                 "next_phase": "architecture",
                 "message": "Pseudocode phase completed successfully"
             },
@@ -426,7 +470,9 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         ]
         
         for path, doc_type, description in pseudocode_files:
-            if Path(path).exists():
+            # Written by subtask agents in other processes: re-stat it instead of waiting for the watcher
+            self.artifacts.refresh(path)
+            if self.artifacts.exists(path):
                 docs_created.append({
                     "path": path,
                     "type": doc_type,
@@ -435,8 +481,8 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 })
         
         # Check for any additional pseudocode files
-        if Path(self._get_namespaced_path("docs/pseudocode")).exists():
-            for pseudocode_file in Path(self._get_namespaced_path("docs/pseudocode")).glob("*.md"):
+        if self.artifacts.exists(self._get_namespaced_path("docs/pseudocode")):
+            for pseudocode_file in self.artifacts.files(self._get_namespaced_path("docs/pseudocode"), "*.md"):
                 file_path = str(pseudocode_file)
                 if not any(doc["path"] == file_path for doc in docs_created):
                     docs_created.append({
@@ -518,15 +564,19 @@ def main(namespace: str, task_id: str, goal: str):
         agent_class = globals()[agent_class_name]
         agent = agent_class()
         
-        async def run():
+        async def run() -> bool:
             try:
                 result = await agent._execute_task(task, task.context)
                 console.print(f"[green]✅ {agent.agent_name} completed successfully[/green]")
                 console.print(f"Result: {result}")
+                return result.success
             except Exception as e:
                 console.print(f"[red]❌ {agent.agent_name} failed: {e}[/red]")
+                return False
         
-        asyncio.run(run())
+        # The dispatcher takes the exit code as the task outcome
+        if not asyncio.run(run()):
+            raise SystemExit(1)
     else:
         console.print("[red]❌ No agent class found[/red]")
 
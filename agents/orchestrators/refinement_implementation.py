@@ -6,6 +6,7 @@
 #   "rich",
 #   "pydantic",
 #   "python-dotenv",
+#   "psycopg2-binary",
 #   "click",
 # ]
 # ///
@@ -19,6 +20,7 @@ from datetime import datetime
 
 
 # Base agent classes embedded for UV standalone execution
+import sys
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
 from datetime import datetime
@@ -29,6 +31,13 @@ try:
     from rich.console import Console
     from supabase import create_client, Client
     from dotenv import load_dotenv
+    
+    # Subtask DAG execution
+    lib_path = Path(__file__).parent.parent.parent / 'lib'
+    sys.path.insert(0, str(lib_path))
+    from dag_executor import TaskGraph, DAGResult, run_task_graph, wait_for_agent_tasks
+    from task_memo import enqueue_task
+    from artifact_index import ProjectArtifacts, project_artifacts, watch_artifacts
 except ImportError as e:
     print(f"Missing dependency: {e}")
     exit(1)
@@ -61,6 +70,9 @@ class BaseAgent(ABC):
         # Load project context
         self.project_id = self._load_project_id()
         self.supabase = self._init_supabase()
+        # Phase checks query the tree while subtasks write it: one watched index per
+        # process, its start-up scan overlapping the subtask run
+        watch_artifacts()
         
     def _load_project_id(self) -> str:
         sparc_dir = Path('.sparc')
@@ -88,8 +100,13 @@ class BaseAgent(ABC):
         """Check if a namespaced file exists"""
         return Path(self._get_namespaced_path(path)).exists()
     
+    @property
+    def artifacts(self) -> ProjectArtifacts:
+        """Project tree queries, answered from the watched index"""
+        return project_artifacts()
+    
     async def delegate_task(self, to_agent: str, task_description: str, 
-                          context: Dict[str, Any], priority: int = 5) -> str:
+                          context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         task_data = {
             'namespace': self.project_id,
             'from_agent': self.agent_name,
@@ -105,20 +122,28 @@ class BaseAgent(ABC):
                 'priority': priority
             },
             'status': 'pending',
+            'priority': priority,
             'created_at': datetime.now().isoformat()
         }
         
-        result = self.supabase.table('agent_tasks').insert(task_data).execute()
-        return result.data[0]['id'] if result.data else None
+        # Equivalent delegations reuse the in-flight or completed task
+        return enqueue_task(self.supabase, task_data, bypass=bypass_memo)
     
     async def _delegate_task(self, to_agent: str, task_description: str, 
-                           task_context: Dict[str, Any], priority: int = 5) -> str:
+                           task_context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         """Delegate task to another agent"""
-        return await self.delegate_task(to_agent, task_description, task_context, priority)
+        return await self.delegate_task(to_agent, task_description, task_context, priority, bypass_memo)
 
     async def _wait_for_tasks(self, task_ids: List[str]) -> Dict[str, Any]:
-        """Wait for delegated tasks to complete - placeholder implementation"""
-        return {task_id: {"success": True, "output": f"Mock completion for {task_id}"} for task_id in task_ids}
+        """Wait for delegated tasks to complete"""
+        return await wait_for_agent_tasks(self, task_ids)
+
+    async def _run_task_graph(self, graph: TaskGraph) -> DAGResult:
+        """Delegate subtasks as soon as their dependencies complete"""
+        result = await run_task_graph(self, graph)
+        console.print(f"[blue]🧭 Critical path: {' → '.join(result.critical_path)} "
+                      f"({result.critical_path_seconds:.1f}s of {result.wall_seconds:.1f}s)[/blue]")
+        return result
 
     async def _request_approval(self, phase_name: str, artifacts: Dict[str, Any], message: str = "") -> str:
         """Request approval for phase completion - placeholder implementation"""
@@ -194,11 +219,14 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 errors=[f"Prerequisites not met: {prereqs['missing']}"]
             )
         
+        graph = TaskGraph()
+        
         # Step 1: Set up project structure and framework boilerplate
-        framework_task_id = await self._delegate_task(
+        graph.add(
+            "framework",
             to_agent="coder-framework-boilerplate",
-            task_description="Create project structure and framework boilerplate",
-            task_context={
+            description="Create project structure and framework boilerplate",
+            context={
                 "architecture_design": prereqs["architecture_design"],
                 "comprehensive_spec": prereqs["comprehensive_spec"],
                 "test_plan": prereqs.get("test_plan", ""),
@@ -222,14 +250,14 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 2: Implement core functionality using TDD
-        tdd_implementation_task_id = await self._delegate_task(
+        graph.add(
+            "tdd_implementation",
             to_agent="coder-test-driven",
-            task_description="Implement core functionality using test-driven development",
-            task_context={
+            description="Implement core functionality using test-driven development",
+            context={
                 "architecture_design": prereqs["architecture_design"],
                 "comprehensive_spec": prereqs["comprehensive_spec"],
                 "test_suite": prereqs["test_suite"],
-                "framework_task_id": framework_task_id,
                 "tdd_focus": "core_functionality",
                 "requirements": [
                     "Implement core business logic following TDD principles",
@@ -246,17 +274,18 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Logging integrated throughout"
                 ]
             },
-            priority=10
+            priority=10,
+            depends_on=["framework"]
         )
         
         # Step 3: Implement API endpoints and interfaces
-        api_implementation_task_id = await self._delegate_task(
+        graph.add(
+            "api_implementation",
             to_agent="coder-test-driven",
-            task_description="Implement API endpoints and external interfaces",
-            task_context={
+            description="Implement API endpoints and external interfaces",
+            context={
                 "architecture_design": prereqs["architecture_design"],
                 "comprehensive_spec": prereqs["comprehensive_spec"],
-                "tdd_implementation_task_id": tdd_implementation_task_id,
                 "tdd_focus": "api_interfaces",
                 "requirements": [
                     "Implement all API endpoints and routes",
@@ -273,17 +302,18 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "API documentation generated"
                 ]
             },
-            priority=9
+            priority=9,
+            depends_on=["tdd_implementation"]
         )
         
         # Step 4: Implement data layer and persistence
-        data_implementation_task_id = await self._delegate_task(
+        graph.add(
+            "data_implementation",
             to_agent="coder-test-driven",
-            task_description="Implement data layer and persistence mechanisms",
-            task_context={
+            description="Implement data layer and persistence mechanisms",
+            context={
                 "architecture_design": prereqs["architecture_design"],
                 "comprehensive_spec": prereqs["comprehensive_spec"],
-                "tdd_implementation_task_id": tdd_implementation_task_id,
                 "tdd_focus": "data_persistence",
                 "requirements": [
                     "Implement database models and schemas",
@@ -300,17 +330,16 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Caching layer implemented"
                 ]
             },
-            priority=9
+            priority=9,
+            depends_on=["tdd_implementation"]
         )
         
         # Step 5: Debug and resolve integration issues
-        debugging_task_id = await self._delegate_task(
+        graph.add(
+            "debugging",
             to_agent="debugger-targeted",
-            task_description="Debug and resolve integration and system issues",
-            task_context={
-                "tdd_implementation_task_id": tdd_implementation_task_id,
-                "api_implementation_task_id": api_implementation_task_id,
-                "data_implementation_task_id": data_implementation_task_id,
+            description="Debug and resolve integration and system issues",
+            context={
                 "debugging_focus": "integration_issues",
                 "requirements": [
                     "Identify and fix integration bugs",
@@ -327,18 +356,16 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Error handling enhanced"
                 ]
             },
-            priority=8
+            priority=8,
+            depends_on=["tdd_implementation", "api_implementation", "data_implementation"]
         )
         
         # Step 6: Comprehensive code review and quality analysis
-        code_review_task_id = await self._delegate_task(
+        graph.add(
+            "code_review",
             to_agent="code-comprehension-assistant-v2",
-            task_description="Conduct comprehensive code review and quality analysis",
-            task_context={
-                "tdd_implementation_task_id": tdd_implementation_task_id,
-                "api_implementation_task_id": api_implementation_task_id,
-                "data_implementation_task_id": data_implementation_task_id,
-                "debugging_task_id": debugging_task_id,
+            description="Conduct comprehensive code review and quality analysis",
+            context={
                 "review_focus": "code_quality_analysis",
                 "requirements": [
                     "Review code for best practices and patterns",
@@ -355,16 +382,16 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Test coverage analysis completed"
                 ]
             },
-            priority=7
+            priority=7,
+            depends_on=["tdd_implementation", "api_implementation", "data_implementation", "debugging"]
         )
         
         # Step 7: Security analysis and hardening
-        security_analysis_task_id = await self._delegate_task(
+        graph.add(
+            "security_analysis",
             to_agent="security-reviewer-module",
-            task_description="Conduct security analysis and implement hardening",
-            task_context={
-                "api_implementation_task_id": api_implementation_task_id,
-                "data_implementation_task_id": data_implementation_task_id,
+            description="Conduct security analysis and implement hardening",
+            context={
                 "architecture_design": prereqs["architecture_design"],
                 "security_focus": "implementation_security",
                 "requirements": [
@@ -382,17 +409,16 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Security monitoring configured"
                 ]
             },
-            priority=7
+            priority=7,
+            depends_on=["api_implementation", "data_implementation"]
         )
         
         # Step 8: Performance optimization
-        optimization_task_id = await self._delegate_task(
+        graph.add(
+            "optimization",
             to_agent="optimizer-module",
-            task_description="Optimize performance and resource usage",
-            task_context={
-                "tdd_implementation_task_id": tdd_implementation_task_id,
-                "api_implementation_task_id": api_implementation_task_id,
-                "data_implementation_task_id": data_implementation_task_id,
+            description="Optimize performance and resource usage",
+            context={
                 "optimization_focus": "performance_optimization",
                 "requirements": [
                     "Profile and optimize performance bottlenecks",
@@ -409,14 +435,27 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Performance monitoring active"
                 ]
             },
-            priority=6
+            priority=6,
+            depends_on=["tdd_implementation", "api_implementation", "data_implementation"]
         )
         
-        # Wait for all tasks to complete
-        all_tasks = [framework_task_id, tdd_implementation_task_id, api_implementation_task_id, 
-                    data_implementation_task_id, debugging_task_id, code_review_task_id, 
-                    security_analysis_task_id, optimization_task_id]
-        completed_tasks = await self._wait_for_tasks(all_tasks)
+        # Run subtasks as their dependencies complete
+        dag_result = await self._run_task_graph(graph)
+        completed_tasks = dag_result.completed_tasks()
+        
+        if not dag_result.success:
+            return AgentResult(
+                success=False,
+                outputs={
+                    "error": "Delegated subtasks failed",
+                    "failed_tasks": dag_result.failed,
+                    "cancelled_tasks": dag_result.cancelled,
+                    "completed_tasks": completed_tasks
+                },
+                files_created=[],
+                files_modified=[],
+                errors=[f"{key}: {completed_tasks[key]['error']}" for key in dag_result.failed]
+            )
         
         # Validate implementation completeness
         validation_result = await self._validate_implementation()
@@ -445,6 +484,7 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 "phase": "refinement-implementation",
                 "documents_created": documents_created,
                 "completed_tasks": completed_tasks,
+                "critical_path": dag_result.critical_path,
                 "validation_result": validation_result,
                 "next_phase": "bmo-completion",
                 "message": "Refinement implementation phase completed successfully"
@@ -548,16 +588,13 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         docs_created = []
         
         # Source code files
-        src_dir = Path(self._get_namespaced_path("src"))
-        if src_dir.exists():
-            for src_file in src_dir.rglob("*"):
-                if src_file.is_file():
-                    docs_created.append({
-                        "path": str(src_file),
-                        "type": "source_code",
-                        "description": f"Source code: {src_file.name}",
-                        "memory_type": "implementation"
-                    })
+        for src_file in self.artifacts.files(self._get_namespaced_path("src"), "*", recursive=True):
+            docs_created.append({
+                "path": str(src_file),
+                "type": "source_code",
+                "description": f"Source code: {src_file.name}",
+                "memory_type": "implementation"
+            })
         
         # Configuration files
         config_files = [
@@ -569,7 +606,9 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         
         for file_path, doc_type, description in config_files:
             namespaced_path = self._get_namespaced_path(file_path)
-            if Path(namespaced_path).exists():
+            # Written by subtask agents in other processes: re-stat it instead of waiting for the watcher
+            self.artifacts.refresh(namespaced_path)
+            if self.artifacts.exists(namespaced_path):
                 docs_created.append({
                     "path": namespaced_path,
                     "type": doc_type,
@@ -580,19 +619,18 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         # Configuration directories
         config_dirs = ["config/", "scripts/", "deploy/"]
         for config_dir in config_dirs:
-            if Path(config_dir).exists():
-                for config_file in Path(config_dir).rglob("*"):
-                    if config_file.is_file():
-                        docs_created.append({
-                            "path": str(config_file),
-                            "type": "configuration",
-                            "description": f"Configuration: {config_file.name}",
-                            "memory_type": "configuration"
-                        })
+            if self.artifacts.exists(config_dir):
+                for config_file in self.artifacts.files(config_dir, "*", recursive=True):
+                    docs_created.append({
+                        "path": str(config_file),
+                        "type": "configuration",
+                        "description": f"Configuration: {config_file.name}",
+                        "memory_type": "configuration"
+                    })
         
         # Documentation files
-        if Path(self._get_namespaced_path("docs/implementation")).exists():
-            for doc_file in Path(self._get_namespaced_path("docs/implementation")).rglob("*.md"):
+        if self.artifacts.exists(self._get_namespaced_path("docs/implementation")):
+            for doc_file in self.artifacts.files(self._get_namespaced_path("docs/implementation"), "*.md", recursive=True):
                 docs_created.append({
                     "path": str(doc_file),
                     "type": "implementation_docs",
@@ -601,8 +639,8 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 })
         
         # Reports
-        if Path(self._get_namespaced_path("docs/reports")).exists():
-            for report_file in Path(self._get_namespaced_path("docs/reports")).glob("*implementation*.md"):
+        if self.artifacts.exists(self._get_namespaced_path("docs/reports")):
+            for report_file in self.artifacts.files(self._get_namespaced_path("docs/reports"), "*implementation*.md"):
                 docs_created.append({
                     "path": str(report_file),
                     "type": "implementation_report",
@@ -682,15 +720,19 @@ def main(namespace: str, task_id: str, goal: str):
         agent_class = globals()[agent_class_name]
         agent = agent_class()
         
-        async def run():
+        async def run() -> bool:
             try:
                 result = await agent._execute_task(task, task.context)
                 console.print(f"[green]✅ {agent.agent_name} completed successfully[/green]")
                 console.print(f"Result: {result}")
+                return result.success
             except Exception as e:
                 console.print(f"[red]❌ {agent.agent_name} failed: {e}[/red]")
+                return False
         
-        asyncio.run(run())
+        # The dispatcher takes the exit code as the task outcome
+        if not asyncio.run(run()):
+            raise SystemExit(1)
     else:
         console.print("[red]❌ No agent class found[/red]")
 
@@ -6,6 +6,7 @@
 #   "rich",
 #   "pydantic",
 #   "python-dotenv",
+#   "psycopg2-binary",
 #   "click",
 # ]
 # ///
@@ -19,6 +20,7 @@ from datetime import datetime
 
 
 # Base agent classes embedded for UV standalone execution
+import sys
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
 from datetime import datetime
@@ -29,6 +31,13 @@ try:
     from rich.console import Console
     from supabase import create_client, Client
     from dotenv import load_dotenv
+    
+    # Subtask DAG execution
+    lib_path = Path(__file__).parent.parent.parent / 'lib'
+    sys.path.insert(0, str(lib_path))
+    from dag_executor import TaskGraph, DAGResult, run_task_graph, wait_for_agent_tasks
+    from task_memo import enqueue_task
+    from artifact_index import ProjectArtifacts, project_artifacts, watch_artifacts
 except ImportError as e:
     print(f"Missing dependency: {e}")
     exit(1)
@@ -61,6 +70,9 @@ class BaseAgent(ABC):
         # Load project context
         self.project_id = self._load_project_id()
         self.supabase = self._init_supabase()
+        # Phase checks query the tree while subtasks write it: one watched index per
+        # process, its start-up scan overlapping the subtask run
+        watch_artifacts()
         
     def _load_project_id(self) -> str:
         sparc_dir = Path('.sparc')
@@ -88,8 +100,13 @@ class BaseAgent(ABC):
         """Check if a namespaced file exists"""
         return Path(self._get_namespaced_path(path)).exists()
     
+    @property
+    def artifacts(self) -> ProjectArtifacts:
+        """Project tree queries, answered from the watched index"""
+        return project_artifacts()
+    
     async def delegate_task(self, to_agent: str, task_description: str, 
-                          context: Dict[str, Any], priority: int = 5) -> str:
+                          context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         task_data = {
             'namespace': self.project_id,
             'from_agent': self.agent_name,
@@ -105,20 +122,28 @@ class BaseAgent(ABC):
                 'priority': priority
             },
             'status': 'pending',
+            'priority': priority,
             'created_at': datetime.now().isoformat()
         }
         
-        result = self.supabase.table('agent_tasks').insert(task_data).execute()
-        return result.data[0]['id'] if result.data else None
+        # Equivalent delegations reuse the in-flight or completed task
+        return enqueue_task(self.supabase, task_data, bypass=bypass_memo)
     
     async def _delegate_task(self, to_agent: str, task_description: str, 
-                           task_context: Dict[str, Any], priority: int = 5) -> str:
+                           task_context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         """Delegate task to another agent"""
-        return await self.delegate_task(to_agent, task_description, task_context, priority)
+        return await self.delegate_task(to_agent, task_description, task_context, priority, bypass_memo)
 
     async def _wait_for_tasks(self, task_ids: List[str]) -> Dict[str, Any]:
-        """Wait for delegated tasks to complete - placeholder implementation"""
-        return {task_id: {"success": True, "output": f"Mock completion for {task_id}"} for task_id in task_ids}
+        """Wait for delegated tasks to complete"""
+        return await wait_for_agent_tasks(self, task_ids)
+
+    async def _run_task_graph(self, graph: TaskGraph) -> DAGResult:
+        """Delegate subtasks as soon as their dependencies complete"""
+        result = await run_task_graph(self, graph)
+        console.print(f"[blue]🧭 Critical path: {' → '.join(result.critical_path)} "
+                      f"({result.critical_path_seconds:.1f}s of {result.wall_seconds:.1f}s)[/blue]")
+        return result
 
     async def _request_approval(self, phase_name: str, artifacts: Dict[str, Any], message: str = "") -> str:
         """Request approval for phase completion - placeholder implementation"""
@@ -194,11 +219,14 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 errors=[f"Prerequisites not met: {prereqs['missing']}"]
             )
         
+        graph = TaskGraph()
+        
         # Step 1: Create comprehensive test plan from specifications
-        test_plan_task_id = await self._delegate_task(
+        graph.add(
+            "test_plan",
             to_agent="spec-to-testplan-converter",
-            task_description="Convert specifications to comprehensive test plan",
-            task_context={
+            description="Convert specifications to comprehensive test plan",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "output_file": self._get_namespaced_path("docs/testing/test_plan.md"),
                 "requirements": [
@@ -220,12 +248,12 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 2: Create acceptance criteria and validation framework
-        acceptance_task_id = await self._delegate_task(
+        graph.add(
+            "acceptance",
             to_agent="tester-acceptance-plan-writer",
-            task_description="Create acceptance criteria and validation framework",
-            task_context={
+            description="Create acceptance criteria and validation framework",
+            context={
                 "prerequisites_valid": prereqs["valid"],
-                "test_plan_task_id": test_plan_task_id,
                 "output_file": self._get_namespaced_path("docs/testing/acceptance_criteria.md"),
                 "requirements": [
                     "Define acceptance criteria for all features",
@@ -242,18 +270,18 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Traceability matrix created"
                 ]
             },
-            priority=9
+            priority=9,
+            depends_on=["test_plan"]
         )
         
         # Step 3: Implement TDD-driven test suite creation
-        tdd_task_id = await self._delegate_task(
+        graph.add(
+            "tdd",
             to_agent="tester-tdd-master",
-            task_description="Create TDD-driven test suite with failing tests",
-            task_context={
+            description="Create TDD-driven test suite with failing tests",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "prerequisites_valid": prereqs["valid"],
-                "test_plan_task_id": test_plan_task_id,
-                "acceptance_task_id": acceptance_task_id,
                 "test_suite_focus": "comprehensive_tdd",
                 "requirements": [
                     "Create failing unit tests for all specified functionality",
@@ -270,17 +298,18 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Test organization follows conventions"
                 ]
             },
-            priority=9
+            priority=9,
+            depends_on=["test_plan", "acceptance"]
         )
         
         # Step 4: Create end-to-end test scenarios
-        e2e_task_id = await self._delegate_task(
+        graph.add(
+            "e2e",
             to_agent="tester-tdd-master",
-            task_description="Create end-to-end test scenarios and framework",
-            task_context={
+            description="Create end-to-end test scenarios and framework",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "prerequisites_valid": prereqs["valid"],
-                "acceptance_task_id": acceptance_task_id,
                 "test_suite_focus": "e2e_scenarios",
                 "requirements": [
                     "Create end-to-end test scenarios",
@@ -296,16 +325,17 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Cross-platform test coverage established"
                 ]
             },
-            priority=8
+            priority=8,
+            depends_on=["acceptance"]
         )
         
         # Step 5: Create edge case and boundary testing
-        edge_case_task_id = await self._delegate_task(
+        graph.add(
+            "edge_case",
             to_agent="edge-case-synthesizer",
-            task_description="Create edge case and boundary condition tests",
-            task_context={
+            description="Create edge case and boundary condition tests",
+            context={
                 "prerequisites_valid": prereqs["valid"],
-                "tdd_task_id": tdd_task_id,
                 "test_focus": "edge_cases_boundary_conditions",
                 "requirements": [
                     "Identify and create tests for edge cases",
@@ -322,16 +352,17 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Stress test scenarios implemented"
                 ]
             },
-            priority=8
+            priority=8,
+            depends_on=["tdd"]
         )
         
         # Step 6: Implement chaos engineering and resilience testing
-        chaos_task_id = await self._delegate_task(
+        graph.add(
+            "chaos",
             to_agent="chaos-engineer",
-            task_description="Create chaos engineering and resilience tests",
-            task_context={
+            description="Create chaos engineering and resilience tests",
+            context={
                 "prerequisites_valid": prereqs["valid"],
-                "test_plan_task_id": test_plan_task_id,
                 "chaos_testing_focus": "system_resilience",
                 "requirements": [
                     "Design chaos engineering experiments",
@@ -348,14 +379,16 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Monitoring validation tests implemented"
                 ]
             },
-            priority=7
+            priority=7,
+            depends_on=["test_plan"]
         )
         
         # Step 7: Create performance and load testing
-        performance_task_id = await self._delegate_task(
+        graph.add(
+            "performance",
             to_agent="tester-tdd-master",
-            task_description="Create performance and load testing suite",
-            task_context={
+            description="Create performance and load testing suite",
+            context={
                 "prerequisites_valid": prereqs["valid"],
                 "prerequisites_valid": prereqs["valid"],
                 "test_suite_focus": "performance_load",
@@ -377,10 +410,23 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
             priority=7
         )
         
-        # Wait for all tasks to complete
-        all_tasks = [test_plan_task_id, acceptance_task_id, tdd_task_id, e2e_task_id, 
-                    edge_case_task_id, chaos_task_id, performance_task_id]
-        completed_tasks = await self._wait_for_tasks(all_tasks)
+        # Run subtasks as their dependencies complete
+        dag_result = await self._run_task_graph(graph)
+        completed_tasks = dag_result.completed_tasks()
+        
+        if not dag_result.success:
+            return AgentResult(
+                success=False,
+                outputs={
+                    "error": "Delegated subtasks failed",
+                    "failed_tasks": dag_result.failed,
+                    "cancelled_tasks": dag_result.cancelled,
+                    "completed_tasks": completed_tasks
+                },
+                files_created=[],
+                files_modified=[],
+                errors=[f"{key}: {completed_tasks[key]['error']}" for key in dag_result.failed]
+            )
         
         # Identify created documents and test files
         documents_created = await self._identify_created_documents()
@@ -406,6 +452,7 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 "phase": "refinement-testing",
                 "documents_created": documents_created,
                 "completed_tasks": completed_tasks,
+                "critical_path": dag_result.critical_path,
                 "test_validation": validation_result,
                 "next_phase": "refinement-implementation",
                 "message": "Refinement testing phase completed successfully"
@@ -476,7 +523,9 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         ]
         
         for path, doc_type, description in test_docs:
-            if Path(path).exists():
+            # Written by subtask agents in other processes: re-stat it instead of waiting for the watcher
+            self.artifacts.refresh(path)
+            if self.artifacts.exists(path):
                 docs_created.append({
                     "path": path,
                     "type": doc_type,
@@ -494,8 +543,8 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         ]
         
         for test_dir, test_type, description in test_directories:
-            if Path(test_dir).exists():
-                for test_file in Path(test_dir).rglob("*.py"):
+            if self.artifacts.exists(test_dir):
+                for test_file in self.artifacts.files(test_dir, "*.py", recursive=True):
                     docs_created.append({
                         "path": str(test_file),
                         "type": test_type,
@@ -510,8 +559,11 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         ]
         
         for config_path in test_config_files:
-            if Path(config_path).exists():
-                if Path(config_path).is_file():
+            # Files are re-stat'ed (subtask agents wrote them elsewhere); directories come from the index
+            if not config_path.endswith('/'):
+                self.artifacts.refresh(config_path)
+            if self.artifacts.exists(config_path):
+                if self.artifacts.is_file(config_path):
                     docs_created.append({
                         "path": config_path,
                         "type": "test_config",
@@ -519,14 +571,13 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                         "memory_type": "configuration"
                     })
                 else:
-                    for config_file in Path(config_path).rglob("*"):
-                        if config_file.is_file():
-                            docs_created.append({
-                                "path": str(config_file),
-                                "type": "test_config",
-                                "description": f"Test configuration: {config_file.name}",
-                                "memory_type": "configuration"
-                            })
+                    for config_file in self.artifacts.files(config_path, "*", recursive=True):
+                        docs_created.append({
+                            "path": str(config_file),
+                            "type": "test_config",
+                            "description": f"Test configuration: {config_file.name}",
+                            "memory_type": "configuration"
+                        })
         
         return docs_created
     
@@ -618,15 +669,19 @@ def main(namespace: str, task_id: str, goal: str):
         agent_class = globals()[agent_class_name]
         agent = agent_class()
         
-        async def run():
+        async def run() -> bool:
             try:
                 result = await agent._execute_task(task, task.context)
                 console.print(f"[green]✅ {agent.agent_name} completed successfully[/green]")
                 console.print(f"Result: {result}")
+                return result.success
             except Exception as e:
                 console.print(f"[red]❌ {agent.agent_name} failed: {e}[/red]")
+                return False
         
-        asyncio.run(run())
+        # The dispatcher takes the exit code as the task outcome
+        if not asyncio.run(run()):
+            raise SystemExit(1)
     else:
         console.print("[red]❌ No agent class found[/red]")
 
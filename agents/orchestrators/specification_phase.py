@@ -6,6 +6,7 @@
 #   "rich",
 #   "pydantic",
 #   "python-dotenv",
+#   "psycopg2-binary",
 #   "click",
 # ]
 # ///
@@ -19,6 +20,7 @@ from datetime import datetime
 
 
 # Base agent classes embedded for UV standalone execution
+import sys
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
 from datetime import datetime
@@ -29,6 +31,13 @@ try:
     from rich.console import Console
     from supabase import create_client, Client
     from dotenv import load_dotenv
+    
+    # Subtask DAG execution
+    lib_path = Path(__file__).parent.parent.parent / 'lib'
+    sys.path.insert(0, str(lib_path))
+    from dag_executor import TaskGraph, DAGResult, run_task_graph, wait_for_agent_tasks
+    from task_memo import enqueue_task
+    from artifact_index import ProjectArtifacts, project_artifacts, watch_artifacts
 except ImportError as e:
     print(f"Missing dependency: {e}")
     exit(1)
@@ -61,6 +70,9 @@ class BaseAgent(ABC):
         # Load project context
         self.project_id = self._load_project_id()
         self.supabase = self._init_supabase()
+        # Phase checks query the tree while subtasks write it: one watched index per
+        # process, its start-up scan overlapping the subtask run
+        watch_artifacts()
         
     def _load_project_id(self) -> str:
         sparc_dir = Path('.sparc')
@@ -89,8 +101,13 @@ class BaseAgent(ABC):
         """Check if a namespaced file exists"""
         return Path(self._get_namespaced_path(path)).exists()
     
+    @property
+    def artifacts(self) -> ProjectArtifacts:
+        """Project tree queries, answered from the watched index"""
+        return project_artifacts()
+    
     async def delegate_task(self, to_agent: str, task_description: str, 
-                          context: Dict[str, Any], priority: int = 5) -> str:
+                          context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         task_data = {
             'namespace': self.project_id,
             'from_agent': self.agent_name,
@@ -106,20 +123,28 @@ class BaseAgent(ABC):
                 'priority': priority
             },
             'status': 'pending',
+            'priority': priority,
             'created_at': datetime.now().isoformat()
         }
         
-        result = self.supabase.table('agent_tasks').insert(task_data).execute()
-        return result.data[0]['id'] if result.data else None
+        # Equivalent delegations reuse the in-flight or completed task
+        return enqueue_task(self.supabase, task_data, bypass=bypass_memo)
     
     async def _delegate_task(self, to_agent: str, task_description: str, 
-                           task_context: Dict[str, Any], priority: int = 5) -> str:
+                           task_context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         """Delegate task to another agent"""
-        return await self.delegate_task(to_agent, task_description, task_context, priority)
+        return await self.delegate_task(to_agent, task_description, task_context, priority, bypass_memo)
 
     async def _wait_for_tasks(self, task_ids: List[str]) -> Dict[str, Any]:
-        """Wait for delegated tasks to complete - placeholder implementation"""
-        return {task_id: {"success": True, "output": f"Mock completion for {task_id}"} for task_id in task_ids}
+        """Wait for delegated tasks to complete"""
+        return await wait_for_agent_tasks(self, task_ids)
+
+    async def _run_task_graph(self, graph: TaskGraph) -> DAGResult:
+        """Delegate subtasks as soon as their dependencies complete"""
+        result = await run_task_graph(self, graph)
+        console.print(f"[blue]🧭 Critical path: {' → '.join(result.critical_path)} "
+                      f"({result.critical_path_seconds:.1f}s of {result.wall_seconds:.1f}s)[/blue]")
+        return result
 
     async def _request_approval(self, phase_name: str, artifacts: Dict[str, Any], message: str = "") -> str:
         """Request approval for phase completion - placeholder implementation"""
@@ -192,11 +217,14 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 errors=[f"Prerequisites not met: {prereqs['missing']}"]
             )
         
+        graph = TaskGraph()
+        
         # Step 1: Research technical feasibility
-        research_task_id = await self._delegate_task(
+        graph.add(
+            "research",
             to_agent="research-planner-strategic",
-            task_description="Analyze technical feasibility and research requirements",
-            task_context={
+            description="Analyze technical feasibility and research requirements",
+            context={
                 "project_goal": task.context.get("project_goal", task.description),
                 "prerequisites_valid": prereqs["valid"],
                 "research_focus": "technical_feasibility_analysis",
@@ -216,13 +244,13 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         )
         
         # Step 2: Create comprehensive specification
-        spec_task_id = await self._delegate_task(
+        graph.add(
+            "spec",
             to_agent="spec-writer-comprehensive",
-            task_description="Create comprehensive technical specification",
-            task_context={
+            description="Create comprehensive technical specification",
+            context={
                 "project_goal": task.context.get("project_goal", task.description),
                 "prerequisites_valid": prereqs["valid"],
-                "research_task_id": research_task_id,
                 "output_file": self._get_namespaced_path("docs/specifications/comprehensive_spec.md"),
                 "requirements": [
                     "Create detailed functional requirements",
@@ -238,16 +266,17 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Acceptance criteria defined for all features"
                 ]
             },
-            priority=9
+            priority=9,
+            depends_on=["research"]
         )
         
         # Step 3: Create example-driven requirements
-        examples_task_id = await self._delegate_task(
+        graph.add(
+            "examples",
             to_agent="spec-writer-from-examples",
-            task_description="Create example-driven requirements and use cases",
-            task_context={
+            description="Create example-driven requirements and use cases",
+            context={
                 "project_goal": task.context.get("project_goal", task.description),
-                "comprehensive_spec_task_id": spec_task_id,
                 "output_file": self._get_namespaced_path("docs/specifications/examples_and_use_cases.md"),
                 "requirements": [
                     "Create concrete usage examples",
@@ -262,16 +291,16 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Edge cases identified"
                 ]
             },
-            priority=8
+            priority=8,
+            depends_on=["spec"]
         )
         
         # Step 4: Critical evaluation of requirements
-        review_task_id = await self._delegate_task(
+        graph.add(
+            "review",
             to_agent="devils-advocate-critical-evaluator",
-            task_description="Critically evaluate and validate requirements",
-            task_context={
-                "spec_task_id": spec_task_id,
-                "examples_task_id": examples_task_id,
+            description="Critically evaluate and validate requirements",
+            context={
                 "evaluation_focus": "requirements_validation",
                 "requirements": [
                     "Identify ambiguous requirements",
@@ -287,12 +316,27 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                     "Testability assessment completed"
                 ]
             },
-            priority=7
+            priority=7,
+            depends_on=["spec", "examples"]
         )
         
-        # Wait for all tasks to complete and validate outputs
-        all_tasks = [research_task_id, spec_task_id, examples_task_id, review_task_id]
-        completed_tasks = await self._wait_for_tasks(all_tasks)
+        # Run subtasks as their dependencies complete
+        dag_result = await self._run_task_graph(graph)
+        completed_tasks = dag_result.completed_tasks()
+        
+        if not dag_result.success:
+            return AgentResult(
+                success=False,
+                outputs={
+                    "error": "Delegated subtasks failed",
+                    "failed_tasks": dag_result.failed,
+                    "cancelled_tasks": dag_result.cancelled,
+                    "completed_tasks": completed_tasks
+                },
+                files_created=[],
+                files_modified=[],
+                errors=[f"{key}: {completed_tasks[key]['error']}" for key in dag_result.failed]
+            )
         
         # Identify created documents
         documents_created = await self._identify_created_documents()
@@ -323,6 +367,7 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
                 "phase": "specification",
                 "documents_created": documents_created,
                 "completed_tasks": completed_tasks,
+                "critical_path": dag_result.critical_path,
                 "approval_requested": approval_id,
                 "next_phase": "pseudocode",
                 "message": "Specification phase completed, approval requested"
@@ -377,7 +422,8 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         
         # Check for comprehensive spec
         comprehensive_path = self._get_namespaced_path("docs/specifications/comprehensive_spec.md")
-        if Path(comprehensive_path).exists():
+        self.artifacts.refresh(comprehensive_path)  # Written by a subtask agent in another process
+        if self.artifacts.exists(comprehensive_path):
             docs_created.append({
                 "path": comprehensive_path,
                 "type": "comprehensive_specification",
@@ -387,7 +433,8 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
         
         # Check for examples and use cases
         examples_path = self._get_namespaced_path("docs/specifications/examples_and_use_cases.md")
-        if Path(examples_path).exists():
+        self.artifacts.refresh(examples_path)  # Written by a subtask agent in another process
+        if self.artifacts.exists(examples_path):
             docs_created.append({
                 "path": examples_path,
                 "type": "examples_use_cases",
@@ -396,8 +443,7 @@ You coordinate but do NOT write files directly. You orchestrate the creation thr
             })
         
         # Check for research reports
-        research_dir = Path(self._get_namespaced_path("docs/research"))
-        research_files = list(research_dir.glob("*.md")) if research_dir.exists() else []
+        research_files = self.artifacts.files(self._get_namespaced_path("docs/research"), "*.md")
         for research_file in research_files:
             docs_created.append({
                 "path": str(research_file),
@@ -471,15 +517,19 @@ def main(namespace: str, task_id: str, goal: str):
     # Create agent and execute
     agent = SpecificationPhaseOrchestrator()
     
-    async def run():
+    async def run() -> bool:
         try:
             result = await agent._execute_task(task, task.context)
             console.print(f"[green]✅ {agent.agent_name} completed successfully[/green]")
             console.print(f"Result: {result}")
+            return result.success
         except Exception as e:
             console.print(f"[red]❌ {agent.agent_name} failed: {e}[/red]")
+            return False
     
-    asyncio.run(run())
+    # The dispatcher takes the exit code as the task outcome
+    if not asyncio.run(run()):
+        raise SystemExit(1)
 
 if __name__ == "__main__":
     main()
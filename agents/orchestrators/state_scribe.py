@@ -13,7 +13,8 @@
 """State Scribe - The ONLY agent that writes to project_memorys table"""
 
 import os
-from typing import Dict, Any, List
+import asyncio
+from typing import Dict, Any, List, Tuple
 from pathlib import Path
 
 
@@ -28,6 +29,12 @@ try:
     from rich.console import Console
     from supabase import create_client, Client
     from dotenv import load_dotenv
+    import sys
+    lib_path = Path(__file__).parent.parent.parent / 'lib'
+    sys.path.insert(0, str(lib_path))
+    from call_accounting import count_tokens
+    from project_snapshot import SnapshotClient, delete_delta, file_delta, publish
+    from content_hash_index import FileHashCache
 except ImportError as e:
     print(f"Missing dependency: {e}")
     exit(1)
@@ -259,6 +266,11 @@ class BaseAgent(ABC):
         pass
 
 
+# Paths per existing-records query (keeps the request URL short) and rows per upsert call
+IN_QUERY_CHUNK = 200
+UPSERT_CHUNK = 500
+
+
 class StateScribeAgent(BaseAgent):
     """The sole, authoritative agent responsible for maintaining project state"""
     
@@ -295,6 +307,7 @@ You are triggered by:
 Never create, modify, or delete actual files - only maintain their records in the database.
 """
         )
+        self._bulk_upsert_available = True
     
     async def _execute_task(self, task: TaskPayload, context: Dict[str, Any]) -> AgentResult:
         """Record file artifacts in the project_memorys table"""
@@ -311,66 +324,71 @@ Never create, modify, or delete actual files - only maintain their records in th
                 files_modified=[]
             )
         
-        inserted = 0
-        updated = 0
         errors = []
         
+        # Stat and hash every file on a thread pool (streamed reads; files whose size and
+        # mtime are unchanged since the last pass reuse their hash); later entries for a path win
+        paths = [f["file_path"] for f in files_to_record if f.get("file_path")]
+        hashes = await asyncio.to_thread(FileHashCache(self.project_id).hash_files, paths)
+        records: Dict[str, Dict[str, Any]] = {}
         for file_info in files_to_record:
-            try:
-                file_path = file_info["file_path"]
-                
-                # Validate file exists
-                if not Path(file_path).exists():
-                    errors.append(f"File does not exist: {file_path}")
-                    continue
-                
-                # Check if record exists
-                existing = self.supabase.table("project_memorys").select("*").eq(
-                    "project_id", self.project_id
-                ).eq(
-                    "file_path", file_path
-                ).execute()
-                
-                if existing.data:
-                    # Update existing record
-                    self.supabase.table("project_memorys").update({
-                        "memory_type": file_info.get("memory_type", "unknown"),
-                        "brief_description": file_info.get("brief_description", ""),
-                        "elements_description": file_info.get("elements_description", ""),
-                        "rationale": file_info.get("rationale", ""),
-                        "version": existing.data[0]["version"] + 1
-                    }).eq(
-                        "project_id", self.project_id
-                    ).eq(
-                        "file_path", file_path
-                    ).execute()
-                    updated += 1
-                else:
-                    # Insert new record
-                    self.supabase.table("project_memorys").insert({
-                        "namespace": self.project_id,
-                        "project_id": self.project_id,
-                        "file_path": file_path,
-                        "memory_type": file_info.get("memory_type", "unknown"),
-                        "brief_description": file_info.get("brief_description", ""),
-                        "elements_description": file_info.get("elements_description", ""),
-                        "rationale": file_info.get("rationale", ""),
-                        "version": 1
-                    }).execute()
-                    inserted += 1
-                
-                # Skip semantic indexing for standalone execution
-                
-            except Exception as e:
-                errors.append(f"Error processing {file_info.get('file_path', 'unknown')}: {str(e)}")
+            if not file_info.get("file_path"):
+                errors.append("Error processing unknown: missing file_path")
+            elif hashes.get(file_info["file_path"]) is None:
+                errors.append(f"File does not exist: {file_info['file_path']}")
+            else:
+                records[file_info["file_path"]] = {
+                    "file_path": file_info["file_path"],
+                    "memory_type": file_info.get("memory_type", "unknown"),
+                    "brief_description": file_info.get("brief_description", ""),
+                    "elements_description": file_info.get("elements_description", ""),
+                    "rationale": file_info.get("rationale", ""),
+                    "content_hash": hashes[file_info["file_path"]]
+                }
+        
+        # One query for the batch's existing records; byte-identical files are left alone
+        existing = await asyncio.to_thread(self._fetch_existing_records, list(records))
+        changed = []
+        unchanged = []
+        for path, record in records.items():
+            if existing.get(path, {}).get("content_hash") == record["content_hash"]:
+                unchanged.append(path)
+            else:
+                changed.append(record)
+        
+        # One upsert per UPSERT_CHUNK changed rows
+        written, write_errors = await asyncio.to_thread(self._upsert_records, changed, existing)
+        errors.extend(write_errors)
+        changed_files = list(written)
+        
+        inserted = sum(1 for _, was_inserted in written.values() if was_inserted)
+        updated = len(written) - inserted
+        now = datetime.now().isoformat()
+        snapshot_deltas = [
+            file_delta(
+                file_path,
+                memory_type=records[file_path]["memory_type"],
+                version=version,
+                brief_description=records[file_path]["brief_description"],
+                content_hash=records[file_path]["content_hash"],
+                updated_at=now
+            )
+            for file_path, (version, _) in written.items()
+        ]
         
-        # Create git commit for this phase if files were processed successfully
+        # One snapshot version for the whole batch, so readers pick it up as a single delta
+        self._publish_snapshot(snapshot_deltas, phase if phase != "unknown" else None)
+        
+        # Create git commit for this phase if files were processed successfully (changed files only)
         git_result = {}
-        if len(errors) == 0 and files_to_record:
-            git_result = self._create_phase_commit(files_to_record, phase, agent_name)
+        if len(errors) == 0 and changed_files:
+            git_result = self._create_phase_commit(
+                [f for f in files_to_record if f.get("file_path") in written], phase, agent_name
+            )
         
         # Generate summary
-        summary = f"Processed {len(files_to_record)} files: {inserted} inserted, {updated} updated"
+        summary = (f"Processed {len(files_to_record)} files: {inserted} inserted, {updated} updated, "
+                   f"{len(unchanged)} unchanged")
         if errors:
             summary += f", {len(errors)} errors"
         if git_result.get("committed"):
@@ -382,7 +400,10 @@ Never create, modify, or delete actual files - only maintain their records in th
                 "summary": summary,
                 "records_inserted": inserted,
                 "records_updated": updated,
+                "records_unchanged": len(unchanged),
                 "total_processed": len(files_to_record),
+                "changed_files": changed_files,
+                "unchanged_files": unchanged,
                 "git_commit": git_result,
                 "errors": errors
             },
@@ -392,11 +413,86 @@ Never create, modify, or delete actual files - only maintain their records in th
             errors=errors if errors else None
         )
     
+    def _fetch_existing_records(self, file_paths: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Existing project_memorys rows for these files, by path (IN_QUERY_CHUNK paths per query)"""
+        existing = {}
+        for i in range(0, len(file_paths), IN_QUERY_CHUNK):
+            result = self.supabase.table("project_memorys").select("id, file_path, version, content_hash").eq(
+                "project_id", self.project_id
+            ).in_(
+                "file_path", file_paths[i:i + IN_QUERY_CHUNK]
+            ).execute()
+            for row in result.data or []:
+                existing[row["file_path"]] = row
+        return existing
+    
+    def _upsert_records(self, records: List[Dict[str, Any]],
+                        existing: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, Tuple[int, bool]], List[str]]:
+        """Upsert records in batches; returns {file_path: (version, inserted)} and per-file errors
+        
+        Uses upsert_project_memories (database/sql/scribe_bulk_upsert.sql), which bumps versions
+        server-side. A batch that fails, or a database without the function, falls back to
+        per-file writes so each failure is reported against its file.
+        """
+        written: Dict[str, Tuple[int, bool]] = {}
+        errors: List[str] = []
+        for i in range(0, len(records), UPSERT_CHUNK):
+            chunk = records[i:i + UPSERT_CHUNK]
+            if self._bulk_upsert_available:
+                try:
+                    result = self.supabase.rpc("upsert_project_memories", {
+                        "p_project_id": self.project_id,
+                        "p_rows": chunk
+                    }).execute()
+                    for row in result.data or []:
+                        written[row["file_path"]] = (row["version"], row["inserted"])
+                    continue
+                except Exception as e:
+                    if "upsert_project_memories" in str(e) or "PGRST202" in str(e):
+                        self._bulk_upsert_available = False
+                        console.print("[yellow]⚠️ upsert_project_memories not installed; writing per file "
+                                      "(run database/sql/scribe_bulk_upsert.sql)[/yellow]")
+            
+            for record in chunk:
+                try:
+                    written[record["file_path"]] = self._write_record(record, existing.get(record["file_path"]))
+                except Exception as e:
+                    errors.append(f"Error processing {record['file_path']}: {str(e)}")
+        return written, errors
+    
+    def _write_record(self, record: Dict[str, Any], existing: Optional[Dict[str, Any]]) -> Tuple[int, bool]:
+        """Single-file update or insert (fallback path)"""
+        if existing:
+            version = existing["version"] + 1
+            self.supabase.table("project_memorys").update({**record, "version": version}).eq(
+                "project_id", self.project_id
+            ).eq(
+                "file_path", record["file_path"]
+            ).execute()
+            return version, False
+        
+        self.supabase.table("project_memorys").insert({
+            **record,
+            "namespace": self.project_id,
+            "project_id": self.project_id,
+            "version": 1
+        }).execute()
+        return 1, True
+    
+    def _publish_snapshot(self, deltas: List[Dict[str, Any]], phase: Optional[str] = None):
+        """Apply recorded changes to the project snapshot; the records themselves are already saved"""
+        try:
+            version = publish(self.supabase, self.project_id, deltas, phase)
+            if version:
+                console.print(f"[dim]🗂️  Project snapshot v{version} ({len(deltas)} changes)[/dim]")
+        except Exception as e:
+            console.print(f"[yellow]⚠️ Project snapshot not updated: {str(e)}[/yellow]")
+    
     def _estimate_file_tokens(self, file_path: str) -> int:
         """Estimate token count for a file"""
         try:
             content = Path(file_path).read_text(encoding='utf-8')
-            return len(content) // 4  # Rough estimate
+            return count_tokens(content)
         except Exception:
             return 0
     
@@ -409,6 +505,7 @@ Never create, modify, or delete actual files - only maintain their records in th
             ).execute()
             
             orphaned = 0
+            deltas = []
             for record in result.data:
                 file_path = record["file_path"]
                 if not Path(file_path).exists():
@@ -416,8 +513,10 @@ Never create, modify, or delete actual files - only maintain their records in th
                     self.supabase.table("project_memorys").delete().eq(
                         "id", record["id"]
                     ).execute()
+                    deltas.append(delete_delta(file_path))
                     orphaned += 1
             
+            self._publish_snapshot(deltas)
             return orphaned
         except Exception as e:
             print(f"Error cleaning up orphaned records: {str(e)}")
@@ -425,6 +524,21 @@ Never create, modify, or delete actual files - only maintain their records in th
     
     async def get_project_summary(self) -> Dict[str, Any]:
         """Get a comprehensive summary of the project state"""
+        try:
+            # Materialized snapshot: only the changes since the local copy are transferred
+            snapshot = SnapshotClient(self.supabase, self.project_id).get()
+            if snapshot["files"]:
+                return {
+                    "total_files": len(snapshot["files"]),
+                    "by_type": {t: n for t, n in snapshot["counts"].items() if n},
+                    "last_updated": snapshot["last_updated"],
+                    "current_phase": snapshot["current_phase"],
+                    "snapshot_version": snapshot["version"],
+                    "project_id": self.project_id
+                }
+        except Exception as e:
+            print(f"Project snapshot unavailable, scanning project_memorys: {str(e)}")
+        
         try:
             result = self.supabase.table("project_memorys").select("*").eq(
                 "project_id", self.project_id
@@ -509,15 +623,19 @@ def main(namespace: str, task_id: str, goal: str):
         agent_class = globals()[agent_class_name]
         agent = agent_class()
         
-        async def run():
+        async def run() -> bool:
             try:
                 result = await agent._execute_task(task, task.context)
                 console.print(f"[green]✅ {agent.agent_name} completed successfully[/green]")
                 console.print(f"Result: {result}")
+                return result.success
             except Exception as e:
                 console.print(f"[red]❌ {agent.agent_name} failed: {e}[/red]")
+                return False
         
-        asyncio.run(run())
+        # The dispatcher takes the exit code as the task outcome
+        if not asyncio.run(run()):
+            raise SystemExit(1)
     else:
         console.print("[red]❌ No agent class found[/red]")
 
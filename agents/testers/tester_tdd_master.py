@@ -31,6 +31,11 @@ try:
     from rich.console import Console
     from supabase import create_client, Client
     from dotenv import load_dotenv
+    
+    import sys
+    lib_path = Path(__file__).parent.parent.parent / 'lib'
+    sys.path.insert(0, str(lib_path))
+    from prompt_layout import PromptLayout
 except ImportError as e:
     print(f"Missing dependency: {e}")
     exit(1)
@@ -127,6 +132,21 @@ AI Verifiable Outcomes: {task.ai_verifiable_outcomes}
         pass
 
 
+TDD_REQUIREMENTS = """
+TDD TEST IMPLEMENTATION REQUIREMENTS:
+Write granular test code according to the provided test plan. You must:
+
+1. Follow TDD best practices strictly
+2. Write descriptive test names and focused tests
+3. Use appropriate test doubles (mocks, stubs, spies, fakes, dummies)
+4. Avoid bad fallbacks in tests
+5. Ensure tests are independent and repeatable
+6. Create new test code files
+7. Focus on behavior verification over state testing
+
+Generate comprehensive TDD test code.
+"""
+
 
 class TesterTDDMasterAgent(BaseAgent):
     """TDD testing specialist implementing test code according to plans"""
@@ -141,24 +161,16 @@ class TesterTDDMasterAgent(BaseAgent):
     async def _execute_task(self, task: TaskPayload, context: Dict[str, Any]) -> AgentResult:
         """Execute TDD test implementation using Claude"""
         
-        prompt = self._build_agent_prompt(task, context)
+        prompt = await self._build_agent_prompt(task, context)
         
-        tdd_prompt = f"""
-{prompt}
-
-TDD TEST IMPLEMENTATION REQUIREMENTS:
-Write granular test code according to the provided test plan. You must:
-
-1. Follow TDD best practices strictly
-2. Write descriptive test names and focused tests
-3. Use appropriate test doubles (mocks, stubs, spies, fakes, dummies)
-4. Avoid bad fallbacks in tests
-5. Ensure tests are independent and repeatable
-6. Create new test code files
-7. Focus on behavior verification over state testing
-
-Generate comprehensive TDD test code.
-"""
+        # Static instructions first (cacheable prefix), task-specific prompt last
+        layout = PromptLayout(self.agent_name, self.project_id)
+        layout.stable("role", self.role_definition)
+        layout.stable("instructions", self.custom_instructions)
+        layout.stable("requirements", TDD_REQUIREMENTS)
+        layout.variable("task", prompt)
+        # _run_claude is still a placeholder here; nothing is sent, so nothing to track
+        tdd_prompt = layout.render(record=False)
         
         claude_response = await self._run_claude(tdd_prompt)
         files_created = await self._create_test_files(claude_response)
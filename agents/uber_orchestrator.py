@@ -17,6 +17,7 @@ from pathlib import Path
 
 
 # Base agent classes embedded for UV standalone execution
+import sys
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
 from datetime import datetime
@@ -27,6 +28,14 @@ try:
     from rich.console import Console
     from supabase import create_client, Client
     from dotenv import load_dotenv
+    
+    # Delegation memoization and the watched artifact index
+    lib_path = Path(__file__).parent.parent / 'lib'
+    sys.path.insert(0, str(lib_path))
+    from task_memo import enqueue_task
+    from artifact_index import project_artifacts, watch_artifacts
+    from phase_pipeline import PHASE_ARTIFACTS
+    from project_snapshot import SnapshotClient
 except ImportError as e:
     print(f"Missing dependency: {e}")
     exit(1)
@@ -59,6 +68,8 @@ class BaseAgent(ABC):
         # Load project context
         self.project_id = self._load_project_id()
         self.supabase = self._init_supabase()
+        # Phase checks repeat while phases run: one watched index per process keeps them O(1)
+        watch_artifacts()
         
     def _load_project_id(self) -> str:
         sparc_dir = Path('.sparc')
@@ -88,7 +99,7 @@ class BaseAgent(ABC):
         return Path(self._get_namespaced_path(path)).exists()
     
     async def delegate_task(self, to_agent: str, task_description: str, 
-                          context: Dict[str, Any], priority: int = 5) -> str:
+                          context: Dict[str, Any], priority: int = 5, bypass_memo: bool = False) -> str:
         task_data = {
             'namespace': self.project_id,
             'from_agent': self.agent_name,
@@ -107,8 +118,8 @@ class BaseAgent(ABC):
             'created_at': datetime.now().isoformat()
         }
         
-        result = self.supabase.table('agent_tasks').insert(task_data).execute()
-        return result.data[0]['id'] if result.data else None
+        # Re-delegating an unfinished phase coalesces onto the task already running
+        return enqueue_task(self.supabase, task_data, bypass=bypass_memo)
     
     @abstractmethod
     async def _execute_task(self, task: TaskPayload, context: Dict[str, Any]) -> AgentResult:
@@ -217,7 +228,9 @@ At each phase, you must:
                     "project_goal": task.context.get("project_goal", task.description),
                     "requirements": self._get_phase_requirements(next_phase),
                     "ai_verifiable_outcomes": self._get_phase_outcomes(next_phase),
-                    "current_context": context
+                    "current_context": context,
+                    "input_artifacts": self._phase_artifacts(current_phase),
+                    "output_artifacts": self._phase_artifacts(next_phase)
                 },
                 priority=10  # High priority for phase orchestrators
             )
@@ -249,6 +262,14 @@ At each phase, you must:
     
     async def _determine_current_phase(self, context: Dict[str, Any]) -> Optional[str]:
         """Determine the current phase from project state"""
+        try:
+            # The project snapshot carries the phase the scribe last recorded
+            snapshot = SnapshotClient(self.supabase, self.project_id).get()
+            if snapshot.get("current_phase"):
+                return snapshot["current_phase"]
+        except Exception as e:
+            print(f"Project snapshot unavailable: {str(e)}")
+        
         try:
             # Query latest phase from contexts
             result = self.supabase.table("sparc_contexts").select("phase").eq(
@@ -296,31 +317,22 @@ At each phase, you must:
             
         return None
     
+    def _phase_artifacts(self, phase: Optional[str]) -> List[str]:
+        """Namespaced artifacts that mark a phase complete"""
+        return [self._get_namespaced_path(path) for path in PHASE_ARTIFACTS.get(phase, [])]
+    
     async def _is_phase_complete(self, phase: str, context: Dict[str, Any]) -> bool:
         """Check if a phase is complete based on required artifacts"""
-        # Define phase completion criteria
-        completion_criteria = {
-            "goal-clarification": [self._get_namespaced_path("docs/Mutual_Understanding_Document.md"), self._get_namespaced_path("docs/specifications/constraints_and_anti_goals.md")],
-            "specification": [self._get_namespaced_path("docs/specifications/comprehensive_spec.md")],
-            "pseudocode": [self._get_namespaced_path("docs/pseudocode/")],
-            "architecture": [self._get_namespaced_path("docs/architecture/system_design.md")],
-            "refinement-testing": [self._get_namespaced_path("tests/")],
-            "refinement-implementation": [self._get_namespaced_path("src/")],
-            "bmo-completion": [self._get_namespaced_path("docs/bmo_validation_report.md")]
-        }
-        
-        required_files = completion_criteria.get(phase, [])
-        project_files = context.get("project_state", {}).get("files", {})
-        
-        # Check if required files exist
-        for required_file in required_files:
+        artifacts = project_artifacts()
+        for required_file in self._phase_artifacts(phase):
             if required_file.endswith('/'):
-                # Directory check
-                if not any(path.startswith(required_file) for path in project_files.keys()):
+                # Directory check, answered from the watched index
+                if not artifacts.has_files(required_file):
                     return False
             else:
-                # File check
-                if required_file not in project_files:
+                # File check; re-stat it, another process may have just written it
+                artifacts.refresh(required_file)
+                if not artifacts.is_file(required_file):
                     return False
         
         return True
@@ -444,15 +456,19 @@ def main(namespace: str, task_id: str, goal: str):
     # Create agent and execute
     agent = UberOrchestratorAgent()
     
-    async def run():
+    async def run() -> bool:
         try:
             result = await agent._execute_task(task, task.context)
             console.print(f"[green]✅ {agent.agent_name} completed successfully[/green]")
             console.print(f"Result: {result}")
+            return result.success
         except Exception as e:
             console.print(f"[red]❌ {agent.agent_name} failed: {e}[/red]")
+            return False
     
-    asyncio.run(run())
+    # The dispatcher takes the exit code as the task outcome
+    if not asyncio.run(run()):
+        raise SystemExit(1)
 
 if __name__ == "__main__":
     main()
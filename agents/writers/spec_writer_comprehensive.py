@@ -31,6 +31,11 @@ try:
     from rich.console import Console
     from supabase import create_client, Client
     from dotenv import load_dotenv
+    
+    import sys
+    lib_path = Path(__file__).parent.parent.parent / 'lib'
+    sys.path.insert(0, str(lib_path))
+    from prompt_layout import PromptLayout
 except ImportError as e:
     print(f"Missing dependency: {e}")
     exit(1)
@@ -127,6 +132,29 @@ AI Verifiable Outcomes: {task.ai_verifiable_outcomes}
         pass
 
 
+SPECIFICATION_REQUIREMENTS = """
+SPECIFICATION REQUIREMENTS:
+Create comprehensive specification documents in Markdown format. Save each as a separate file:
+
+1. docs/specifications/functional_requirements.md
+2. docs/specifications/non_functional_requirements.md  
+3. docs/specifications/data_models.md
+4. docs/specifications/api_specification.md
+5. docs/specifications/class_definitions.md
+6. docs/specifications/ui_ux_specification.md
+7. docs/specifications/edge_cases.md
+8. docs/specifications/traceability_matrix.md
+
+For each specification:
+- Use clear, measurable language
+- Include AI-verifiable success criteria
+- Formalize fuzzy requirements into concrete criteria
+- Ensure completeness and clarity
+- Define every class and function in detail
+
+Create the files and provide the content for each specification area.
+"""
+
 
 class SpecWriterComprehensiveAgent(BaseAgent):
     """Creates comprehensive and modular specification documents"""
@@ -156,33 +184,16 @@ Your specifications must be complete, clear, and verifiable for the next phases.
         """Execute comprehensive specification writing using Claude"""
         
         # Build comprehensive prompt for Claude
-        prompt = self._build_agent_prompt(task, context)
+        prompt = await self._build_agent_prompt(task, context)
         
-        # Add specification-specific instructions
-        spec_prompt = f"""
-{prompt}
-
-SPECIFICATION REQUIREMENTS:
-Create comprehensive specification documents in Markdown format. Save each as a separate file:
-
-1. docs/specifications/functional_requirements.md
-2. docs/specifications/non_functional_requirements.md  
-3. docs/specifications/data_models.md
-4. docs/specifications/api_specification.md
-5. docs/specifications/class_definitions.md
-6. docs/specifications/ui_ux_specification.md
-7. docs/specifications/edge_cases.md
-8. docs/specifications/traceability_matrix.md
-
-For each specification:
-- Use clear, measurable language
-- Include AI-verifiable success criteria
-- Formalize fuzzy requirements into concrete criteria
-- Ensure completeness and clarity
-- Define every class and function in detail
-
-Create the files and provide the content for each specification area.
-"""
+        # Add specification-specific instructions: static blocks first (cacheable prefix), task prompt last
+        layout = PromptLayout(self.agent_name, self.project_id)
+        layout.stable("role", self.role_definition)
+        layout.stable("instructions", self.custom_instructions)
+        layout.stable("requirements", SPECIFICATION_REQUIREMENTS)
+        layout.variable("task", prompt)
+        # _run_claude is still a placeholder here; nothing is sent, so nothing to track
+        spec_prompt = layout.render(record=False)
         
         # Use Claude to generate specifications
         claude_response = await self._run_claude(spec_prompt)
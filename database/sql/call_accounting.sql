@@ -0,0 +1,33 @@
+-- SPARC Call Accounting
+-- Run this in your Supabase SQL Editor after setup.sql
+--
+-- Tags communication_metrics rows written by lib/call_accounting.py with the agent,
+-- phase, task and workflow run they belong to. One row per metric per Claude call
+-- (claude_prompt_tokens, claude_response_tokens, claude_wall_ms, claude_queue_wait_ms,
+-- claude_cache_hit) or agent run (agent_wall_ms), measurement_window = 'call'.
+
+ALTER TABLE communication_metrics ADD COLUMN IF NOT EXISTS agent_name VARCHAR(255);
+ALTER TABLE communication_metrics ADD COLUMN IF NOT EXISTS phase VARCHAR(100);
+ALTER TABLE communication_metrics ADD COLUMN IF NOT EXISTS task_id VARCHAR(255);
+ALTER TABLE communication_metrics ADD COLUMN IF NOT EXISTS run_id VARCHAR(64);
+
+CREATE INDEX IF NOT EXISTS idx_communication_metrics_agent
+    ON communication_metrics (namespace, agent_name, metric_type, created_at);
+CREATE INDEX IF NOT EXISTS idx_communication_metrics_phase
+    ON communication_metrics (namespace, phase, metric_type)
+    WHERE phase IS NOT NULL;
+
+-- Most expensive agents per namespace
+CREATE OR REPLACE VIEW claude_usage_by_agent AS
+SELECT namespace,
+       agent_name,
+       COUNT(*) FILTER (WHERE metric_type = 'claude_wall_ms') AS calls,
+       SUM(metric_value) FILTER (WHERE metric_type = 'claude_prompt_tokens') AS prompt_tokens,
+       SUM(metric_value) FILTER (WHERE metric_type = 'claude_response_tokens') AS response_tokens,
+       SUM(metric_value) FILTER (WHERE metric_type = 'claude_wall_ms') / 1000 AS wall_seconds,
+       AVG(metric_value) FILTER (WHERE metric_type = 'claude_cache_hit') AS cache_hit_rate
+FROM communication_metrics
+WHERE measurement_window = 'call'
+GROUP BY namespace, agent_name;
+
+SELECT 'SPARC call accounting enabled 🧮' AS status;
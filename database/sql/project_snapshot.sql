@@ -0,0 +1,191 @@
+-- SPARC Project Snapshot
+-- Run this in your Supabase SQL Editor after setup.sql
+--
+-- One materialized document per namespace: file index, per-type counts, current
+-- phase, latest artifacts and last_updated. The state scribe and the post-tool-use
+-- hook apply deltas to it instead of agents re-reading every project_memorys row.
+-- Every change bumps the version and is kept in sparc_snapshot_deltas, so a client
+-- holding version N fetches only the deltas with version > N.
+
+CREATE TABLE IF NOT EXISTS sparc_project_snapshots (
+    namespace VARCHAR(255) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    snapshot JSONB NOT NULL DEFAULT '{"files": {}, "counts": {}, "current_phase": null, "latest_artifacts": [], "last_updated": null}',
+    last_updated TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS sparc_snapshot_deltas (
+    id BIGSERIAL PRIMARY KEY,
+    namespace VARCHAR(255) NOT NULL,
+    version BIGINT NOT NULL,
+    op VARCHAR(20) NOT NULL CHECK (op IN ('upsert', 'delete', 'phase', 'reset')),
+    file_path TEXT,
+    entry JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_snapshot_deltas_version ON sparc_snapshot_deltas (namespace, version);
+
+ALTER TABLE sparc_project_snapshots ENABLE ROW LEVEL SECURITY;
+ALTER TABLE sparc_snapshot_deltas ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow all operations on project snapshots" ON sparc_project_snapshots FOR ALL USING (true);
+CREATE POLICY "Allow all operations on snapshot deltas" ON sparc_snapshot_deltas FOR ALL USING (true);
+
+-- Snapshot key for a path, as project_snapshot.snapshot_path() computes it: relative to
+-- the project root p_root (absolute paths under it), without a leading './'
+CREATE OR REPLACE FUNCTION snapshot_key(p_path TEXT, p_root TEXT)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN p_root IS NOT NULL AND starts_with(p_path, rtrim(p_root, '/') || '/')
+            THEN substr(p_path, length(rtrim(p_root, '/')) + 2)
+        ELSE regexp_replace(p_path, '^(\./)+', '')
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Apply a batch of file deltas ([{op: upsert|delete, file_path, entry}]) and optionally
+-- set the current phase, as one new version. Upsert entries merge into the existing one.
+CREATE OR REPLACE FUNCTION apply_snapshot_deltas(
+    p_namespace VARCHAR,
+    p_deltas JSONB,
+    p_phase VARCHAR DEFAULT NULL
+)
+RETURNS BIGINT AS $$
+DECLARE
+    snap JSONB;
+    v BIGINT;
+    d JSONB;
+    path TEXT;
+    old_entry JSONB;
+    merged JSONB;
+    old_type TEXT;
+    new_type TEXT;
+BEGIN
+    INSERT INTO sparc_project_snapshots (namespace) VALUES (p_namespace)
+    ON CONFLICT (namespace) DO NOTHING;
+
+    SELECT snapshot, version INTO snap, v
+    FROM sparc_project_snapshots
+    WHERE namespace = p_namespace
+    FOR UPDATE;
+    v := v + 1;
+
+    FOR d IN SELECT * FROM jsonb_array_elements(COALESCE(p_deltas, '[]'::jsonb)) LOOP
+        path := d->>'file_path';
+        old_entry := snap->'files'->path;
+
+        IF old_entry IS NOT NULL THEN
+            old_type := COALESCE(old_entry->>'memory_type', 'unknown');
+            snap := jsonb_set(snap, ARRAY['counts', old_type],
+                              to_jsonb(GREATEST(COALESCE((snap->'counts'->>old_type)::INTEGER, 0) - 1, 0)));
+        END IF;
+
+        IF d->>'op' = 'delete' THEN
+            snap := jsonb_set(snap, '{files}', (snap->'files') - path);
+            snap := jsonb_set(snap, '{latest_artifacts}', to_jsonb(ARRAY(
+                SELECT a FROM jsonb_array_elements_text(snap->'latest_artifacts') AS a WHERE a <> path
+            )));
+        ELSE
+            merged := COALESCE(old_entry, '{}'::jsonb) || COALESCE(d->'entry', '{}'::jsonb);
+            new_type := COALESCE(merged->>'memory_type', 'unknown');
+            snap := jsonb_set(snap, ARRAY['files', path], merged);
+            snap := jsonb_set(snap, ARRAY['counts', new_type],
+                              to_jsonb(COALESCE((snap->'counts'->>new_type)::INTEGER, 0) + 1));
+            snap := jsonb_set(snap, '{latest_artifacts}', to_jsonb(ARRAY(
+                SELECT a FROM (
+                    SELECT path AS a, 0::BIGINT AS ord
+                    UNION ALL
+                    SELECT t.a, t.ord FROM jsonb_array_elements_text(snap->'latest_artifacts')
+                        WITH ORDINALITY AS t(a, ord) WHERE t.a <> path
+                ) latest ORDER BY ord LIMIT 20
+            )));
+        END IF;
+
+        INSERT INTO sparc_snapshot_deltas (namespace, version, op, file_path, entry)
+        VALUES (p_namespace, v, COALESCE(d->>'op', 'upsert'), path, d->'entry');
+    END LOOP;
+
+    IF p_phase IS NOT NULL THEN
+        snap := jsonb_set(snap, '{current_phase}', to_jsonb(p_phase));
+        INSERT INTO sparc_snapshot_deltas (namespace, version, op, entry)
+        VALUES (p_namespace, v, 'phase', jsonb_build_object('current_phase', p_phase));
+    END IF;
+
+    snap := jsonb_set(snap, '{last_updated}', to_jsonb(NOW()));
+    UPDATE sparc_project_snapshots
+    SET snapshot = snap, version = v, last_updated = NOW()
+    WHERE namespace = p_namespace;
+
+    RETURN v;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Rebuild the snapshot from project_memorys (first install, or after manual edits).
+-- Clients holding an older version see the 'reset' delta and refetch in full.
+-- Files are keyed like the deltas (snapshot_key against p_root, the project root), so
+-- later deltas for a file land on its entry; rows naming one file two ways count once.
+DROP FUNCTION IF EXISTS rebuild_project_snapshot(VARCHAR);
+CREATE OR REPLACE FUNCTION rebuild_project_snapshot(p_namespace VARCHAR, p_root TEXT DEFAULT NULL)
+RETURNS BIGINT AS $$
+DECLARE
+    snap JSONB;
+    v BIGINT;
+BEGIN
+    INSERT INTO sparc_project_snapshots (namespace) VALUES (p_namespace)
+    ON CONFLICT (namespace) DO NOTHING;
+
+    SELECT version INTO v FROM sparc_project_snapshots WHERE namespace = p_namespace FOR UPDATE;
+    v := v + 1;
+
+    WITH memories AS (
+        SELECT DISTINCT ON (key) snapshot_key(file_path, p_root) AS key,
+               memory_type, version, content_hash, brief_description, updated_at
+        FROM project_memorys WHERE namespace = p_namespace
+        ORDER BY key, updated_at DESC NULLS LAST
+    )
+    SELECT jsonb_build_object(
+        'files', COALESCE((
+            SELECT jsonb_object_agg(key, jsonb_build_object(
+                'memory_type', memory_type,
+                'version', version,
+                'content_hash', content_hash,
+                'brief_description', brief_description,
+                'updated_at', updated_at
+            ))
+            FROM memories
+        ), '{}'::jsonb),
+        'counts', COALESCE((
+            SELECT jsonb_object_agg(memory_type, n)
+            FROM (SELECT COALESCE(memory_type, 'unknown') AS memory_type, COUNT(*) AS n
+                  FROM memories GROUP BY 1) counts
+        ), '{}'::jsonb),
+        'current_phase', (SELECT snapshot->'current_phase' FROM sparc_project_snapshots WHERE namespace = p_namespace),
+        'latest_artifacts', to_jsonb(ARRAY(
+            SELECT key FROM memories ORDER BY updated_at DESC NULLS LAST LIMIT 20
+        )),
+        'last_updated', to_jsonb(NOW())
+    ) INTO snap;
+
+    UPDATE sparc_project_snapshots
+    SET snapshot = snap, version = v, last_updated = NOW()
+    WHERE namespace = p_namespace;
+
+    INSERT INTO sparc_snapshot_deltas (namespace, version, op) VALUES (p_namespace, v, 'reset');
+    RETURN v;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Keep the last p_keep versions of deltas; older clients refetch the full snapshot
+CREATE OR REPLACE FUNCTION prune_snapshot_deltas(p_namespace VARCHAR, p_keep INTEGER DEFAULT 1000)
+RETURNS INTEGER AS $$
+DECLARE
+    pruned INTEGER;
+BEGIN
+    DELETE FROM sparc_snapshot_deltas
+    WHERE namespace = p_namespace
+      AND version <= (SELECT version FROM sparc_project_snapshots WHERE namespace = p_namespace) - GREATEST(p_keep, 1);
+    GET DIAGNOSTICS pruned = ROW_COUNT;
+    RETURN pruned;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT 'SPARC project snapshots ready 🗂️' AS status;
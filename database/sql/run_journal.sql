@@ -0,0 +1,20 @@
+-- SPARC Run Journal Mirror
+-- Run this in your Supabase SQL Editor after setup.sql
+--
+-- Optional copy of the local run journal (.sparc/runs.db, lib/run_journal.py),
+-- so runs can be inspected from the dashboard. Resume always reads the local journal.
+
+CREATE TABLE IF NOT EXISTS sparc_run_journal (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    run_id VARCHAR(64) NOT NULL,
+    node VARCHAR(255) NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    artifacts JSONB DEFAULT '{}',
+    detail JSONB DEFAULT '{}',
+    recorded_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_sparc_run_journal_run ON sparc_run_journal (run_id, recorded_at);
+
+SELECT 'SPARC run journal mirror ready 📓' AS status;
@@ -0,0 +1,50 @@
+-- SPARC State Scribe Bulk Upsert
+-- Run this in your Supabase SQL Editor after setup.sql
+--
+-- Lets the state scribe record a whole batch of files in one call: rows are
+-- upserted on (project_id, file_path) and an existing record's version is bumped
+-- server-side, so concurrent scribes never lose an increment.
+
+ALTER TABLE project_memorys ADD COLUMN IF NOT EXISTS project_id VARCHAR(255);
+UPDATE project_memorys SET project_id = namespace WHERE project_id IS NULL;
+
+-- Keep only the newest record per file before adding the unique key
+DELETE FROM project_memorys pm
+USING project_memorys newer
+WHERE pm.project_id = newer.project_id
+  AND pm.file_path = newer.file_path
+  AND (pm.version, pm.updated_at, pm.id::TEXT) < (newer.version, newer.updated_at, newer.id::TEXT);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_project_memorys_project_file
+    ON project_memorys (project_id, file_path);
+
+-- p_rows: [{file_path, memory_type, brief_description, elements_description, rationale, content_hash}]
+CREATE OR REPLACE FUNCTION upsert_project_memories(
+    p_project_id VARCHAR,
+    p_rows JSONB
+)
+RETURNS TABLE (file_path TEXT, version INTEGER, inserted BOOLEAN) AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+    INSERT INTO project_memorys AS pm (
+        namespace, project_id, file_path, memory_type,
+        brief_description, elements_description, rationale, content_hash, version
+    )
+    SELECT p_project_id, p_project_id, r->>'file_path', COALESCE(r->>'memory_type', 'unknown'),
+           COALESCE(r->>'brief_description', ''), COALESCE(r->>'elements_description', ''),
+           COALESCE(r->>'rationale', ''), r->>'content_hash', 1
+    FROM jsonb_array_elements(p_rows) AS r
+    ON CONFLICT (project_id, file_path) DO UPDATE SET
+        memory_type = EXCLUDED.memory_type,
+        brief_description = EXCLUDED.brief_description,
+        elements_description = EXCLUDED.elements_description,
+        rationale = EXCLUDED.rationale,
+        content_hash = COALESCE(EXCLUDED.content_hash, pm.content_hash),
+        version = pm.version + 1,
+        updated_at = NOW()
+    RETURNING pm.file_path, pm.version, (xmax = 0);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT 'SPARC scribe bulk upsert ready 📦' AS status;
@@ -0,0 +1,71 @@
+-- SPARC Atomic Task Claiming
+-- Run this in your Supabase SQL Editor after setup.sql
+--
+-- claim_next_task() hands exactly one pending task to one worker, even with many
+-- workers claiming concurrently: competing transactions skip rows that are
+-- already locked instead of waiting on (or double-claiming) them.
+
+ALTER TABLE agent_tasks
+ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(255),
+ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE;
+
+-- Matches the claim query's filter and ordering, so the next task is an index
+-- lookup no matter how many finished tasks the namespace has accumulated
+CREATE INDEX IF NOT EXISTS idx_agent_tasks_claim
+    ON agent_tasks (namespace, status, to_agent, priority DESC, created_at)
+    WHERE status = 'pending';
+
+CREATE OR REPLACE FUNCTION claim_next_task(
+    p_namespace VARCHAR,
+    p_agent_filter TEXT[] DEFAULT NULL,
+    p_worker_id VARCHAR DEFAULT NULL,
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS SETOF agent_tasks AS $$
+BEGIN
+    RETURN QUERY
+    WITH next_task AS (
+        SELECT id
+        FROM agent_tasks
+        WHERE namespace = p_namespace
+          AND status = 'pending'
+          AND (p_agent_filter IS NULL OR to_agent = ANY(p_agent_filter))
+        ORDER BY priority DESC, created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE agent_tasks t
+    SET status = 'in_progress',
+        claimed_by = p_worker_id,
+        started_at = NOW(),
+        lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+    FROM next_task
+    WHERE t.id = next_task.id
+    RETURNING t.*;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Finish a claimed task; only the lease holder may complete it
+CREATE OR REPLACE FUNCTION complete_claimed_task(
+    p_task_id UUID,
+    p_worker_id VARCHAR,
+    p_status VARCHAR,
+    p_result JSONB DEFAULT NULL,
+    p_error TEXT DEFAULT NULL
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE agent_tasks
+    SET status = p_status,
+        result = p_result,
+        error = p_error,
+        completed_at = NOW(),
+        lease_expires_at = NULL
+    WHERE id = p_task_id
+      AND status = 'in_progress'
+      AND claimed_by IS NOT DISTINCT FROM p_worker_id;
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT 'SPARC atomic task claiming enabled 🔒' AS status;
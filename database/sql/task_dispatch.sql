@@ -0,0 +1,54 @@
+-- SPARC Push-Based Task Dispatch
+-- Run this in your Supabase SQL Editor after setup.sql and create_missing_tables.sql
+--
+-- Publishes agent_tasks and approval_requests changes on NOTIFY channels so
+-- dispatchers wake immediately instead of polling.
+
+-- Notify on new tasks and on every status transition
+CREATE OR REPLACE FUNCTION notify_agent_task_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR NEW.status IS DISTINCT FROM OLD.status THEN
+        PERFORM pg_notify('sparc_agent_tasks', json_build_object(
+            'op', TG_OP,
+            'id', NEW.id,
+            'namespace', NEW.namespace,
+            'to_agent', NEW.to_agent,
+            'status', NEW.status,
+            'priority', NEW.priority
+        )::text);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS agent_tasks_notify ON agent_tasks;
+CREATE TRIGGER agent_tasks_notify
+    AFTER INSERT OR UPDATE OF status ON agent_tasks
+    FOR EACH ROW EXECUTE FUNCTION notify_agent_task_change();
+
+CREATE OR REPLACE FUNCTION notify_approval_request_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR NEW.status IS DISTINCT FROM OLD.status THEN
+        PERFORM pg_notify('sparc_approval_requests', json_build_object(
+            'op', TG_OP,
+            'id', NEW.id,
+            'project_id', NEW.project_id,
+            'phase', NEW.phase,
+            'status', NEW.status
+        )::text);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS approval_requests_notify ON approval_requests;
+CREATE TRIGGER approval_requests_notify
+    AFTER INSERT OR UPDATE OF status ON approval_requests
+    FOR EACH ROW EXECUTE FUNCTION notify_approval_request_change();
+
+-- Supabase Realtime can be used instead of a direct LISTEN connection
+-- ALTER PUBLICATION supabase_realtime ADD TABLE agent_tasks, approval_requests;
+
+SELECT 'SPARC task dispatch notifications enabled 🔔' AS status;
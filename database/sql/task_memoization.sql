@@ -0,0 +1,22 @@
+-- SPARC Task Memoization
+-- Run this in your Supabase SQL Editor after setup.sql
+--
+-- Delegations carry a fingerprint of (to_agent, task_type, normalized payload,
+-- input artifact hashes), computed in lib/task_memo.py. An equivalent delegation
+-- coalesces onto the pending or in-flight task instead of running the agent again;
+-- a completed task is reused only while its declared outputs exist.
+
+ALTER TABLE agent_tasks
+ADD COLUMN IF NOT EXISTS fingerprint CHAR(64);
+
+-- At most one in-flight task per fingerprint; a concurrent duplicate insert fails
+-- and the caller coalesces onto the winner
+CREATE UNIQUE INDEX IF NOT EXISTS idx_agent_tasks_fingerprint_active
+    ON agent_tasks (namespace, fingerprint)
+    WHERE fingerprint IS NOT NULL AND status IN ('pending', 'in_progress');
+
+CREATE INDEX IF NOT EXISTS idx_agent_tasks_fingerprint
+    ON agent_tasks (namespace, fingerprint, created_at DESC)
+    WHERE fingerprint IS NOT NULL;
+
+SELECT 'SPARC task memoization enabled 🧠' AS status;
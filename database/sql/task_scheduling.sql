@@ -0,0 +1,40 @@
+-- SPARC Task Scheduling
+-- Run this in your Supabase SQL Editor after task_claiming.sql
+--
+-- The dispatcher picks the next task client-side (lib/task_scheduler.py: aging,
+-- concurrency caps, fair share across namespaces) and then claims that exact
+-- task. Aging is not done in SQL: ordering by a time-dependent expression
+-- would bypass idx_agent_tasks_claim.
+
+CREATE OR REPLACE FUNCTION claim_task(
+    p_task_id UUID,
+    p_worker_id VARCHAR DEFAULT NULL,
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS SETOF agent_tasks AS $$
+BEGIN
+    RETURN QUERY
+    WITH chosen AS (
+        SELECT id
+        FROM agent_tasks
+        WHERE id = p_task_id
+          AND status = 'pending'
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE agent_tasks t
+    SET status = 'in_progress',
+        claimed_by = p_worker_id,
+        started_at = NOW(),
+        lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+    FROM chosen
+    WHERE t.id = chosen.id
+    RETURNING t.*;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Oldest pending tasks, so aged low-priority work is visible to the scheduler
+CREATE INDEX IF NOT EXISTS idx_agent_tasks_pending_age
+    ON agent_tasks (namespace, created_at)
+    WHERE status = 'pending';
+
+SELECT 'SPARC task scheduling enabled 🗓️' AS status;
@@ -0,0 +1,103 @@
+-- SPARC Worker Fleet
+-- Run this in your Supabase SQL Editor after task_claiming.sql
+--
+-- Workers on any number of hosts register here, lease tasks for a bounded time
+-- and renew those leases with heartbeats. Leases that run out (crashed or
+-- partitioned worker) are returned to the queue. Idle workers may steal pending
+-- work from the busiest namespace they don't serve.
+
+CREATE TABLE IF NOT EXISTS sparc_workers (
+    worker_id VARCHAR(255) PRIMARY KEY,
+    host VARCHAR(255) NOT NULL,
+    pid INTEGER,
+    namespaces TEXT[] DEFAULT '{}',
+    capacity INTEGER DEFAULT 1,
+    running INTEGER DEFAULT 0,
+    status VARCHAR(20) DEFAULT 'active' CHECK (status IN ('active', 'draining', 'stopped', 'lost')),
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    last_heartbeat TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_agent_tasks_leases
+    ON agent_tasks (lease_expires_at)
+    WHERE status = 'in_progress';
+
+-- Renew every lease the worker holds and report its load
+CREATE OR REPLACE FUNCTION worker_heartbeat(
+    p_worker_id VARCHAR,
+    p_running INTEGER DEFAULT 0,
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS INTEGER AS $$
+DECLARE
+    renewed INTEGER;
+BEGIN
+    UPDATE sparc_workers
+    SET last_heartbeat = NOW(), running = p_running,
+        status = CASE WHEN status = 'lost' THEN 'active' ELSE status END
+    WHERE worker_id = p_worker_id;
+
+    UPDATE agent_tasks
+    SET lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+    WHERE claimed_by = p_worker_id AND status = 'in_progress';
+    GET DIAGNOSTICS renewed = ROW_COUNT;
+    RETURN renewed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Requeue tasks whose lease ran out; safe to call from every worker
+CREATE OR REPLACE FUNCTION reclaim_expired_leases(p_worker_timeout_seconds INTEGER DEFAULT 900)
+RETURNS INTEGER AS $$
+DECLARE
+    reclaimed INTEGER;
+BEGIN
+    WITH expired AS (
+        SELECT id
+        FROM agent_tasks
+        WHERE status = 'in_progress' AND lease_expires_at < NOW()
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE agent_tasks t
+    SET status = 'pending', claimed_by = NULL, lease_expires_at = NULL, started_at = NULL
+    FROM expired
+    WHERE t.id = expired.id;
+    GET DIAGNOSTICS reclaimed = ROW_COUNT;
+
+    UPDATE sparc_workers
+    SET status = 'lost'
+    WHERE status = 'active'
+      AND last_heartbeat < NOW() - make_interval(secs => p_worker_timeout_seconds);
+
+    RETURN reclaimed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Lease the next task from the namespace with the deepest queue, outside p_exclude_namespaces
+CREATE OR REPLACE FUNCTION steal_task(
+    p_worker_id VARCHAR,
+    p_exclude_namespaces TEXT[] DEFAULT '{}',
+    p_agent_filter TEXT[] DEFAULT NULL,
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS SETOF agent_tasks AS $$
+DECLARE
+    busiest VARCHAR;
+BEGIN
+    SELECT namespace INTO busiest
+    FROM agent_tasks
+    WHERE status = 'pending'
+      AND NOT (namespace = ANY(p_exclude_namespaces))
+      AND (p_agent_filter IS NULL OR to_agent = ANY(p_agent_filter))
+    GROUP BY namespace
+    ORDER BY COUNT(*) DESC
+    LIMIT 1;
+
+    IF busiest IS NULL THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY SELECT * FROM claim_next_task(busiest, p_agent_filter, p_worker_id, p_lease_seconds);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT 'SPARC worker fleet enabled 🛰️' AS status;
@@ -14,11 +14,12 @@ SPARC Enhanced PostToolUse Hook - Integrates Layer 2 Intelligence Components
 Captures file changes and triggers intelligent autonomous workflow continuation
 """
 
+import time
+HOOK_STARTED = time.perf_counter()  # Before the heavy imports below, so total_ms includes them
+
 import json
 import sys
 import os
-import time
-import asyncio
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any, Optional, Tuple
@@ -32,6 +33,11 @@ try:
     lib_path = Path(__file__).parent.parent / 'lib'
     sys.path.insert(0, str(lib_path))
     
+    from content_hash_index import ContentHashIndex, resolve_content_hash, is_noop_edit
+    from hook_metrics import record_event, HookTimer
+    from intent_queue import SNAPSHOT_KIND, IntentQueue, ensure_worker
+    from task_memo import enqueue_task
+    from project_snapshot import file_delta, publish
     from enhanced_hook_orchestrator import get_orchestrator_instance
     from bmo_intent_tracker import BMOIntentTracker
     from interactive_question_engine import InteractiveQuestionEngine
@@ -41,6 +47,7 @@ except ImportError as e:
     sys.exit(1)
 
 console = Console()
+hook_timer = HookTimer(started=HOOK_STARTED)
 
 def load_project_namespace() -> str:
     """Load namespace from project .sparc directory"""
@@ -125,11 +132,10 @@ def process_with_intelligence(hook_data: Dict[str, Any], supabase: Client, names
             console.print("[blue]🤖 Intelligent SPARC assistance trigger detected[/blue]")
             return trigger_intelligent_assistance(hook_data, orchestrator, intent_tracker, namespace)
         
-        # Extract intents from user interactions for intent model building
+        # Queue intents from user interactions for background intent model building
         if tool_name in ['Write', 'Edit'] and content:
-            asyncio.run(intent_tracker.extract_intents_from_interaction(
-                content, 'claude_code_interaction', {'file_path': file_path}
-            ))
+            if IntentQueue(namespace).enqueue(file_path, content, {'file_path': file_path}):
+                ensure_worker(namespace)
         
         return None
         
@@ -342,10 +348,12 @@ def trigger_next_workflow(supabase: Client, namespace: str, file_path: str, tool
                     'priority': 7
                 },
                 'status': 'pending',
+                'priority': 7,  # The scheduler and claim_task order by the column, not the payload
                 'created_at': datetime.now().isoformat()
             }
             
-            supabase.table('agent_tasks').insert(task_data).execute()
+            # Repeated edits with identical content reuse the pending scribe task
+            enqueue_task(supabase, task_data)
             console.print(f"[blue]🤖 SPARC: Triggered {next_agent} for {file_path}[/blue]")
     
     except Exception as e:
@@ -380,25 +388,43 @@ def main():
     
     # Set up error logging
     error_log = setup_error_logging()
+    hook_data = None
+    namespace = 'default'
     
     try:
-        # Validate environment first
-        if not validate_environment():
-            return  # Fail silently if SPARC not configured
-        
         # Read and validate hook data
-        hook_data = read_and_validate_hook_data()
+        with hook_timer.span('stdin_read'):
+            hook_data = read_and_validate_hook_data()
         if not hook_data:
             return
         
         # Load project namespace with fallback
         namespace = load_project_namespace_safe()
         
+        # Validate environment
+        with hook_timer.span('env_validation'):
+            if not validate_environment():
+                return  # Fail silently if SPARC not configured
+        
+        # Skip no-op edits before touching the database
+        with hook_timer.span('dedup'):
+            content_hash = check_content_changed(hook_data, namespace)
+        if content_hash is False:
+            return
+        
         # Execute with comprehensive error handling
-        execute_sparc_workflow_safe(hook_data, namespace, error_log)
+        stored = execute_sparc_workflow_safe(hook_data, namespace, error_log)
+        
+        # Remember what was recorded so identical rewrites are skipped next time;
+        # a change that failed to store must be retried, not skipped
+        if content_hash and stored:
+            record_content_hash(hook_data, namespace, content_hash, error_log)
         
     except Exception as e:
         handle_critical_error(e, error_log)
+    finally:
+        if hook_data:
+            hook_timer.flush(namespace, hook_data.get('tool_name'))
 
 def setup_error_logging():
     """Setup error logging for production"""
@@ -408,6 +434,41 @@ def setup_error_logging():
     log_file = log_dir / f'hook_errors_{datetime.now().strftime("%Y%m%d")}.log'
     return log_file
 
+def check_content_changed(hook_data: Dict[str, Any], namespace: str):
+    """Return the new content hash, None if unknown, or False for a no-op change"""
+    try:
+        tool_name = hook_data.get('tool_name')
+        tool_input = hook_data.get('tool_input', {})
+        
+        if tool_name not in ['Write', 'Edit', 'MultiEdit']:
+            return None
+        
+        file_path = tool_input.get('file_path')
+        if not file_path or not isinstance(file_path, str):
+            return None
+        
+        if is_noop_edit(tool_name, tool_input):
+            record_event('skipped_unchanged', namespace, tool=tool_name, reason='noop_edit')
+            return False
+        
+        content_hash = resolve_content_hash(tool_name, tool_input)
+        if ContentHashIndex(namespace).is_unchanged(file_path, content_hash):
+            record_event('skipped_unchanged', namespace, tool=tool_name, reason='same_hash')
+            return False
+        
+        return content_hash
+        
+    except Exception:
+        return None  # Never drop an event because dedup failed
+
+def record_content_hash(hook_data: Dict[str, Any], namespace: str, content_hash: str, error_log: Path):
+    """Persist the content hash for the processed file"""
+    try:
+        file_path = hook_data.get('tool_input', {}).get('file_path')
+        ContentHashIndex(namespace).record(file_path, content_hash)
+    except Exception as e:
+        log_error(f"Failed to record content hash: {e}", error_log)
+
 def validate_environment() -> bool:
     """Validate SPARC environment is properly configured"""
     try:
@@ -479,17 +540,19 @@ def load_project_namespace_safe() -> str:
     except Exception:
         return 'default'
 
-def execute_sparc_workflow_safe(hook_data: Dict[str, Any], namespace: str, error_log: Path):
-    """Execute SPARC workflow with comprehensive error handling"""
+def execute_sparc_workflow_safe(hook_data: Dict[str, Any], namespace: str, error_log: Path) -> bool:
+    """Execute SPARC workflow with comprehensive error handling; True if the file change was stored"""
     try:
         # Update SPARC memory and trigger workflows
-        update_sparc_memory_safe(hook_data, namespace, error_log)
+        return update_sparc_memory_safe(hook_data, namespace, error_log)
         
     except Exception as e:
         log_workflow_error(e, hook_data, namespace, error_log)
+        return False
 
-def update_sparc_memory_safe(hook_data: Dict[str, Any], namespace: str, error_log: Path):
-    """Enhanced SPARC memory update with production error handling"""
+def update_sparc_memory_safe(hook_data: Dict[str, Any], namespace: str, error_log: Path) -> bool:
+    """Enhanced SPARC memory update with production error handling; True if the file change was stored"""
+    stored = False
     try:
         supabase = get_supabase_client()
         
@@ -502,29 +565,36 @@ def update_sparc_memory_safe(hook_data: Dict[str, Any], namespace: str, error_lo
             
             if file_path and isinstance(file_path, str):
                 try:
-                    store_file_change_safe(supabase, namespace, hook_data, file_path, tool_name)
+                    with hook_timer.span('supabase_insert'):
+                        store_file_change_safe(supabase, namespace, hook_data, file_path, tool_name)
+                    stored = True
                 except Exception as e:
                     log_error(f"Failed to store file change: {e}", error_log)
         
         # Enhanced intelligence processing with error isolation
         try:
-            workflow_continuation = process_with_intelligence_safe(hook_data, supabase, namespace, error_log)
+            with hook_timer.span('intelligence'):
+                workflow_continuation = process_with_intelligence_safe(hook_data, supabase, namespace, error_log)
             
             if workflow_continuation:
                 console.print(f"[green]🧠 SPARC: Triggered {workflow_continuation.next_agent}[/green]")
             else:
                 # Fallback to original workflow triggering
                 if tool_name in ['Write', 'Edit', 'MultiEdit'] and tool_input.get('file_path'):
-                    trigger_next_workflow_safe(supabase, namespace, tool_input.get('file_path'), tool_name, error_log)
+                    with hook_timer.span('trigger'):
+                        trigger_next_workflow_safe(supabase, namespace, tool_input.get('file_path'), tool_name, error_log)
         
         except Exception as e:
             log_error(f"Intelligence processing failed: {e}", error_log)
             # Continue with basic workflow triggering
             if tool_name in ['Write', 'Edit', 'MultiEdit'] and tool_input.get('file_path'):
-                trigger_next_workflow_safe(supabase, namespace, tool_input.get('file_path'), tool_name, error_log)
+                with hook_timer.span('trigger'):
+                    trigger_next_workflow_safe(supabase, namespace, tool_input.get('file_path'), tool_name, error_log)
     
     except Exception as e:
         log_error(f"Memory update failed: {e}", error_log)
+    
+    return stored
 
 def store_file_change_safe(supabase: Client, namespace: str, hook_data: Dict[str, Any], file_path: str, tool_name: str):
     """Store file change with retry logic"""
@@ -543,6 +613,7 @@ def store_file_change_safe(supabase: Client, namespace: str, hook_data: Dict[str
             
             supabase.table('sparc_file_changes').insert(memory_data).execute()
             console.print(f"[green]📝 SPARC: Stored {file_path}[/green]")
+            publish_snapshot_delta_safe(supabase, namespace, file_path, tool_name, memory_data['timestamp'])
             return
             
         except Exception as e:
@@ -550,6 +621,18 @@ def store_file_change_safe(supabase: Client, namespace: str, hook_data: Dict[str
                 raise e
             time.sleep(0.5 * (attempt + 1))  # Exponential backoff
 
+def publish_snapshot_delta_safe(supabase: Client, namespace: str, file_path: str, tool_name: str, timestamp: str):
+    """Mark the file as touched in the project snapshot (best effort, never retried)"""
+    try:
+        delta = file_delta(file_path, last_tool=tool_name, updated_at=timestamp)
+        # The intent worker publishes queued deltas in batches; repeated edits to a file coalesce
+        if IntentQueue(namespace, kind=SNAPSHOT_KIND).enqueue(delta['file_path'], '', {'delta': delta}):
+            ensure_worker(namespace)
+        else:
+            publish(supabase, namespace, [delta])  # Queue full
+    except Exception as e:
+        log_error(f"Project snapshot delta failed: {e}", setup_error_logging())
+
 def process_with_intelligence_safe(hook_data: Dict[str, Any], supabase: Client, namespace: str, error_log: Path) -> Optional[Any]:
     """Process with intelligence components with error isolation"""
     try:
@@ -578,38 +661,13 @@ def process_with_intelligence_safe(hook_data: Dict[str, Any], supabase: Client,
         except Exception as e:
             log_error(f"Trigger detection failed: {e}", error_log)
         
-        # Extract intents with error handling
+        # Queue intent extraction for the background worker (never blocks the hook)
         try:
             if tool_name in ['Write', 'Edit'] and content and isinstance(content, str):
-                # Run async intent extraction safely
-                import asyncio
-                try:
-                    loop = asyncio.get_event_loop()
-                    if loop.is_running():
-                        # Create new thread for async operation
-                        import threading
-                        result = [None]
-                        def run_intent_extraction():
-                            new_loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(new_loop)
-                            result[0] = new_loop.run_until_complete(
-                                intent_tracker.extract_intents_from_interaction(
-                                    content, 'claude_code_interaction', {'file_path': file_path}
-                                )
-                            )
-                            new_loop.close()
-                        
-                        thread = threading.Thread(target=run_intent_extraction)
-                        thread.start()
-                        thread.join(timeout=5)  # 5 second timeout
-                    else:
-                        asyncio.run(intent_tracker.extract_intents_from_interaction(
-                            content, 'claude_code_interaction', {'file_path': file_path}
-                        ))
-                except Exception:
-                    pass  # Intent extraction is not critical
+                if IntentQueue(namespace).enqueue(file_path, content, {'file_path': file_path}):
+                    ensure_worker(namespace)
         except Exception as e:
-            log_error(f"Intent extraction failed: {e}", error_log)
+            log_error(f"Intent extraction enqueue failed: {e}", error_log)
         
         return None
         
@@ -709,10 +767,12 @@ def trigger_next_workflow_safe(supabase: Client, namespace: str, file_path: str,
                     'priority': 7
                 },
                 'status': 'pending',
+                'priority': 7,  # The scheduler and claim_task order by the column, not the payload
                 'created_at': datetime.now().isoformat()
             }
             
-            supabase.table('agent_tasks').insert(task_data).execute()
+            # Repeated edits with identical content reuse the pending scribe task
+            enqueue_task(supabase, task_data)
             console.print(f"[blue]🤖 SPARC: Queued {next_agent} for {file_path}[/blue]")
     
     except Exception as e:
@@ -1,74 +1,61 @@
 #!/usr/bin/env python3
 # /// script
 # requires-python = ">=3.11"
-# dependencies = [
-#   "rich>=13.0.0",
-# ]
+# dependencies = []
 # ///
 
 """
 SPARC PreToolUse Hook - Provides context before tool execution
 Runs before every tool operation in Claude Code
+
+This hook sits on the hot path of every tool call, so it is stdlib-only:
+the approve decision is written before any context output is produced.
 """
 
 import json
+import os
 import sys
-from pathlib import Path
-
-try:
-    from rich.console import Console
-except ImportError:
-    print("Missing dependency: rich")
-    sys.exit(1)
 
-console = Console()
+APPROVE = '{"decision": "approve"}'
+FILE_TOOLS = ('Write', 'Edit', 'MultiEdit')
 
-def load_project_namespace() -> str:
+def load_project_namespace():
     """Load namespace from project .sparc directory"""
-    sparc_dir = Path.cwd() / '.sparc'
-    namespace_file = sparc_dir / 'namespace'
-    
-    if namespace_file.exists():
-        return namespace_file.read_text().strip()
-    return None
+    try:
+        with open(os.path.join('.sparc', 'namespace')) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
 
-def provide_sparc_context(hook_data: dict):
+def provide_sparc_context(hook_data: dict, namespace: str):
     """Provide SPARC context for the upcoming tool operation"""
-    namespace = load_project_namespace()
-    
-    if namespace:
-        tool_name = hook_data.get('tool_name')
-        tool_input = hook_data.get('tool_input', {})
-        
-        # Log the upcoming operation
-        if tool_name in ['Write', 'Edit', 'MultiEdit']:
-            file_path = tool_input.get('file_path', 'unknown')
-            console.print(f"[dim]🤖 SPARC: {tool_name} operation on {file_path}[/dim]")
-        
-        # Return approval (no blocking)
-        return {"decision": "approve"}
-    
-    return {"decision": "approve"}
+    tool_name = hook_data.get('tool_name')
+
+    # Log the upcoming operation (stderr keeps stdout a clean JSON decision)
+    if tool_name in FILE_TOOLS:
+        file_path = (hook_data.get('tool_input') or {}).get('file_path', 'unknown')
+        sys.stderr.write(f"\033[2m🤖 SPARC: {tool_name} operation on {file_path}\033[0m\n")
 
 def main():
     """Main hook execution"""
+    # Fast path: no SPARC project means no context to parse or print
+    namespace = load_project_namespace()
+
+    # Never block the tool call - answer first, then add context
+    sys.stdout.write(APPROVE + '\n')
+    sys.stdout.flush()
+
+    # Drain stdin so the caller never sees a broken pipe on large payloads
+    raw_data = sys.stdin.read()
+    if not namespace:
+        return
+
     try:
-        # Read hook data from stdin
-        hook_data = json.loads(sys.stdin.read())
-        
-        # Provide context and return decision
-        result = provide_sparc_context(hook_data)
-        
-        # Output decision for Claude Code
-        if result:
-            print(json.dumps(result))
-        
-    except json.JSONDecodeError:
-        # Silent fail for invalid JSON
-        print(json.dumps({"decision": "approve"}))
+        hook_data = json.loads(raw_data)
+        if isinstance(hook_data, dict):
+            provide_sparc_context(hook_data, namespace)
     except Exception:
-        # Silent fail for any other errors
-        print(json.dumps({"decision": "approve"}))
+        pass  # Silent fail - decision already sent
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,57 +1,50 @@
 #!/usr/bin/env python3
 # /// script
 # requires-python = ">=3.11"
-# dependencies = [
-#   "rich>=13.0.0",
-# ]
+# dependencies = []
 # ///
 
 """
 SPARC Stop Hook - Runs when Claude Code finishes responding
 Provides feedback and status updates for autonomous development
+
+Stdlib-only so it starts without dependency resolution.
 """
 
 import json
+import os
 import sys
-from pathlib import Path
-
-try:
-    from rich.console import Console
-except ImportError:
-    print("Missing dependency: rich")
-    sys.exit(1)
 
-console = Console()
+GREEN = '\033[32m'
+DIM = '\033[2m'
+RESET = '\033[0m'
 
-def load_project_namespace() -> str:
+def load_project_namespace():
     """Load namespace from project .sparc directory"""
-    sparc_dir = Path.cwd() / '.sparc'
-    namespace_file = sparc_dir / 'namespace'
-    
-    if namespace_file.exists():
-        return namespace_file.read_text().strip()
-    return None
-
-def announce_completion(hook_data: dict):
+    try:
+        with open(os.path.join('.sparc', 'namespace')) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def announce_completion(hook_data: dict, namespace):
     """Announce Claude Code completion for SPARC project"""
-    namespace = load_project_namespace()
-    
     if namespace:
-        console.print("[green]✅ SPARC: Claude Code session completed[/green]")
-        console.print(f"[dim]📦 Project: {namespace}[/dim]")
-        console.print("[dim]🔄 Autonomous agents continue working...[/dim]")
+        print(f"{GREEN}✅ SPARC: Claude Code session completed{RESET}")
+        print(f"{DIM}📦 Project: {namespace}{RESET}")
+        print(f"{DIM}🔄 Autonomous agents continue working...{RESET}")
     else:
-        console.print("[green]✅ All set and ready for your next step![/green]")
+        print(f"{GREEN}✅ All set and ready for your next step!{RESET}")
 
 def main():
     """Main hook execution"""
     try:
         # Read hook data from stdin
         hook_data = json.loads(sys.stdin.read())
-        
+
         # Announce completion
-        announce_completion(hook_data)
-        
+        announce_completion(hook_data, load_project_namespace())
+
     except json.JSONDecodeError:
         # Silent fail for invalid JSON
         pass
@@ -60,4 +53,4 @@ def main():
         pass
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
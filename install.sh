@@ -6,6 +6,9 @@
 
 set -e
 
+# Set when run from a checkout (empty when piped from curl)
+SPARC_SOURCE_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" 2>/dev/null && pwd || true)"
+
 echo "┌─────────────────────────────────────────────────────────────────┐"
 echo "│ 🚀 SPARC - Autonomous Development System                        │"
 echo "│ Installing 36 AI agents for complete software development...    │"
@@ -398,7 +401,7 @@ def create_project_structure(project_path):
     hooks_dir = claude_dir / 'hooks'
     hooks_dir.mkdir(exist_ok=True)
     
-    # Copy UV hook scripts to project
+    # Copy hook scripts to project
     global_hooks = Path('/usr/local/sparc/hooks')
     if global_hooks.exists():
         for hook_script in ['post_tool_use.py', 'pre_tool_use.py', 'stop.py']:
@@ -427,7 +430,7 @@ def create_project_structure(project_path):
                     'hooks': [
                         {
                             'type': 'command',
-                            'command': 'uv run .claude/hooks/pre_tool_use.py'
+                            'command': 'python3 .claude/hooks/pre_tool_use.py'
                         }
                     ]
                 }
@@ -438,7 +441,7 @@ def create_project_structure(project_path):
                     'hooks': [
                         {
                             'type': 'command',
-                            'command': 'uv run .claude/hooks/stop.py'
+                            'command': 'python3 .claude/hooks/stop.py'
                         }
                     ]
                 }
@@ -446,8 +449,13 @@ def create_project_structure(project_path):
         }
     }
     
-    # Save hooks configuration
+    # The installed config runs the stdlib PreToolUse/Stop hooks with plain python3
     import json
+    global_config = global_hooks / 'claude_hooks_config.json'
+    if global_config.exists():
+        hooks_config = json.loads(global_config.read_text())
+    
+    # Save hooks configuration
     with open(claude_dir / 'hooks.json', 'w') as f:
         json.dump(hooks_config, f, indent=2)
     
@@ -1866,7 +1874,7 @@ EOF
 echo "🔗 Installing Claude Code integration hooks..."
 sudo mkdir -p /usr/local/sparc/hooks
 
-# Install hooks configuration (correct Claude Code format)
+# Install hooks configuration (correct Claude Code format; same as hooks/claude_hooks_config.json)
 sudo tee /usr/local/sparc/hooks/claude_hooks_config.json > /dev/null << 'EOF'
 {
   "hooks": {
@@ -1876,7 +1884,7 @@ sudo tee /usr/local/sparc/hooks/claude_hooks_config.json > /dev/null << 'EOF'
         "hooks": [
           {
             "type": "command",
-            "command": "uv run .claude/hooks/post_tool_use.py"
+            "command": "uv run /usr/local/sparc/hooks/post_tool_use.py"
           }
         ]
       }
@@ -1887,7 +1895,7 @@ sudo tee /usr/local/sparc/hooks/claude_hooks_config.json > /dev/null << 'EOF'
         "hooks": [
           {
             "type": "command", 
-            "command": "uv run .claude/hooks/pre_tool_use.py"
+            "command": "python3 /usr/local/sparc/hooks/pre_tool_use.py"
           }
         ]
       }
@@ -1898,7 +1906,7 @@ sudo tee /usr/local/sparc/hooks/claude_hooks_config.json > /dev/null << 'EOF'
         "hooks": [
           {
             "type": "command",
-            "command": "uv run .claude/hooks/stop.py"
+            "command": "python3 /usr/local/sparc/hooks/stop.py"
           }
         ]
       }
@@ -1907,8 +1915,8 @@ sudo tee /usr/local/sparc/hooks/claude_hooks_config.json > /dev/null << 'EOF'
 }
 EOF
 
-# Install UV hook scripts (embedded for remote installation)
-echo "📝 Installing UV hook scripts..."
+# Install hook scripts (embedded for remote installation)
+echo "📝 Installing hook scripts..."
 
 sudo tee /usr/local/sparc/hooks/post_tool_use.py > /dev/null << 'EOF'
 #!/usr/bin/env python3
@@ -2008,48 +2016,61 @@ sudo tee /usr/local/sparc/hooks/pre_tool_use.py > /dev/null << 'EOF'
 #!/usr/bin/env python3
 # /// script
 # requires-python = ">=3.11"
-# dependencies = [
-#   "rich>=13.0.0",
-# ]
+# dependencies = []
 # ///
 
 """
 SPARC PreToolUse Hook - Provides context before tool execution
+Runs before every tool operation in Claude Code
+
+This hook sits on the hot path of every tool call, so it is stdlib-only:
+the approve decision is written before any context output is produced.
 """
 
 import json
+import os
 import sys
-from pathlib import Path
 
-try:
-    from rich.console import Console
-except ImportError:
-    print("Missing dependency: rich")
-    sys.exit(1)
+APPROVE = '{"decision": "approve"}'
+FILE_TOOLS = ('Write', 'Edit', 'MultiEdit')
 
-console = Console()
+def load_project_namespace():
+    """Load namespace from project .sparc directory"""
+    try:
+        with open(os.path.join('.sparc', 'namespace')) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def provide_sparc_context(hook_data: dict, namespace: str):
+    """Provide SPARC context for the upcoming tool operation"""
+    tool_name = hook_data.get('tool_name')
+
+    # Log the upcoming operation (stderr keeps stdout a clean JSON decision)
+    if tool_name in FILE_TOOLS:
+        file_path = (hook_data.get('tool_input') or {}).get('file_path', 'unknown')
+        sys.stderr.write(f"\033[2m🤖 SPARC: {tool_name} operation on {file_path}\033[0m\n")
 
 def main():
+    """Main hook execution"""
+    # Fast path: no SPARC project means no context to parse or print
+    namespace = load_project_namespace()
+
+    # Never block the tool call - answer first, then add context
+    sys.stdout.write(APPROVE + '\n')
+    sys.stdout.flush()
+
+    # Drain stdin so the caller never sees a broken pipe on large payloads
+    raw_data = sys.stdin.read()
+    if not namespace:
+        return
+
     try:
-        hook_data = json.loads(sys.stdin.read())
-        
-        # Check if SPARC project
-        sparc_dir = Path.cwd() / '.sparc'
-        namespace_file = sparc_dir / 'namespace'
-        
-        if namespace_file.exists():
-            namespace = namespace_file.read_text().strip()
-            tool_name = hook_data.get('tool_name')
-            
-            if tool_name in ['Write', 'Edit', 'MultiEdit']:
-                tool_input = hook_data.get('tool_input', {})
-                file_path = tool_input.get('file_path', 'unknown')
-                console.print(f"[dim]🤖 SPARC: {tool_name} operation on {file_path}[/dim]")
-        
-        print(json.dumps({"decision": "approve"}))
-        
+        hook_data = json.loads(raw_data)
+        if isinstance(hook_data, dict):
+            provide_sparc_context(hook_data, namespace)
     except Exception:
-        print(json.dumps({"decision": "approve"}))
+        pass  # Silent fail - decision already sent
 
 if __name__ == "__main__":
     main()
@@ -2059,49 +2080,72 @@ sudo tee /usr/local/sparc/hooks/stop.py > /dev/null << 'EOF'
 #!/usr/bin/env python3
 # /// script
 # requires-python = ">=3.11"
-# dependencies = [
-#   "rich>=13.0.0",
-# ]
+# dependencies = []
 # ///
 
 """
 SPARC Stop Hook - Runs when Claude Code finishes responding
+Provides feedback and status updates for autonomous development
+
+Stdlib-only so it starts without dependency resolution.
 """
 
 import json
+import os
 import sys
-from pathlib import Path
 
-try:
-    from rich.console import Console
-except ImportError:
-    print("Missing dependency: rich")
-    sys.exit(1)
+GREEN = '\033[32m'
+DIM = '\033[2m'
+RESET = '\033[0m'
 
-console = Console()
+def load_project_namespace():
+    """Load namespace from project .sparc directory"""
+    try:
+        with open(os.path.join('.sparc', 'namespace')) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def announce_completion(hook_data: dict, namespace):
+    """Announce Claude Code completion for SPARC project"""
+    if namespace:
+        print(f"{GREEN}✅ SPARC: Claude Code session completed{RESET}")
+        print(f"{DIM}📦 Project: {namespace}{RESET}")
+        print(f"{DIM}🔄 Autonomous agents continue working...{RESET}")
+    else:
+        print(f"{GREEN}✅ All set and ready for your next step!{RESET}")
 
 def main():
+    """Main hook execution"""
     try:
+        # Read hook data from stdin
         hook_data = json.loads(sys.stdin.read())
-        
-        # Check if SPARC project
-        sparc_dir = Path.cwd() / '.sparc'
-        namespace_file = sparc_dir / 'namespace'
-        
-        if namespace_file.exists():
-            namespace = namespace_file.read_text().strip()
-            console.print("[green]✅ SPARC: Claude Code session completed[/green]")
-            console.print(f"[dim]📦 Project: {namespace}[/dim]")
-        else:
-            console.print("[green]✅ All set and ready for your next step![/green]")
-    
+
+        # Announce completion
+        announce_completion(hook_data, load_project_namespace())
+
+    except json.JSONDecodeError:
+        # Silent fail for invalid JSON
+        pass
     except Exception:
+        # Silent fail for any other errors
         pass
 
 if __name__ == "__main__":
     main()
 EOF
 
+# From a checkout, install the repository's stdlib hooks and config over the embedded copies.
+# post_tool_use.py stays the embedded standalone script: the repository's version imports
+# SPARC lib modules that this installer doesn't ship.
+if [ -f "$SPARC_SOURCE_DIR/hooks/claude_hooks_config.json" ]; then
+    echo "📝 Installing hooks from $SPARC_SOURCE_DIR/hooks..."
+    sudo cp "$SPARC_SOURCE_DIR/hooks/pre_tool_use.py" \
+            "$SPARC_SOURCE_DIR/hooks/stop.py" \
+            "$SPARC_SOURCE_DIR/hooks/claude_hooks_config.json" \
+            /usr/local/sparc/hooks/
+fi
+
 # Create enhanced sparc command with UV support
 echo "📝 Creating enhanced SPARC command with UV support..."
 sudo tee /usr/local/bin/sparc > /dev/null << 'EOF'
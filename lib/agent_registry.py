@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+SPARC Agent Registry - Maps agent names (e.g. 'orchestrator-state-scribe') to agent scripts
+Built by scanning the agents directory for agent_name declarations
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+AGENTS_DIR = Path(__file__).parent.parent / 'agents'
+
+_AGENT_NAME_PATTERN = re.compile(r'agent_name\s*=\s*["\']([a-z0-9][a-z0-9_-]+)["\']')
+
+
+@lru_cache(maxsize=None)
+def discover_agent_scripts(agents_dir: Path = AGENTS_DIR) -> Dict[str, Path]:
+    """agent_name -> script path; base (non-enhanced) agents win over enhanced duplicates"""
+    registry: Dict[str, Path] = {}
+
+    scripts = sorted(agents_dir.rglob('*.py'), key=lambda p: ('enhanced' in p.parts, str(p)))
+    for script in scripts:
+        try:
+            content = script.read_text()
+        except OSError:
+            continue
+
+        for agent_name in _AGENT_NAME_PATTERN.findall(content):
+            registry.setdefault(agent_name, script)
+
+    return registry
+
+
+def resolve_agent_script(agent_name: str, agents_dir: Path = AGENTS_DIR) -> Optional[Path]:
+    """Script implementing agent_name, or None if no agent declares it"""
+    return discover_agent_scripts(agents_dir).get(agent_name)
+
+
+_CLAUDE_PATTERN = re.compile(r'ClaudeRunner|_run_claude|\[\s*["\']claude["\']')
+
+
+@lru_cache(maxsize=None)
+def uses_claude(agent_name: str, agents_dir: Path = AGENTS_DIR) -> bool:
+    """Does the agent's script shell out to the Claude CLI?"""
+    script = resolve_agent_script(agent_name, agents_dir)
+    try:
+        return bool(script and _CLAUDE_PATTERN.search(script.read_text()))
+    except OSError:
+        return False
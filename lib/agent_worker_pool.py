@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+SPARC Agent Worker Pool - Long-lived worker processes that run agents in-process
+Replaces a `uv run` per agent: modules and Supabase clients are loaded once per worker
+
+Each task gets a fresh agent instance. A task that exceeds its timeout, or crashes
+its worker, only costs that worker: it is killed and replaced, the pool keeps going.
+Workers run in the current interpreter, so the agents' dependencies (supabase,
+pydantic, rich, ...) must be installed in it; an agent that can't be loaded reports
+load_error and its caller falls back to `uv run`.
+
+The runners take --pool N; the dispatcher and fleet workers take --pool N too, and
+DAG subtasks run locally by phase orchestrators use a process-wide pool of
+SPARC_AGENT_POOL workers when that is set.
+"""
+
+import asyncio
+import atexit
+import importlib.util
+import inspect
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import multiprocessing as mp
+from functools import lru_cache
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+DEFAULT_TASK_TIMEOUT = 300.0
+POOL_ENV = 'SPARC_AGENT_POOL'
+
+
+def cli_payload(agent_path: Path, namespace: str, task_id: Optional[str] = None,
+                goal: Optional[str] = None, phase: Optional[str] = None) -> Dict[str, Any]:
+    """The task an agent's own CLI builds from --namespace/--task-id/--goal"""
+    if task_id:
+        return {
+            'task_id': str(task_id),
+            'description': "Loaded from database",
+            'context': {},
+            'requirements': [],
+            'ai_verifiable_outcomes': [],
+            'phase': phase or 'unknown',
+            'priority': 5
+        }
+    return {
+        'task_id': f"{Path(agent_path).stem}_{datetime.now().isoformat()}",
+        'description': goal or f"Run {Path(agent_path).stem} for {namespace}",
+        'context': {'project_goal': goal or '', 'namespace': namespace},
+        'requirements': [],
+        'ai_verifiable_outcomes': [],
+        'phase': phase or 'unknown',
+        'priority': 5
+    }
+
+
+def _module_name(agent_path: Path) -> str:
+    return f"sparc_agent_{agent_path.parent.name}_{agent_path.stem}"
+
+
+def _find_agent_class(module):
+    """The concrete agent class the script's own CLI would have run"""
+    for name, obj in vars(module).items():
+        if (inspect.isclass(obj) and obj.__module__ == module.__name__
+                and (name.endswith('Agent') or name.endswith('Orchestrator'))
+                and name != 'BaseAgent' and not inspect.isabstract(obj)
+                and hasattr(obj, '_execute_task')):
+            return obj
+    return None
+
+
+@lru_cache(maxsize=None)
+def _shared_client(create_client, url: str, key: str):
+    return create_client(url, key)
+
+
+def _load_agent(agent_path: Path):
+    """Import an agent script once and point its client factory at the shared client"""
+    spec = importlib.util.spec_from_file_location(_module_name(agent_path), agent_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+
+    create_client = getattr(module, 'create_client', None)
+    if create_client is not None:
+        module.create_client = lambda url, key: _shared_client(create_client, url, key)
+
+    agent_class = _find_agent_class(module)
+    if agent_class is None:
+        raise ImportError(f"No agent class found in {agent_path}")
+    return module, agent_class
+
+
+def _serialize(result) -> Dict[str, Any]:
+    if hasattr(result, 'model_dump'):
+        return result.model_dump()
+    if hasattr(result, 'dict'):
+        return result.dict()
+    return result if isinstance(result, dict) else {'outputs': result}
+
+
+def _worker_main(conn, preload: List[str], cwd: str):
+    """Worker loop: receive (agent_path, payload), run a fresh agent, send the result back"""
+    os.chdir(cwd)
+    from artifact_index import watch_artifacts
+    watch_artifacts()  # Long-lived: worth keeping a watched index of the project tree
+    loaded: Dict[str, tuple] = {}
+    load_errors: Dict[str, str] = {}
+
+    def load(path: str):
+        if path not in loaded and path not in load_errors:
+            try:
+                loaded[path] = _load_agent(Path(path))
+            except BaseException as e:  # agent scripts call exit() on missing deps
+                load_errors[path] = f"{type(e).__name__}: {e}"
+
+    for path in preload:
+        load(path)
+
+    loop = asyncio.new_event_loop()
+    conn.send({'ready': True, 'loaded': list(loaded), 'load_errors': load_errors})
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+
+        started = time.time()
+        agent_path = request['agent_path']
+        load(agent_path)
+
+        if agent_path in load_errors:
+            conn.send({'success': False, 'load_error': True, 'error': load_errors[agent_path],
+                       'started_at': started})
+            continue
+
+        module, agent_class = loaded[agent_path]
+        # Bounds the agent's own subtask waits (see dag_executor.caller_budget); one task
+        # runs at a time, so the caller's environment is applied for its duration only
+        overrides = {'SPARC_AGENT_TIMEOUT': str(request['timeout']), **(request.get('env') or {})}
+        saved = {key: os.environ.get(key) for key in overrides}
+        os.environ.update(overrides)
+        try:
+            task = module.TaskPayload(**request['payload'])
+            agent = agent_class()
+            result = loop.run_until_complete(agent._execute_task(task, task.context))
+            data = _serialize(result)
+            conn.send({'success': bool(data.get('success', True)), 'result': data,
+                       'agent_name': getattr(agent, 'agent_name', agent_class.__name__),
+                       'started_at': started})
+        except BaseException as e:
+            conn.send({'success': False, 'error': f"{type(e).__name__}: {e}", 'started_at': started})
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+class _Worker:
+    def __init__(self, ctx, preload: List[str], cwd: str):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, preload, cwd), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = None  # handshake, read lazily so the pool starts workers in parallel
+
+    def wait_ready(self, timeout: float) -> Dict[str, Any]:
+        if self.ready is None:
+            if not self.conn.poll(timeout):
+                raise TimeoutError("Worker did not start in time")
+            self.ready = self.conn.recv()
+        return self.ready
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(5)
+        finally:
+            self.conn.close()
+
+
+class AgentWorkerPool:
+    """N warm agent workers; run() is thread-safe and blocks only the calling thread"""
+
+    def __init__(self, size: int = 4, preload: Optional[List[Path]] = None, cwd: Optional[Path] = None,
+                 task_timeout: float = DEFAULT_TASK_TIMEOUT, start_timeout: float = 120.0):
+        self.size = size
+        self.preload = [str(Path(p).resolve()) for p in (preload or [])]
+        self.cwd = str(cwd or Path.cwd())
+        self.task_timeout = task_timeout
+        self.start_timeout = start_timeout
+        self._ctx = mp.get_context('spawn')
+        self._idle: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers: List[_Worker] = []
+        self.restarts = 0
+
+        for _ in range(size):
+            self._add_worker()
+
+    def _add_worker(self) -> _Worker:
+        worker = _Worker(self._ctx, self.preload, self.cwd)
+        with self._lock:
+            self._workers.append(worker)
+        self._idle.put(worker)
+        return worker
+
+    def _replace(self, worker: _Worker):
+        """Crash isolation: a dead or hung worker is killed and a fresh one takes its slot"""
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        worker.kill()
+        self.restarts += 1
+        self._add_worker()
+
+    def run(self, agent_path: Path, payload: Dict[str, Any], timeout: Optional[float] = None,
+            env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Run one task on an idle worker; returns success/result/error plus dispatch timing
+
+        env is set in the worker's environment while the task runs.
+        """
+        submitted = time.time()
+        worker = self._idle.get()
+        timeout = timeout or self.task_timeout
+
+        try:
+            worker.wait_ready(self.start_timeout)
+            worker.conn.send({'agent_path': str(Path(agent_path).resolve()), 'payload': payload,
+                              'timeout': timeout, 'env': env or {}})
+            if not worker.conn.poll(timeout):
+                self._replace(worker)
+                return {'success': False, 'error': 'Timeout', 'timed_out': True,
+                        'stderr': f'Agent execution timed out after {timeout:g}s'}
+            response = worker.conn.recv()
+        except (EOFError, OSError, TimeoutError) as e:
+            self._replace(worker)
+            return {'success': False, 'error': f"Worker crashed: {type(e).__name__}: {e}", 'crashed': True}
+
+        self._idle.put(worker)
+        response['dispatch_ms'] = round((response.pop('started_at', submitted) - submitted) * 1000, 3)
+        response['duration_ms'] = round((time.time() - submitted) * 1000, 3)
+        return response
+
+    async def run_async(self, agent_path: Path, payload: Dict[str, Any],
+                        timeout: Optional[float] = None, env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.run, agent_path, payload, timeout, env)
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+                worker.process.join(2)
+            except (OSError, ValueError):
+                pass
+            if worker.process.is_alive():
+                worker.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_shared_pool: Optional[AgentWorkerPool] = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool() -> Optional[AgentWorkerPool]:
+    """Process-wide pool of SPARC_AGENT_POOL workers, started on first use
+
+    None when the variable is unset, or inside a pool worker: those are daemonic and
+    can't start workers of their own, so their subtasks keep using `uv run`.
+    """
+    global _shared_pool
+    try:
+        size = int(os.environ.get(POOL_ENV) or 0)
+    except ValueError:
+        size = 0
+    if size <= 0 or mp.current_process().daemon:
+        return None
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = AgentWorkerPool(size)
+            atexit.register(_shared_pool.close)
+    return _shared_pool
+
+
+def runner_result(response: Dict[str, Any], agent_path: Path) -> Dict[str, Any]:
+    """Pool response in the shape the uv-based runners return"""
+    result = response.get('result') or {}
+    return {
+        'success': response['success'],
+        'returncode': 0 if response['success'] else 1,
+        'output': json.dumps(result.get('outputs', {}), indent=2, default=str),
+        'stderr': response.get('stderr') or response.get('error') or '',
+        'agent_path': str(agent_path),
+        'result': result,
+        'dispatch_ms': response.get('dispatch_ms')
+    }
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+SPARC Artifact Index - In-memory index of the project tree, kept current by a watcher
+O(1) exists / has-files queries, cached content hashes and change subscriptions
+
+One full scan at start-up; after that the index follows the filesystem through
+inotify (Linux, via ctypes - no extra dependency) or, where that is unavailable,
+a periodic stat-only rescan. Watcher events arrive asynchronously, so callers that
+need a file another process just wrote call refresh() on that file first (one stat);
+directory queries are answered from the index.
+
+The index pays off in processes that query the tree repeatedly: pool workers and the
+orchestrators call watch_artifacts(), which starts one index per process with its
+scan in the background. Other one-shot `uv run` agents make a handful of queries, so
+project_artifacts() hands them DirectArtifacts: the same queries with direct stats.
+"""
+
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import sys
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Callable, Set, Tuple, Union
+
+from content_hash_index import hash_file
+
+IGNORED_DIRS = {'.git', '.sparc', '.venv', 'venv', 'node_modules', '__pycache__', '.mypy_cache', '.pytest_cache'}
+POLL_INTERVAL = 1.0
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct('iIII')
+
+Subscriber = Callable[[str, str], None]  # (event, path) with event in created | modified | deleted
+
+
+class ArtifactIndex:
+    """Files under root keyed by root-relative path, plus per-directory file counts"""
+
+    def __init__(self, root: Path, poll_interval: float = POLL_INTERVAL):
+        self.root = Path(root).resolve()
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._files: Dict[str, Tuple[int, int]] = {}  # rel path -> (size, mtime_ns)
+        self._hashes: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._file_counts: Counter = Counter()  # dir -> files below it
+        self._children: Dict[str, Set[str]] = defaultdict(set)
+        self._subscribers: List[Tuple[str, Subscriber]] = []
+        self._watches: Dict[int, str] = {}  # inotify wd -> rel dir
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.mode = 'stopped'
+
+    # -- queries ---------------------------------------------------------
+
+    def _rel(self, path) -> Optional[str]:
+        """Root-relative key for a path given relative to the cwd or absolute"""
+        try:
+            rel = Path(os.path.abspath(path)).relative_to(self.root).as_posix()
+        except ValueError:
+            return None
+        return '' if rel == '.' else rel
+
+    def is_file(self, path) -> bool:
+        rel = self._rel(path)
+        return rel is not None and rel in self._files
+
+    def has_files(self, path) -> bool:
+        """Directory contains at least one file (at any depth)"""
+        rel = self._rel(path)
+        return rel is not None and self._file_counts[rel] > 0
+
+    def exists(self, path) -> bool:
+        return self.is_file(path) or self.has_files(path)
+
+    def files(self, directory, pattern: str = '*', recursive: bool = False) -> List[Path]:
+        """Files in directory matching pattern (glob / rglob without touching the disk)"""
+        rel = self._rel(directory)
+        if rel is None:
+            return []
+
+        matches: List[str] = []
+        with self._lock:
+            pending = [rel]
+            while pending:
+                current = pending.pop()
+                for name in self._children.get(current, ()):
+                    child = f"{current}/{name}" if current else name
+                    if child in self._files:
+                        if fnmatch.fnmatchcase(name, pattern):
+                            matches.append(child[len(rel) + 1:] if rel else child)
+                    elif recursive:
+                        pending.append(child)
+
+        base = Path(directory)
+        return [base / match for match in sorted(matches)]
+
+    def content_hash(self, path) -> Optional[str]:
+        """SHA-256 of a file, recomputed only when its size or mtime changed"""
+        rel = self._rel(path)
+        with self._lock:
+            stat_key = self._files.get(rel) if rel is not None else None
+            cached = self._hashes.get(rel)
+        if stat_key is None:
+            return None
+        if cached and cached[0] == stat_key:
+            return cached[1]
+
+        digest = hash_file(str(self.root / rel))
+        if digest is not None:
+            with self._lock:
+                self._hashes[rel] = (stat_key, digest)
+        return digest
+
+    def subscribe(self, callback: Subscriber, prefix: str = '') -> Callable[[], None]:
+        """Call callback(event, path) for changes under prefix; returns an unsubscribe function"""
+        rel = self._rel(prefix) if prefix else ''
+        entry = (rel or '', callback)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def refresh(self, path=''):
+        """Bring path up to date without waiting for the watcher
+
+        A file costs one stat; a directory (default: everything) is rescanned, so keep
+        those for recovery rather than routine checks.
+        """
+        rel = self._rel(path) if path else ''
+        if rel is None:
+            return
+        if not rel or (self.root / rel).is_dir():
+            self._sync(rel)
+            return
+
+        stat_key = self._stat_file(rel)
+        if stat_key:
+            event = self._set_file(rel, stat_key)
+            if event:
+                self._publish(event, rel)
+        else:
+            removed = ([rel] if self._remove_file(rel) else []) + self._remove_tree(rel)
+            for gone in removed:
+                self._publish('deleted', gone)
+
+    # -- maintenance -----------------------------------------------------
+
+    def _ancestors(self, rel: str):
+        parts = rel.split('/')
+        yield ''
+        for i in range(1, len(parts)):
+            yield '/'.join(parts[:i])
+
+    def _set_file(self, rel: str, stat_key: Tuple[int, int]) -> Optional[str]:
+        """Insert/update one file; returns the event to publish, if any"""
+        with self._lock:
+            previous = self._files.get(rel)
+            if previous == stat_key:
+                return None
+            self._files[rel] = stat_key
+
+            if previous is None:
+                parent = ''
+                for ancestor in self._ancestors(rel):
+                    self._file_counts[ancestor] += 1
+                    parent = ancestor
+                self._children[parent].add(rel.rsplit('/', 1)[-1])
+                # Make intermediate directories reachable from their parents
+                parts = rel.split('/')
+                for i in range(1, len(parts)):
+                    self._children['/'.join(parts[:i - 1])].add(parts[i - 1])
+            return 'created' if previous is None else 'modified'
+
+    def _remove_file(self, rel: str) -> bool:
+        with self._lock:
+            previous = self._files.pop(rel, None)
+            if previous is None:
+                return False
+            self._hashes.pop(rel, None)
+            for ancestor in self._ancestors(rel):
+                self._file_counts[ancestor] -= 1
+
+            # Prune directories that no longer hold files
+            parts = rel.split('/')
+            for i in range(len(parts), 0, -1):
+                parent = '/'.join(parts[:i - 1])
+                child = '/'.join(parts[:i])
+                if child in self._files or self._file_counts[child] > 0:
+                    break
+                self._children[parent].discard(parts[i - 1])
+                self._children.pop(child, None)
+            return True
+
+    def _remove_tree(self, rel: str) -> List[str]:
+        prefix = rel + '/'
+        with self._lock:
+            doomed = [p for p in self._files if p.startswith(prefix)]
+        return [p for p in doomed if self._remove_file(p)]
+
+    def _publish(self, event: str, rel: str):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for prefix, callback in subscribers:
+            if not prefix or rel == prefix or rel.startswith(prefix + '/'):
+                try:
+                    callback(event, str(self.root / rel))
+                except Exception:
+                    pass  # A subscriber must never break the watcher
+
+    def _stat_file(self, rel: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.root / rel)
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def _scan(self, rel_dir: str = '') -> Dict[str, Tuple[int, int]]:
+        """stat every file under rel_dir, skipping ignored directories"""
+        found: Dict[str, Tuple[int, int]] = {}
+        top = self.root / rel_dir if rel_dir else self.root
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                found[Path(full).relative_to(self.root).as_posix()] = (st.st_size, st.st_mtime_ns)
+        return found
+
+    def _sync(self, rel_dir: str = ''):
+        """Reconcile the index with a fresh scan of rel_dir, publishing the differences"""
+        found = self._scan(rel_dir)
+        prefix = rel_dir + '/' if rel_dir else ''
+        with self._lock:
+            known = [p for p in self._files if p.startswith(prefix)]
+        for rel in known:
+            if rel not in found and self._remove_file(rel):
+                self._publish('deleted', rel)
+        for rel, stat_key in found.items():
+            event = self._set_file(rel, stat_key)
+            if event:
+                self._publish(event, rel)
+
+    # -- lifecycle -------------------------------------------------------
+
+    def start(self) -> 'ArtifactIndex':
+        if self._thread:
+            return self
+
+        inotify = _Inotify.create() if sys.platform.startswith('linux') else None
+        if inotify:
+            # Watch before scanning, so nothing created during the scan is missed
+            self._add_watches(inotify, '')
+        for rel, stat_key in self._scan().items():
+            self._set_file(rel, stat_key)
+
+        if inotify:
+            self.mode = 'inotify'
+            target = lambda: self._watch_inotify(inotify)
+        else:
+            self.mode = 'polling'
+            target = self._watch_polling
+        self._thread = threading.Thread(target=target, name='sparc-artifact-index', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+        self.mode = 'stopped'
+
+    def _watch_polling(self):
+        while not self._stop.wait(self.poll_interval):
+            self._sync()
+
+    def _add_watches(self, inotify: '_Inotify', rel_dir: str):
+        top = self.root / rel_dir if rel_dir else self.root
+        for dirpath, dirnames, _ in os.walk(top):
+            dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+            rel = Path(dirpath).relative_to(self.root).as_posix()
+            wd = inotify.add_watch(dirpath)
+            if wd >= 0:
+                self._watches[wd] = '' if rel == '.' else rel
+
+    def _watch_inotify(self, inotify: '_Inotify'):
+        watches = self._watches
+        try:
+            while not self._stop.is_set():
+                for wd, mask, name in inotify.read(timeout=0.5):
+                    if mask & IN_Q_OVERFLOW:
+                        self._sync()  # Events were lost; reconcile with the disk
+                        continue
+                    if mask & IN_IGNORED:
+                        watches.pop(wd, None)
+                        continue
+                    parent = watches.get(wd)
+                    if parent is None or not name or name in IGNORED_DIRS:
+                        continue
+                    rel = f"{parent}/{name}" if parent else name
+
+                    if mask & IN_ISDIR:
+                        if mask & (IN_CREATE | IN_MOVED_TO):
+                            self._add_watches(inotify, rel)
+                            self._sync(rel)  # Files may have landed before the watch existed
+                        elif mask & (IN_DELETE | IN_MOVED_FROM):
+                            for removed in self._remove_tree(rel):
+                                self._publish('deleted', removed)
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        if self._remove_file(rel):
+                            self._publish('deleted', rel)
+                    else:
+                        stat_key = self._stat_file(rel)
+                        event = self._set_file(rel, stat_key) if stat_key else None
+                        if event:
+                            self._publish(event, rel)
+        finally:
+            inotify.close()
+
+
+class _Inotify:
+    """Minimal inotify binding over libc"""
+
+    def __init__(self, libc, fd: int):
+        self._libc = libc
+        self.fd = fd
+
+    @classmethod
+    def create(cls) -> Optional['_Inotify']:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK)
+        except (OSError, AttributeError):
+            return None
+        return cls(libc, fd) if fd >= 0 else None
+
+    def add_watch(self, path: str) -> int:
+        return self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+
+    def read(self, timeout: float) -> List[Tuple[int, int, str]]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'surrogateescape')
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DirectArtifacts:
+    """ArtifactIndex's queries answered straight from the filesystem (no scan, no watcher)"""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or Path.cwd()).resolve()
+        self.mode = 'direct'
+
+    def is_file(self, path) -> bool:
+        return os.path.isfile(path)
+
+    def has_files(self, path) -> bool:
+        for _, dirnames, filenames in os.walk(path):
+            if filenames:
+                return True
+            dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+        return False
+
+    def exists(self, path) -> bool:
+        return self.is_file(path) or self.has_files(path)
+
+    def files(self, directory, pattern: str = '*', recursive: bool = False) -> List[Path]:
+        matches: List[str] = []
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS] if recursive else []
+            rel_dir = os.path.relpath(dirpath, directory)
+            for name in filenames:
+                if fnmatch.fnmatchcase(name, pattern):
+                    matches.append(name if rel_dir == '.' else f"{Path(rel_dir).as_posix()}/{name}")
+
+        base = Path(directory)
+        return [base / match for match in sorted(matches)]
+
+    def content_hash(self, path) -> Optional[str]:
+        return hash_file(str(path))
+
+    def refresh(self, path=''):
+        pass  # Always current
+
+
+ProjectArtifacts = Union[ArtifactIndex, DirectArtifacts]
+
+_shared: Dict[Path, ArtifactIndex] = {}
+_shared_lock = threading.Lock()
+_watching = False
+
+
+def shared_index(root: Optional[Path] = None) -> ArtifactIndex:
+    """The started index for root (default: cwd), one per process"""
+    key = Path(root or Path.cwd()).resolve()
+    with _shared_lock:
+        index = _shared.get(key)
+        if index is None:
+            index = _shared[key] = ArtifactIndex(key).start()
+        return index
+
+
+def watch_artifacts(root: Optional[Path] = None):
+    """Serve project_artifacts() from the watched index in this process
+
+    The index's start-up scan runs in the background; the first query waits for it.
+    """
+    global _watching
+    _watching = True
+    key = Path(root or Path.cwd()).resolve()
+    if key not in _shared:
+        threading.Thread(target=shared_index, args=(key,), name='sparc-artifact-scan', daemon=True).start()
+
+
+def project_artifacts(root: Optional[Path] = None) -> ProjectArtifacts:
+    """The watched index after watch_artifacts(), direct stats otherwise"""
+    return shared_index(root) if _watching else DirectArtifacts(root)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+SPARC Call Accounting - Token and latency accounting for Claude calls and agent runs
+Tagged by agent, phase, namespace and task; persisted to communication_metrics in batches
+
+Every Claude invocation records prompt/response tokens, wall time, governor queue
+wait and whether the prompt cache answered it. Agent runs record their wall time.
+Records land immediately in the local metrics log ('claude_call' / 'agent_run'
+events, which the usage report reads) and are buffered for communication_metrics,
+one row per metric, flushed every BATCH_SIZE records, every FLUSH_INTERVAL seconds
+and at exit.
+
+Tokens are counted with tiktoken when it is installed (cl100k_base, close to
+Claude's tokenizer for English and code). Otherwise a word/symbol estimate is used,
+scaled by SPARC_TOKEN_SCALE so it can be calibrated against billed usage.
+"""
+
+import atexit
+import math
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from hook_metrics import iter_events, percentile, record_event
+
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 10.0
+METRICS_TABLE = 'communication_metrics'
+
+_TOKEN_PIECE = re.compile(r'[A-Za-z]+|\d+|[^\sA-Za-z\d]|\n')
+
+
+@lru_cache(maxsize=1)
+def _tiktoken_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception:
+        return None
+
+
+def tokenizer_name() -> str:
+    return 'tiktoken' if _tiktoken_encoding() is not None else 'estimate'
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in text: real BPE count when tiktoken is available, calibrated estimate otherwise"""
+    if not text:
+        return 0
+    encoding = _tiktoken_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    # Short words are one token, long ones about one per 4 letters; digits group by 3;
+    # every symbol and newline is its own token. Much closer than len/4 on code.
+    tokens = 0
+    for piece in _TOKEN_PIECE.findall(text):
+        if piece[0].isalpha():
+            tokens += 1 if len(piece) <= 6 else math.ceil(len(piece) / 4)
+        elif piece[0].isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        else:
+            tokens += 1
+    return max(1, round(tokens * float(os.getenv('SPARC_TOKEN_SCALE', '1.0'))))
+
+
+@dataclass
+class ClaudeCall:
+    agent: str
+    namespace: str
+    prompt_tokens: int
+    response_tokens: int
+    wall_ms: float
+    queue_wait_ms: float = 0.0
+    cache_hit: bool = False
+    success: bool = True
+    phase: Optional[str] = None
+    task_id: Optional[str] = None
+
+
+class Accountant:
+    """Buffers metric rows and writes them to communication_metrics in batches"""
+
+    def __init__(self, supabase=None, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self.supabase = supabase
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._disabled = False
+        atexit.register(self.flush)
+
+    def _client(self):
+        if self.supabase is None and not self._disabled:
+            url, key = os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY')
+            if not (url and key):
+                self._disabled = True
+                return None
+            try:
+                from supabase import create_client
+                self.supabase = create_client(url, key)
+            except Exception:
+                self._disabled = True
+        return self.supabase
+
+    def _add_rows(self, namespace: str, tags: Dict[str, Any], metrics: Dict[str, float]):
+        rows = [{
+            'namespace': namespace,
+            'metric_type': metric_type,
+            'metric_value': float(value),
+            'measurement_window': 'call',
+            'agent_name': tags.get('agent'),
+            'phase': tags.get('phase'),
+            'task_id': tags.get('task_id'),
+            'run_id': os.environ.get('SPARC_RUN_ID')
+        } for metric_type, value in metrics.items()]
+
+        with self._lock:
+            self._rows.extend(rows)
+            due = (len(self._rows) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            # Callers are usually on an event loop; don't block it on the insert
+            threading.Thread(target=self.flush, daemon=True).start()
+
+    def record_call(self, call: ClaudeCall):
+        fields = asdict(call)
+        namespace = fields.pop('namespace')
+        record_event('claude_call', namespace, tokenizer=tokenizer_name(), **fields)
+        self._add_rows(namespace, fields, {
+            'claude_prompt_tokens': call.prompt_tokens,
+            'claude_response_tokens': call.response_tokens,
+            'claude_wall_ms': call.wall_ms,
+            'claude_queue_wait_ms': call.queue_wait_ms,
+            'claude_cache_hit': 1.0 if call.cache_hit else 0.0
+        })
+
+    def record_agent_run(self, agent: str, namespace: str, wall_ms: float, success: bool,
+                         phase: Optional[str] = None, task_id: Optional[str] = None):
+        record_event('agent_run', namespace, agent=agent, wall_ms=wall_ms, success=success,
+                     phase=phase, task_id=task_id)
+        self._add_rows(namespace, {'agent': agent, 'phase': phase, 'task_id': task_id},
+                       {'agent_wall_ms': wall_ms})
+
+    def flush(self) -> int:
+        """Write buffered rows in one insert; rows stay buffered if the database is unreachable"""
+        with self._lock:
+            rows, self._rows = self._rows, []
+            self._last_flush = time.monotonic()
+        if not rows:
+            return 0
+
+        client = self._client()
+        if client is None:
+            return 0  # No database configured: the local metrics log is the record
+        try:
+            client.table(METRICS_TABLE).insert(rows).execute()
+            return len(rows)
+        except Exception:
+            with self._lock:
+                self._rows[:0] = rows[-10 * self.batch_size:]
+            return 0
+
+
+_accountant: Optional[Accountant] = None
+
+
+def accountant() -> Accountant:
+    """Process-wide accountant"""
+    global _accountant
+    if _accountant is None:
+        _accountant = Accountant()
+    return _accountant
+
+
+def summarize_usage(group_by: str = 'agent', window_seconds: Optional[float] = None,
+                    namespace: Optional[str] = None, log_path: Optional[Path] = None) -> List[Tuple[str, Dict[str, float]]]:
+    """Claude usage per agent or phase from the local log, most expensive (total tokens) first"""
+    since = time.time() - window_seconds if window_seconds else None
+    groups: Dict[str, Dict[str, Any]] = {}
+
+    for entry in iter_events('claude_call', namespace, log_path, since):
+        key = entry.get(group_by) or 'unknown'
+        row = groups.setdefault(key, {'calls': 0, 'prompt_tokens': 0, 'response_tokens': 0,
+                                      'cache_hits': 0, 'failures': 0, 'queue_wait_ms': 0.0, 'walls': []})
+        row['calls'] += 1
+        row['prompt_tokens'] += entry.get('prompt_tokens', 0)
+        row['response_tokens'] += entry.get('response_tokens', 0)
+        row['cache_hits'] += 1 if entry.get('cache_hit') else 0
+        row['failures'] += 0 if entry.get('success', True) else 1
+        row['queue_wait_ms'] += entry.get('queue_wait_ms', 0.0)
+        row['walls'].append(entry.get('wall_ms', 0.0))
+
+    summary = []
+    for key, row in groups.items():
+        walls = row.pop('walls')
+        row.update(total_tokens=row['prompt_tokens'] + row['response_tokens'],
+                   wall_s=sum(walls) / 1000, p50_ms=percentile(walls, 50), p95_ms=percentile(walls, 95))
+        summary.append((key, row))
+    return sorted(summary, key=lambda item: item[1]['total_tokens'], reverse=True)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+SPARC Claude Cache - Content-addressed prompt -> response cache around the Claude runner
+Lets reruns skip unchanged prompts and benchmarks replay recorded sessions offline
+
+Entries are keyed by sha256 of (prompt, model, hashes of the artifacts the
+prompt depends on), stored gzip-compressed under .sparc/claude_cache (or
+SPARC_CLAUDE_CACHE_DIR), and evicted least-recently-used once the store grows past
+SPARC_CLAUDE_CACHE_MAX_MB. SPARC_CLAUDE_CACHE selects the mode:
+
+    off           never consulted (default)
+    record        always call Claude, store every successful response
+    replay        serve only from the cache; a miss is an error
+    read-through  serve hits, call Claude and store on a miss
+
+scripts/benchmarks/fake_claude.py serves recorded responses in place of the real CLI.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from content_hash_index import hash_path
+
+CACHE_DIR = Path('.sparc/claude_cache')
+CACHE_DIR_ENV = 'SPARC_CLAUDE_CACHE_DIR'
+MODE_ENV = 'SPARC_CLAUDE_CACHE'
+MAX_MB_ENV = 'SPARC_CLAUDE_CACHE_MAX_MB'
+DEFAULT_MAX_MB = 256
+MODES = ('off', 'record', 'replay', 'read-through')
+
+
+def cache_mode() -> str:
+    mode = os.getenv(MODE_ENV, 'off').strip().lower()
+    return mode if mode in MODES else 'off'
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+def cache_key(prompt: str, model: str, artifacts: Optional[List[str]] = None) -> str:
+    """sha256 over the prompt, the model and the current hash of every artifact"""
+    material = {
+        'prompt': prompt_hash(prompt),
+        'model': model,
+        'artifacts': {path: hash_path(path) for path in sorted(artifacts or [])}
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode()).hexdigest()
+
+
+class ClaudeCache:
+    """On-disk, size-bounded response store"""
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir or os.getenv(CACHE_DIR_ENV) or CACHE_DIR)
+        self.max_bytes = max_bytes or int(float(os.getenv(MAX_MB_ENV, DEFAULT_MAX_MB)) * 1024 * 1024)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / 'entries' / key[:2] / f"{key}.json.gz"
+
+    def _prompt_path(self, prompt_sha: str) -> Path:
+        return self.cache_dir / 'prompts' / prompt_sha
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._entry_path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, OSError, json.JSONDecodeError):
+            return None
+        try:
+            os.utime(path)  # Recency for LRU eviction
+        except OSError:
+            pass
+        return entry
+
+    def lookup_prompt(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Latest entry recorded for this exact prompt, whatever model or artifacts it was keyed with"""
+        try:
+            key = self._prompt_path(prompt_hash(prompt)).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return self.get(key)
+
+    def put(self, key: str, prompt: str, model: str, response: str, **meta: Any):
+        entry = {'key': key, 'prompt_sha': prompt_hash(prompt), 'model': model,
+                 'response': response, 'recorded_at': time.time(), **meta}
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                f.write(json.dumps(entry).encode('utf-8'))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        pointer = self._prompt_path(entry['prompt_sha'])
+        pointer.parent.mkdir(parents=True, exist_ok=True)
+        pointer.write_text(key)
+        self.evict()
+
+    def _entries(self) -> List[Tuple[Path, os.stat_result]]:
+        entries = []
+        for path in (self.cache_dir / 'entries').glob('*/*.json.gz'):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                pass
+        return entries
+
+    def evict(self) -> int:
+        """Drop least-recently-used entries until the store fits max_bytes"""
+        entries = self._entries()
+        total = sum(stat.st_size for _, stat in entries)
+        removed = 0
+        for path, stat in sorted(entries, key=lambda item: item[1].st_mtime):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            total -= stat.st_size
+            removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        return {'entries': len(entries), 'bytes': sum(stat.st_size for _, stat in entries),
+                'max_bytes': self.max_bytes, 'mode': cache_mode()}
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+SPARC Claude Governor - Host-wide limits for Claude Code executions
+Bounds concurrent Claude sessions and the request/token rate across every agent process
+
+State lives in one small JSON file guarded by an flock, so any process on the host
+(agents, orchestrators, pool workers) shares it whatever project it runs in. The file
+is $SPARC_GOVERNOR_STATE, else $XDG_RUNTIME_DIR/sparc/claude_governor.json, else
+~/.sparc/claude_governor.json.
+Callers queue in arrival order; the head of the queue is admitted once a session
+slot is free and both per-minute buckets (requests, estimated tokens) can pay for
+it. Sessions or waiters whose process died are dropped on the next update. Each
+admission records a 'claude_wait' metrics event.
+
+Limits come from the environment:
+    SPARC_CLAUDE_MAX_SESSIONS (4), SPARC_CLAUDE_RPM (30), SPARC_CLAUDE_TPM (400000)
+"""
+
+import asyncio
+import fcntl
+import json
+import os
+import secrets
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from call_accounting import count_tokens
+from hook_metrics import record_event
+
+STATE_ENV = 'SPARC_GOVERNOR_STATE'
+POLL_INTERVAL = 0.25
+CHARS_PER_TOKEN = 4
+
+
+def governor_state_path() -> Path:
+    """Per-user, host-wide state file (not per project: the limits are the account's)"""
+    override = os.getenv(STATE_ENV)
+    if override:
+        return Path(override).expanduser()
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return Path(runtime_dir) / 'sparc' / 'claude_governor.json'
+    return Path.home() / '.sparc' / 'claude_governor.json'
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count for budgeting (tiktoken when installed, calibrated estimate otherwise)"""
+    return max(1, count_tokens(text))
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@dataclass
+class GovernorLimits:
+    max_sessions: int = 4
+    requests_per_minute: int = 30
+    tokens_per_minute: int = 400_000
+
+    @classmethod
+    def from_env(cls) -> 'GovernorLimits':
+        return cls(
+            max_sessions=int(os.getenv('SPARC_CLAUDE_MAX_SESSIONS', cls.max_sessions)),
+            requests_per_minute=int(os.getenv('SPARC_CLAUDE_RPM', cls.requests_per_minute)),
+            tokens_per_minute=int(os.getenv('SPARC_CLAUDE_TPM', cls.tokens_per_minute))
+        )
+
+
+@dataclass
+class Lease:
+    ticket: str
+    agent: str
+    namespace: str
+    tokens: int
+    waited_ms: float
+    used_tokens: Optional[int] = None
+
+
+class ClaudeGovernor:
+    """Fair, host-wide admission control for Claude sessions"""
+
+    def __init__(self, limits: Optional[GovernorLimits] = None, state_path: Optional[Path] = None,
+                 poll_interval: float = POLL_INTERVAL):
+        self.limits = limits or GovernorLimits.from_env()
+        self.state_path = state_path or governor_state_path()
+        self.lock_path = self.state_path.with_suffix('.lock')
+        self.poll_interval = poll_interval
+
+    @contextmanager
+    def _state(self):
+        """Read-modify-write the shared state under an exclusive flock"""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    state = json.loads(self.state_path.read_text())
+                except (FileNotFoundError, json.JSONDecodeError):
+                    state = {}
+                state.setdefault('sessions', {})
+                state.setdefault('queue', [])
+                state.setdefault('buckets', {})
+                self._refill(state)
+                self._prune(state)
+
+                yield state
+
+                tmp = self.state_path.with_suffix('.tmp')
+                tmp.write_text(json.dumps(state))
+                os.replace(tmp, self.state_path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _refill(self, state: Dict[str, Any]):
+        now = time.time()
+        for name, capacity in (('requests', self.limits.requests_per_minute),
+                               ('tokens', self.limits.tokens_per_minute)):
+            bucket = state['buckets'].setdefault(name, {'level': capacity, 'updated': now})
+            elapsed = max(0.0, now - bucket['updated'])
+            bucket['level'] = min(capacity, bucket['level'] + elapsed * capacity / 60)
+            bucket['updated'] = now
+
+    @staticmethod
+    def _prune(state: Dict[str, Any]):
+        state['sessions'] = {t: s for t, s in state['sessions'].items() if _alive(s['pid'])}
+        state['queue'] = [w for w in state['queue'] if _alive(w['pid'])]
+
+    def _admissible(self, state: Dict[str, Any], tokens: int) -> bool:
+        buckets = state['buckets']
+        # A request larger than the whole budget is charged the full budget, not refused forever
+        return (len(state['sessions']) < self.limits.max_sessions
+                and buckets['requests']['level'] >= 1
+                and buckets['tokens']['level'] >= min(tokens, self.limits.tokens_per_minute))
+
+    def _try_admit(self, ticket: str) -> bool:
+        with self._state() as state:
+            head = state['queue'][0] if state['queue'] else None
+            if head is None or head['ticket'] != ticket or not self._admissible(state, head['tokens']):
+                return False
+
+            state['queue'].pop(0)
+            state['buckets']['requests']['level'] -= 1
+            state['buckets']['tokens']['level'] -= min(head['tokens'], self.limits.tokens_per_minute)
+            state['sessions'][ticket] = {'pid': head['pid'], 'agent': head['agent'],
+                                         'tokens': head['tokens'], 'started': time.time()}
+            return True
+
+    def _enqueue(self, ticket: str, agent: str, tokens: int, enqueued: float) -> int:
+        """Join the queue (again, if the state file was reset); returns the number of waiters ahead"""
+        with self._state() as state:
+            if not any(w['ticket'] == ticket for w in state['queue']):
+                state['queue'].append({'ticket': ticket, 'pid': os.getpid(), 'agent': agent,
+                                       'tokens': tokens, 'enqueued': enqueued})
+            return len(state['queue']) - 1
+
+    async def acquire(self, agent: str, tokens: int, namespace: str = 'default') -> Lease:
+        """Wait (in arrival order) for a session slot and budget"""
+        ticket = secrets.token_hex(8)
+        enqueued = time.time()
+        queued_behind = await asyncio.to_thread(self._enqueue, ticket, agent, tokens, enqueued)
+
+        try:
+            while not await asyncio.to_thread(self._try_admit, ticket):
+                await asyncio.to_thread(self._enqueue, ticket, agent, tokens, enqueued)
+                await asyncio.sleep(self.poll_interval)
+        except BaseException:
+            with self._state() as state:
+                state['queue'] = [w for w in state['queue'] if w['ticket'] != ticket]
+                state['sessions'].pop(ticket, None)
+            raise
+
+        waited_ms = round((time.time() - enqueued) * 1000, 1)
+        record_event('claude_wait', namespace, agent=agent, wait_ms=waited_ms,
+                     queued_behind=queued_behind, tokens=tokens)
+        return Lease(ticket, agent, namespace, tokens, waited_ms)
+
+    def release(self, lease: Lease):
+        """Free the session; charge the difference if it used more tokens than estimated"""
+        with self._state() as state:
+            state['sessions'].pop(lease.ticket, None)
+            if lease.used_tokens is not None and lease.used_tokens > lease.tokens:
+                state['buckets']['tokens']['level'] -= lease.used_tokens - lease.tokens
+
+    @asynccontextmanager
+    async def session(self, agent: str, prompt: str, namespace: str = 'default'):
+        """async with governor.session(agent, prompt) as lease: ... (set lease.used_tokens when known)"""
+        lease = await self.acquire(agent, estimate_tokens(prompt), namespace)
+        try:
+            yield lease
+        finally:
+            await asyncio.to_thread(self.release, lease)
+
+    def status(self) -> Dict[str, Any]:
+        with self._state() as state:
+            return {
+                'sessions': len(state['sessions']),
+                'waiting': len(state['queue']),
+                'requests_available': int(state['buckets']['requests']['level']),
+                'tokens_available': int(state['buckets']['tokens']['level']),
+                'limits': self.limits.__dict__
+            }
+
+
+_governor: Optional[ClaudeGovernor] = None
+
+
+def governor() -> ClaudeGovernor:
+    """The process-wide governor (state is shared host-wide through the state file)"""
+    global _governor
+    if _governor is None:
+        _governor = ClaudeGovernor()
+    return _governor
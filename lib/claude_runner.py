@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+SPARC Claude Runner - Streaming async execution of Claude Code for agents
+Prompt goes in on stdin (no shell), stdout is consumed line by line as it arrives
+
+Fenced file blocks in the output are written to disk as soon as each block closes,
+so artifacts appear while Claude is still working. A block names its file either in
+the info string or on the line right before it:
+
+    ```python src/app.py            ```src/app.py            **src/app.py**
+    ```ts title="web/index.ts"      File: docs/spec.md        ```markdown
+
+The subprocess runs with cwd=project_path (the process cwd is never changed), goes
+through the host-wide Claude governor, and is terminated on timeout or cancellation,
+so many agents can run concurrently in one event loop.
+
+The command defaults to `claude -p` and can be replaced with SPARC_CLAUDE_CMD.
+With SPARC_CLAUDE_CACHE set, responses go through the prompt cache (claude_cache.py);
+cached responses stream through the same line and file handling as live ones.
+Every call is accounted (tokens, wall time, queue wait, cache hit) by call_accounting.py.
+"""
+
+import asyncio
+import os
+import re
+import shlex
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from call_accounting import ClaudeCall, accountant, count_tokens
+from claude_cache import ClaudeCache, cache_key, cache_mode
+from claude_governor import CHARS_PER_TOKEN, governor
+from hook_metrics import record_event
+
+DEFAULT_COMMAND = 'claude -p'
+COMMAND_ENV = 'SPARC_CLAUDE_CMD'
+DEFAULT_TIMEOUT = 600
+LINE_LIMIT = 4 * 1024 * 1024
+TERMINATE_GRACE_SECONDS = 5
+
+_FENCE = re.compile(r'^\s*(`{3,}|~{3,})(.*)$')
+_TITLE_ATTR = re.compile(r'''(?:title|file|path|filename)\s*=\s*["']?([^"'\s]+)''')
+_PATH_TOKEN = re.compile(r'^[\w.\-/]+/[\w.\-]+$|^[\w\-][\w.\-]*\.[A-Za-z0-9]{1,8}$')
+_HEADER_PATH = re.compile(
+    r'^\s*(?:#+\s*|(?:\*\*)?(?:File|Path|Filename)(?:\*\*)?\s*:\s*)?[`*]*([\w.\-/]+)[`*]*:?\s*$',
+    re.IGNORECASE
+)
+
+
+class ClaudeRunError(Exception):
+    """Claude Code failed, timed out or is not installed"""
+
+
+def claude_command() -> List[str]:
+    return shlex.split(os.getenv(COMMAND_ENV, DEFAULT_COMMAND))
+
+
+def claude_model(command: List[str]) -> str:
+    """Model the command runs (--model flag, else SPARC_CLAUDE_MODEL); part of the cache key"""
+    for i, arg in enumerate(command):
+        if arg == '--model' and i + 1 < len(command):
+            return command[i + 1]
+        if arg.startswith('--model='):
+            return arg.split('=', 1)[1]
+    return os.getenv('SPARC_CLAUDE_MODEL', 'default')
+
+
+def _looks_like_path(token: str) -> bool:
+    return bool(_PATH_TOKEN.match(token))
+
+
+def _fence_path(info: str, previous_line: str) -> Optional[str]:
+    """File path for a block opened with this info string, if it names one"""
+    info = info.strip()
+    title = _TITLE_ATTR.search(info)
+    if title:
+        return title.group(1)
+
+    # ```python:src/app.py  /  ```python src/app.py  /  ```src/app.py
+    for token in re.split(r'[\s:]+', info):
+        if token and '.' in token and _looks_like_path(token):
+            return token
+
+    header = _HEADER_PATH.match(previous_line)
+    if header and '.' in header.group(1) and _looks_like_path(header.group(1)):
+        return header.group(1)
+    return None
+
+
+class FencedFileExtractor:
+    """Incremental parser: feed() output lines, files are written when their block closes"""
+
+    def __init__(self, base_dir: Path = Path('.'), on_file: Optional[Callable[[Path], None]] = None):
+        self.base_dir = Path(base_dir).resolve()
+        self.on_file = on_file
+        self.files: List[Path] = []
+        self._fence: Optional[str] = None
+        self._path: Optional[str] = None
+        self._lines: List[str] = []
+        self._depth = 0
+        self._previous = ''
+
+    def feed(self, line: str) -> Optional[Path]:
+        """Consume one line (without newline); returns the path written if this line closed a file block"""
+        if self._fence is None:
+            match = _FENCE.match(line)
+            if match:
+                self._fence = match.group(1)
+                self._path = _fence_path(match.group(2), self._previous)
+                self._lines = []
+            elif line.strip():
+                self._previous = line
+            return None
+
+        stripped = line.strip()
+        if stripped.startswith(self._fence[0] * len(self._fence)) and stripped.strip(self._fence[0]) == '':
+            if self._depth:
+                # Closes a fence nested in the file (e.g. code samples in a markdown doc)
+                self._depth -= 1
+                self._lines.append(line)
+                return None
+            path, lines = self._path, self._lines
+            self._fence, self._path, self._lines, self._depth, self._previous = None, None, [], 0, ''
+            return self._write(path, lines) if path else None
+
+        if self._path:
+            nested = _FENCE.match(line)
+            if nested and nested.group(2).strip():
+                self._depth += 1
+            self._lines.append(line)
+        return None
+
+    def _write(self, relative: str, lines: List[str]) -> Optional[Path]:
+        target = (self.base_dir / relative).resolve()
+        if self.base_dir not in target.parents:
+            return None  # Never write outside the project
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            os.replace(tmp, target)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        self.files.append(target)
+        if self.on_file:
+            self.on_file(target)
+        return target
+
+
+class ClaudeRunner:
+    """Streaming Claude Code subprocess; safe to use concurrently from one event loop"""
+
+    def __init__(self, project_path: str = ".", agent_name: str = "claude-runner", namespace: str = 'default',
+                 timeout: float = DEFAULT_TIMEOUT, command: Optional[List[str]] = None,
+                 cache: Optional[ClaudeCache] = None, phase: Optional[str] = None,
+                 task_id: Optional[str] = None):
+        self.project_path = Path(project_path)
+        self.agent_name = agent_name
+        self.namespace = namespace
+        self.timeout = timeout
+        self.command = command
+        self.cache = cache
+        self.phase = phase
+        self.task_id = task_id
+
+    async def stream(self, prompt: str, artifacts: Optional[List[str]] = None) -> AsyncIterator[str]:
+        """Yield stdout lines as Claude produces them; raises ClaudeRunError on failure or timeout
+
+        artifacts: files/directories the prompt was built from; their hashes are part of the cache key
+        """
+        started = time.monotonic()
+        stats: Dict[str, Any] = {'queue_wait_ms': 0.0, 'cache_hit': False}
+        lines = []
+        success = False
+        try:
+            async for line in self._stream(prompt, artifacts, stats):
+                lines.append(line)
+                yield line
+            success = True
+        finally:
+            accountant().record_call(ClaudeCall(
+                agent=self.agent_name,
+                namespace=self.namespace,
+                prompt_tokens=count_tokens(prompt),
+                response_tokens=count_tokens('\n'.join(lines)),
+                wall_ms=round((time.monotonic() - started) * 1000, 1),
+                queue_wait_ms=stats['queue_wait_ms'],
+                cache_hit=stats['cache_hit'],
+                success=success,
+                phase=self.phase,
+                task_id=self.task_id
+            ))
+
+    async def _stream(self, prompt: str, artifacts: Optional[List[str]],
+                      stats: Dict[str, Any]) -> AsyncIterator[str]:
+        command = self.command or claude_command()
+        mode = cache_mode()
+        if mode == 'off':
+            async for line in self._stream_live(command, prompt, stats):
+                yield line
+            return
+
+        cache = self.cache or ClaudeCache()
+        model = claude_model(command)
+        key = cache_key(prompt, model, artifacts)
+
+        if mode in ('replay', 'read-through'):
+            entry = cache.get(key)
+            record_event('claude_cache', self.namespace, agent=self.agent_name, mode=mode, hit=entry is not None)
+            if entry is not None:
+                stats['cache_hit'] = True
+                for line in entry['response'].split('\n'):
+                    yield line
+                return
+            if mode == 'replay':
+                raise ClaudeRunError(f"No recorded Claude response for this prompt (replay mode, key {key[:12]})")
+
+        lines = []
+        async for line in self._stream_live(command, prompt, stats):
+            lines.append(line)
+            yield line
+        cache.put(key, prompt, model, '\n'.join(lines), agent=self.agent_name)
+
+    async def _stream_live(self, command: List[str], prompt: str,
+                           stats: Dict[str, Any]) -> AsyncIterator[str]:
+        async with governor().session(self.agent_name, prompt, self.namespace) as lease:
+            stats['queue_wait_ms'] = lease.waited_ms
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *command,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=self.project_path,
+                    limit=LINE_LIMIT
+                )
+            except FileNotFoundError:
+                raise ClaudeRunError(f"Claude Code CLI not found ({command[0]}). "
+                                     "Please ensure Claude Code is installed and in PATH.")
+
+            stderr_task = asyncio.create_task(process.stderr.read())
+            deadline = time.monotonic() + self.timeout
+            output_chars = 0
+            try:
+                # One wall-clock deadline from spawn; time the caller spends between lines counts too
+                await asyncio.wait_for(self._send_prompt(process, prompt), self._remaining(deadline))
+                while True:
+                    line = await asyncio.wait_for(process.stdout.readline(), self._remaining(deadline))
+                    if not line:
+                        break
+                    text = line.decode('utf-8', errors='replace').rstrip('\r\n')
+                    output_chars += len(text) + 1
+                    yield text
+
+                returncode = await asyncio.wait_for(process.wait(), self._remaining(deadline))
+                stderr = (await stderr_task).decode('utf-8', errors='replace')
+            except asyncio.TimeoutError:
+                raise ClaudeRunError(f"Claude execution timed out after {self.timeout:g}s")
+            finally:
+                lease.used_tokens = lease.tokens + output_chars // CHARS_PER_TOKEN
+                if process.returncode is None:
+                    await self._terminate(process)
+                if not stderr_task.done():
+                    stderr_task.cancel()
+
+            if returncode != 0:
+                raise ClaudeRunError(f"Claude execution failed ({returncode}): {stderr.strip()[-2000:]}")
+
+    def _remaining(self, deadline: float) -> float:
+        return max(0.0, deadline - time.monotonic())
+
+    @staticmethod
+    async def _send_prompt(process: asyncio.subprocess.Process, prompt: str):
+        try:
+            process.stdin.write(prompt.encode('utf-8'))
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Exited early; the exit status tells why
+        finally:
+            process.stdin.close()
+
+    @staticmethod
+    async def _terminate(process: asyncio.subprocess.Process):
+        try:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), TERMINATE_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        except ProcessLookupError:
+            pass
+
+    async def run_claude(self, prompt: str, max_tokens: int = 50000,
+                         on_line: Optional[Callable[[str], None]] = None,
+                         extractor: Optional[FencedFileExtractor] = None,
+                         artifacts: Optional[List[str]] = None) -> str:
+        """Run to completion and return stdout; lines and file blocks are handled as they stream"""
+        lines = []
+        async for line in self.stream(prompt, artifacts):
+            lines.append(line)
+            if on_line:
+                on_line(line)
+            if extractor:
+                extractor.feed(line)
+        return '\n'.join(lines).strip()
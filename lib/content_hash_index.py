@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+SPARC Content Hash Index - Per-namespace map of file_path to last seen content hash
+Lets hooks recognise no-op edits and skip storage, intent extraction and triggering
+
+FileHashCache hashes many files at once on a thread pool (hashlib releases the GIL
+on large buffers) and remembers each hash by (size, mtime), so repeated passes over
+an unchanged tree only stat it.
+"""
+
+import hashlib
+import json
+import os
+import stat
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+INDEX_DIR = Path('.sparc/cache')
+HASH_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+
+
+def hash_content(content: str) -> str:
+    """SHA-256 of text content"""
+    return hashlib.sha256(content.encode('utf-8', errors='surrogateescape')).hexdigest()
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> Optional[str]:
+    """SHA-256 of a file on disk, streamed in chunks; None if unreadable"""
+    try:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except OSError:
+        return None
+
+
+def hash_path(path: str) -> Optional[str]:
+    """Content hash of a file, or of every file under a directory; None if missing"""
+    target = Path(path)
+    if target.is_file():
+        return hash_file(str(target))
+    if not target.is_dir():
+        return None
+
+    digest = hashlib.sha256()
+    for file_path in sorted(p for p in target.rglob('*') if p.is_file()):
+        digest.update(str(file_path.relative_to(target)).encode())
+        digest.update((hash_file(str(file_path)) or '').encode())
+    return digest.hexdigest()
+
+
+class ContentHashIndex:
+    """Small on-disk index of the last recorded content hash for each file"""
+
+    def __init__(self, namespace: str, index_dir: Optional[Path] = None):
+        self.namespace = namespace
+        self.index_path = (index_dir or INDEX_DIR) / namespace / 'content_hashes.json'
+        self._hashes: Optional[Dict[str, str]] = None
+
+    @property
+    def hashes(self) -> Dict[str, str]:
+        if self._hashes is None:
+            self._hashes = self._load()
+        return self._hashes
+
+    def _load(self) -> Dict[str, str]:
+        try:
+            data = json.loads(self.index_path.read_text())
+            return data if isinstance(data, dict) else {}
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def get(self, file_path: str) -> Optional[str]:
+        return self.hashes.get(self._key(file_path))
+
+    def is_unchanged(self, file_path: str, content_hash: Optional[str]) -> bool:
+        """True when content_hash matches what was last recorded for file_path"""
+        return content_hash is not None and self.get(file_path) == content_hash
+
+    def record(self, file_path: str, content_hash: Optional[str]):
+        """Remember content_hash for file_path and persist atomically"""
+        if content_hash is None:
+            return
+
+        # Re-read before writing so concurrent hooks don't drop each other's entries
+        self._hashes = self._load()
+        self._hashes[self._key(file_path)] = content_hash
+        self._save()
+
+    def _save(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.index_path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._hashes, f, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+
+class FileHashCache:
+    """Content hashes keyed by (size, mtime_ns); unchanged files are never re-read"""
+
+    def __init__(self, namespace: str, index_dir: Optional[Path] = None):
+        self.cache_path = (index_dir or INDEX_DIR) / namespace / 'file_hashes.json'
+        self._entries: Optional[Dict[str, List]] = None
+
+    @property
+    def entries(self) -> Dict[str, List]:
+        if self._entries is None:
+            try:
+                data = json.loads(self.cache_path.read_text())
+                self._entries = data if isinstance(data, dict) else {}
+            except (OSError, json.JSONDecodeError):
+                self._entries = {}
+        return self._entries
+
+    def _stat_and_hash(self, file_path: str) -> Optional[List]:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+
+        cached = self.entries.get(os.path.abspath(file_path))
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached
+        digest = hash_file(file_path)
+        return [st.st_size, st.st_mtime_ns, digest] if digest else None
+
+    def hash_files(self, file_paths: List[str], max_workers: int = HASH_WORKERS) -> Dict[str, Optional[str]]:
+        """file_path -> content hash (None if missing or unreadable), hashed in parallel"""
+        entries = self.entries
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(self._stat_and_hash, file_paths))
+
+        changed = False
+        hashes = {}
+        for file_path, entry in zip(file_paths, results):
+            hashes[file_path] = entry[2] if entry else None
+            key = os.path.abspath(file_path)
+            if entry and entries.get(key) != entry:
+                entries[key] = entry
+                changed = True
+        if changed:
+            self._save()
+        return hashes
+
+    def _save(self):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._entries, f, separators=(',', ':'))
+            os.replace(tmp_path, self.cache_path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+def resolve_content_hash(tool_name: str, tool_input: Dict[str, Any]) -> Optional[str]:
+    """Hash of the file content produced by a Write/Edit/MultiEdit tool call
+
+    The hook runs after the tool, so the file on disk is authoritative. Falls back
+    to the Write payload when the file cannot be read.
+    """
+    file_path = tool_input.get('file_path')
+    if not file_path or not isinstance(file_path, str):
+        return None
+
+    file_hash = hash_file(file_path)
+    if file_hash is not None:
+        return file_hash
+
+    content = tool_input.get('content')
+    if tool_name == 'Write' and isinstance(content, str):
+        return hash_content(content)
+
+    return None
+
+
+def is_noop_edit(tool_name: str, tool_input: Dict[str, Any]) -> bool:
+    """Edits whose replacement text equals the original text change nothing"""
+    if tool_name == 'Edit':
+        return tool_input.get('old_string') == tool_input.get('new_string')
+
+    if tool_name == 'MultiEdit':
+        edits = tool_input.get('edits') or []
+        return bool(edits) and all(e.get('old_string') == e.get('new_string') for e in edits)
+
+    return False
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+SPARC Context Cache - Per-run cache of shared agent context (project state, code search)
+Agents launched in the same run and phase reuse one fetch instead of each refetching
+
+Entries are scoped to the workflow run (SPARC_RUN_ID) and phase and live under
+.sparc/context_cache/<run_id>/ for SPARC_CONTEXT_CACHE_TTL seconds (default 300), so
+agents in separate processes share them. Concurrent misses on the same key are
+single-flight: within a process they await one fetch, across processes the first
+holds a flock on the entry while the others wait for its result. The in-process layer
+is only trusted while the entry file is still the one it was read from (one stat), so
+an invalidation by another process is seen on the next lookup. Outside a run only
+the in-process layer is used. SPARC_NO_CONTEXT_CACHE=1 disables caching.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from hook_metrics import record_event
+
+CACHE_DIR = Path('.sparc/context_cache')
+TTL_ENV = 'SPARC_CONTEXT_CACHE_TTL'
+DEFAULT_TTL = 300.0
+
+
+def context_cache_disabled() -> bool:
+    return os.environ.get('SPARC_NO_CONTEXT_CACHE') == '1'
+
+
+def entry_key(kind: str, namespace: str, phase: Optional[str], *parts: Any) -> str:
+    material = json.dumps([kind, namespace, phase or '', *parts], sort_keys=True, default=str)
+    return f"{kind}-{hashlib.sha256(material.encode()).hexdigest()[:24]}"
+
+
+class ContextCache:
+    """Two-level (process, run directory) cache with single-flight fetches"""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, ttl: Optional[float] = None,
+                 run_id: Optional[str] = None):
+        self.ttl = float(os.getenv(TTL_ENV, DEFAULT_TTL)) if ttl is None else ttl
+        self.run_id = run_id if run_id is not None else os.environ.get('SPARC_RUN_ID')
+        self.run_dir = Path(cache_dir) / self.run_id if self.run_id else None
+        self._memory: Dict[str, Tuple[float, Any]] = {}
+        self._signatures: Dict[str, Tuple[int, int]] = {}  # key -> (inode, mtime_ns) of its entry file
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _fresh(self, stored_at: float) -> bool:
+        return time.time() - stored_at < self.ttl
+
+    def _signature(self, key: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.run_dir / f"{key}.json")
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def _from_memory(self, key: str) -> Optional[Tuple[float, Any]]:
+        cached = self._memory.get(key)
+        if not cached or not self._fresh(cached[0]):
+            return None
+        # Entries are replaced, never rewritten in place, so a changed signature means
+        # another process invalidated or refetched it
+        if self.run_dir is not None and self._signature(key) != self._signatures.get(key):
+            return None
+        return cached
+
+    def _read(self, key: str) -> Optional[Tuple[float, Any]]:
+        signature = self._signature(key)
+        try:
+            entry = json.loads((self.run_dir / f"{key}.json").read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if 'stored_at' not in entry or 'value' not in entry:
+            return None
+        self._signatures[key] = signature
+        return entry['stored_at'], entry['value']
+
+    def _write(self, key: str, stored_at: float, value: Any):
+        fd, tmp = tempfile.mkstemp(dir=self.run_dir, prefix=f".{key}.")
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'stored_at': stored_at, 'value': value}, f, default=str)
+        os.replace(tmp, self.run_dir / f"{key}.json")
+        self._signatures[key] = self._signature(key)
+
+    def _lock(self, key: str):
+        """Blocking exclusive flock on the entry; returns the open lock file"""
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        lock = open(self.run_dir / f".{key}.lock", 'a')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    @staticmethod
+    def _unlock(lock):
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        lock.close()
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]], namespace: str = 'default') -> Any:
+        """Cached value for key, else the result of fetch() (stored for the rest of the run)"""
+        if context_cache_disabled():
+            return await fetch()
+
+        cached = self._from_memory(key)
+        if cached:
+            record_event('context_cache', namespace, kind=key.split('-')[0], hit=True, level='process')
+            return cached[1]
+
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._fetch_shared(key, fetch, namespace)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Waiters re-raise it; don't warn when there are none
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _fetch_shared(self, key: str, fetch: Callable[[], Awaitable[Any]], namespace: str) -> Any:
+        if self.run_dir is None:
+            value = await fetch()
+            self._memory[key] = (time.time(), value)
+            record_event('context_cache', namespace, kind=key.split('-')[0], hit=False, level='none')
+            return value
+
+        lock = await asyncio.to_thread(self._lock, key)
+        try:
+            entry = self._read(key)
+            if entry and self._fresh(entry[0]):
+                self._memory[key] = entry
+                record_event('context_cache', namespace, kind=key.split('-')[0], hit=True, level='run')
+                return entry[1]
+
+            value = await fetch()
+            stored_at = time.time()
+            self._write(key, stored_at, value)
+            self._memory[key] = (stored_at, value)
+            record_event('context_cache', namespace, kind=key.split('-')[0], hit=False, level='run')
+            return value
+        finally:
+            self._unlock(lock)
+
+    def invalidate(self, kind: str):
+        """Drop every entry of one kind (e.g. after this process changed project state)
+
+        Blocks while another process is fetching one of those entries, so a value
+        fetched before the change can't be stored after it.
+        """
+        for key in [k for k in self._memory if k.startswith(f"{kind}-")]:
+            del self._memory[key]
+            self._signatures.pop(key, None)
+        if self.run_dir is not None:
+            for path in self.run_dir.glob(f"{kind}-*.json"):
+                lock = self._lock(path.stem)
+                try:
+                    path.unlink(missing_ok=True)
+                finally:
+                    self._unlock(lock)
+
+    def clear_run(self):
+        """Remove this run's entries (call when the run finishes)"""
+        self._memory.clear()
+        self._signatures.clear()
+        if self.run_dir is not None:
+            shutil.rmtree(self.run_dir, ignore_errors=True)
+
+
+_context_cache: Optional[ContextCache] = None
+
+
+def context_cache() -> ContextCache:
+    """Process-wide cache for the current run"""
+    global _context_cache
+    if _context_cache is None or _context_cache.run_id != os.environ.get('SPARC_RUN_ID'):
+        _context_cache = ContextCache()
+    return _context_cache
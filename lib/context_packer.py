@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+SPARC Context Packer - Token-budgeted selection of context for agent prompts
+Picks the most relevant chunks that fit the budget instead of the first N whole files
+
+Candidate documents are split into chunks (markdown sections, top-level Python
+definitions, otherwise paragraph runs), each scored by its document's relevance
+and its overlap with the task. Selection is a greedy knapsack on relevance per
+token, with duplicate and near-duplicate chunks removed, plus the usual guard
+that a single better chunk beats a greedy set of weaker ones. Everything that was
+left out is reported with the reason.
+"""
+
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+from claude_governor import estimate_tokens
+
+DEFAULT_BUDGET_TOKENS = 8000
+BUDGET_ENV = 'SPARC_CONTEXT_BUDGET_TOKENS'
+MAX_CHUNK_TOKENS = 400
+MIN_CHUNK_CHARS = 240  # Smaller sections (imports, one-line stubs) merge into the next one
+SNIPPET_OVERHEAD_TOKENS = 12  # File header and fence around each rendered chunk
+NEAR_DUPLICATE_OVERLAP = 0.8
+
+_BOUNDARY = re.compile(r'^(#{1,6}\s|(?:async\s+)?def\s|class\s|@)')
+_HEADING = re.compile(r'^#{1,6}\s')
+_WORD = re.compile(r'[A-Za-z_][A-Za-z0-9_]{2,}')
+
+
+def context_budget() -> int:
+    return int(os.getenv(BUDGET_ENV, DEFAULT_BUDGET_TOKENS))
+
+
+@dataclass
+class Snippet:
+    source: str
+    text: str
+    score: float
+    start_line: int = 1
+    end_line: int = 1
+    tokens: int = 0
+
+    def __post_init__(self):
+        if not self.tokens:
+            self.tokens = estimate_tokens(self.text) + SNIPPET_OVERHEAD_TOKENS
+
+
+@dataclass
+class PackResult:
+    selected: List[Snippet]
+    dropped: List[Tuple[Snippet, str]]
+    budget: int
+    used_tokens: int = field(init=False)
+
+    def __post_init__(self):
+        self.used_tokens = sum(s.tokens for s in self.selected)
+
+    def render(self) -> str:
+        """Selected chunks grouped by file, in file order"""
+        blocks = []
+        by_source: Dict[str, List[Snippet]] = {}
+        for snippet in self.selected:
+            by_source.setdefault(snippet.source, []).append(snippet)
+
+        for source, snippets in by_source.items():
+            for snippet in sorted(snippets, key=lambda s: s.start_line):
+                blocks.append(f"File: {source} (lines {snippet.start_line}-{snippet.end_line})\n"
+                              f"```\n{snippet.text}\n```")
+        return '\n\n'.join(blocks)
+
+    def report(self) -> Dict[str, Any]:
+        reasons: Dict[str, int] = {}
+        for _, reason in self.dropped:
+            reasons[reason] = reasons.get(reason, 0) + 1
+        return {
+            'budget': self.budget,
+            'used_tokens': self.used_tokens,
+            'selected': len(self.selected),
+            'selected_sources': sorted({s.source for s in self.selected}),
+            'dropped': len(self.dropped),
+            'dropped_reasons': reasons,
+            'dropped_sources': sorted({s.source for s, _ in self.dropped} - {s.source for s in self.selected})
+        }
+
+
+def _terms(text: str) -> Set[str]:
+    return {word.lower() for word in _WORD.findall(text)}
+
+
+def _split_line(line: str, max_chars: int) -> List[str]:
+    """A line in pieces of at most max_chars, cut at a space where one is near the end"""
+    pieces = []
+    while len(line) > max_chars:
+        cut = line.rfind(' ', max_chars // 2, max_chars)
+        cut = cut if cut > 0 else max_chars
+        pieces.append(line[:cut])
+        line = line[cut:]
+    pieces.append(line)
+    return pieces
+
+
+def chunk_document(source: str, text: str, score: float,
+                   max_chunk_tokens: int = MAX_CHUNK_TOKENS) -> List[Snippet]:
+    """Split at headings / top-level definitions, then pack lines up to max_chunk_tokens
+
+    Lines longer than a chunk are split across chunks rather than cut short, and a
+    heading that would end a chunk moves to the next one, which it introduces.
+    """
+    lines = text.splitlines()
+    sections: List[Tuple[int, List[str]]] = []
+    for number, line in enumerate(lines, start=1):
+        if not sections or (_BOUNDARY.match(line) and len('\n'.join(sections[-1][1]).strip()) >= MIN_CHUNK_CHARS):
+            sections.append((number, []))
+        sections[-1][1].append(line)
+
+    chunks: List[Snippet] = []
+    max_chars = max_chunk_tokens * 4
+    buffer: List[Tuple[int, str]] = []  # (line number, text)
+    size = 0
+
+    def emit(pieces: List[Tuple[int, str]]):
+        if any(piece.strip() for _, piece in pieces):
+            chunks.append(Snippet(source, '\n'.join(piece for _, piece in pieces), score,
+                                  pieces[0][0], pieces[-1][0]))
+
+    def flush():
+        """Emit the buffer, except trailing headings: those stay for the chunk they introduce"""
+        nonlocal buffer, size
+        keep = len(buffer)
+        while keep and (not buffer[keep - 1][1].strip() or _HEADING.match(buffer[keep - 1][1])):
+            keep -= 1
+        if not any(_HEADING.match(piece) for _, piece in buffer[keep:]):
+            keep = len(buffer)
+        if keep:  # Headings alone aren't a chunk; they wait for what follows
+            emit(buffer[:keep])
+            buffer = buffer[keep:]
+            size = sum(len(piece) + 1 for _, piece in buffer)
+
+    for index, (start, section) in enumerate(sections):
+        if index:
+            flush()
+        for number, line in enumerate(section, start=start):
+            for piece in _split_line(line, max_chars):
+                if buffer and size + len(piece) > max_chars:
+                    flush()
+                buffer.append((number, piece))
+                size += len(piece) + 1
+    emit(buffer)
+    return chunks
+
+
+def candidates_from_files(files: Iterable[Dict[str, Any]], query: str = '',
+                          max_chunk_tokens: int = MAX_CHUNK_TOKENS) -> List[Snippet]:
+    """Chunk search results / documents ({'file_path', 'content', optional score}) into scored snippets
+
+    A chunk's score is its document's relevance, weighted by how much of the task's
+    vocabulary it mentions. Results without a score get a rank-based one.
+    """
+    query_terms = _terms(query)
+    snippets: List[Snippet] = []
+    for rank, info in enumerate(files):
+        content = info.get('content') or ''
+        if not content.strip():
+            continue
+        source = info.get('file_path') or info.get('source') or f"result-{rank + 1}"
+        base = info.get('score', info.get('similarity_score', info.get('relevance')))
+        base = float(base) if base is not None else 1.0 / (1 + rank)
+
+        for chunk in chunk_document(source, content, base, max_chunk_tokens):
+            if query_terms:
+                overlap = len(_terms(chunk.text) & query_terms) / len(query_terms)
+                chunk.score = base * (0.5 + 0.5 * min(1.0, overlap * 2))
+            snippets.append(chunk)
+    return snippets
+
+
+def _fingerprint(text: str) -> str:
+    return hashlib.sha1(' '.join(text.split()).lower().encode()).hexdigest()
+
+
+def _content_lines(text: str) -> Set[str]:
+    return {' '.join(line.split()) for line in text.splitlines() if len(line.strip()) > 3}
+
+
+def pack(snippets: List[Snippet], budget: Optional[int] = None) -> PackResult:
+    """Greedy knapsack on score per token, skipping duplicates and near-duplicates"""
+    budget = context_budget() if budget is None else budget
+    dropped: List[Tuple[Snippet, str]] = []
+
+    # Exact duplicates (same text from two sources) keep the best-scored copy
+    unique: Dict[str, Snippet] = {}
+    for snippet in sorted(snippets, key=lambda s: s.score, reverse=True):
+        key = _fingerprint(snippet.text)
+        if key in unique:
+            dropped.append((snippet, 'duplicate'))
+        else:
+            unique[key] = snippet
+
+    ranked = sorted(unique.values(), key=lambda s: (s.score / max(1, s.tokens), s.score), reverse=True)
+    selected: List[Snippet] = []
+    seen_lines: Set[str] = set()
+    used = 0
+    for snippet in ranked:
+        if snippet.score <= 0:
+            dropped.append((snippet, 'irrelevant'))
+            continue
+        lines = _content_lines(snippet.text)
+        if lines and len(lines & seen_lines) / len(lines) >= NEAR_DUPLICATE_OVERLAP:
+            dropped.append((snippet, 'near_duplicate'))
+            continue
+        if used + snippet.tokens > budget:
+            dropped.append((snippet, 'over_budget'))
+            continue
+        selected.append(snippet)
+        seen_lines |= lines
+        used += snippet.tokens
+
+    # Greedy by density can lose to the single most relevant chunk that fits on its own
+    fitting = [s for s in unique.values() if s.tokens <= budget and s.score > 0]
+    best = max(fitting, key=lambda s: s.score, default=None)
+    if best is not None and best not in selected and best.score > sum(s.score for s in selected):
+        dropped = [(s, 'over_budget') for s in selected] + [d for d in dropped if d[0] is not best]
+        selected = [best]
+
+    return PackResult(selected, dropped, budget)
+
+
+def pack_files(files: Iterable[Dict[str, Any]], query: str = '', budget: Optional[int] = None) -> PackResult:
+    """candidates_from_files + pack"""
+    return pack(candidates_from_files(files, query), budget)
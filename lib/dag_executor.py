@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+SPARC DAG Executor - Runs an orchestrator's delegated subtasks as a dependency graph
+Ready subtasks are delegated concurrently; failures cancel everything downstream of them
+
+Inside a journaled workflow run (SPARC_RUN_ID), subtask transitions are journaled and a
+resumed run skips subtasks that completed with unchanged input artifacts.
+
+Subtasks run in-process by default: the orchestrator leases each task it waits on and
+runs the agent script itself. Under an external dispatcher (orchestrator.py --dispatch,
+fleet workers), which sets SPARC_EXTERNAL_DISPATCH=1 for the agents it starts, the
+tasks are left to it. Waits never outlast the caller: SPARC_AGENT_TIMEOUT (set by the
+runners to their own timeout) bounds the whole wait, less a margin.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Iterable
+
+from agent_registry import resolve_agent_script
+from agent_worker_pool import cli_payload, shared_pool
+from run_journal import RunJournal
+from task_dispatcher import TaskDispatcher, PostgresNotifier, get_notifier, DEFAULT_SAFETY_POLL_INTERVAL
+from task_memo import input_artifacts
+from task_queue import claim_task, complete_task, default_worker_id
+
+# Without LISTEN/NOTIFY, waits fall back to polling at this interval
+FALLBACK_POLL_INTERVAL = 5.0
+DEFAULT_TASK_TIMEOUT = 3600.0
+TIMEOUT_ENV = 'SPARC_AGENT_TIMEOUT'
+EXTERNAL_DISPATCH_ENV = 'SPARC_EXTERNAL_DISPATCH'
+TIMEOUT_MARGIN = 15.0  # Left to the agent to report back before its caller kills it
+
+
+def caller_budget() -> float:
+    """Seconds this process may spend waiting on subtasks (capped by the caller's timeout)"""
+    try:
+        caller_timeout = float(os.environ[TIMEOUT_ENV])
+    except (KeyError, ValueError):
+        return DEFAULT_TASK_TIMEOUT
+    return max(1.0, min(DEFAULT_TASK_TIMEOUT, caller_timeout - TIMEOUT_MARGIN))
+
+
+def agent_timeout() -> float:
+    """Seconds an executor lets one agent run (SPARC_AGENT_TIMEOUT, else DEFAULT_TASK_TIMEOUT)
+
+    Executors pass it on in TIMEOUT_ENV and kill the agent TIMEOUT_MARGIN after it.
+    """
+    try:
+        return max(1.0, float(os.environ[TIMEOUT_ENV]))
+    except (KeyError, ValueError):
+        return DEFAULT_TASK_TIMEOUT
+
+
+def external_dispatch() -> bool:
+    return os.environ.get(EXTERNAL_DISPATCH_ENV) == '1'
+
+
+@dataclass
+class SubTask:
+    key: str
+    to_agent: str
+    description: str
+    context: Dict[str, Any]
+    priority: int = 5
+    depends_on: List[str] = field(default_factory=list)
+
+
+@dataclass
+class NodeResult:
+    key: str
+    status: str  # completed | failed | cancelled
+    task_id: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    output: Any = None
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+
+class TaskGraph:
+    """Subtasks keyed by name, with explicit depends_on edges"""
+
+    def __init__(self):
+        self.nodes: Dict[str, SubTask] = {}
+
+    def add(self, key: str, to_agent: str, description: str, context: Optional[Dict[str, Any]] = None,
+            priority: int = 5, depends_on: Iterable[str] = ()) -> str:
+        if key in self.nodes:
+            raise ValueError(f"Duplicate subtask: {key}")
+        self.nodes[key] = SubTask(key, to_agent, description, dict(context or {}), priority, list(depends_on))
+        return key
+
+    def dependents(self, key: str) -> List[str]:
+        return [k for k, node in self.nodes.items() if key in node.depends_on]
+
+    def validate(self):
+        """Reject unknown dependencies and cycles"""
+        for node in self.nodes.values():
+            unknown = [d for d in node.depends_on if d not in self.nodes]
+            if unknown:
+                raise ValueError(f"{node.key} depends on unknown subtasks: {', '.join(unknown)}")
+
+        indegree = {k: len(node.depends_on) for k, node in self.nodes.items()}
+        ready = [k for k, n in indegree.items() if n == 0]
+        visited = 0
+        while ready:
+            key = ready.pop()
+            visited += 1
+            for dependent in self.dependents(key):
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    ready.append(dependent)
+
+        if visited != len(self.nodes):
+            cyclic = sorted(k for k, n in indegree.items() if n > 0)
+            raise ValueError(f"Dependency cycle between: {', '.join(cyclic)}")
+
+
+@dataclass
+class DAGResult:
+    results: Dict[str, NodeResult]
+    critical_path: List[str]
+    critical_path_seconds: float
+    wall_seconds: float
+
+    @property
+    def success(self) -> bool:
+        return all(r.status == 'completed' for r in self.results.values())
+
+    @property
+    def failed(self) -> List[str]:
+        return [k for k, r in self.results.items() if r.status == 'failed']
+
+    @property
+    def cancelled(self) -> List[str]:
+        return [k for k, r in self.results.items() if r.status == 'cancelled']
+
+    def completed_tasks(self) -> Dict[str, Dict[str, Any]]:
+        """Per-subtask outcome in the shape orchestrators report"""
+        return {
+            key: {
+                "task_id": r.task_id,
+                "success": r.status == 'completed',
+                "status": r.status,
+                "output": r.output,
+                "error": r.error,
+                "duration_seconds": round(r.duration, 3)
+            }
+            for key, r in self.results.items()
+        }
+
+
+SubmitFn = Callable[[SubTask, Dict[str, Any]], Awaitable[Optional[str]]]
+WaitFn = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+class DAGExecutor:
+    """Delegates every ready subtask at once and reacts to each completion as it arrives"""
+
+    def __init__(self, submit: SubmitFn, wait: WaitFn, max_concurrency: Optional[int] = None,
+                 journal: Optional[RunJournal] = None, journal_prefix: str = ''):
+        self.submit = submit
+        self.wait = wait
+        self._slots = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.journal = journal
+        self.journal_prefix = journal_prefix
+
+    async def run(self, graph: TaskGraph) -> DAGResult:
+        graph.validate()
+        started = time.perf_counter()
+        results: Dict[str, NodeResult] = {}
+        waiting_on = {k: set(node.depends_on) for k, node in graph.nodes.items()}
+        running: Dict[asyncio.Task, str] = {}
+
+        def launch_ready():
+            for key, node in graph.nodes.items():
+                if key in results or key in running.values() or waiting_on[key]:
+                    continue
+                dependency_ids = {d: results[d].task_id for d in node.depends_on}
+                running[asyncio.create_task(self._run_node(node, dependency_ids))] = key
+
+        def cancel_downstream(key: str, reason: str):
+            for dependent in graph.dependents(key):
+                if dependent not in results:
+                    results[dependent] = NodeResult(dependent, 'cancelled', error=reason)
+                    cancel_downstream(dependent, reason)
+
+        try:
+            launch_ready()
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    key = running.pop(finished)
+                    result = finished.result()
+                    results[key] = result
+
+                    if result.status == 'completed':
+                        for dependent in graph.dependents(key):
+                            waiting_on[dependent].discard(key)
+                    else:
+                        cancel_downstream(key, f"dependency {key} {result.status}")
+                launch_ready()
+        finally:
+            for pending in running:
+                pending.cancel()
+
+        ordered = {k: results[k] for k in graph.nodes}
+        path, path_seconds = self._critical_path(graph, ordered)
+        return DAGResult(ordered, path, path_seconds, time.perf_counter() - started)
+
+    def _journal_node(self, node: SubTask) -> str:
+        return f"{self.journal_prefix}/{node.key}" if self.journal_prefix else node.key
+
+    async def _run_node(self, node: SubTask, dependency_ids: Dict[str, str]) -> NodeResult:
+        context = dict(node.context)
+        for dependency, task_id in dependency_ids.items():
+            context[f"{dependency}_task_id"] = task_id
+
+        if self.journal:
+            done = self.journal.completed_unchanged(self._journal_node(node))
+            if done:
+                now = time.perf_counter()
+                self.journal.record(self._journal_node(node), 'skipped', 'subtask')
+                return NodeResult(node.key, 'completed', done['detail'].get('task_id'), now, now,
+                                  done['detail'].get('output'))
+            self.journal.record(self._journal_node(node), 'running', 'subtask')
+
+        result = NodeResult(node.key, 'failed', started_at=time.perf_counter())
+        try:
+            if self._slots:
+                async with self._slots:
+                    await self._submit_and_wait(node, context, result)
+            else:
+                await self._submit_and_wait(node, context, result)
+        except asyncio.TimeoutError:
+            result.status, result.error = 'failed', 'timed out'
+        except Exception as e:
+            result.status, result.error = 'failed', str(e)
+
+        result.finished_at = time.perf_counter()
+        if self.journal:
+            self.journal.record(self._journal_node(node), result.status, 'subtask',
+                                artifact_paths=input_artifacts({'context': context}),
+                                detail={'task_id': result.task_id, 'output': result.output, 'error': result.error})
+        return result
+
+    async def _submit_and_wait(self, node: SubTask, context: Dict[str, Any], result: NodeResult):
+        result.task_id = await self.submit(node, context)
+        if not result.task_id:
+            raise RuntimeError(f"Could not delegate {node.key} to {node.to_agent}")
+
+        outcome = await self.wait(result.task_id)
+        result.status = 'completed' if outcome.get('status') == 'completed' else 'failed'
+        result.output = outcome.get('output')
+        result.error = outcome.get('error')
+
+    @staticmethod
+    def _critical_path(graph: TaskGraph, results: Dict[str, NodeResult]) -> tuple:
+        """Chain of subtasks that gated the finish: walk back through the last dependency to finish"""
+        timed = {k: r for k, r in results.items() if r.finished_at is not None}
+        if not timed:
+            return [], 0.0
+
+        key = max(timed, key=lambda k: timed[k].finished_at)
+        path = [key]
+        while True:
+            gating = [d for d in graph.nodes[key].depends_on if d in timed]
+            if not gating:
+                break
+            key = max(gating, key=lambda d: timed[d].finished_at)
+            path.append(key)
+
+        path.reverse()
+        return path, timed[path[-1]].finished_at - timed[path[0]].started_at
+
+
+class AgentTaskBackend:
+    """submit/wait against agent_tasks for an agent; waits are woken by task notifications
+
+    task_timeout bounds all waits together (default: caller_budget()). With run_locally
+    (default: no external dispatcher) each waited-on task is leased and run here.
+    """
+
+    def __init__(self, agent, notifier=None, task_timeout: Optional[float] = None,
+                 run_locally: Optional[bool] = None):
+        self.agent = agent
+        self.notifier = notifier or get_notifier()
+        self.task_timeout = caller_budget() if task_timeout is None else task_timeout
+        self.run_locally = not external_dispatch() if run_locally is None else run_locally
+        poll_interval = (DEFAULT_SAFETY_POLL_INTERVAL if isinstance(self.notifier, PostgresNotifier)
+                         else FALLBACK_POLL_INTERVAL)
+        self.dispatcher = TaskDispatcher(agent.supabase, agent.project_id, self.notifier, poll_interval)
+        self.worker_id = default_worker_id()
+        self._stop = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+        self._deadline = 0.0
+        self._local: Dict[str, asyncio.Task] = {}
+
+    async def __aenter__(self):
+        self._deadline = time.monotonic() + self.task_timeout
+        self._runner = asyncio.create_task(self.dispatcher.run(self._stop))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        # Local runs still going past the deadline are killed and failed
+        for local in self._local.values():
+            local.cancel()
+        await asyncio.gather(*self._local.values(), return_exceptions=True)
+        self._stop.set()
+        await self._runner
+
+    def _remaining(self) -> float:
+        return max(0.0, self._deadline - time.monotonic())
+
+    async def submit(self, node: SubTask, context: Dict[str, Any]) -> Optional[str]:
+        return await self.agent._delegate_task(node.to_agent, node.description, context, node.priority)
+
+    async def _run_locally(self, task_id: str):
+        """Lease the task and run its agent in a child process; no-op if someone else has it
+
+        With SPARC_AGENT_POOL set the agent runs on a warm pool worker instead (see shared_pool).
+        """
+        supabase = self.agent.supabase
+        task = await asyncio.to_thread(claim_task, supabase, task_id, self.worker_id,
+                                       int(self._remaining() + TIMEOUT_MARGIN))
+        if not task:
+            return  # Already running elsewhere (or finished); the wait sees its outcome
+
+        success, result, error = False, None, None
+        script = resolve_agent_script(task['to_agent'])
+        try:
+            if script is None:
+                raise RuntimeError(f"No agent script for {task['to_agent']}")
+            pool = shared_pool()
+            if pool is not None:
+                response = await pool.run_async(script, cli_payload(script, task['namespace'], task_id=task_id),
+                                                timeout=self._remaining())
+                if not response.get('load_error'):
+                    success = response['success']
+                    outputs = (response.get('result') or {}).get('outputs', {})
+                    result = {'output': json.dumps(outputs, default=str)[-4000:]} if success else None
+                    error = None if success else (response.get('stderr') or response.get('error') or '')[-4000:]
+                    return
+            process = await asyncio.create_subprocess_exec(
+                'uv', 'run', str(script), '--namespace', task['namespace'], '--task-id', str(task_id),
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                env={**os.environ, TIMEOUT_ENV: str(int(self._remaining()))},
+                start_new_session=True
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), self._remaining())
+            except BaseException:
+                # The whole group: uv's child interpreter would otherwise keep the pipes open
+                os.killpg(process.pid, signal.SIGKILL)
+                await process.wait()
+                raise
+            success = process.returncode == 0
+            result = {'output': stdout.decode()[-4000:]} if success else None
+            error = None if success else stderr.decode()[-4000:]
+        except asyncio.TimeoutError:
+            error = 'timed out'
+        except asyncio.CancelledError:
+            error = 'cancelled'
+            raise
+        except Exception as e:
+            error = str(e)
+        finally:
+            await asyncio.shield(asyncio.to_thread(complete_task, supabase, task_id, self.worker_id,
+                                                   success, result=result, error=error))
+            self.dispatcher.status_changed(task_id, 'completed' if success else 'failed')
+
+    async def wait(self, task_id: str) -> Dict[str, Any]:
+        if self.run_locally and task_id not in self._local:
+            self._local[task_id] = asyncio.create_task(self._run_locally(task_id))
+
+        status = await self.dispatcher.wait_for_status(task_id, timeout=self._remaining())
+        row = await asyncio.to_thread(
+            lambda: self.agent.supabase.table('agent_tasks').select('result, error').eq('id', task_id).execute()
+        )
+        details = row.data[0] if row.data else {}
+        return {'status': status, 'output': details.get('result'), 'error': details.get('error')}
+
+
+async def run_task_graph(agent, graph: TaskGraph, max_concurrency: Optional[int] = None) -> DAGResult:
+    """Run an orchestrator's subtask graph against agent_tasks"""
+    journal = RunJournal.from_env(mirror=agent.supabase)
+    try:
+        async with AgentTaskBackend(agent) as backend:
+            executor = DAGExecutor(backend.submit, backend.wait, max_concurrency,
+                                   journal=journal, journal_prefix=agent.agent_name)
+            result = await executor.run(graph)
+        if journal and result.success:
+            # Handover signal for phase_pipeline: the phase's artifacts are final
+            journal.record(agent.agent_name, 'completed', 'handover')
+        return result
+    finally:
+        if journal:
+            journal.close()
+
+
+async def wait_for_agent_tasks(agent, task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Block until each delegated task finishes; {task_id: {success, output, error}}"""
+    async with AgentTaskBackend(agent) as backend:
+        outcomes = await asyncio.gather(*(backend.wait(t) for t in task_ids), return_exceptions=True)
+
+    return {
+        task_id: ({"success": False, "output": None, "error": str(outcome) or 'timed out'}
+                  if isinstance(outcome, BaseException) else
+                  {"success": outcome['status'] == 'completed', "output": outcome['output'],
+                   "error": outcome['error']})
+        for task_id, outcome in zip(task_ids, outcomes)
+    }
@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#   "supabase>=2.0.0",
+#   "python-dotenv>=1.0.0",
+# ]
+# ///
+
+"""
+SPARC Fleet Worker - Runs agent tasks for many namespaces across many hosts
+Registers in sparc_workers, leases tasks, renews leases by heartbeat, steals work when idle
+
+Every worker also requeues tasks whose lease expired (see database/sql/worker_fleet.sql),
+so a crashed host's work is picked up elsewhere. SQLiteFleetStore provides the same
+operations on a local file, so a multi-process fleet can run without Supabase. The default
+executor still starts the agent scripts, which read their task from Supabase by id; for a
+store that only exists locally, pass run_local_fleet an executor of your own. With --pool N
+agents run on N warm workers per fleet worker (PoolExecutor) instead of a `uv run` each.
+
+
+    uv run lib/fleet_worker.py --namespace shop --namespace blog --capacity 4
+    uv run lib/fleet_worker.py --namespace shop --capacity 4 --pool 4
+    uv run lib/fleet_worker.py --local 3 --store .sparc/fleet.db
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from hook_metrics import record_event
+from task_queue import DEFAULT_LEASE_SECONDS, claim_next_task, complete_task, default_worker_id
+
+POLL_INTERVAL = 2.0
+WORKER_TIMEOUT_SECONDS = 900
+
+# (success, result, error)
+Execute = Callable[[Dict[str, Any]], Awaitable[Tuple[bool, Optional[Dict[str, Any]], Optional[str]]]]
+
+
+class SupabaseFleetStore:
+    """Fleet operations against agent_tasks / sparc_workers through Supabase"""
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+
+    def register(self, worker_id: str, namespaces: List[str], capacity: int):
+        self.supabase.table('sparc_workers').upsert({
+            'worker_id': worker_id,
+            'host': socket.gethostname(),
+            'pid': os.getpid(),
+            'namespaces': namespaces,
+            'capacity': capacity,
+            'running': 0,
+            'status': 'active'
+        }).execute()
+
+    def deregister(self, worker_id: str):
+        self.supabase.table('sparc_workers').update({'status': 'stopped', 'running': 0}) \
+            .eq('worker_id', worker_id).execute()
+
+    def heartbeat(self, worker_id: str, running: int, lease_seconds: int) -> int:
+        result = self.supabase.rpc('worker_heartbeat', {
+            'p_worker_id': worker_id, 'p_running': running, 'p_lease_seconds': lease_seconds
+        }).execute()
+        return result.data or 0
+
+    def reclaim_expired(self) -> int:
+        result = self.supabase.rpc('reclaim_expired_leases', {
+            'p_worker_timeout_seconds': WORKER_TIMEOUT_SECONDS
+        }).execute()
+        return result.data or 0
+
+    def claim(self, namespace: str, worker_id: str, agent_filter: Optional[List[str]],
+              lease_seconds: int) -> Optional[Dict[str, Any]]:
+        return claim_next_task(self.supabase, namespace, agent_filter, worker_id, lease_seconds)
+
+    def steal(self, worker_id: str, exclude: List[str], agent_filter: Optional[List[str]],
+              lease_seconds: int) -> Optional[Dict[str, Any]]:
+        result = self.supabase.rpc('steal_task', {
+            'p_worker_id': worker_id,
+            'p_exclude_namespaces': exclude,
+            'p_agent_filter': agent_filter,
+            'p_lease_seconds': lease_seconds
+        }).execute()
+        return result.data[0] if result.data else None
+
+    def complete(self, task_id: str, worker_id: str, success: bool,
+                 result: Optional[Dict[str, Any]], error: Optional[str]) -> bool:
+        return complete_task(self.supabase, task_id, worker_id, success, result, error)
+
+
+class SQLiteFleetStore:
+    """Local stand-in with the same semantics; safe to share between processes"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS agent_tasks (
+                    id TEXT PRIMARY KEY, namespace TEXT NOT NULL, to_agent TEXT NOT NULL,
+                    task_type TEXT, task_payload TEXT, priority INTEGER DEFAULT 5,
+                    status TEXT DEFAULT 'pending', claimed_by TEXT, lease_expires_at REAL,
+                    result TEXT, error TEXT, created_at REAL, started_at REAL, completed_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_local_tasks_claim ON agent_tasks (status, namespace, priority, created_at);
+                CREATE TABLE IF NOT EXISTS sparc_workers (
+                    worker_id TEXT PRIMARY KEY, host TEXT, pid INTEGER, namespaces TEXT,
+                    capacity INTEGER, running INTEGER DEFAULT 0, status TEXT, last_heartbeat REAL
+                );
+            """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _write(self, statements: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run statements in one IMMEDIATE transaction: writers are serialized across processes"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            value = statements(conn)
+            conn.execute('COMMIT')
+            return value
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        task = dict(row)
+        task['task_payload'] = json.loads(task['task_payload'] or '{}')
+        return task
+
+    def enqueue(self, namespace: str, to_agent: str, payload: Optional[Dict[str, Any]] = None,
+                priority: int = 5, task_type: str = 'delegation') -> str:
+        task_id = str(uuid.uuid4())
+        self._write(lambda c: c.execute(
+            'INSERT INTO agent_tasks (id, namespace, to_agent, task_type, task_payload, priority, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (task_id, namespace, to_agent, task_type, json.dumps(payload or {}), priority, time.time())
+        ))
+        return task_id
+
+    def task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self._row(self._conn().execute('SELECT * FROM agent_tasks WHERE id = ?', (task_id,)).fetchone())
+
+    def register(self, worker_id: str, namespaces: List[str], capacity: int):
+        self._write(lambda c: c.execute(
+            'INSERT OR REPLACE INTO sparc_workers VALUES (?, ?, ?, ?, ?, 0, ?, ?)',
+            (worker_id, socket.gethostname(), os.getpid(), json.dumps(namespaces), capacity, 'active', time.time())
+        ))
+
+    def deregister(self, worker_id: str):
+        self._write(lambda c: c.execute(
+            "UPDATE sparc_workers SET status = 'stopped', running = 0 WHERE worker_id = ?", (worker_id,)
+        ))
+
+    def heartbeat(self, worker_id: str, running: int, lease_seconds: int) -> int:
+        now = time.time()
+
+        def renew(c):
+            c.execute("UPDATE sparc_workers SET last_heartbeat = ?, running = ?, "
+                      "status = CASE WHEN status = 'lost' THEN 'active' ELSE status END WHERE worker_id = ?",
+                      (now, running, worker_id))
+            return c.execute("UPDATE agent_tasks SET lease_expires_at = ? "
+                             "WHERE claimed_by = ? AND status = 'in_progress'",
+                             (now + lease_seconds, worker_id)).rowcount
+        return self._write(renew)
+
+    def reclaim_expired(self) -> int:
+        now = time.time()
+
+        def reclaim(c):
+            count = c.execute("UPDATE agent_tasks SET status = 'pending', claimed_by = NULL, "
+                              "lease_expires_at = NULL, started_at = NULL "
+                              "WHERE status = 'in_progress' AND lease_expires_at < ?", (now,)).rowcount
+            c.execute("UPDATE sparc_workers SET status = 'lost' WHERE status = 'active' AND last_heartbeat < ?",
+                      (now - WORKER_TIMEOUT_SECONDS,))
+            return count
+        return self._write(reclaim)
+
+    def _claim_where(self, c, where: str, params: tuple, worker_id: str,
+                     agent_filter: Optional[List[str]], lease_seconds: int) -> Optional[Dict[str, Any]]:
+        if agent_filter:
+            where += f" AND to_agent IN ({','.join('?' * len(agent_filter))})"
+            params += tuple(agent_filter)
+        row = c.execute(f"SELECT id FROM agent_tasks WHERE status = 'pending' AND {where} "
+                        "ORDER BY priority DESC, created_at LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        c.execute("UPDATE agent_tasks SET status = 'in_progress', claimed_by = ?, started_at = ?, "
+                  "lease_expires_at = ? WHERE id = ?", (worker_id, now, now + lease_seconds, row['id']))
+        return self._row(c.execute('SELECT * FROM agent_tasks WHERE id = ?', (row['id'],)).fetchone())
+
+    def claim(self, namespace: str, worker_id: str, agent_filter: Optional[List[str]],
+              lease_seconds: int) -> Optional[Dict[str, Any]]:
+        return self._write(lambda c: self._claim_where(c, 'namespace = ?', (namespace,), worker_id,
+                                                       agent_filter, lease_seconds))
+
+    def steal(self, worker_id: str, exclude: List[str], agent_filter: Optional[List[str]],
+              lease_seconds: int) -> Optional[Dict[str, Any]]:
+        def steal(c):
+            where = f"namespace NOT IN ({','.join('?' * len(exclude))})" if exclude else '1 = 1'
+            params = tuple(exclude)
+            if agent_filter:
+                # Busiest by tasks this worker can run, as in the SQL steal_task
+                where += f" AND to_agent IN ({','.join('?' * len(agent_filter))})"
+                params += tuple(agent_filter)
+            busiest = c.execute(f"SELECT namespace FROM agent_tasks WHERE status = 'pending' AND {where} "
+                                "GROUP BY namespace ORDER BY COUNT(*) DESC LIMIT 1", params).fetchone()
+            if busiest is None:
+                return None
+            return self._claim_where(c, 'namespace = ?', (busiest['namespace'],), worker_id,
+                                     agent_filter, lease_seconds)
+        return self._write(steal)
+
+    def complete(self, task_id: str, worker_id: str, success: bool,
+                 result: Optional[Dict[str, Any]], error: Optional[str]) -> bool:
+        return self._write(lambda c: c.execute(
+            "UPDATE agent_tasks SET status = ?, result = ?, error = ?, completed_at = ?, lease_expires_at = NULL "
+            "WHERE id = ? AND status = 'in_progress' AND claimed_by = ?",
+            ('completed' if success else 'failed', json.dumps(result) if result is not None else None,
+             error, time.time(), task_id, worker_id)
+        ).rowcount == 1)
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn().execute('SELECT status, COUNT(*) AS n FROM agent_tasks GROUP BY status').fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+
+async def run_agent_script(task: Dict[str, Any]) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
+    """Default executor: `uv run` the agent script registered for task['to_agent']
+
+    The run is bounded (dag_executor.agent_timeout): the heartbeat renews every lease this
+    worker holds, so a hung agent would otherwise keep its task forever.
+    """
+    from agent_registry import resolve_agent_script
+    from dag_executor import TIMEOUT_ENV, TIMEOUT_MARGIN, agent_timeout
+
+    script = resolve_agent_script(task['to_agent'])
+    if script is None:
+        return False, None, f"No agent script for {task['to_agent']}"
+
+    timeout = agent_timeout()
+    process = await asyncio.create_subprocess_exec(
+        'uv', 'run', str(script), '--namespace', task['namespace'], '--task-id', str(task['id']),
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        # Subtasks go through the fleet too
+        env={**os.environ, 'SPARC_EXTERNAL_DISPATCH': '1', TIMEOUT_ENV: str(int(timeout))},
+        start_new_session=True
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout + TIMEOUT_MARGIN)
+    except BaseException as e:
+        # The whole group: uv's child interpreter would otherwise keep the pipes open
+        os.killpg(process.pid, signal.SIGKILL)
+        await process.wait()
+        if isinstance(e, asyncio.TimeoutError):
+            return False, None, f"Agent timed out after {timeout:g}s"
+        raise
+    # Agents exit non-zero when their task fails, so the exit code is the outcome
+    if process.returncode == 0:
+        return True, {'output': stdout.decode()[-4000:]}, None
+    return False, None, stderr.decode()[-4000:]
+
+
+class PoolExecutor:
+    """Executor that runs agents on an AgentWorkerPool; agents it can't load go through run_agent_script
+
+    Picklable, so it can be handed to run_local_fleet: the pool starts on first use, in the
+    process that runs the fleet worker.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._pool = None
+
+    def __getstate__(self):
+        return {'size': self.size, '_pool': None}
+
+    async def __call__(self, task: Dict[str, Any]) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
+        from agent_registry import resolve_agent_script
+        from agent_worker_pool import AgentWorkerPool, cli_payload
+        from dag_executor import agent_timeout
+
+        script = resolve_agent_script(task['to_agent'])
+        if script is None:
+            return False, None, f"No agent script for {task['to_agent']}"
+        if self._pool is None:
+            self._pool = AgentWorkerPool(self.size)
+
+        # A timed-out run costs its worker, which the pool kills and replaces
+        response = await self._pool.run_async(script, cli_payload(script, task['namespace'], task_id=task['id']),
+                                              timeout=agent_timeout(), env={'SPARC_EXTERNAL_DISPATCH': '1'})
+        if response.get('load_error'):
+            return await run_agent_script(task)
+        if response['success']:
+            outputs = (response.get('result') or {}).get('outputs', {})
+            return True, {'output': json.dumps(outputs, default=str)[-4000:]}, None
+        return False, None, (response.get('stderr') or response.get('error') or '')[-4000:]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+
+class FleetWorker:
+    """One worker process: serves its home namespaces first, steals from the busiest queue when idle"""
+
+    def __init__(self, store, namespaces: List[str], execute: Execute = run_agent_script,
+                 capacity: int = 2, worker_id: Optional[str] = None,
+                 agent_filter: Optional[List[str]] = None, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+                 heartbeat_interval: Optional[float] = None, poll_interval: float = POLL_INTERVAL,
+                 steal: bool = True):
+        self.store = store
+        self.namespaces = namespaces
+        self.execute = execute
+        self.capacity = capacity
+        self.worker_id = worker_id or f"{default_worker_id()}:{uuid.uuid4().hex[:6]}"
+        self.agent_filter = agent_filter
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval or lease_seconds / 3
+        self.poll_interval = poll_interval
+        self.steal_enabled = steal
+        self.running: Dict[str, asyncio.Task] = {}
+        self.completed = 0
+        self.stolen = 0
+        self._next_namespace = 0
+        self._wake = asyncio.Event()
+
+    def wake(self):
+        """Something may be claimable (task notification, finished task)"""
+        self._wake.set()
+
+    async def run(self, stop: asyncio.Event, idle_exit: Optional[float] = None):
+        """Serve until stop is set (or nothing was claimable for idle_exit seconds)"""
+        await asyncio.to_thread(self.store.register, self.worker_id, self.namespaces, self.capacity)
+        heartbeat = asyncio.create_task(self._heartbeat_loop(stop))
+        idle_since = time.monotonic()
+
+        try:
+            while not stop.is_set():
+                claimed = await self._fill()
+                if claimed or self.running:
+                    idle_since = time.monotonic()
+                elif idle_exit is not None and time.monotonic() - idle_since >= idle_exit:
+                    break
+
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # Running tasks still need their leases renewed until they finish
+            if self.running:
+                await asyncio.gather(*self.running.values(), return_exceptions=True)
+            heartbeat.cancel()
+            await asyncio.to_thread(self.store.deregister, self.worker_id)
+
+    async def _fill(self) -> int:
+        claimed = 0
+        while len(self.running) < self.capacity:
+            task = await asyncio.to_thread(self._claim_one)
+            if task is None:
+                break
+            claimed += 1
+            self.running[task['id']] = asyncio.create_task(self._run_task(task))
+        return claimed
+
+    def _claim_one(self) -> Optional[Dict[str, Any]]:
+        # Rotate the starting namespace so home namespaces share this worker fairly
+        count = len(self.namespaces)
+        for offset in range(count):
+            namespace = self.namespaces[(self._next_namespace + offset) % count]
+            task = self.store.claim(namespace, self.worker_id, self.agent_filter, self.lease_seconds)
+            if task:
+                self._next_namespace = (self._next_namespace + offset + 1) % count
+                return task
+
+        if not self.steal_enabled:
+            return None
+        task = self.store.steal(self.worker_id, self.namespaces, self.agent_filter, self.lease_seconds)
+        if task:
+            self.stolen += 1
+            record_event('task_stolen', task['namespace'], worker_id=self.worker_id, to_agent=task['to_agent'])
+        return task
+
+    async def _run_task(self, task: Dict[str, Any]):
+        try:
+            try:
+                success, result, error = await self.execute(task)
+            except Exception as e:
+                success, result, error = False, None, f"{type(e).__name__}: {e}"
+
+            kept_lease = await asyncio.to_thread(self.store.complete, task['id'], self.worker_id,
+                                                 success, result, error)
+            if not kept_lease:
+                # Lease expired and the task was reclaimed; its new owner's result wins
+                record_event('lease_lost', task['namespace'], worker_id=self.worker_id, task_id=task['id'])
+            self.completed += 1
+        finally:
+            self.running.pop(task['id'], None)
+            self.wake()
+
+    async def _heartbeat_loop(self, stop: asyncio.Event):
+        while not stop.is_set():
+            try:
+                await asyncio.to_thread(self.store.heartbeat, self.worker_id, len(self.running), self.lease_seconds)
+                reclaimed = await asyncio.to_thread(self.store.reclaim_expired)
+                if reclaimed:
+                    self.wake()
+            except Exception as e:
+                print(f"Heartbeat failed for {self.worker_id}: {e}", file=sys.stderr)
+            await asyncio.sleep(self.heartbeat_interval)
+
+
+def _local_worker_main(store_path: str, namespaces: List[str], execute: Execute, options: Dict[str, Any],
+                       results):
+    store = SQLiteFleetStore(Path(store_path))
+    idle_exit = options.pop('idle_exit', None)
+    worker = FleetWorker(store, namespaces, execute, **options)
+
+    async def serve():
+        await worker.run(asyncio.Event(), idle_exit=idle_exit)
+
+    try:
+        asyncio.run(serve())
+    finally:
+        if hasattr(execute, 'close'):
+            execute.close()
+    results.put({'worker_id': worker.worker_id, 'completed': worker.completed, 'stolen': worker.stolen})
+
+
+def run_local_fleet(store_path: Path, worker_namespaces: List[List[str]], execute: Execute = run_agent_script,
+                    idle_exit: float = 5.0, **options) -> List[Dict[str, Any]]:
+    """Multi-process fleet on this machine sharing a SQLite store; returns per-worker stats once all go idle"""
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=_local_worker_main,
+                    args=(str(store_path), namespaces, execute, {**options, 'idle_exit': idle_exit}, results))
+        for namespaces in worker_namespaces
+    ]
+    for process in processes:
+        process.start()
+    stats = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SPARC fleet worker")
+    parser.add_argument('--namespace', action='append', default=[], help='Home namespace (repeatable)')
+    parser.add_argument('--capacity', type=int, default=2, help='Concurrent tasks on this worker')
+    parser.add_argument('--lease', type=int, default=DEFAULT_LEASE_SECONDS, help='Lease length in seconds')
+    parser.add_argument('--no-steal', action='store_true', help='Only serve the home namespaces')
+    parser.add_argument('--local', type=int, default=0,
+                        help='Run N local worker processes on a SQLite store. Agents still load their task '
+                             'from Supabase by id, so this only works for tasks that also exist there')
+    parser.add_argument('--store', default='.sparc/fleet.db', help='SQLite store for --local')
+    parser.add_argument('--pool', type=int, default=0,
+                        help='Run agents on N warm workers per fleet worker instead of a uv run each')
+    args = parser.parse_args()
+
+    options = {'capacity': args.capacity, 'lease_seconds': args.lease, 'steal': not args.no_steal}
+    execute = PoolExecutor(args.pool) if args.pool > 0 else run_agent_script
+
+    if args.local:
+        homes = args.namespace or ['default']
+        worker_namespaces = [[homes[i % len(homes)]] for i in range(args.local)]
+        for stats in run_local_fleet(Path(args.store), worker_namespaces, execute, **options):
+            print(f"{stats['worker_id']}: {stats['completed']} tasks ({stats['stolen']} stolen)")
+        return
+
+    if not args.namespace:
+        parser.error('--namespace is required (or use --local)')
+
+    from supabase import create_client
+    from dotenv import load_dotenv
+    from task_dispatcher import TASK_CHANNEL, get_notifier
+
+    load_dotenv()
+    store = SupabaseFleetStore(create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY')))
+    worker = FleetWorker(store, args.namespace, execute, **options)
+
+    async def serve():
+        stop = asyncio.Event()
+
+        async def listen():
+            # Any task change may make work claimable; the slow poll covers missed notifications
+            async for _ in get_notifier().listen([TASK_CHANNEL]):
+                worker.wake()
+
+        listener = asyncio.create_task(listen())
+        try:
+            await worker.run(stop)
+        finally:
+            listener.cancel()
+
+    print(f"Fleet worker {worker.worker_id} serving {', '.join(args.namespace)}")
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if isinstance(execute, PoolExecutor):
+            execute.close()
+
+
+if __name__ == "__main__":
+    main()
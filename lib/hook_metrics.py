@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+SPARC Hook Metrics - Compact local metrics log for Claude Code hooks
+Appends one JSON line per hook event so counters can be derived offline
+
+The log rotates once it passes SPARC_METRICS_MAX_MB (default 20): the current file
+becomes .1, older ones shift up and everything past ROTATE_KEEP is dropped.
+Readers include the rotated files.
+"""
+
+import fcntl
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+METRICS_LOG = Path('.sparc/logs/hook_metrics.jsonl')
+MAX_MB_ENV = 'SPARC_METRICS_MAX_MB'
+DEFAULT_MAX_MB = 20
+ROTATE_KEEP = 3
+
+
+def _rotated(path: Path, n: int) -> Path:
+    return path.with_name(f"{path.name}.{n}")
+
+
+def _rotate_if_needed(path: Path):
+    max_bytes = float(os.getenv(MAX_MB_ENV, DEFAULT_MAX_MB)) * 1024 * 1024
+    try:
+        if path.stat().st_size < max_bytes:
+            return
+    except FileNotFoundError:
+        return
+
+    # One process rotates; the others see the fresh file when they re-check under the lock
+    with open(path.with_name(f".{path.name}.lock"), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if not path.exists() or path.stat().st_size < max_bytes:
+                return
+            for n in range(ROTATE_KEEP - 1, 0, -1):
+                if _rotated(path, n).exists():
+                    os.replace(_rotated(path, n), _rotated(path, n + 1))
+            os.replace(path, _rotated(path, 1))
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def record_event(event: str, namespace: str, log_path: Optional[Path] = None, **fields: Any):
+    """Append a single metrics event (never raises)"""
+    try:
+        path = log_path or METRICS_LOG
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _rotate_if_needed(path)
+
+        entry = {'ts': round(time.time(), 3), 'event': event, 'namespace': namespace}
+        entry.update(fields)
+
+        # Single short write in append mode keeps concurrent hooks from interleaving
+        with open(path, 'a') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+    except Exception:
+        pass  # Metrics must never break the hook
+
+
+def count_events(event: str, namespace: Optional[str] = None, log_path: Optional[Path] = None) -> int:
+    """Count recorded events of a given kind"""
+    return sum(1 for _ in iter_events(event, namespace, log_path))
+
+
+def iter_events(event: Optional[str] = None, namespace: Optional[str] = None,
+                log_path: Optional[Path] = None, since: Optional[float] = None):
+    """Iterate recorded events, optionally filtered by kind, namespace and start time"""
+    path = log_path or METRICS_LOG
+    files = [_rotated(path, n) for n in range(ROTATE_KEEP, 0, -1)] + [path]
+
+    for file_path in files:  # Oldest first
+        try:
+            f = open(file_path)
+        except FileNotFoundError:
+            continue
+        with f:
+            for line in f:
+                try:
+                    entry: Dict[str, Any] = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+                if event and entry.get('event') != event:
+                    continue
+                if namespace and entry.get('namespace') != namespace:
+                    continue
+                if since and entry.get('ts', 0) < since:
+                    continue
+
+                yield entry
+
+
+class HookTimer:
+    """Collects named timing spans for one hook invocation
+
+    started: perf_counter() taken at the top of the hook script, before its heavy
+    imports; the time up to now is recorded as the 'imports' span and counts in total.
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        now = time.perf_counter()
+        self.started = started if started is not None else now
+        self.spans: Dict[str, float] = {}
+        if started is not None:
+            self.spans['imports'] = round((now - started) * 1000, 3)
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.spans[name] = round(self.spans.get(name, 0.0) + elapsed_ms, 3)
+
+    def flush(self, namespace: str, tool_name: Optional[str], log_path: Optional[Path] = None, **fields: Any):
+        """Write all spans plus total wall time as a single 'hook_timing' event"""
+        total_ms = round((time.perf_counter() - self.started) * 1000, 3)
+        record_event('hook_timing', namespace, log_path=log_path,
+                     tool=tool_name or 'unknown', spans=self.spans, total_ms=total_ms, **fields)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize_timings(window_seconds: Optional[float] = None, namespace: Optional[str] = None,
+                      log_path: Optional[Path] = None) -> Dict[Tuple[str, str], Dict[str, float]]:
+    """p50/p95/p99 per (tool, span) over the time window; tool 'ALL' aggregates every tool"""
+    since = time.time() - window_seconds if window_seconds else None
+    samples: Dict[Tuple[str, str], List[float]] = {}
+
+    for entry in iter_events('hook_timing', namespace, log_path, since):
+        tool = entry.get('tool', 'unknown')
+        spans = dict(entry.get('spans') or {})
+        spans['total'] = entry.get('total_ms', 0.0)
+
+        for span_name, ms in spans.items():
+            for key in ((tool, span_name), ('ALL', span_name)):
+                samples.setdefault(key, []).append(ms)
+
+    return {
+        key: {
+            'count': len(values),
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+        }
+        for key, values in sorted(samples.items())
+    }
+
+
+def _summarize_waits(event: str, key_field: str, default_key: str, window_seconds: Optional[float],
+                     namespace: Optional[str], log_path: Optional[Path]) -> Dict[str, Dict[str, float]]:
+    since = time.time() - window_seconds if window_seconds else None
+    samples: Dict[str, List[float]] = {}
+
+    for entry in iter_events(event, namespace, log_path, since):
+        samples.setdefault(entry.get(key_field, default_key), []).append(entry.get('wait_ms', 0.0))
+
+    return {
+        key: {
+            'count': len(values),
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+        }
+        for key, values in sorted(samples.items())
+    }
+
+
+def summarize_queue_waits(window_seconds: Optional[float] = None, namespace: Optional[str] = None,
+                          log_path: Optional[Path] = None) -> Dict[str, Dict[str, float]]:
+    """p50/p95/p99 queue wait (ms) per scheduling class from 'task_wait' events"""
+    return _summarize_waits('task_wait', 'task_class', 'standard', window_seconds, namespace, log_path)
+
+
+def summarize_claude_waits(window_seconds: Optional[float] = None, namespace: Optional[str] = None,
+                           log_path: Optional[Path] = None) -> Dict[str, Dict[str, float]]:
+    """p50/p95/p99 Claude governor wait (ms) per agent from 'claude_wait' events"""
+    return _summarize_waits('claude_wait', 'agent', 'unknown', window_seconds, namespace, log_path)
+
+
+def summarize_prefix_reuse(window_seconds: Optional[float] = None, namespace: Optional[str] = None,
+                           log_path: Optional[Path] = None, cache_ttl: float = 300.0) -> Dict[str, Dict[str, float]]:
+    """Per agent: calls whose prompt prefix was already sent within cache_ttl ('prompt_prefix' events)
+
+    That is an upper bound on provider prompt-cache hits; reusable_pct is the share of
+    prompt tokens such hits would not have to re-process.
+    """
+    since = time.time() - window_seconds if window_seconds else None
+    last_sent: Dict[Tuple[str, str], float] = {}
+    stats: Dict[str, Dict[str, float]] = {}
+
+    for entry in iter_events('prompt_prefix', namespace, log_path, since):
+        agent = entry.get('agent', 'unknown')
+        row = stats.setdefault(agent, {'calls': 0, 'prefixes': 0, 'hits': 0,
+                                       'prompt_tokens': 0, 'reusable_tokens': 0})
+        key = (agent, entry.get('prefix_hash', ''))
+        previous = last_sent.get(key)
+
+        row['calls'] += 1
+        row['prompt_tokens'] += entry.get('prompt_tokens', 0)
+        if previous is None:
+            row['prefixes'] += 1
+        if previous is not None and entry.get('ts', 0) - previous <= cache_ttl:
+            row['hits'] += 1
+            row['reusable_tokens'] += entry.get('prefix_tokens', 0)
+        last_sent[key] = entry.get('ts', 0)
+
+    for row in stats.values():
+        row['hit_rate'] = row['hits'] / row['calls'] if row['calls'] else 0.0
+        row['reusable_pct'] = 100 * row['reusable_tokens'] / row['prompt_tokens'] if row['prompt_tokens'] else 0.0
+    return dict(sorted(stats.items()))
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+SPARC Intent Queue - Bounded on-disk queue for background intent extraction
+Hooks enqueue and return immediately; a single local worker drains the queue in batches
+
+The same worker also drains the hook's project snapshot deltas (kind 'snapshot'),
+publishing everything pending as one snapshot version.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from hook_metrics import record_event
+
+QUEUE_DIR = Path('.sparc/queue')
+INTENT_KIND = 'intents'
+SNAPSHOT_KIND = 'snapshot'
+WORKER_SCRIPT = Path(__file__).parent / 'intent_worker.py'
+
+DEFAULT_MAX_PENDING = 200
+DEFAULT_COALESCE_WINDOW = 2.0  # seconds an entry must stay unchanged before extraction
+
+
+class IntentQueue:
+    """One file per source path, so repeated edits to the same file coalesce into one entry"""
+
+    def __init__(self, namespace: str,
+                 queue_dir: Optional[Path] = None,
+                 max_pending: int = DEFAULT_MAX_PENDING,
+                 coalesce_window: float = DEFAULT_COALESCE_WINDOW,
+                 kind: str = INTENT_KIND):
+        self.namespace = namespace
+        self.queue_dir = queue_dir or QUEUE_DIR
+        self.pending_dir = self.queue_dir / kind / namespace
+        self.max_pending = max_pending
+        self.coalesce_window = coalesce_window
+
+    @property
+    def lock_path(self) -> Path:
+        return self.queue_dir / f'intent_worker_{self.namespace}.lock'
+
+    def enqueue(self, file_path: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """Add or replace the pending extraction for file_path; False if the queue is full"""
+        self.pending_dir.mkdir(parents=True, exist_ok=True)
+        entry_path = self.pending_dir / f'{self._key(file_path)}.json'
+
+        if not entry_path.exists() and self.pending_count() >= self.max_pending:
+            record_event('intent_dropped', self.namespace, reason='queue_full')
+            return False
+
+        if entry_path.exists():
+            record_event('intent_coalesced', self.namespace)
+
+        entry = {
+            'file_path': file_path,
+            'content': content,
+            'metadata': metadata or {},
+            'enqueued_at': time.time(),
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.pending_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, entry_path)
+        return True
+
+    def pending_count(self) -> int:
+        if not self.pending_dir.exists():
+            return 0
+        return sum(1 for _ in self.pending_dir.glob('*.json'))
+
+    def take_batch(self, max_items: int = 20) -> List[Dict[str, Any]]:
+        """Claim settled entries (unchanged for coalesce_window) for processing"""
+        if not self.pending_dir.exists():
+            return []
+
+        now = time.time()
+        batch = []
+
+        for entry_path in sorted(self.pending_dir.glob('*.json'), key=lambda p: p.stat().st_mtime):
+            if len(batch) >= max_items:
+                break
+
+            try:
+                if now - entry_path.stat().st_mtime < self.coalesce_window:
+                    continue  # Still being edited - wait for it to settle
+
+                # Rename claims the entry; a newer enqueue for the same file starts a fresh entry
+                claimed_path = entry_path.with_suffix('.processing')
+                os.replace(entry_path, claimed_path)
+
+                entry = json.loads(claimed_path.read_text())
+                entry['_claimed_path'] = str(claimed_path)
+                batch.append(entry)
+            except (OSError, json.JSONDecodeError):
+                continue
+
+        return batch
+
+    def ack(self, entry: Dict[str, Any]):
+        """Remove a processed entry"""
+        try:
+            os.unlink(entry['_claimed_path'])
+        except (KeyError, OSError):
+            pass
+
+    def release(self, entry: Dict[str, Any]):
+        """Return a claimed entry to the pending set for a retry (a newer one for its file wins)"""
+        try:
+            claimed_path = Path(entry['_claimed_path'])
+            pending_path = claimed_path.with_suffix('.json')
+            if not pending_path.exists():
+                os.replace(claimed_path, pending_path)
+            else:
+                claimed_path.unlink()
+        except (KeyError, OSError):
+            pass
+
+    def recover_claimed(self):
+        """Return entries claimed by a crashed worker to the pending set"""
+        if not self.pending_dir.exists():
+            return
+        for claimed_path in self.pending_dir.glob('*.processing'):
+            pending_path = claimed_path.with_suffix('.json')
+            if not pending_path.exists():
+                os.replace(claimed_path, pending_path)
+            else:
+                claimed_path.unlink()
+
+    def worker_running(self) -> bool:
+        """True if a worker currently holds the queue lock"""
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            return False
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()
+
+
+def ensure_worker(namespace: str, queue_dir: Optional[Path] = None):
+    """Start a detached intent worker for the namespace unless one is already running"""
+    queue = IntentQueue(namespace, queue_dir)
+    if queue.worker_running():
+        return
+
+    cmd = [sys.executable, str(WORKER_SCRIPT), '--namespace', namespace]
+    if queue_dir:
+        cmd.extend(['--queue-dir', str(queue_dir)])
+
+    subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,  # Survive the hook process exiting
+        cwd=os.getcwd()
+    )
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#   "supabase>=2.0.0",
+#   "python-dotenv>=1.0.0",
+#   "pydantic>=2.0.0",
+# ]
+# ///
+
+"""
+SPARC Intent Worker - Drains the intent queue in batches
+Started on demand by the PostToolUse hook; exits after a period of inactivity
+
+Pending project snapshot deltas are published together, one RPC per batch instead
+of one per hook call. A batch that fails to publish stays queued and is retried with
+backoff. The snapshot queue is drained even when the intelligence layer
+(bmo_intent_tracker) isn't installed; intents then wait in their queue.
+"""
+
+import argparse
+import asyncio
+import fcntl
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from intent_queue import SNAPSHOT_KIND, IntentQueue
+from hook_metrics import record_event
+from project_snapshot import publish
+
+IDLE_TIMEOUT = 30.0
+POLL_INTERVAL = 0.5
+SNAPSHOT_BATCH = 200
+RETRY_MIN_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+
+async def process_batch(intent_tracker, queue: IntentQueue, batch: List[Dict[str, Any]]):
+    """Run extractions for a batch concurrently on one event loop"""
+    started = time.perf_counter()
+
+    results = await asyncio.gather(*[
+        intent_tracker.extract_intents_from_interaction(
+            entry['content'], 'claude_code_interaction', entry.get('metadata') or {'file_path': entry['file_path']}
+        )
+        for entry in batch
+    ], return_exceptions=True)
+
+    failed = 0
+    for entry, result in zip(batch, results):
+        if isinstance(result, Exception):
+            failed += 1
+        queue.ack(entry)
+
+    record_event('intent_batch', queue.namespace, size=len(batch), failed=failed,
+                 duration_ms=round((time.perf_counter() - started) * 1000, 3),
+                 max_wait_ms=round(max(time.time() - e['enqueued_at'] for e in batch) * 1000, 3))
+
+
+def publish_snapshot_batch(supabase, queue: IntentQueue, batch: List[Dict[str, Any]],
+                           retry_in: float = RETRY_MIN_SECONDS) -> bool:
+    """Publish the pending file deltas as one snapshot version; on failure they stay queued"""
+    started = time.perf_counter()
+    try:
+        version = publish(supabase, queue.namespace, [entry['metadata']['delta'] for entry in batch])
+    except Exception as e:
+        # Dropping them would leave the snapshot silently behind project_memorys
+        for entry in batch:
+            queue.release(entry)
+        record_event('snapshot_publish_failed', queue.namespace, size=len(batch), error=str(e),
+                     retry_in_s=retry_in)
+        return False
+
+    for entry in batch:
+        queue.ack(entry)
+
+    record_event('snapshot_batch', queue.namespace, size=len(batch), version=version,
+                 duration_ms=round((time.perf_counter() - started) * 1000, 3),
+                 max_wait_ms=round(max(time.time() - e['enqueued_at'] for e in batch) * 1000, 3))
+    return True
+
+
+def load_intent_tracker(supabase, namespace: str):
+    """The intelligence layer's tracker, or None where it isn't installed"""
+    try:
+        from bmo_intent_tracker import BMOIntentTracker
+        return BMOIntentTracker(supabase, namespace)
+    except Exception as e:
+        record_event('intent_tracker_unavailable', namespace, error=str(e))
+        return None
+
+
+async def run_worker(queue: IntentQueue, idle_timeout: float, batch_size: int):
+    from supabase import create_client
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+    snapshots = IntentQueue(queue.namespace, queue.queue_dir, kind=SNAPSHOT_KIND)
+    snapshots.recover_claimed()
+    # Snapshot deltas don't need the tracker; without it only the snapshot queue is drained
+    intent_tracker = await asyncio.to_thread(load_intent_tracker, supabase, queue.namespace)
+    if intent_tracker:
+        queue.recover_claimed()
+
+    idle_since = time.monotonic()
+    retry_delay, retry_at = 0.0, 0.0
+
+    while time.monotonic() - idle_since < idle_timeout:
+        batch = queue.take_batch(batch_size) if intent_tracker else []
+        deltas = snapshots.take_batch(SNAPSHOT_BATCH) if time.monotonic() >= retry_at else []
+
+        if batch:
+            await process_batch(intent_tracker, queue, batch)
+        if deltas:
+            next_delay = min(RETRY_MAX_SECONDS, max(RETRY_MIN_SECONDS, retry_delay * 2))
+            if await asyncio.to_thread(publish_snapshot_batch, supabase, snapshots, deltas, next_delay):
+                retry_delay, retry_at = 0.0, 0.0
+            else:
+                retry_delay, retry_at = next_delay, time.monotonic() + next_delay
+
+        pending = snapshots.pending_count() + (queue.pending_count() if intent_tracker else 0)
+        if batch or deltas or pending:
+            idle_since = time.monotonic()  # Busy, or entries are still settling (or awaiting a retry)
+
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SPARC intent extraction worker")
+    parser.add_argument('--namespace', required=True, help='Project namespace')
+    parser.add_argument('--queue-dir', help='Queue directory (default .sparc/queue)')
+    parser.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT, help='Seconds idle before exiting')
+    parser.add_argument('--batch-size', type=int, default=20, help='Maximum extractions per batch')
+    args = parser.parse_args()
+
+    queue = IntentQueue(args.namespace, Path(args.queue_dir) if args.queue_dir else None)
+    queue.lock_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(queue.lock_path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return  # Another worker already owns this namespace
+
+        try:
+            asyncio.run(run_worker(queue, args.idle_timeout, args.batch_size))
+        except Exception as e:
+            record_event('intent_worker_error', args.namespace, error=str(e))
+
+
+if __name__ == "__main__":
+    main()
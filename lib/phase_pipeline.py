@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+SPARC Phase Pipeline - Event-driven phase transitions for the full-workflow runners
+A phase hands over once its orchestrator journals that the subtasks producing its artifacts completed
+
+While the previous phase finishes its review (state scribe, approval request,
+validation), the next phase is already running.
+A file merely existing is not a signal: it may still be half written. Phases without
+a run journal, or without a subtask graph, hand over when their process exits.
+If a phase ultimately fails, phases started speculatively after it are cancelled.
+With a run journal, phase transitions are journaled and phases that completed with
+unchanged artifacts in an earlier attempt of the run are skipped.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+from run_journal import RunJournal
+
+# Artifacts that mark a phase complete, relative to the namespace directory; also the
+# criteria of UberOrchestratorAgent._is_phase_complete
+PHASE_ARTIFACTS = {
+    'goal-clarification': ['docs/Mutual_Understanding_Document.md', 'docs/specifications/constraints_and_anti_goals.md'],
+    'specification': ['docs/specifications/comprehensive_spec.md'],
+    'pseudocode': ['docs/pseudocode/'],
+    'architecture': ['docs/architecture/system_design.md'],
+    'refinement-testing': ['tests/'],
+    'refinement-implementation': ['src/'],
+    'bmo-completion': ['docs/bmo_validation_report.md']
+}
+
+# Runner phase names -> orchestrator phase names
+PHASE_ALIASES = {
+    'testing': 'refinement-testing',
+    'implementation': 'refinement-implementation'
+}
+
+# Orchestrators whose subtask graph produces the phase's artifacts (see dag_executor.run_task_graph)
+PHASE_ORCHESTRATORS = {
+    'specification': 'orchestrator-sparc-specification-phase',
+    'pseudocode': 'orchestrator-sparc-pseudocode-phase',
+    'architecture': 'orchestrator-sparc-architecture-phase',
+    'refinement-implementation': 'orchestrator-sparc-refinement-implementation',
+    'refinement-testing': 'orchestrator-sparc-refinement-testing',
+    'documentation': 'orchestrator-sparc-completion-documentation',
+    'bmo-completion': 'orchestrator-bmo-completion-phase'
+}
+
+HANDOVER_CHECK_INTERVAL = 0.25
+
+
+def artifact_paths(phase: str, namespace: str, base_path: Path) -> List[str]:
+    """Required artifacts for phase; directories keep their trailing slash"""
+    required = PHASE_ARTIFACTS.get(PHASE_ALIASES.get(phase, phase), [])
+    return [str(base_path / namespace / path) + ('/' if path.endswith('/') else '') for path in required]
+
+
+@dataclass
+class PhaseOutcome:
+    phase: str
+    status: str  # completed | failed | cancelled
+    result: Optional[Dict[str, Any]] = None
+    started_at: Optional[float] = None
+    handed_over_at: Optional[float] = None  # next phase released
+    finished_at: Optional[float] = None
+
+
+RunPhase = Callable[[str], Awaitable[Dict[str, Any]]]
+HandoverReady = Callable[[str, float], Awaitable[None]]  # (phase, wall-clock start)
+
+
+class PhasePipeline:
+    """Runs phases in order, overlapping each phase's tail with the next phase's start"""
+
+    def __init__(self, run_phase: RunPhase, phases: List[str], namespace: str, base_path: Path,
+                 on_complete: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 handover_ready: Optional[HandoverReady] = None, journal: Optional[RunJournal] = None):
+        self.run_phase = run_phase
+        self.phases = phases
+        self.namespace = namespace
+        self.base_path = base_path
+        self.on_complete = on_complete
+        self.handover_ready = handover_ready or self._journaled_handover
+        self.journal = journal
+        self.outcomes: Dict[str, PhaseOutcome] = {}
+
+    async def run(self) -> Dict[str, PhaseOutcome]:
+        running: List[tuple] = []  # (phase, task)
+
+        for phase in self.phases:
+            outcome = self.outcomes[phase] = PhaseOutcome(phase, 'running', started_at=time.perf_counter())
+            task = asyncio.create_task(self._run_one(outcome))
+            running.append((phase, task))
+
+            gate = await self._handover(phase, task, running)
+            outcome.handed_over_at = time.perf_counter()
+            if gate == 'failed':
+                break
+
+        # Finish in order; the first failure cancels everything still running after it
+        failed = False
+        for phase, task in running:
+            if failed:
+                if not task.done():
+                    task.cancel()
+                    self.outcomes[phase].status = 'cancelled'
+                continue
+            await asyncio.gather(task, return_exceptions=True)
+            failed = self.outcomes[phase].status != 'completed'
+
+        await asyncio.gather(*(t for _, t in running), return_exceptions=True)
+        for phase in self.phases:
+            self.outcomes.setdefault(phase, PhaseOutcome(phase, 'cancelled'))
+        return self.outcomes
+
+    async def _run_one(self, outcome: PhaseOutcome):
+        if self.journal:
+            done = self.journal.completed_unchanged(outcome.phase)
+            if done:
+                self.journal.record(outcome.phase, 'skipped')
+                outcome.status, outcome.finished_at = 'completed', time.perf_counter()
+                outcome.result = {**done['detail'], 'success': True, 'resumed': True}
+                return
+            self.journal.record(outcome.phase, 'running')
+
+        try:
+            outcome.result = await self.run_phase(outcome.phase)
+            outcome.status = 'completed' if outcome.result.get('success') else 'failed'
+        except asyncio.CancelledError:
+            outcome.status = 'cancelled'
+            raise
+        except Exception as e:
+            outcome.status = 'failed'
+            outcome.result = {'success': False, 'error': str(e)}
+        finally:
+            outcome.finished_at = time.perf_counter()
+            if self.journal:
+                self.journal.record(outcome.phase, outcome.status,
+                                    artifact_paths=artifact_paths(outcome.phase, self.namespace, self.base_path),
+                                    detail={k: v for k, v in (outcome.result or {}).items()
+                                            if k in ('returncode', 'agent_path', 'error')})
+
+        if outcome.status == 'completed' and self.on_complete:
+            self.on_complete(outcome.phase, outcome.result)
+
+    async def _journaled_handover(self, phase: str, since: float):
+        """Return once the phase's orchestrator journals a completed subtask graph after since"""
+        agent_name = PHASE_ORCHESTRATORS.get(PHASE_ALIASES.get(phase, phase))
+        if self.journal is None or agent_name is None:
+            await asyncio.Event().wait()  # No signal; the phase hands over when it exits
+
+        while True:
+            last = self.journal.last_transition(agent_name)
+            if last and last['status'] == 'completed' and last['ts'] >= since:
+                return
+            await asyncio.sleep(HANDOVER_CHECK_INTERVAL)
+
+    async def _handover(self, phase: str, task: asyncio.Task, running: List[tuple]) -> str:
+        """'artifacts' when the next phase may start early, 'done' on exit, 'failed' on any failure"""
+        watcher = asyncio.create_task(self.handover_ready(phase, time.time()))
+        earlier = [t for p, t in running if p != phase and not t.done()]
+
+        try:
+            while True:
+                done, _ = await asyncio.wait({task, watcher, *earlier}, return_when=asyncio.FIRST_COMPLETED)
+                if any(self.outcomes[p].status == 'failed' for p, t in running if t.done()):
+                    return 'failed'
+                if task in done:
+                    return 'done'
+                if watcher in done:
+                    if watcher.exception() is None:
+                        return 'artifacts'
+                    # Handover checks broke; fall back to waiting for the process
+                    watcher = asyncio.create_task(asyncio.Event().wait())
+                earlier = [t for t in earlier if not t.done()]
+        finally:
+            watcher.cancel()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+SPARC Project Snapshot - Versioned, incrementally maintained project state document
+File index, per-type counts, current phase, latest artifacts and last_updated in one row
+
+Writers (state scribe, post-tool-use hook) send deltas to apply_snapshot_deltas
+(database/sql/project_snapshot.sql); each call is one new version. Files are keyed
+by their path relative to the project root (the working directory), however the
+writer named them. The hook doesn't publish itself: its deltas go through the intent
+queue and the intent worker publishes whatever is pending as one version. Readers keep a
+local copy under .sparc/snapshots/ and, on the next read, fetch only the deltas
+after the version they hold and replay them here with the same rules as the SQL
+function. A gap in the versions (pruned deltas) or a 'reset' delta falls back to
+one full fetch.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from hook_metrics import record_event
+
+SNAPSHOT_TABLE = 'sparc_project_snapshots'
+DELTA_TABLE = 'sparc_snapshot_deltas'
+SNAPSHOT_DIR = Path('.sparc/snapshots')
+LATEST_ARTIFACTS = 20
+MAX_DELTAS = 2000  # Beyond this a full fetch is cheaper than replaying
+
+
+def empty_snapshot() -> Dict[str, Any]:
+    return {'files': {}, 'counts': {}, 'current_phase': None, 'latest_artifacts': [], 'last_updated': None}
+
+
+def snapshot_path(file_path: str, root: Optional[Path] = None) -> str:
+    """Snapshot key for a file: relative to the project root, '/'-separated"""
+    path = Path(file_path)
+    if path.is_absolute():
+        try:
+            path = path.resolve().relative_to(Path(root or Path.cwd()).resolve())
+        except ValueError:
+            return path.as_posix()  # Outside the project; keep it absolute
+    return Path(os.path.normpath(path)).as_posix()
+
+
+def file_delta(file_path: str, **entry: Any) -> Dict[str, Any]:
+    """Upsert delta; entry fields (memory_type, version, content_hash, ...) merge into the file's entry"""
+    return {'op': 'upsert', 'file_path': snapshot_path(file_path),
+            'entry': {k: v for k, v in entry.items() if v is not None}}
+
+
+def delete_delta(file_path: str) -> Dict[str, Any]:
+    return {'op': 'delete', 'file_path': snapshot_path(file_path)}
+
+
+def publish(supabase, namespace: str, deltas: List[Dict[str, Any]], phase: Optional[str] = None) -> Optional[int]:
+    """Apply deltas (and the current phase) as one new snapshot version; returns the version"""
+    if not deltas and not phase:
+        return None
+    result = supabase.rpc('apply_snapshot_deltas', {
+        'p_namespace': namespace,
+        'p_deltas': deltas,
+        'p_phase': phase
+    }).execute()
+    return result.data
+
+
+def rebuild(supabase, namespace: str, root: Optional[Path] = None) -> int:
+    """Rebuild the snapshot from project_memorys, keyed like the deltas; returns the version"""
+    result = supabase.rpc('rebuild_project_snapshot', {
+        'p_namespace': namespace,
+        'p_root': Path(root or Path.cwd()).resolve().as_posix()
+    }).execute()
+    return result.data
+
+
+def apply_delta(snapshot: Dict[str, Any], delta: Dict[str, Any]):
+    """Replay one delta row on a local copy (mirrors apply_snapshot_deltas)"""
+    op = delta.get('op', 'upsert')
+    if op == 'phase':
+        snapshot['current_phase'] = (delta.get('entry') or {}).get('current_phase')
+        return
+
+    path = delta['file_path']
+    files, counts = snapshot['files'], snapshot['counts']
+    old_entry = files.get(path)
+    if old_entry is not None:
+        old_type = old_entry.get('memory_type') or 'unknown'
+        counts[old_type] = max(0, counts.get(old_type, 0) - 1)
+
+    latest = [p for p in snapshot['latest_artifacts'] if p != path]
+    if op == 'delete':
+        files.pop(path, None)
+    else:
+        merged = {**(old_entry or {}), **(delta.get('entry') or {})}
+        files[path] = merged
+        new_type = merged.get('memory_type') or 'unknown'
+        counts[new_type] = counts.get(new_type, 0) + 1
+        latest = [path] + latest[:LATEST_ARTIFACTS - 1]
+    snapshot['latest_artifacts'] = latest
+
+
+class SnapshotClient:
+    """Reads a namespace's snapshot, transferring only what changed since the local copy"""
+
+    def __init__(self, supabase, namespace: str, cache_dir: Path = SNAPSHOT_DIR):
+        self.supabase = supabase
+        self.namespace = namespace
+        self.cache_path = Path(cache_dir) / f"{namespace}.json"
+
+    def _load_local(self) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self.cache_path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _save_local(self, held: Dict[str, Any]):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_path.parent, prefix=f".{self.cache_path.name}.")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(held, f, default=str)
+        os.replace(tmp, self.cache_path)
+
+    def fetch_full(self) -> Dict[str, Any]:
+        result = self.supabase.table(SNAPSHOT_TABLE).select('version, snapshot').eq(
+            'namespace', self.namespace
+        ).execute()
+        if not result.data:
+            return {'version': 0, 'snapshot': empty_snapshot()}
+        return {'version': result.data[0]['version'], 'snapshot': result.data[0]['snapshot']}
+
+    def changes_since(self, version: int) -> Optional[List[Dict[str, Any]]]:
+        """Delta rows after version, oldest first; None when they can't bring version up to date"""
+        rows = self.supabase.table(DELTA_TABLE).select('version, op, file_path, entry, created_at').eq(
+            'namespace', self.namespace
+        ).gt('version', version).order('id').limit(MAX_DELTAS + 1).execute().data or []
+
+        if len(rows) > MAX_DELTAS:
+            return None
+        if rows and rows[0]['version'] != version + 1:
+            return None  # Deltas in between were pruned
+        if any(row['op'] == 'reset' for row in rows):
+            return None
+        return rows
+
+    def get(self) -> Dict[str, Any]:
+        """Current snapshot document plus its 'version'"""
+        held = self._load_local()
+        mode = 'full'
+        if held is not None:
+            rows = self.changes_since(held['version'])
+            if rows is not None:
+                for row in rows:
+                    apply_delta(held['snapshot'], row)
+                if rows:
+                    held['version'] = rows[-1]['version']
+                    held['snapshot']['last_updated'] = rows[-1].get('created_at')
+                mode = f"delta:{len(rows)}"
+
+        if mode == 'full':
+            held = self.fetch_full()
+        if mode != 'delta:0':
+            self._save_local(held)
+
+        record_event('project_snapshot', self.namespace, mode=mode.split(':')[0], version=held['version'],
+                     files=len(held['snapshot'].get('files', {})))
+        return {**held['snapshot'], 'version': held['version']}
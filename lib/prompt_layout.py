@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+SPARC Prompt Layout - Byte-stable prompt prefixes for provider-side prompt caching
+Static blocks (role, instructions, rarely changing project docs) first, task data last
+
+Provider prompt caches match on an exact prefix, so the stable blocks are normalized
+(trailing whitespace, surrounding blank lines) and always emitted in the same order
+before anything task-specific. Each rendered prompt records a 'prompt_prefix' event
+with the prefix hash and size; hook_metrics.summarize_prefix_reuse turns those into
+the cache-hit potential per agent.
+"""
+
+import hashlib
+import os
+from typing import List, Optional, Tuple
+
+from claude_governor import estimate_tokens
+from hook_metrics import record_event
+
+BLOCK_SEPARATOR = '\n\n'
+
+
+def normalize_block(text: str) -> str:
+    """Same content -> same bytes, however the block was indented or padded"""
+    return '\n'.join(line.rstrip() for line in text.strip('\n').splitlines()).strip()
+
+
+class PromptLayout:
+    """Collects prompt blocks; render() emits every stable block before any variable one"""
+
+    def __init__(self, agent_name: str, namespace: str = 'default'):
+        self.agent_name = agent_name
+        self.namespace = namespace
+        self._stable: List[Tuple[str, str]] = []
+        self._variable: List[Tuple[str, str]] = []
+        self.prefix_hash: Optional[str] = None
+        self.prefix_tokens = 0
+
+    def stable(self, name: str, text: str) -> 'PromptLayout':
+        """Block that is identical across calls (role, instructions, project docs)"""
+        text = normalize_block(text)
+        if text:
+            self._stable.append((name, text))
+        return self
+
+    def variable(self, name: str, text: str) -> 'PromptLayout':
+        """Block that changes per task; always placed after the stable prefix"""
+        text = text.strip('\n')
+        if text.strip():
+            self._variable.append((name, text))
+        return self
+
+    def render(self, record: bool = True) -> str:
+        prefix = BLOCK_SEPARATOR.join(text for _, text in self._stable)
+        suffix = BLOCK_SEPARATOR.join(text for _, text in self._variable)
+        prompt = prefix + BLOCK_SEPARATOR + suffix if prefix and suffix else prefix or suffix
+
+        self.prefix_hash = hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+        self.prefix_tokens = estimate_tokens(prefix) if prefix else 0
+        if record:
+            record_event('prompt_prefix', self.namespace, agent=self.agent_name,
+                         prefix_hash=self.prefix_hash[:16], prefix_tokens=self.prefix_tokens,
+                         prompt_tokens=estimate_tokens(prompt), blocks=[name for name, _ in self._stable],
+                         run_id=os.environ.get('SPARC_RUN_ID'))
+        return prompt
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+SPARC Run Journal - Durable record of workflow runs for crash-safe resume
+Every phase and subtask transition is journaled with the hashes of its artifacts
+
+The journal is a local SQLite database (.sparc/runs.db), shared by the workflow
+runner and the orchestrator processes it starts (they find the run through
+SPARC_RUN_ID). With SPARC_JOURNAL_MIRROR=1, transitions are also mirrored to the
+sparc_run_journal table. On resume, a node whose last transition is 'completed' and
+whose artifacts still hash the same is skipped; everything else runs again.
+"""
+
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from content_hash_index import hash_path
+from context_cache import ContextCache
+
+JOURNAL_DB = Path('.sparc/runs.db')
+RUN_ID_ENV = 'SPARC_RUN_ID'
+MIRROR_ENV = 'SPARC_JOURNAL_MIRROR'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    workflow TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS transitions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    node TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    artifacts TEXT,
+    detail TEXT,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transitions_run_node ON transitions (run_id, node, id);
+"""
+
+
+def new_run_id() -> str:
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+
+
+def hash_artifacts(paths: List[str]) -> Dict[str, Optional[str]]:
+    return {path: hash_path(path) for path in paths}
+
+
+class RunJournal:
+    """Append-only transition log for one run"""
+
+    def __init__(self, run_id: str, db_path: Optional[Path] = None, mirror=None):
+        self.run_id = run_id
+        self.db_path = db_path or JOURNAL_DB
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.mirror = mirror  # Supabase client, optional
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def start(cls, namespace: str, workflow: str, params: Optional[Dict[str, Any]] = None,
+              db_path: Optional[Path] = None, mirror=None) -> 'RunJournal':
+        """Open a journal for a brand-new run"""
+        journal = cls(new_run_id(), db_path, mirror)
+        with journal._lock, journal._conn:
+            journal._conn.execute(
+                'INSERT INTO runs (run_id, namespace, workflow, status, params, started_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (journal.run_id, namespace, workflow, 'running', json.dumps(params or {}), time.time())
+            )
+        return journal
+
+    @classmethod
+    def resume(cls, run_id: str, db_path: Optional[Path] = None, mirror=None) -> 'RunJournal':
+        """Reopen an existing run; raises KeyError if it was never journaled"""
+        journal = cls(run_id, db_path, mirror)
+        if journal.run_info() is None:
+            raise KeyError(f"Unknown run: {run_id}")
+        with journal._lock, journal._conn:
+            journal._conn.execute('UPDATE runs SET status = ?, finished_at = NULL WHERE run_id = ?',
+                                  ('running', run_id))
+        return journal
+
+    @classmethod
+    def from_env(cls, mirror=None) -> Optional['RunJournal']:
+        """The journal of the run this process belongs to, if any"""
+        run_id = os.environ.get(RUN_ID_ENV)
+        if not run_id:
+            return None
+        if os.environ.get(MIRROR_ENV) != '1':
+            mirror = None
+        try:
+            return cls(run_id, mirror=mirror)
+        except sqlite3.Error:
+            return None
+
+    def run_info(self) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            'SELECT namespace, workflow, status, params, started_at, finished_at FROM runs WHERE run_id = ?',
+            (self.run_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'run_id': self.run_id, 'namespace': row[0], 'workflow': row[1], 'status': row[2],
+                'params': json.loads(row[3] or '{}'), 'started_at': row[4], 'finished_at': row[5]}
+
+    def record(self, node: str, status: str, kind: str = 'phase', artifact_paths: Optional[List[str]] = None,
+               detail: Optional[Dict[str, Any]] = None):
+        """Journal one transition (running | completed | failed | cancelled | skipped)"""
+        artifacts = hash_artifacts(artifact_paths) if artifact_paths else {}
+        entry = (self.run_id, node, kind, status, json.dumps(artifacts),
+                 json.dumps(detail or {}, default=str), time.time())
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO transitions (run_id, node, kind, status, artifacts, detail, ts) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                entry
+            )
+        self._mirror(entry)
+
+    def finish(self, status: str):
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE runs SET status = ?, finished_at = ? WHERE run_id = ?',
+                               (status, time.time(), self.run_id))
+        # Shared agent context is only valid within the run; a resume refetches it
+        ContextCache(run_id=self.run_id).clear_run()
+
+    def last_transition(self, node: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            'SELECT status, artifacts, detail, ts FROM transitions WHERE run_id = ? AND node = ? '
+            'AND status != ? ORDER BY id DESC LIMIT 1',
+            (self.run_id, node, 'skipped')
+        ).fetchone()
+        if row is None:
+            return None
+        return {'status': row[0], 'artifacts': json.loads(row[1] or '{}'),
+                'detail': json.loads(row[2] or '{}'), 'ts': row[3]}
+
+    def completed_unchanged(self, node: str) -> Optional[Dict[str, Any]]:
+        """The completing transition if node finished and its artifacts are unchanged, else None"""
+        last = self.last_transition(node)
+        if not last or last['status'] != 'completed':
+            return None
+        # An artifact that was missing when the node completed proves nothing; run it again
+        if any(digest is None for digest in last['artifacts'].values()):
+            return None
+        if hash_artifacts(list(last['artifacts'])) != last['artifacts']:
+            return None
+        return last
+
+    def nodes(self) -> Dict[str, str]:
+        """node -> latest status, in first-seen order"""
+        rows = self._conn.execute(
+            'SELECT node, status FROM transitions WHERE run_id = ? AND status != ? ORDER BY id',
+            (self.run_id, 'skipped')
+        ).fetchall()
+        latest: Dict[str, str] = {}
+        for node, status in rows:
+            latest[node] = status
+        return latest
+
+    def _mirror(self, entry: tuple):
+        if self.mirror is None:
+            return
+        try:
+            self.mirror.table('sparc_run_journal').insert({
+                'run_id': entry[0], 'node': entry[1], 'kind': entry[2], 'status': entry[3],
+                'artifacts': json.loads(entry[4]), 'detail': json.loads(entry[5]),
+                'recorded_at': datetime.fromtimestamp(entry[6]).isoformat()
+            }).execute()
+        except Exception:
+            self.mirror = None  # The local journal stays authoritative
+
+    def close(self):
+        self._conn.close()
+
+
+def open_run(namespace: str, workflow: str, resume_run_id: Optional[str] = None,
+             params: Optional[Dict[str, Any]] = None, mirror=None) -> RunJournal:
+    """Start (or resume) a run and export its id to child processes via SPARC_RUN_ID"""
+    if os.environ.get(MIRROR_ENV) != '1':
+        mirror = None
+    if resume_run_id:
+        journal = RunJournal.resume(resume_run_id, mirror=mirror)
+    else:
+        journal = RunJournal.start(namespace, workflow, params, mirror=mirror)
+    os.environ[RUN_ID_ENV] = journal.run_id
+    return journal
+
+
+def list_runs(db_path: Optional[Path] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """Most recent runs first"""
+    path = db_path or JOURNAL_DB
+    if not path.exists():
+        return []
+    conn = sqlite3.connect(str(path), timeout=30)
+    try:
+        rows = conn.execute(
+            'SELECT run_id, namespace, workflow, status, started_at, finished_at FROM runs '
+            'ORDER BY started_at DESC LIMIT ?', (limit,)
+        ).fetchall()
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+    return [dict(zip(('run_id', 'namespace', 'workflow', 'status', 'started_at', 'finished_at'), row))
+            for row in rows]
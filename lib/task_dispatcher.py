@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+SPARC Task Dispatcher - Push-based agent wakeups from agent_tasks / approval_requests changes
+Listens on the NOTIFY channels from database/sql/task_dispatch.sql; polling is only a slow safety net
+"""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Callable, Awaitable, AsyncIterator, Iterable
+
+from hook_metrics import record_event
+
+TASK_CHANNEL = 'sparc_agent_tasks'
+APPROVAL_CHANNEL = 'sparc_approval_requests'
+CHANNELS = (TASK_CHANNEL, APPROVAL_CHANNEL)
+# Pseudo-channel: the listen connection was re-established and notifications may have been missed
+RECONNECTED = 'sparc_listen_reconnected'
+
+TERMINAL_STATUSES = frozenset({'completed', 'failed', 'cancelled'})
+DEFAULT_SAFETY_POLL_INTERVAL = 60.0
+RECONNECT_MIN_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 60.0
+
+TaskHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+ApprovalHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class Notification:
+    channel: str
+    payload: Dict[str, Any]
+    received_at: float
+
+
+class InMemoryNotifier:
+    """Local stand-in for Postgres LISTEN/NOTIFY (tests, single-process runs)"""
+
+    def __init__(self):
+        self._subscribers: List[tuple] = []  # (loop, queue, channels)
+
+    def notify(self, channel: str, payload: Dict[str, Any]):
+        """Deliver to every listener on channel; safe to call from any thread"""
+        for loop, queue, channels in list(self._subscribers):
+            if channel in channels:
+                notification = Notification(channel, dict(payload), time.perf_counter())
+                loop.call_soon_threadsafe(queue.put_nowait, notification)
+
+    async def listen(self, channels: Iterable[str] = CHANNELS) -> AsyncIterator[Notification]:
+        queue: asyncio.Queue = asyncio.Queue()
+        subscriber = (asyncio.get_running_loop(), queue, frozenset(channels))
+        self._subscribers.append(subscriber)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.remove(subscriber)
+
+
+class PostgresNotifier:
+    """LISTEN on a direct Postgres connection; the socket is watched by the event loop, not polled"""
+
+    def __init__(self, dsn: Optional[str] = None, namespace: str = 'default'):
+        self.dsn = dsn or database_url()
+        if not self.dsn:
+            raise ValueError("SUPABASE_DB_URL or DATABASE_URL is required for Postgres notifications")
+        self.namespace = namespace  # Only labels dispatch_listen_error events
+
+    def _connect(self):
+        import psycopg2
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        return conn
+
+    def notify(self, channel: str, payload: Dict[str, Any]):
+        """Publish a notification (normally the triggers do this)"""
+        conn = self._connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", (channel, json.dumps(payload, default=str)))
+        finally:
+            conn.close()
+
+    def _connect_listening(self, channels: List[str]):
+        conn = self._connect()
+        with conn.cursor() as cursor:
+            for channel in channels:
+                cursor.execute(f'LISTEN "{channel}"')
+        return conn
+
+    async def listen(self, channels: Iterable[str] = CHANNELS) -> AsyncIterator[Notification]:
+        """Notifications on channels until closed
+
+        A dropped connection is re-established with exponential backoff (LISTEN is
+        re-issued) and announced with a RECONNECTED notification, since anything sent
+        while it was down was missed.
+        """
+        import psycopg2
+
+        loop = asyncio.get_running_loop()
+        channels = list(channels)
+        queue: asyncio.Queue = asyncio.Queue()
+        backoff = RECONNECT_MIN_SECONDS
+        conn, fileno, reconnecting = None, None, False
+
+        def drain():
+            try:
+                conn.poll()
+            except psycopg2.Error as e:
+                # Stop watching the dead socket; the listen loop reconnects
+                loop.remove_reader(fileno)
+                queue.put_nowait(e)
+                return
+            while conn.notifies:
+                raw = conn.notifies.pop(0)
+                try:
+                    payload = json.loads(raw.payload)
+                except (TypeError, ValueError):
+                    payload = {'raw': raw.payload}
+                queue.put_nowait(Notification(raw.channel, payload, time.perf_counter()))
+
+        try:
+            while True:
+                try:
+                    conn = await asyncio.to_thread(self._connect_listening, channels)
+                except psycopg2.OperationalError as e:
+                    record_event('dispatch_listen_error', self.namespace, stage='connect',
+                                 error=str(e).strip(), retry_in_s=backoff)
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, RECONNECT_MAX_SECONDS)
+                    reconnecting = True
+                    continue
+
+                backoff = RECONNECT_MIN_SECONDS
+                fileno = conn.fileno()
+                loop.add_reader(fileno, drain)
+                if reconnecting:
+                    yield Notification(RECONNECTED, {}, time.perf_counter())
+
+                while not isinstance(item := await queue.get(), Exception):
+                    yield item
+
+                record_event('dispatch_listen_error', self.namespace, stage='listen',
+                             error=str(item).strip(), retry_in_s=backoff)
+                conn.close()
+                conn = None
+                reconnecting = True
+                await asyncio.sleep(backoff)
+        finally:
+            if conn is not None:
+                loop.remove_reader(fileno)
+                conn.close()
+
+
+def database_url() -> Optional[str]:
+    """Direct Postgres DSN (Supabase: Project Settings → Database → Connection string)"""
+    return os.getenv('SUPABASE_DB_URL') or os.getenv('DATABASE_URL')
+
+
+def get_notifier():
+    """Postgres notifier when a direct DSN is configured, otherwise an in-memory stand-in"""
+    if database_url():
+        return PostgresNotifier()
+    return InMemoryNotifier()
+
+
+class TaskDispatcher:
+    """Wakes registered agent handlers as soon as a task addressed to them becomes pending"""
+
+    def __init__(self, supabase, namespace: str, notifier=None,
+                 safety_poll_interval: float = DEFAULT_SAFETY_POLL_INTERVAL):
+        self.supabase = supabase
+        self.namespace = namespace
+        self.notifier = notifier or get_notifier()
+        self.safety_poll_interval = safety_poll_interval
+
+        self._handlers: Dict[str, TaskHandler] = {}
+        self._approval_handlers: List[ApprovalHandler] = []
+        self._status_waiters: Dict[str, List[tuple]] = {}  # task_id -> [(statuses, future)]
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    def register(self, agent_name: str, handler: TaskHandler):
+        """Run handler(task) whenever a pending task for agent_name appears"""
+        self._handlers[agent_name] = handler
+
+    def on_approval(self, handler: ApprovalHandler):
+        """Run handler(approval) on approval request inserts and status changes"""
+        self._approval_handlers.append(handler)
+
+    async def wait_for_status(self, task_id: str, statuses: Iterable[str] = TERMINAL_STATUSES,
+                              timeout: Optional[float] = None) -> str:
+        """Block until the task reaches one of statuses; returns the status reached"""
+        future = asyncio.get_running_loop().create_future()
+        waiter = (frozenset(statuses), future)
+        self._status_waiters.setdefault(str(task_id), []).append(waiter)
+
+        try:
+            # The task may have finished before we subscribed
+            current = await self._fetch_status(task_id)
+            if current in waiter[0] and not future.done():
+                future.set_result(current)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            waiters = self._status_waiters.get(str(task_id), [])
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if not waiters:
+                self._status_waiters.pop(str(task_id), None)
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        """Dispatch until stop is set: notifications first, safety-net poll in the background"""
+        stop = stop or asyncio.Event()
+        listener = asyncio.create_task(self._listen())
+        poller = asyncio.create_task(self._safety_poll())
+
+        try:
+            await self.poll_once()
+            await stop.wait()
+        finally:
+            listener.cancel()
+            poller.cancel()
+            await asyncio.gather(listener, poller, return_exceptions=True)
+            if self._in_flight:
+                await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+
+    async def poll_once(self):
+        """Pick up anything a lost notification would have missed"""
+        if self._handlers:
+            result = await asyncio.to_thread(
+                lambda: self.supabase.table('agent_tasks').select(
+                    'id, namespace, to_agent, status, priority'
+                ).eq('namespace', self.namespace).eq('status', 'pending').in_(
+                    'to_agent', list(self._handlers)
+                ).order('priority', desc=True).order('created_at').execute()
+            )
+            for task in result.data or []:
+                self._dispatch(task, time.perf_counter())
+
+        for task_id in list(self._status_waiters):
+            status = await self._fetch_status(task_id)
+            if status:
+                self._resolve_waiters(task_id, status)
+
+    async def _listen(self):
+        async for notification in self.notifier.listen(CHANNELS):
+            if notification.channel == TASK_CHANNEL:
+                self._on_task_notification(notification)
+            elif notification.channel == APPROVAL_CHANNEL:
+                for handler in self._approval_handlers:
+                    asyncio.create_task(handler(notification.payload))
+            elif notification.channel == RECONNECTED:
+                # Catch up on whatever was sent while the connection was down
+                try:
+                    await self.poll_once()
+                except Exception as e:
+                    record_event('dispatch_poll_error', self.namespace, error=str(e))
+
+    async def _safety_poll(self):
+        while True:
+            await asyncio.sleep(self.safety_poll_interval)
+            try:
+                await self.poll_once()
+            except Exception as e:
+                record_event('dispatch_poll_error', self.namespace, error=str(e))
+
+    def _on_task_notification(self, notification: Notification):
+        task = notification.payload
+        if task.get('namespace') != self.namespace:
+            return
+
+        self._resolve_waiters(str(task.get('id')), task.get('status'))
+
+        if task.get('status') == 'pending':
+            self._dispatch(task, notification.received_at)
+
+    def _dispatch(self, task: Dict[str, Any], received_at: float):
+        handler = self._handlers.get(task.get('to_agent'))
+        task_id = str(task.get('id'))
+        if not handler or task_id in self._in_flight:
+            return
+
+        async def run_handler():
+            record_event('task_dispatched', self.namespace, task_id=task_id, to_agent=task.get('to_agent'),
+                         handoff_ms=round((time.perf_counter() - received_at) * 1000, 3))
+            try:
+                await handler(task)
+            finally:
+                self._in_flight.pop(task_id, None)
+
+        self._in_flight[task_id] = asyncio.create_task(run_handler())
+
+    def status_changed(self, task_id: str, status: str):
+        """Wake waiters on a transition this process made itself (no need to wait for the poll)"""
+        self._resolve_waiters(str(task_id), status)
+
+    def _resolve_waiters(self, task_id: str, status: Optional[str]):
+        for statuses, future in list(self._status_waiters.get(task_id, [])):
+            if status in statuses and not future.done():
+                future.set_result(status)
+
+    async def _fetch_status(self, task_id: str) -> Optional[str]:
+        result = await asyncio.to_thread(
+            lambda: self.supabase.table('agent_tasks').select('status').eq('id', task_id).execute()
+        )
+        return result.data[0]['status'] if result.data else None
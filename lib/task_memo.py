@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+SPARC Task Memo - Idempotent delegation keyed by a canonical task fingerprint
+Duplicate delegations coalesce onto the pending or in-flight task
+
+fingerprint = sha256(to_agent, task_type, normalized task_payload, input artifact hashes)
+
+Volatile fields (generated task ids, timestamps, the caller's loaded context) are
+dropped before hashing. Input artifacts are the paths listed in
+context['input_artifacts'] plus any context value under a *_file / *_path / *_dir
+key, except output ones (output_*, target_*, report_*); when an input changes, so
+does the fingerprint. A completed task is reused only when it declares outputs
+(context['output_artifacts'] or output keys), all of them and all inputs exist, it
+reported success, and it finished within SPARC_MEMO_TTL seconds (default 3600).
+Pass bypass=True (or set SPARC_NO_MEMO=1) to always enqueue a fresh task.
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from content_hash_index import hash_path
+from hook_metrics import record_event
+
+VOLATILE_KEYS = {'task_id', 'created_at', 'updated_at', 'started_at', 'completed_at', 'timestamp',
+                 'current_context'}
+ARTIFACT_KEY_SUFFIXES = ('_file', '_path', '_dir')
+OUTPUT_KEY_PREFIXES = ('output_', 'target_', 'report_')
+IN_FLIGHT_STATUSES = ['pending', 'in_progress']
+TTL_ENV = 'SPARC_MEMO_TTL'
+DEFAULT_TTL = 3600.0
+
+
+def normalize_payload(value: Any) -> Any:
+    """Drop volatile keys at any depth so re-issued delegations compare equal"""
+    if isinstance(value, dict):
+        return {k: normalize_payload(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, (list, tuple)):
+        return [normalize_payload(v) for v in value]
+    return value
+
+
+def _artifact_keys(context: Dict[str, Any], outputs: bool) -> List[str]:
+    return [value for key, value in context.items()
+            if key.endswith(ARTIFACT_KEY_SUFFIXES) and key.startswith(OUTPUT_KEY_PREFIXES) == outputs
+            and isinstance(value, str) and value]
+
+
+def input_artifacts(payload: Dict[str, Any]) -> List[str]:
+    """Paths the task reads, taken from its context"""
+    context = payload.get('context') or {}
+    paths = list(context.get('input_artifacts') or []) + _artifact_keys(context, outputs=False)
+    return sorted(set(paths))
+
+
+def output_artifacts(payload: Dict[str, Any]) -> List[str]:
+    """Paths the task declares it writes"""
+    context = payload.get('context') or {}
+    paths = list(context.get('output_artifacts') or []) + _artifact_keys(context, outputs=True)
+    return sorted(set(paths))
+
+
+def task_fingerprint(to_agent: str, task_type: str, payload: Dict[str, Any]) -> str:
+    canonical = {
+        'to_agent': to_agent,
+        'task_type': task_type,
+        'payload': normalize_payload(payload),
+        'artifacts': {path: hash_path(path) for path in input_artifacts(payload)}
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def memo_bypassed(bypass: bool = False) -> bool:
+    return bypass or os.environ.get('SPARC_NO_MEMO') == '1'
+
+
+def _age_seconds(value: Any) -> float:
+    try:
+        return time.time() - datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return float('inf')
+
+
+def completed_reusable(payload: Dict[str, Any]) -> bool:
+    """May a completed task stand in for this one? Only if its declared outputs are all on disk"""
+    outputs = output_artifacts(payload)
+    return bool(outputs) and all(hash_path(path) is not None for path in outputs + input_artifacts(payload))
+
+
+def find_memoized(supabase, namespace: str, fingerprint: str,
+                  allow_completed: bool = False) -> Optional[Dict[str, Any]]:
+    """Pending or in-flight task with this fingerprint; with allow_completed, else a recent successful one"""
+    statuses = IN_FLIGHT_STATUSES + (['completed'] if allow_completed else [])
+    rows = supabase.table('agent_tasks').select('id, status, result, created_at, completed_at') \
+        .eq('namespace', namespace).eq('fingerprint', fingerprint) \
+        .in_('status', statuses) \
+        .order('created_at', desc=True).limit(10).execute().data or []
+
+    for row in rows:
+        if row['status'] in IN_FLIGHT_STATUSES:
+            return row
+
+    ttl = float(os.getenv(TTL_ENV, DEFAULT_TTL))
+    for row in rows:
+        result = row.get('result')
+        if (result and result.get('success') is not False
+                and _age_seconds(row.get('completed_at') or row['created_at']) < ttl):
+            return row
+    return None
+
+
+def enqueue_task(supabase, task_data: Dict[str, Any], bypass: bool = False) -> Optional[str]:
+    """Insert task_data into agent_tasks unless an equivalent task already exists; returns the task id"""
+    namespace = task_data['namespace']
+    if memo_bypassed(bypass):
+        result = supabase.table('agent_tasks').insert(task_data).execute()
+        return result.data[0]['id'] if result.data else None
+
+    payload = task_data.get('task_payload') or {}
+    fingerprint = task_fingerprint(task_data['to_agent'], task_data.get('task_type', ''), payload)
+
+    existing = find_memoized(supabase, namespace, fingerprint, allow_completed=completed_reusable(payload))
+    if existing:
+        outcome = 'cached' if existing['status'] == 'completed' else 'coalesced'
+        record_event('task_memo', namespace, outcome=outcome, to_agent=task_data['to_agent'],
+                     task_id=existing['id'])
+        return existing['id']
+
+    try:
+        result = supabase.table('agent_tasks').insert({**task_data, 'fingerprint': fingerprint}).execute()
+    except Exception as e:
+        # Lost the race: the unique in-flight index rejected a concurrent duplicate
+        if '23505' not in str(e):
+            raise
+        existing = find_memoized(supabase, namespace, fingerprint)
+        if not existing:
+            raise
+        record_event('task_memo', namespace, outcome='coalesced', to_agent=task_data['to_agent'],
+                     task_id=existing['id'])
+        return existing['id']
+
+    record_event('task_memo', namespace, outcome='new', to_agent=task_data['to_agent'])
+    return result.data[0]['id'] if result.data else None
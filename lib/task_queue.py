@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+SPARC Task Queue - Atomic task claiming through the claim_next_task() / claim_task() database functions
+One pending task is leased to exactly one worker (see database/sql/task_claiming.sql, task_scheduling.sql)
+"""
+
+import os
+import socket
+from typing import Dict, Any, List, Optional, Union
+
+DEFAULT_LEASE_SECONDS = 300
+CANDIDATE_LIMIT = 100
+
+
+def default_worker_id() -> str:
+    """host:pid identifies this worker in claimed_by"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next_task(supabase, namespace: str, agent_filter: Optional[List[str]] = None,
+                    worker_id: Optional[str] = None,
+                    lease_seconds: int = DEFAULT_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+    """Lease the highest-priority, oldest pending task (optionally only for agent_filter)"""
+    result = supabase.rpc('claim_next_task', {
+        'p_namespace': namespace,
+        'p_agent_filter': agent_filter,
+        'p_worker_id': worker_id or default_worker_id(),
+        'p_lease_seconds': lease_seconds
+    }).execute()
+
+    return result.data[0] if result.data else None
+
+
+def claim_task(supabase, task_id: str, worker_id: Optional[str] = None,
+               lease_seconds: int = DEFAULT_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+    """Lease one specific pending task; None if another worker got it first"""
+    result = supabase.rpc('claim_task', {
+        'p_task_id': task_id,
+        'p_worker_id': worker_id or default_worker_id(),
+        'p_lease_seconds': lease_seconds
+    }).execute()
+
+    return result.data[0] if result.data else None
+
+
+def pending_candidates(supabase, namespaces: Union[str, List[str]], agent_filter: Optional[List[str]] = None,
+                       limit: int = CANDIDATE_LIMIT) -> List[Dict[str, Any]]:
+    """Top pending tasks by priority plus the oldest ones, for the scheduler to choose from
+
+    Fetched per namespace, so a busy namespace can't crowd the others out of the candidates.
+    """
+    columns = 'id, namespace, to_agent, task_type, priority, created_at'
+    candidates: Dict[str, Dict[str, Any]] = {}
+
+    for namespace in ([namespaces] if isinstance(namespaces, str) else namespaces):
+        for order_by, desc in (('priority', True), ('created_at', False)):
+            query = supabase.table('agent_tasks').select(columns) \
+                .eq('namespace', namespace).eq('status', 'pending')
+            if agent_filter:
+                query = query.in_('to_agent', agent_filter)
+            rows = query.order(order_by, desc=desc).limit(limit).execute().data or []
+            for row in rows:
+                candidates[row['id']] = row
+
+    return list(candidates.values())
+
+
+def renew_leases(supabase, worker_id: Optional[str] = None, running: int = 0,
+                 lease_seconds: int = DEFAULT_LEASE_SECONDS) -> int:
+    """Extend every lease this worker holds (worker_heartbeat in worker_fleet.sql); returns how many"""
+    result = supabase.rpc('worker_heartbeat', {
+        'p_worker_id': worker_id or default_worker_id(),
+        'p_running': running,
+        'p_lease_seconds': lease_seconds
+    }).execute()
+
+    return result.data or 0
+
+
+def complete_task(supabase, task_id: str, worker_id: Optional[str] = None, success: bool = True,
+                  result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> bool:
+    """Mark a claimed task completed/failed; False if this worker no longer holds the lease"""
+    response = supabase.rpc('complete_claimed_task', {
+        'p_task_id': task_id,
+        'p_worker_id': worker_id or default_worker_id(),
+        'p_status': 'completed' if success else 'failed',
+        'p_result': result,
+        'p_error': error
+    }).execute()
+
+    return bool(response.data)
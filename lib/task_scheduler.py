@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+SPARC Task Scheduler - Chooses which pending task a dispatcher claims next
+Priority aging, per-agent / per-namespace / per-class concurrency caps, weighted fair queuing
+
+Limits are read from .sparc/scheduler.json when present, e.g.
+    {"max_running": 8, "agent_limits": {"orchestrator-state-scribe": 2},
+     "class_limits": {"expensive": 3}, "namespace_weights": {"big_project": 2.0}}
+"""
+
+import json
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+
+from agent_registry import uses_claude
+from hook_metrics import record_event, percentile
+
+SCHEDULER_CONFIG = Path('.sparc/scheduler.json')
+
+STATE_SCRIBE = 'orchestrator-state-scribe'
+
+
+@dataclass
+class SchedulerConfig:
+    max_running: int = 8
+    # Waiting tasks gain one priority level per interval, up to max_aging_boost
+    aging_interval_seconds: float = 60.0
+    max_aging_boost: int = 10
+    default_agent_limit: int = 4
+    agent_limits: Dict[str, int] = field(default_factory=lambda: {STATE_SCRIBE: 2})
+    default_namespace_limit: int = 6
+    namespace_limits: Dict[str, int] = field(default_factory=dict)
+    namespace_weights: Dict[str, float] = field(default_factory=dict)
+    # 'expensive' agents shell out to Claude
+    class_limits: Dict[str, int] = field(default_factory=lambda: {'expensive': 3})
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> 'SchedulerConfig':
+        path = path or SCHEDULER_CONFIG
+        config = cls()
+        try:
+            overrides = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return config
+
+        known = {f.name for f in fields(cls)}
+        for key, value in overrides.items():
+            if key in known:
+                setattr(config, key, value)
+        return config
+
+
+def task_class(agent_name: str) -> str:
+    """Scheduling class used for class caps and wait-time export"""
+    if agent_name == STATE_SCRIBE:
+        return 'scribe'
+    if agent_name.startswith('orchestrator-') or agent_name == 'uber-orchestrator':
+        return 'orchestrator'
+    if uses_claude(agent_name):
+        return 'expensive'
+    return 'standard'
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return time.time()
+
+
+class TaskScheduler:
+    """Stateful picker: feed it candidate pending tasks, tell it when tasks start and finish"""
+
+    def __init__(self, config: Optional[SchedulerConfig] = None,
+                 classify: Callable[[str], str] = task_class, clock: Callable[[], float] = time.time):
+        self.config = config or SchedulerConfig.load()
+        self.classify = classify
+        self.clock = clock
+
+        self.running_total = 0
+        self.running_by_agent: Counter = Counter()
+        self.running_by_namespace: Counter = Counter()
+        self.running_by_class: Counter = Counter()
+        self.virtual_time: Dict[str, float] = {}
+        self.wait_samples: Dict[str, List[float]] = defaultdict(list)
+
+    def effective_priority(self, task: Dict[str, Any], now: Optional[float] = None) -> float:
+        waited = (now or self.clock()) - _timestamp(task.get('created_at'))
+        boost = min(self.config.max_aging_boost, max(0.0, waited) / self.config.aging_interval_seconds)
+        return (task.get('priority') or 5) + boost
+
+    def has_capacity(self) -> bool:
+        return self.running_total < self.config.max_running
+
+    def eligible(self, task: Dict[str, Any]) -> bool:
+        """Would starting this task stay within every cap?"""
+        agent = task.get('to_agent')
+        namespace = task.get('namespace')
+        cls = self.classify(agent)
+
+        agent_limit = self.config.agent_limits.get(agent, self.config.default_agent_limit)
+        namespace_limit = self.config.namespace_limits.get(namespace, self.config.default_namespace_limit)
+        class_limit = self.config.class_limits.get(cls)
+
+        return (self.running_by_agent[agent] < agent_limit
+                and self.running_by_namespace[namespace] < namespace_limit
+                and (class_limit is None or self.running_by_class[cls] < class_limit))
+
+    def select(self, candidates: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Next task to claim: least-served namespace (weighted), then highest aged priority"""
+        if not self.has_capacity():
+            return None
+
+        now = self.clock()
+        by_namespace: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for task in candidates:
+            if self.eligible(task):
+                by_namespace[task.get('namespace')].append(task)
+        if not by_namespace:
+            return None
+
+        # Namespaces returning from idle start at the current minimum, not at zero
+        floor = min((self.virtual_time[ns] for ns in by_namespace if ns in self.virtual_time), default=0.0)
+        for namespace in by_namespace:
+            self.virtual_time.setdefault(namespace, floor)
+
+        def best(tasks):
+            return min(tasks, key=lambda t: (-self.effective_priority(t, now), _timestamp(t.get('created_at'))))
+
+        namespace = min(by_namespace, key=lambda ns: (self.virtual_time[ns], -self.effective_priority(best(by_namespace[ns]), now)))
+        return best(by_namespace[namespace])
+
+    def started(self, task: Dict[str, Any]):
+        agent = task.get('to_agent')
+        namespace = task.get('namespace')
+        cls = self.classify(agent)
+
+        self.running_total += 1
+        self.running_by_agent[agent] += 1
+        self.running_by_namespace[namespace] += 1
+        self.running_by_class[cls] += 1
+        self.virtual_time[namespace] = self.virtual_time.get(namespace, 0.0) + 1.0 / self.config.namespace_weights.get(namespace, 1.0)
+
+        wait_ms = max(0.0, (self.clock() - _timestamp(task.get('created_at'))) * 1000)
+        self.wait_samples[cls].append(wait_ms)
+        record_event('task_wait', namespace, to_agent=agent, task_class=cls, wait_ms=round(wait_ms, 1))
+
+    def finished(self, task: Dict[str, Any]):
+        agent = task.get('to_agent')
+        cls = self.classify(agent)
+
+        self.running_total = max(0, self.running_total - 1)
+        self.running_by_agent[agent] = max(0, self.running_by_agent[agent] - 1)
+        self.running_by_namespace[task.get('namespace')] = max(0, self.running_by_namespace[task.get('namespace')] - 1)
+        self.running_by_class[cls] = max(0, self.running_by_class[cls] - 1)
+
+    def wait_summary(self) -> Dict[str, Dict[str, float]]:
+        """Queue wait percentiles (ms) per class since this scheduler started"""
+        return {
+            cls: {
+                'count': len(samples),
+                'p50': percentile(samples, 50),
+                'p95': percentile(samples, 95),
+                'p99': percentile(samples, 99)
+            }
+            for cls, samples in self.wait_samples.items() if samples
+        }
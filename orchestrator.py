@@ -6,6 +6,7 @@
 #   "click>=8.1.0",
 #   "rich>=13.0.0",
 #   "python-dotenv>=1.0.0",
+#   "psycopg2-binary>=2.9.0",
 # ]
 # ///
 
@@ -15,11 +16,12 @@ Coordinates 36 AI agents for complete software development using UV scripts
 """
 
 import os
+import json
+import signal
 import asyncio
-import subprocess
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Tuple
 
 try:
     import click
@@ -35,6 +37,119 @@ except ImportError as e:
 
 console = Console()
 
+def show_hook_stats(window_hours: float, namespace: Optional[str] = None):
+    """Print hook latency percentiles per tool and span from the local metrics log"""
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent / 'lib'))
+    from hook_metrics import summarize_timings, count_events
+    
+    stats = summarize_timings(window_hours * 3600, namespace)
+    
+    if not stats:
+        console.print(f"[yellow]No hook timings recorded in the last {window_hours:g}h[/yellow]")
+        return
+    
+    table = Table(title=f"Hook Latency (last {window_hours:g}h, ms)")
+    table.add_column("Tool")
+    table.add_column("Span")
+    table.add_column("Count", justify="right")
+    table.add_column("p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("p99", justify="right")
+    
+    for (tool, span), row in stats.items():
+        style = "bold" if span == 'total' else None
+        table.add_row(
+            tool, span, str(row['count']),
+            f"{row['p50']:.1f}", f"{row['p95']:.1f}", f"{row['p99']:.1f}",
+            style=style
+        )
+    
+    console.print(table)
+    
+    skipped = count_events('skipped_unchanged', namespace)
+    if skipped:
+        console.print(f"[dim]⏭️  {skipped} unchanged file events skipped[/dim]")
+
+def show_metrics_report(window_hours: float, namespace: Optional[str] = None):
+    """Print task queue wait, Claude governor wait and prompt prefix reuse from the local metrics log"""
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent / 'lib'))
+    from hook_metrics import summarize_queue_waits, summarize_claude_waits, summarize_prefix_reuse
+    
+    waits = summarize_queue_waits(window_hours * 3600, namespace)
+    claude_waits = summarize_claude_waits(window_hours * 3600, namespace)
+    prefixes = summarize_prefix_reuse(window_hours * 3600, namespace)
+    
+    if not (waits or claude_waits or prefixes):
+        console.print(f"[yellow]No dispatch or Claude metrics recorded in the last {window_hours:g}h[/yellow]")
+        return
+    
+    if waits:
+        wait_table = Table(title=f"Task Queue Wait (last {window_hours:g}h, ms)")
+        wait_table.add_column("Class")
+        wait_table.add_column("Count", justify="right")
+        wait_table.add_column("p50", justify="right")
+        wait_table.add_column("p95", justify="right")
+        wait_table.add_column("p99", justify="right")
+        for cls, row in waits.items():
+            wait_table.add_row(cls, str(row['count']), f"{row['p50']:.0f}", f"{row['p95']:.0f}", f"{row['p99']:.0f}")
+        console.print(wait_table)
+    
+    if claude_waits:
+        claude_table = Table(title=f"Claude Governor Wait (last {window_hours:g}h, ms)")
+        claude_table.add_column("Agent")
+        claude_table.add_column("Count", justify="right")
+        claude_table.add_column("p50", justify="right")
+        claude_table.add_column("p95", justify="right")
+        claude_table.add_column("p99", justify="right")
+        for agent, row in claude_waits.items():
+            claude_table.add_row(agent, str(row['count']), f"{row['p50']:.0f}", f"{row['p95']:.0f}", f"{row['p99']:.0f}")
+        console.print(claude_table)
+    
+    if prefixes:
+        prefix_table = Table(title=f"Prompt Prefix Reuse (last {window_hours:g}h, 5 min cache window)")
+        prefix_table.add_column("Agent")
+        prefix_table.add_column("Calls", justify="right")
+        prefix_table.add_column("Prefixes", justify="right")
+        prefix_table.add_column("Hit potential", justify="right")
+        prefix_table.add_column("Reusable tokens", justify="right")
+        for agent, row in prefixes.items():
+            prefix_table.add_row(agent, str(row['calls']), str(row['prefixes']), f"{row['hit_rate']:.0%}",
+                                 f"{row['reusable_tokens']} ({row['reusable_pct']:.0f}%)")
+        console.print(prefix_table)
+
+def show_usage_report(window_hours: float, group_by: str, namespace: Optional[str] = None):
+    """Print Claude token and latency usage per agent or phase, most expensive first"""
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent / 'lib'))
+    from call_accounting import summarize_usage, tokenizer_name
+    
+    usage = summarize_usage(group_by, window_hours * 3600, namespace)
+    if not usage:
+        console.print(f"[yellow]No Claude calls recorded in the last {window_hours:g}h[/yellow]")
+        return
+    
+    table = Table(title=f"Claude Usage by {group_by} (last {window_hours:g}h, tokens via {tokenizer_name()})")
+    table.add_column(group_by.capitalize())
+    table.add_column("Calls", justify="right")
+    table.add_column("Prompt tok", justify="right")
+    table.add_column("Response tok", justify="right")
+    table.add_column("Total tok", justify="right")
+    table.add_column("Wall s", justify="right")
+    table.add_column("p50 ms", justify="right")
+    table.add_column("p95 ms", justify="right")
+    table.add_column("Queue s", justify="right")
+    table.add_column("Cache hits", justify="right")
+    table.add_column("Failed", justify="right")
+    for key, row in usage:
+        table.add_row(
+            key, str(row['calls']), str(row['prompt_tokens']), str(row['response_tokens']),
+            str(row['total_tokens']), f"{row['wall_s']:.1f}", f"{row['p50_ms']:.0f}", f"{row['p95_ms']:.0f}",
+            f"{row['queue_wait_ms'] / 1000:.1f}", f"{row['cache_hits'] / row['calls']:.0%}", str(row['failures'])
+        )
+    console.print(table)
+
 class SPARCOrchestrator:
     """Main SPARC system orchestrator using UV single file agents"""
     
@@ -145,25 +260,22 @@ The agent system will handle complete software development workflows.
                 
                 try:
                     # Start uber orchestrator in background
-                    process = subprocess.Popen([
+                    process = await asyncio.create_subprocess_exec(
                         'uv', 'run', str(uber_script),
-                        '--namespace', self.namespace
-                    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                        '--namespace', self.namespace,
+                        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+                    )
                     
                     console.print(f"[green]✅ Uber orchestrator started (PID: {process.pid})[/green]")
                     console.print("[yellow]💡 Agents are now working autonomously![/yellow]")
                     console.print("[dim]Press Ctrl+C to stop monitoring[/dim]")
                     
-                    # Monitor process
-                    while process.poll() is None:
-                        await asyncio.sleep(1)
-                    
-                    # Get final output
-                    stdout, stderr = process.communicate()
+                    # Resumes as soon as the process exits
+                    stdout, stderr = await process.communicate()
                     if stdout:
-                        console.print(stdout)
+                        console.print(stdout.decode())
                     if stderr and process.returncode != 0:
-                        console.print(f"[red]❌ Error: {stderr}[/red]")
+                        console.print(f"[red]❌ Error: {stderr.decode()}[/red]")
                         
                 except KeyboardInterrupt:
                     console.print("\n[yellow]⏹️ Stopping autonomous development monitoring[/yellow]")
@@ -175,6 +287,194 @@ The agent system will handle complete software development workflows.
             console.print(f"[red]❌ Uber orchestrator not found: {uber_script}[/red]")
             console.print("[yellow]💡 Make sure SPARC is properly installed[/yellow]")
     
+    async def run_dispatcher(self, safety_poll_interval: float, extra_namespaces: Iterable[str] = (),
+                             pool_size: int = 0):
+        """Run agents as soon as tasks are addressed to them (LISTEN/NOTIFY, slow poll as fallback)
+        
+        extra_namespaces are served by the same workers; the scheduler shares them out by
+        namespace weight (weighted fair queuing). With pool_size, agents run on that many
+        warm workers instead of a `uv run` each.
+        """
+        import sys
+        sys.path.insert(0, str(Path(__file__).parent / 'lib'))
+        from agent_registry import discover_agent_scripts
+        from agent_worker_pool import AgentWorkerPool, cli_payload
+        from dag_executor import EXTERNAL_DISPATCH_ENV, TIMEOUT_ENV, TIMEOUT_MARGIN, agent_timeout
+        from task_dispatcher import TaskDispatcher, PostgresNotifier, InMemoryNotifier, database_url
+        from task_queue import (DEFAULT_LEASE_SECONDS, claim_task, complete_task, default_worker_id,
+                                pending_candidates, renew_leases)
+        from task_scheduler import TaskScheduler
+        
+        if database_url():
+            notifier = PostgresNotifier(namespace=self.namespace)
+            console.print("[blue]🔔 Listening for task notifications[/blue]")
+        else:
+            notifier = InMemoryNotifier()
+            console.print("[yellow]⚠️  SUPABASE_DB_URL not set - falling back to polling "
+                          f"every {safety_poll_interval:g}s[/yellow]")
+        
+        namespaces = [self.namespace] + [ns for ns in dict.fromkeys(extra_namespaces) if ns != self.namespace]
+        dispatchers = [TaskDispatcher(self.supabase, ns, notifier, safety_poll_interval) for ns in namespaces]
+        scheduler = TaskScheduler()
+        worker_id = default_worker_id()
+        wake = asyncio.Event()
+        running = set()
+        
+        async def task_available(notified: Dict[str, Any]):
+            # Notifications only wake the scheduler; it decides what runs next
+            wake.set()
+        
+        async def run_in_pool(task: Dict[str, Any]) -> Optional[Tuple[bool, str, str]]:
+            """(success, output, error) from a warm worker, or None if the agent can't load there"""
+            script = scripts[task['to_agent']]
+            response = await pool.run_async(script, cli_payload(script, task['namespace'], task_id=task['id']),
+                                            timeout=agent_timeout(), env={EXTERNAL_DISPATCH_ENV: '1'})
+            if response.get('load_error'):
+                console.print(f"[yellow]⚠️  {task['to_agent']} not loadable in the worker pool, using uv[/yellow]")
+                return None
+            result = response.get('result') or {}
+            return (response['success'], json.dumps(result.get('outputs', {}), default=str),
+                    response.get('stderr') or response.get('error') or '')
+        
+        async def run_task(task: Dict[str, Any]):
+            console.print(f"[blue]▶️  {task['to_agent']} ← task {task['id']}[/blue]")
+            try:
+                outcome = await run_in_pool(task) if pool else None
+                if outcome is None:
+                    # Bounded: the heartbeat renews the lease for as long as the agent runs
+                    timeout = agent_timeout()
+                    process = await asyncio.create_subprocess_exec(
+                        'uv', 'run', str(scripts[task['to_agent']]),
+                        '--namespace', task['namespace'], '--task-id', str(task['id']),
+                        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                        # Phase orchestrators leave their subtasks to this dispatcher
+                        env={**os.environ, EXTERNAL_DISPATCH_ENV: '1', TIMEOUT_ENV: str(int(timeout))},
+                        start_new_session=True
+                    )
+                    try:
+                        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout + TIMEOUT_MARGIN)
+                        outcome = (process.returncode == 0, stdout.decode(), stderr.decode())
+                    except BaseException as e:
+                        # The whole group: uv's child interpreter would otherwise keep the pipes open
+                        os.killpg(process.pid, signal.SIGKILL)
+                        await process.wait()
+                        if not isinstance(e, asyncio.TimeoutError):
+                            raise
+                        outcome = (False, '', f"Agent timed out after {timeout:g}s")
+                
+                success, output, error = outcome
+                await asyncio.to_thread(
+                    complete_task, self.supabase, task['id'], worker_id, success,
+                    result={'output': output[-4000:]} if success else None,
+                    error=None if success else error[-4000:]
+                )
+                
+                icon = "✅" if success else "❌"
+                console.print(f"{icon} {task['to_agent']} finished task {task['id']}")
+            except Exception as e:
+                console.print(f"[red]❌ {task['to_agent']} task {task['id']} failed: {e}[/red]")
+                try:
+                    # Release the lease now instead of leaving it to expire
+                    await asyncio.to_thread(complete_task, self.supabase, task['id'], worker_id, False,
+                                            error=str(e))
+                except Exception as release_error:
+                    console.print(f"[red]❌ Could not mark task {task['id']} failed: {release_error}[/red]")
+            finally:
+                scheduler.finished(task)
+                wake.set()
+        
+        async def schedule():
+            """Claim as many pending tasks as the concurrency caps allow, best first"""
+            while True:
+                await wake.wait()
+                wake.clear()
+                if not scheduler.has_capacity():
+                    continue
+                
+                try:
+                    candidates = await asyncio.to_thread(pending_candidates, self.supabase, namespaces,
+                                                         list(scripts))
+                except Exception as e:
+                    console.print(f"[red]❌ Could not fetch pending tasks: {e}[/red]")
+                    continue
+                
+                while (choice := scheduler.select(candidates)) is not None:
+                    candidates.remove(choice)
+                    # Atomic lease; with several dispatchers only one gets each task
+                    try:
+                        task = await asyncio.to_thread(claim_task, self.supabase, choice['id'], worker_id)
+                    except Exception as e:
+                        # One failed claim must not end the scheduler; the next wake retries
+                        console.print(f"[red]❌ Could not claim task {choice['id']}: {e}[/red]")
+                        continue
+                    if not task:
+                        continue
+                    scheduler.started(task)
+                    runner = asyncio.create_task(run_task(task))
+                    running.add(runner)
+                    runner.add_done_callback(running.discard)
+        
+        async def heartbeat():
+            """Renew the leases of running tasks so long agents aren't reclaimed mid-run"""
+            while True:
+                await asyncio.sleep(DEFAULT_LEASE_SECONDS / 3)
+                if not running:
+                    continue
+                try:
+                    await asyncio.to_thread(renew_leases, self.supabase, worker_id, len(running))
+                except Exception as e:
+                    console.print(f"[yellow]⚠️  Could not renew task leases: {e}[/yellow]")
+        
+        async def resume_after_approval(approval: Dict[str, Any]):
+            if approval.get('project_id') not in namespaces or approval.get('status') == 'pending':
+                return
+            
+            console.print(f"[green]📝 Approval for {approval.get('phase')}: {approval.get('status')}[/green]")
+            insert = self.supabase.table('agent_tasks').insert({
+                'namespace': approval['project_id'],
+                'from_agent': 'human',
+                'to_agent': 'uber-orchestrator',
+                'task_type': 'approval_resolved',
+                'task_payload': {
+                    'task_id': f"approval_{approval.get('id')}",
+                    'description': f"Approval {approval.get('status')} for {approval.get('phase')} phase",
+                    'context': {'approval': approval},
+                    'requirements': [],
+                    'ai_verifiable_outcomes': [],
+                    'phase': approval.get('phase') or 'unknown',
+                    'priority': 10
+                },
+                'status': 'pending',
+                'priority': 10
+            })
+            await asyncio.to_thread(insert.execute)
+        
+        scripts = discover_agent_scripts()
+        pool = AgentWorkerPool(pool_size) if pool_size > 0 else None
+        for dispatcher in dispatchers:
+            for agent_name in scripts:
+                dispatcher.register(agent_name, task_available)
+        # Approval notifications aren't per namespace; one handler covers them all
+        dispatchers[0].on_approval(resume_after_approval)
+        
+        console.print(f"[green]✅ Dispatching for {len(scripts)} agents in {', '.join(namespaces)}[/green]")
+        console.print("[dim]Press Ctrl+C to stop[/dim]")
+        scheduler_task = asyncio.create_task(schedule())
+        heartbeat_task = asyncio.create_task(heartbeat())
+        try:
+            await asyncio.gather(*(dispatcher.run() for dispatcher in dispatchers))
+        finally:
+            scheduler_task.cancel()
+            # Keep the leases alive until the running agents have reported back
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            heartbeat_task.cancel()
+            if pool:
+                pool.close()
+            for cls, stats in scheduler.wait_summary().items():
+                console.print(f"[dim]⏱️  {cls}: {stats['count']} tasks, queue wait "
+                              f"p50 {stats['p50']:.0f}ms / p95 {stats['p95']:.0f}ms[/dim]")
+    
     async def show_status(self):
         """Show current project status"""
         console.print(f"[bold blue]📊 SPARC Project Status: {self.namespace}[/bold blue]")
@@ -235,9 +535,35 @@ The agent system will handle complete software development workflows.
 @click.option('--namespace', help='Project namespace (auto-generated if not provided)')
 @click.option('--status', is_flag=True, help='Show project status')
 @click.option('--start-agents', is_flag=True, help='Start autonomous agent polling')
-def main(goal: Optional[str], namespace: Optional[str], status: bool, start_agents: bool):
+@click.option('--dispatch', is_flag=True, help='Run agents as tasks arrive (push-based dispatch)')
+@click.option('--also-namespace', 'extra_namespaces', multiple=True,
+              help='Further namespace for --dispatch to serve (repeatable; fair-shared by namespace_weights)')
+@click.option('--safety-poll', default=60.0, show_default=True, help='Dispatcher fallback poll interval in seconds')
+@click.option('--pool', 'pool_size', default=0, show_default=True,
+              help='Run --dispatch agents on N warm workers instead of a uv run each')
+@click.option('--hook-stats', is_flag=True, help='Show hook latency percentiles')
+@click.option('--metrics', 'metrics_report', is_flag=True,
+              help='Show task queue wait, Claude governor wait and prompt prefix reuse')
+@click.option('--usage-report', is_flag=True, help='Show Claude token and latency usage')
+@click.option('--by', 'group_by', type=click.Choice(['agent', 'phase']), default='agent', show_default=True,
+              help='Usage report grouping')
+@click.option('--window', default=24.0, show_default=True, help='Hook stats / metrics / usage report window in hours')
+def main(goal: Optional[str], namespace: Optional[str], status: bool, start_agents: bool,
+         dispatch: bool, extra_namespaces: Tuple[str, ...], safety_poll: float, pool_size: int, hook_stats: bool,
+         metrics_report: bool, usage_report: bool, group_by: str, window: float):
     """SPARC Autonomous Development System - 36 AI agents for complete software development"""
     
+    # Hook stats, metrics and usage are read from the local metrics log and need no database
+    if hook_stats:
+        show_hook_stats(window, namespace)
+        return
+    if metrics_report:
+        show_metrics_report(window, namespace)
+        return
+    if usage_report:
+        show_usage_report(window, group_by, namespace)
+        return
+    
     # Load namespace from project if available
     if not namespace:
         sparc_dir = Path('.sparc')
@@ -258,6 +584,8 @@ def main(goal: Optional[str], namespace: Optional[str], status: bool, start_agen
             await orchestrator.show_status()
         elif start_agents:
             await orchestrator.start_agent_polling()
+        elif dispatch:
+            await orchestrator.run_dispatcher(safety_poll, extra_namespaces, pool_size)
         elif goal:
             await orchestrator.initialize_project(goal)
             console.print("\n[yellow]💡 To start autonomous development, run:[/yellow]")
@@ -267,6 +595,11 @@ def main(goal: Optional[str], namespace: Optional[str], status: bool, start_agen
             console.print("[cyan]uv run orchestrator.py --goal 'Build a REST API with authentication'[/cyan]")
             console.print("[cyan]uv run orchestrator.py --status[/cyan]")
             console.print("[cyan]uv run orchestrator.py --start-agents[/cyan]")
+            console.print("[cyan]uv run orchestrator.py --dispatch[/cyan]")
+            console.print("[cyan]uv run orchestrator.py --dispatch --pool 4[/cyan]")
+            console.print("[cyan]uv run orchestrator.py --hook-stats --window 6[/cyan]")
+            console.print("[cyan]uv run orchestrator.py --metrics --window 6[/cyan]")
+            console.print("[cyan]uv run orchestrator.py --usage-report --by phase[/cyan]")
     
     asyncio.run(run())
 
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+SPARC Fake Claude - Stand-in for the `claude` CLI that replays recorded responses
+Reads the prompt from stdin and prints the response recorded for it in the Claude cache
+
+Record once against the real CLI, then replay offline and deterministically:
+    SPARC_CLAUDE_CACHE=record  uv run scripts/workflow/run_agent.py ...
+    SPARC_CLAUDE_CMD="python3 $PWD/scripts/benchmarks/fake_claude.py" uv run scripts/workflow/run_agent.py ...
+
+Arguments are accepted and ignored (so `fake_claude.py -p` works). A prompt that was
+never recorded exits with status 2. Latency is injected through environment variables:
+    SPARC_BENCH_CLAUDE_DELAY_MS       before the first line
+    SPARC_BENCH_CLAUDE_LINE_DELAY_MS  between lines (exercises streaming consumers)
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'lib'))
+
+from claude_cache import ClaudeCache
+
+
+def _delay(env_var: str) -> float:
+    return float(os.environ.get(env_var, '0') or 0) / 1000
+
+
+def main() -> int:
+    prompt = sys.stdin.read()
+    entry = ClaudeCache().lookup_prompt(prompt)
+    if entry is None:
+        print(f"fake_claude: no recorded response for this prompt ({len(prompt)} chars)", file=sys.stderr)
+        return 2
+
+    time.sleep(_delay('SPARC_BENCH_CLAUDE_DELAY_MS'))
+    line_delay = _delay('SPARC_BENCH_CLAUDE_LINE_DELAY_MS')
+    for line in entry['response'].split('\n'):
+        print(line, flush=True)
+        if line_delay:
+            time.sleep(line_delay)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
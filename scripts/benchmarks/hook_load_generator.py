@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#   "rich>=13.0.0",
+# ]
+# ///
+
+"""
+SPARC Hook Load Generator - Throughput benchmark for the PostToolUse pipeline
+Replays synthetic or recorded Claude Code hook payloads into hooks/post_tool_use.py
+at a fixed arrival rate, against local stand-ins for Supabase and Layer 2
+
+Each event runs the real hook as its own process (as Claude Code does), so the
+numbers include interpreter start, imports and all hook-side work.
+
+Usage:
+    uv run scripts/benchmarks/hook_load_generator.py --rate 20 --duration 30
+    uv run scripts/benchmarks/hook_load_generator.py --replay payloads.jsonl --supabase-delay-ms 250
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+HOOK_SCRIPT = ROOT_DIR / 'hooks' / 'post_tool_use.py'
+STANDINS_SCRIPT = Path(__file__).parent / 'hook_standins.py'
+
+sys.path.insert(0, str(ROOT_DIR / 'lib'))
+from hook_metrics import percentile, summarize_timings, count_events
+
+console = Console()
+
+
+@dataclass
+class LoadStats:
+    latencies_ms: List[float] = field(default_factory=list)     # arrival -> hook exit
+    service_ms: List[float] = field(default_factory=list)       # hook start -> hook exit
+    backlog_samples: List[tuple] = field(default_factory=list)  # (elapsed_s, queued)
+    completed: int = 0
+    failed: int = 0
+    dropped: int = 0
+    timed_out: int = 0
+
+
+def generate_payloads(count: int, files: int, sizes: List[int], duplicate_ratio: float,
+                      seed: int) -> List[Dict[str, Any]]:
+    """Synthetic Write/Edit/MultiEdit payloads spread over a pool of files"""
+    rng = random.Random(seed)
+    file_paths = [f"src/module_{i % 17}/file_{i}.py" for i in range(files)]
+    last_by_file: Dict[str, Dict[str, Any]] = {}
+    payloads = []
+
+    def text(size: int) -> str:
+        line = ''.join(rng.choices(string.ascii_letters + ' ', k=79)) + '\n'
+        return (line * (size // 80 + 1))[:size]
+
+    for i in range(count):
+        file_path = rng.choice(file_paths)
+
+        if file_path in last_by_file and rng.random() < duplicate_ratio:
+            payloads.append(last_by_file[file_path])
+            continue
+
+        tool_name = rng.choices(['Write', 'Edit', 'MultiEdit'], weights=[5, 4, 1])[0]
+        size = rng.choice(sizes)
+
+        if tool_name == 'Write':
+            tool_input = {'file_path': file_path, 'content': text(size)}
+        elif tool_name == 'Edit':
+            tool_input = {'file_path': file_path, 'old_string': f'# marker {i}', 'new_string': text(size)}
+        else:
+            tool_input = {'file_path': file_path, 'edits': [
+                {'old_string': f'# marker {i}.{n}', 'new_string': text(max(1, size // 3))} for n in range(3)
+            ]}
+
+        payload = {'session_id': f'bench-{seed}', 'tool_name': tool_name, 'tool_input': tool_input}
+        last_by_file[file_path] = payload
+        payloads.append(payload)
+
+    return payloads
+
+
+def load_replay(path: Path) -> List[Dict[str, Any]]:
+    """Recorded hook payloads, one JSON object per line"""
+    payloads = []
+    for line in path.read_text().splitlines():
+        if line.strip():
+            payloads.append(json.loads(line))
+    return payloads
+
+
+def apply_tool_effect(workdir: Path, payload: Dict[str, Any]):
+    """Leave the file on disk as the tool would have, since the hook hashes it"""
+    tool_input = payload.get('tool_input', {})
+    target = workdir / tool_input.get('file_path', 'unknown')
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    if payload.get('tool_name') == 'Write':
+        target.write_text(tool_input.get('content', ''))
+    elif payload.get('tool_name') == 'Edit':
+        with open(target, 'a') as f:
+            f.write(tool_input.get('new_string', ''))
+    elif payload.get('tool_name') == 'MultiEdit':
+        with open(target, 'a') as f:
+            f.write(''.join(e.get('new_string', '') for e in tool_input.get('edits', [])))
+
+
+async def run_hook(payload: Dict[str, Any], workdir: Path, env: Dict[str, str], timeout: float) -> Optional[bool]:
+    """Run one hook process; None on timeout"""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, str(STANDINS_SCRIPT), str(HOOK_SCRIPT),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+        cwd=workdir,
+        env=env
+    )
+    try:
+        await asyncio.wait_for(process.communicate(json.dumps(payload).encode()), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return None
+    return process.returncode == 0
+
+
+async def run_load(payloads: List[Dict[str, Any]], rate: float, concurrency: int, max_backlog: int,
+                   hook_timeout: float, workdir: Path, env: Dict[str, str]) -> LoadStats:
+    """Open-loop arrivals at `rate`/s served by at most `concurrency` hook processes"""
+    stats = LoadStats()
+    slots = asyncio.Semaphore(concurrency)
+    queued = 0
+    started_at = time.perf_counter()
+
+    async def handle(payload: Dict[str, Any], arrived: float):
+        nonlocal queued
+        async with slots:
+            queued -= 1
+            apply_tool_effect(workdir, payload)
+            service_start = time.perf_counter()
+            ok = await run_hook(payload, workdir, env, hook_timeout)
+            finished = time.perf_counter()
+
+        if ok is None:
+            stats.timed_out += 1
+            return
+
+        stats.completed += ok
+        stats.failed += not ok
+        stats.service_ms.append((finished - service_start) * 1000)
+        stats.latencies_ms.append((finished - arrived) * 1000)
+
+    tasks = []
+    for i, payload in enumerate(payloads):
+        # Pace arrivals against the schedule rather than sleeping a fixed interval
+        delay = started_at + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        arrived = time.perf_counter()
+        stats.backlog_samples.append((round(arrived - started_at, 2), queued))
+
+        if queued >= max_backlog:
+            stats.dropped += 1
+            continue
+
+        queued += 1
+        tasks.append(asyncio.create_task(handle(payload, arrived)))
+
+    await asyncio.gather(*tasks)
+    return stats
+
+
+def print_report(stats: LoadStats, elapsed: float, offered: int, workdir: Path, args):
+    console.print("\n[bold blue]📊 Hook Throughput Benchmark[/bold blue]")
+    console.print(f"Offered: {offered} events at {args.rate:g}/s, concurrency {args.concurrency}, "
+                  f"supabase delay {args.supabase_delay_ms:g} ms")
+    console.print(f"Completed: {stats.completed}  Failed: {stats.failed}  "
+                  f"Dropped: {stats.dropped}  Timed out: {stats.timed_out}")
+    console.print(f"Achieved throughput: {stats.completed / elapsed:.1f} events/s over {elapsed:.1f}s")
+
+    table = Table(title="Latency (ms)")
+    table.add_column("Measure")
+    for col in ("p50", "p95", "p99", "max"):
+        table.add_column(col, justify="right")
+
+    for label, values in (("end-to-end", stats.latencies_ms), ("hook process", stats.service_ms)):
+        if values:
+            table.add_row(label, *(f"{percentile(values, p):.1f}" for p in (50, 95, 99)), f"{max(values):.1f}")
+    console.print(table)
+
+    if stats.backlog_samples:
+        peak = max(q for _, q in stats.backlog_samples)
+        step = max(1, len(stats.backlog_samples) // 10)
+        trend = ', '.join(f"{t:g}s:{q}" for t, q in stats.backlog_samples[::step])
+        console.print(f"Backlog: peak {peak}  trend [{trend}]")
+
+    log_path = workdir / '.sparc' / 'logs' / 'hook_metrics.jsonl'
+    spans = summarize_timings(log_path=log_path)
+    if spans:
+        span_table = Table(title="Hook-internal spans, all tools (ms)")
+        span_table.add_column("Span")
+        for col in ("count", "p50", "p95", "p99"):
+            span_table.add_column(col, justify="right")
+        for (tool, span), row in spans.items():
+            if tool == 'ALL':
+                span_table.add_row(span, str(row['count']), f"{row['p50']:.1f}", f"{row['p95']:.1f}", f"{row['p99']:.1f}")
+        console.print(span_table)
+
+    console.print(f"Skipped unchanged: {count_events('skipped_unchanged', log_path=log_path)}  "
+                  f"Intent coalesced: {count_events('intent_coalesced', log_path=log_path)}  "
+                  f"Intent dropped: {count_events('intent_dropped', log_path=log_path)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SPARC hook throughput benchmark")
+    parser.add_argument('--rate', type=float, default=10.0, help='Arrival rate (events/s)')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds of synthetic load')
+    parser.add_argument('--concurrency', type=int, default=4, help='Maximum concurrent hook processes')
+    parser.add_argument('--max-backlog', type=int, default=100, help='Queued events before new ones are dropped')
+    parser.add_argument('--hook-timeout', type=float, default=60.0, help='Per-hook timeout (s)')
+    parser.add_argument('--files', type=int, default=50, help='Distinct files in synthetic payloads')
+    parser.add_argument('--sizes', default='200,2000,20000', help='Comma-separated content sizes (bytes)')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.1, help='Share of identical re-writes')
+    parser.add_argument('--replay', type=Path, help='JSONL file of recorded hook payloads')
+    parser.add_argument('--supabase-delay-ms', type=float, default=0.0, help='Injected Supabase latency')
+    parser.add_argument('--orchestrator-delay-ms', type=float, default=0.0, help='Injected orchestrator latency')
+    parser.add_argument('--intent-delay-ms', type=float, default=0.0, help='Injected intent extraction latency')
+    parser.add_argument('--seed', type=int, default=7, help='Random seed for synthetic payloads')
+    parser.add_argument('--keep-workdir', action='store_true', help='Keep the scratch project directory')
+    args = parser.parse_args()
+
+    if args.replay:
+        payloads = load_replay(args.replay)
+    else:
+        sizes = [int(s) for s in args.sizes.split(',') if s]
+        payloads = generate_payloads(int(args.rate * args.duration), args.files, sizes,
+                                     args.duplicate_ratio, args.seed)
+
+    workdir = Path(tempfile.mkdtemp(prefix='sparc_hook_bench_'))
+    (workdir / '.sparc').mkdir()
+    (workdir / '.sparc' / 'namespace').write_text('hook_bench')
+
+    env = dict(os.environ,
+               SUPABASE_URL='http://standin.local',
+               SUPABASE_KEY='standin',
+               SPARC_BENCH_SUPABASE_DELAY_MS=str(args.supabase_delay_ms),
+               SPARC_BENCH_ORCHESTRATOR_DELAY_MS=str(args.orchestrator_delay_ms),
+               SPARC_BENCH_INTENT_DELAY_MS=str(args.intent_delay_ms))
+
+    console.print(f"[dim]Scratch project: {workdir}[/dim]")
+    started = time.perf_counter()
+    stats = asyncio.run(run_load(payloads, args.rate, args.concurrency, args.max_backlog,
+                                 args.hook_timeout, workdir, env))
+    elapsed = time.perf_counter() - started
+
+    print_report(stats, elapsed, len(payloads), workdir, args)
+
+    if not args.keep_workdir:
+        import shutil
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
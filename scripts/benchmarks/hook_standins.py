@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+SPARC Hook Stand-ins - Local replacements for Supabase and the Layer 2 components
+Installs fake modules into sys.modules, then runs the target script unchanged
+
+Usage:
+    python3 hook_standins.py <script.py> [script args...]
+
+Backend latency is injected through environment variables (milliseconds):
+    SPARC_BENCH_SUPABASE_DELAY_MS      per Supabase request (select/insert/update)
+    SPARC_BENCH_ORCHESTRATOR_DELAY_MS  per enhanced orchestrator hook call
+    SPARC_BENCH_INTENT_DELAY_MS        per intent extraction
+"""
+
+import asyncio
+import os
+import runpy
+import sys
+import time
+import types
+from pathlib import Path
+
+LIB_DIR = Path(__file__).parent.parent.parent / 'lib'
+
+
+def _delay(env_var: str) -> float:
+    return float(os.environ.get(env_var, '0') or 0) / 1000
+
+
+class _FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class _FakeQuery:
+    """Chainable query builder; only execute() pays the injected latency"""
+
+    def __init__(self, table_name: str):
+        self.table_name = table_name
+        self._data = []
+
+    def insert(self, data):
+        self._data = data if isinstance(data, list) else [dict(data, id=f'fake-{time.time_ns()}')]
+        return self
+
+    def upsert(self, data, **kwargs):
+        return self.insert(data)
+
+    def __getattr__(self, name):
+        # select/update/delete/eq/in_/order/limit/... all just chain
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(_delay('SPARC_BENCH_SUPABASE_DELAY_MS'))
+        return _FakeResponse(self._data)
+
+
+class FakeSupabaseClient:
+    def table(self, table_name: str):
+        return _FakeQuery(table_name)
+
+    def rpc(self, function_name: str, params=None):
+        return _FakeQuery(function_name)
+
+
+class FakeOrchestrator:
+    def process_post_tool_use_hook(self, hook_data):
+        time.sleep(_delay('SPARC_BENCH_ORCHESTRATOR_DELAY_MS'))
+        return None
+
+
+class FakeIntentTracker:
+    def __init__(self, supabase, namespace):
+        self.namespace = namespace
+
+    async def extract_intents_from_interaction(self, content, source, metadata=None):
+        await asyncio.sleep(_delay('SPARC_BENCH_INTENT_DELAY_MS'))
+        return []
+
+
+class FakeQuestionEngine:
+    def __init__(self, supabase, namespace):
+        self.namespace = namespace
+
+
+def _module(name: str, **attrs) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+def install():
+    """Register the stand-in modules before the hook imports them"""
+    sys.modules['supabase'] = _module(
+        'supabase', create_client=lambda url, key: FakeSupabaseClient(), Client=FakeSupabaseClient
+    )
+    sys.modules['dotenv'] = _module('dotenv', load_dotenv=lambda *args, **kwargs: None)
+    sys.modules['enhanced_hook_orchestrator'] = _module(
+        'enhanced_hook_orchestrator', get_orchestrator_instance=lambda supabase, namespace: FakeOrchestrator()
+    )
+    sys.modules['bmo_intent_tracker'] = _module('bmo_intent_tracker', BMOIntentTracker=FakeIntentTracker)
+    sys.modules['interactive_question_engine'] = _module(
+        'interactive_question_engine', InteractiveQuestionEngine=FakeQuestionEngine
+    )
+
+    # Background workers spawned by the hook must also run against the stand-ins
+    sys.path.insert(0, str(LIB_DIR))
+    import intent_queue
+
+    def ensure_worker(namespace, queue_dir=None):
+        queue = intent_queue.IntentQueue(namespace, queue_dir)
+        if queue.worker_running():
+            return
+        intent_queue.subprocess.Popen(
+            [sys.executable, __file__, str(intent_queue.WORKER_SCRIPT), '--namespace', namespace, '--idle-timeout', '2'],
+            stdin=intent_queue.subprocess.DEVNULL,
+            stdout=intent_queue.subprocess.DEVNULL,
+            stderr=intent_queue.subprocess.DEVNULL,
+            start_new_session=True
+        )
+
+    intent_queue.ensure_worker = ensure_worker
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(2)
+
+    install()
+
+    script = sys.argv[1]
+    sys.argv = sys.argv[1:]
+    runpy.run_path(script, run_name='__main__')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+SPARC Hook Startup Budget Test
+Fails when the PreToolUse / Stop fast paths exceed their wall-clock budget
+
+The PreToolUse hook runs on every Claude Code tool call, so any import creeping
+into its fast path shows up as latency on every operation.
+
+Usage:
+    python3 scripts/test_hook_startup.py [--budget-ms 50] [--runs 15]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).parent.parent / 'hooks'
+
+PAYLOAD = json.dumps({
+    'session_id': 'startup-budget',
+    'tool_name': 'Write',
+    'tool_input': {'file_path': 'src/app.py', 'content': 'print("hello")\n' * 200}
+})
+
+CASES = [
+    ('pre_tool_use (no namespace)', 'pre_tool_use.py', False),
+    ('pre_tool_use (namespace)', 'pre_tool_use.py', True),
+    ('stop (no namespace)', 'stop.py', False),
+]
+
+# Modules whose presence means the fast path is paying for heavy imports
+FORBIDDEN_MODULES = ['rich', 'supabase', 'pydantic', 'dotenv', 'asyncio']
+
+
+def time_hook(script: Path, cwd: str, runs: int) -> float:
+    """Median wall time in ms for running the hook with the sample payload"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, str(script)],
+            input=PAYLOAD, capture_output=True, text=True, cwd=cwd, timeout=10
+        )
+        samples.append((time.perf_counter() - start) * 1000)
+
+        if script.name == 'pre_tool_use.py':
+            first_line = result.stdout.splitlines()[0] if result.stdout else ''
+            assert json.loads(first_line) == {'decision': 'approve'}, f"unexpected decision: {result.stdout!r}"
+
+    return statistics.median(samples)
+
+
+def interpreter_baseline(runs: int) -> float:
+    """Median wall time in ms for a bare interpreter start"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], capture_output=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def imported_modules(script: Path) -> set:
+    """Top-level modules loaded by the hook script"""
+    probe = (
+        "import runpy, sys, io\n"
+        f"sys.stdin = io.StringIO({PAYLOAD!r})\n"
+        f"try:\n    runpy.run_path({str(script)!r}, run_name='__main__')\n"
+        "except SystemExit:\n    pass\n"
+        "sys.stderr.write(','.join(sorted({m.split('.')[0] for m in sys.modules})))\n"
+    )
+    result = subprocess.run([sys.executable, '-S', '-c', probe], capture_output=True, text=True)
+    return set(result.stderr.strip().rsplit('\n', 1)[-1].split(','))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hook startup budget test")
+    parser.add_argument('--budget-ms', type=float, default=50.0, help='Allowed median wall time per hook')
+    parser.add_argument('--runs', type=int, default=15, help='Runs per case')
+    args = parser.parse_args()
+
+    failures = []
+    baseline = interpreter_baseline(args.runs)
+    print(f"Interpreter baseline: {baseline:.1f} ms")
+
+    with tempfile.TemporaryDirectory() as plain_dir, tempfile.TemporaryDirectory() as sparc_dir:
+        os.makedirs(os.path.join(sparc_dir, '.sparc'))
+        Path(sparc_dir, '.sparc', 'namespace').write_text('startup_budget')
+
+        for label, script_name, with_namespace in CASES:
+            script = HOOKS_DIR / script_name
+            median_ms = time_hook(script, sparc_dir if with_namespace else plain_dir, args.runs)
+            status = 'OK' if median_ms <= args.budget_ms else 'OVER BUDGET'
+            print(f"{label:32s} {median_ms:6.1f} ms  [{status}]")
+            if median_ms > args.budget_ms:
+                failures.append(f"{label}: {median_ms:.1f} ms > {args.budget_ms:.0f} ms")
+
+    for script_name in ('pre_tool_use.py', 'stop.py'):
+        heavy = imported_modules(HOOKS_DIR / script_name) & set(FORBIDDEN_MODULES)
+        if heavy:
+            failures.append(f"{script_name} imports heavy modules: {', '.join(sorted(heavy))}")
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+
+    print("\nAll hook fast paths within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,33 +2,82 @@
 """
 Universal agent runner that works with UV for all 36 SPARC agents
 Fixes UV execution issues and provides consistent agent interface
+
+Phase orchestrators run their delegated subtasks in-process by default, within this
+runner's timeout. With `orchestrator.py --dispatch` running for the namespace, set
+SPARC_EXTERNAL_DISPATCH=1 to leave the subtasks to that dispatcher instead.
 """
 
 import os
+import asyncio
 import subprocess
 import sys
-import time
+from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 from rich.console import Console
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'lib'))
+from agent_worker_pool import cli_payload, runner_result
+from dag_executor import TIMEOUT_ENV
+from phase_pipeline import PhasePipeline
+
 console = Console()
 
+AGENT_TIMEOUT = 300  # seconds (default --task-timeout); passed to agents so their subtask waits finish first
+
+ORCHESTRATOR_MAP = {
+    'goal-clarification': 'agents/orchestrators/goal_clarification.py',
+    'specification': 'agents/orchestrators/specification_phase.py',
+    'pseudocode': 'agents/orchestrators/pseudocode_phase.py',
+    'architecture': 'agents/orchestrators/architecture_phase.py',
+    'implementation': 'agents/orchestrators/refinement_implementation.py',
+    'testing': 'agents/orchestrators/refinement_testing.py',
+    'documentation': 'agents/orchestrators/completion_documentation.py',
+    'bmo-completion': 'agents/orchestrators/bmo_completion_phase.py'
+}
+
 class UniversalAgentRunner:
     """Universal runner for all SPARC agents"""
     
-    def __init__(self, base_path: Optional[Path] = None):
+    def __init__(self, base_path: Optional[Path] = None, pool=None, task_timeout: float = AGENT_TIMEOUT):
         self.base_path = base_path or Path.cwd()
         self.agents_dir = self.base_path / "agents"
+        self.pool = pool  # optional AgentWorkerPool; falls back to uv per agent
+        self.task_timeout = task_timeout  # per agent, on both paths
         
+    def _resolve_agent_path(self, agent_path: str) -> Path:
+        """Convert relative path to absolute"""
+        if not agent_path.startswith('/'):
+            return self.base_path / agent_path
+        return Path(agent_path)
+    
+    def _agent_command(self, full_agent_path: Path, namespace: str, **kwargs) -> List[str]:
+        """uv command line for an agent"""
+        cmd = ['uv', 'run', str(full_agent_path), '--namespace', namespace]
+        
+        # Add additional arguments
+        for key, value in kwargs.items():
+            if key not in ['namespace']:  # Avoid duplicates
+                cmd.extend([f'--{key}', str(value)])
+        return cmd
+    
+    def _agent_env(self) -> Dict[str, str]:
+        return {**os.environ, TIMEOUT_ENV: str(int(self.task_timeout))}
+    
+    def _timeout_result(self, agent_path: Path) -> Dict[str, Any]:
+        console.print(f"⏰ Agent {agent_path.name} timed out")
+        return {
+            'success': False,
+            'error': 'Timeout',
+            'output': '',
+            'stderr': f'Agent execution timed out after {self.task_timeout:g}s'
+        }
+    
     def run_agent(self, agent_path: str, namespace: str, **kwargs) -> Dict[str, Any]:
         """Run any SPARC agent with proper UV execution"""
         
-        # Convert relative path to absolute
-        if not agent_path.startswith('/'):
-            full_agent_path = self.base_path / agent_path
-        else:
-            full_agent_path = Path(agent_path)
+        full_agent_path = self._resolve_agent_path(agent_path)
         
         if not full_agent_path.exists():
             return {
@@ -38,13 +87,13 @@ class UniversalAgentRunner:
                 'stderr': ''
             }
         
-        # Build command
-        cmd = ['uv', 'run', str(full_agent_path), '--namespace', namespace]
+        if self.pool:
+            result = self._run_in_pool(full_agent_path, namespace, **kwargs)
+            if not result.get('load_error'):
+                return result
+            console.print(f"⚠️ {full_agent_path.name} not loadable in the worker pool, using uv")
         
-        # Add additional arguments
-        for key, value in kwargs.items():
-            if key not in ['namespace']:  # Avoid duplicates
-                cmd.extend([f'--{key}', str(value)])
+        cmd = self._agent_command(full_agent_path, namespace, **kwargs)
         
         console.print(f"🤖 Running agent: {full_agent_path.name}")
         console.print(f"📋 Command: {' '.join(cmd)}")
@@ -54,8 +103,9 @@ class UniversalAgentRunner:
                 cmd,
                 capture_output=True,
                 text=True,
-                timeout=300,  # 5 minute timeout
-                cwd=self.base_path
+                timeout=self.task_timeout,
+                cwd=self.base_path,
+                env=self._agent_env()
             )
             
             success = result.returncode == 0
@@ -76,13 +126,7 @@ class UniversalAgentRunner:
             }
             
         except subprocess.TimeoutExpired:
-            console.print(f"⏰ Agent {full_agent_path.name} timed out")
-            return {
-                'success': False,
-                'error': 'Timeout',
-                'output': '',
-                'stderr': 'Agent execution timed out after 5 minutes'
-            }
+            return self._timeout_result(full_agent_path)
         except Exception as e:
             console.print(f"💥 Error running agent {full_agent_path.name}: {e}")
             return {
@@ -92,37 +136,100 @@ class UniversalAgentRunner:
                 'stderr': str(e)
             }
     
-    def run_orchestrator_phase(self, phase: str, namespace: str, **kwargs) -> Dict[str, Any]:
-        """Run a specific orchestrator phase"""
+    async def run_agent_async(self, agent_path: str, namespace: str, **kwargs) -> Dict[str, Any]:
+        """Cancellable run_agent: the uv process is killed if the caller is cancelled"""
+        
+        full_agent_path = self._resolve_agent_path(agent_path)
+        
+        if not full_agent_path.exists() or self.pool:
+            return await asyncio.to_thread(self.run_agent, agent_path, namespace, **kwargs)
+        
+        cmd = self._agent_command(full_agent_path, namespace, **kwargs)
+        console.print(f"🤖 Running agent: {full_agent_path.name}")
+        
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, cwd=self.base_path,
+            env=self._agent_env()
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=self.task_timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return self._timeout_result(full_agent_path)
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
         
-        orchestrator_map = {
-            'goal-clarification': 'agents/orchestrators/goal_clarification.py',
-            'specification': 'agents/orchestrators/specification_phase.py',
-            'pseudocode': 'agents/orchestrators/pseudocode_phase.py',
-            'architecture': 'agents/orchestrators/architecture_phase.py',
-            'implementation': 'agents/orchestrators/refinement_implementation.py',
-            'testing': 'agents/orchestrators/refinement_testing.py',
-            'documentation': 'agents/orchestrators/completion_documentation.py',
-            'bmo-completion': 'agents/orchestrators/bmo_completion_phase.py'
+        success = process.returncode == 0
+        if success:
+            console.print(f"✅ Agent {full_agent_path.name} completed successfully")
+        else:
+            console.print(f"❌ Agent {full_agent_path.name} failed with code {process.returncode}")
+        
+        return {
+            'success': success,
+            'returncode': process.returncode,
+            'output': stdout.decode(),
+            'stderr': stderr.decode(),
+            'agent_path': str(full_agent_path)
         }
+    
+    def _run_in_pool(self, agent_path: Path, namespace: str, **kwargs) -> Dict[str, Any]:
+        """Run an agent on a warm pool worker with the task its CLI would have built"""
+        payload = cli_payload(agent_path, namespace, task_id=kwargs.get('task_id'),
+                              goal=kwargs.get('goal'), phase=kwargs.get('phase'))
+        
+        console.print(f"🤖 Running agent in worker pool: {agent_path.name}")
+        response = self.pool.run(agent_path, payload, self.task_timeout)
+        
+        if response.get('load_error'):
+            return response
+        
+        if response['success']:
+            console.print(f"✅ Agent {agent_path.name} completed successfully "
+                          f"(dispatch {response.get('dispatch_ms', 0):.1f} ms)")
+        else:
+            console.print(f"❌ Agent {agent_path.name} failed: {response.get('error', 'see result')}")
+        
+        return runner_result(response, agent_path)
+    
+    def run_orchestrator_phase(self, phase: str, namespace: str, **kwargs) -> Dict[str, Any]:
+        """Run a specific orchestrator phase"""
         
-        agent_path = orchestrator_map.get(phase)
+        agent_path = ORCHESTRATOR_MAP.get(phase)
         if not agent_path:
             return {
                 'success': False,
                 'error': f"Unknown phase: {phase}",
-                'available_phases': list(orchestrator_map.keys())
+                'available_phases': list(ORCHESTRATOR_MAP.keys())
             }
         
         return self.run_agent(agent_path, namespace, **kwargs)
     
-    def run_full_workflow(self, namespace: str, goal: str = None) -> Dict[str, Any]:
+    async def run_orchestrator_phase_async(self, phase: str, namespace: str, **kwargs) -> Dict[str, Any]:
+        """Cancellable run_orchestrator_phase"""
+        
+        agent_path = ORCHESTRATOR_MAP.get(phase)
+        if not agent_path:
+            return {
+                'success': False,
+                'error': f"Unknown phase: {phase}",
+                'available_phases': list(ORCHESTRATOR_MAP.keys())
+            }
+        
+        return await self.run_agent_async(agent_path, namespace, **kwargs)
+    
+    def run_full_workflow(self, namespace: str, goal: str = None, journal=None) -> Dict[str, Any]:
         """Run complete SPARC workflow through all phases"""
         
         console.print("🚀 [bold blue]Starting Full SPARC Autonomous Workflow[/bold blue]")
         console.print(f"🏷️ Namespace: {namespace}")
         if goal:
             console.print(f"🎯 Goal: {goal}")
+        if journal:
+            console.print(f"📓 Run: {journal.run_id}")
         
         phases = [
             'goal-clarification',
@@ -134,10 +241,7 @@ class UniversalAgentRunner:
             'documentation'
         ]
         
-        results = {}
-        failed_phase = None
-        
-        for phase in phases:
+        def run_phase(phase: str):
             console.print(f"\\n📋 [bold]Phase: {phase}[/bold]")
             
             # Add goal parameter for goal-clarification phase
@@ -145,25 +249,34 @@ class UniversalAgentRunner:
             if phase == 'goal-clarification' and goal:
                 kwargs['goal'] = goal
             
-            result = self.run_orchestrator_phase(phase, namespace, **kwargs)
-            results[phase] = result
-            
-            if not result['success']:
-                console.print(f"❌ Phase {phase} failed: {result.get('error', 'Unknown error')}")
-                failed_phase = phase
-                break
-            else:
-                console.print(f"✅ Phase {phase} completed successfully")
-                
-                # Show key outputs
-                if result.get('output'):
-                    lines = result['output'].strip().split('\\n')
-                    for line in lines[-3:]:  # Show last 3 lines
-                        if line.strip():
-                            console.print(f"  📄 {line}")
+            return self.run_orchestrator_phase_async(phase, namespace, **kwargs)
+        
+        def phase_completed(phase: str, result: Dict[str, Any]):
+            if result.get('resumed'):
+                console.print(f"⏭️ Phase {phase} already completed in this run, skipped")
+                return
+            console.print(f"✅ Phase {phase} completed successfully")
             
-            # Brief pause between phases
-            time.sleep(1)
+            # Show key outputs
+            if result.get('output'):
+                lines = result['output'].strip().split('\\n')
+                for line in lines[-3:]:  # Show last 3 lines
+                    if line.strip():
+                        console.print(f"  📄 {line}")
+        
+        # Each phase starts as soon as the previous one's artifacts are in place
+        pipeline = PhasePipeline(run_phase, phases, namespace, self.base_path, on_complete=phase_completed,
+                                 journal=journal)
+        outcomes = asyncio.run(pipeline.run())
+        
+        results = {phase: o.result for phase, o in outcomes.items() if o.result is not None}
+        failed_phase = next((phase for phase, o in outcomes.items() if o.status == 'failed'), None)
+        
+        if failed_phase:
+            console.print(f"❌ Phase {failed_phase} failed: {results[failed_phase].get('error', 'Unknown error')}")
+            cancelled = [phase for phase, o in outcomes.items() if o.status == 'cancelled' and o.started_at]
+            if cancelled:
+                console.print(f"  ⏹️ Cancelled early-started phases: {', '.join(cancelled)}")
         
         # Summary
         console.print(f"\\n🎉 [bold]Workflow Summary[/bold]")
@@ -175,6 +288,11 @@ class UniversalAgentRunner:
         else:
             console.print(f"  ✅ All {len(phases)} phases completed successfully!")
         
+        if journal:
+            journal.finish('failed' if failed_phase else 'completed')
+            if failed_phase:
+                console.print(f"  📓 Resume with: --resume {journal.run_id}")
+        
         return {
             'success': failed_phase is None,
             'completed_phases': len([p for p in phases if p in results and results[p]['success']]),
@@ -211,11 +329,48 @@ def main():
     parser.add_argument('--agent', help='Specific agent path to run')
     parser.add_argument('--goal', help='Project goal (for goal-clarification phase)')
     parser.add_argument('--workflow', action='store_true', help='Run full workflow')
+    parser.add_argument('--resume', metavar='RUN_ID', help='Resume a journaled workflow run')
+    parser.add_argument('--list-runs', action='store_true', help='List journaled workflow runs')
     parser.add_argument('--list-agents', action='store_true', help='List available agents')
+    parser.add_argument('--pool', type=int, default=0, help='Run agents on N warm in-process workers')
+    parser.add_argument('--task-timeout', type=float, default=AGENT_TIMEOUT, help='Per-agent timeout in seconds')
     
     args = parser.parse_args()
     
-    runner = UniversalAgentRunner()
+    # Journal before starting workers so they inherit SPARC_RUN_ID
+    journal = None
+    if args.workflow or args.resume:
+        from run_journal import open_run
+        try:
+            journal = open_run(args.namespace, 'run_agent', args.resume, params={'goal': args.goal})
+        except KeyError as e:
+            console.print(f"[red]❌ {e.args[0]}[/red]")
+            sys.exit(1)
+    
+    pool = None
+    if args.pool > 0:
+        from agent_worker_pool import AgentWorkerPool
+        preload = [Path.cwd() / path for path in ORCHESTRATOR_MAP.values()]
+        pool = AgentWorkerPool(args.pool, preload=preload, task_timeout=args.task_timeout)
+    
+    try:
+        run_cli(args, UniversalAgentRunner(pool=pool, task_timeout=args.task_timeout), parser, journal)
+    finally:
+        if pool:
+            pool.close()
+        if journal:
+            journal.close()
+
+def run_cli(args, runner: UniversalAgentRunner, parser, journal=None):
+    """Dispatch the parsed CLI arguments"""
+    
+    if args.list_runs:
+        from run_journal import list_runs
+        console.print("📓 [bold]Workflow Runs[/bold]")
+        for run in list_runs():
+            started = datetime.fromtimestamp(run['started_at']).strftime('%Y-%m-%d %H:%M')
+            console.print(f"  • {run['run_id']}  {run['namespace']}  {run['workflow']}  {run['status']}  {started}")
+        return
     
     if args.list_agents:
         agents = runner.list_available_agents()
@@ -226,8 +381,8 @@ def main():
                 console.print(f"  • {agent}")
         return
     
-    if args.workflow:
-        result = runner.run_full_workflow(args.namespace, args.goal)
+    if args.workflow or args.resume:
+        result = runner.run_full_workflow(args.namespace, args.goal, journal)
         sys.exit(0 if result['success'] else 1)
     
     if args.phase:
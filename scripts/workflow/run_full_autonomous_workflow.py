@@ -1,15 +1,19 @@
 #!/usr/bin/env python3
 """
 Run complete autonomous SPARC workflow with proper 36-agent coordination
+
+Each phase orchestrator runs its delegated subtasks in-process (see run_agent.py).
+If `orchestrator.py --dispatch` serves this namespace, export SPARC_EXTERNAL_DISPATCH=1
+so the orchestrators leave their subtasks to it.
 """
 
 import os
 import subprocess
 import sys
-import time
 import asyncio
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.live import Live
@@ -17,6 +21,8 @@ from rich.panel import Panel
 from rich.table import Table
 from supabase import create_client
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'lib'))
+
 load_dotenv()
 console = Console()
 
@@ -49,33 +55,57 @@ class AutonomousWorkflowRunner:
             
         return create_client(url, key)
     
-    def run_autonomous_workflow(self):
+    def run_autonomous_workflow(self, resume_run_id: Optional[str] = None):
         """Run complete autonomous workflow"""
+        from phase_pipeline import PhasePipeline
+        from run_journal import open_run
+        
         console.print("🤖 [bold blue]Starting Full Autonomous SPARC Workflow[/bold blue]")
         console.print(f"📋 Goal: Build a grocery planning app")
         console.print(f"🏷️ Namespace: {self.namespace}")
         
-        # Step 1: Clear any existing tasks
-        self._clear_pending_tasks()
-        
-        # Step 2: Create proper project record
-        self._create_project_record()
+        # Every phase and subtask transition is journaled so a crashed run can resume
+        try:
+            journal = open_run(self.namespace, 'autonomous', resume_run_id, mirror=self.supabase)
+        except KeyError as e:
+            console.print(f"[red]❌ {e.args[0]}[/red]")
+            return
+        console.print(f"📓 Run: {journal.run_id}")
         
-        # Step 3: Run each phase sequentially
-        for phase_name in self.phases:
-            console.print(f"\\n🚀 [bold]Starting Phase: {phase_name}[/bold]")
-            
-            success = self._run_phase(phase_name)
+        if resume_run_id:
+            # Tasks of the interrupted run may still be in flight; keep them
+            console.print("⏯️ Resuming: completed phases with unchanged artifacts are skipped")
+        else:
+            # Step 1: Clear any existing tasks
+            self._clear_pending_tasks()
             
-            if success:
-                console.print(f"✅ Phase {phase_name} completed successfully")
-                self._update_project_phase(phase_name)
-            else:
+            # Step 2: Create proper project record
+            self._create_project_record()
+        
+        # Step 3: Run phases, each starting once the previous phase's artifacts are ready
+        def phase_completed(phase_name: str, result):
+            if result.get('resumed'):
+                console.print(f"⏭️ Phase {phase_name} already completed, skipped")
+                return
+            console.print(f"✅ Phase {phase_name} completed successfully")
+            self._update_project_phase(phase_name)
+        
+        pipeline = PhasePipeline(self._run_phase, self.phases, self.namespace, self.base_path,
+                                 on_complete=phase_completed, journal=journal)
+        outcomes = asyncio.run(pipeline.run())
+        
+        failed = False
+        for phase_name, outcome in outcomes.items():
+            if outcome.status == 'failed':
+                failed = True
                 console.print(f"❌ Phase {phase_name} failed")
-                break
-                
-            # Brief pause between phases
-            time.sleep(2)
+            elif outcome.status == 'cancelled' and outcome.started_at:
+                console.print(f"⏹️ Phase {phase_name} cancelled after an earlier failure")
+        
+        journal.finish('failed' if failed else 'completed')
+        journal.close()
+        if failed:
+            console.print(f"📓 Resume with: --resume {journal.run_id}")
         
         # Step 4: Show final results
         self._show_final_results()
@@ -122,10 +152,12 @@ class AutonomousWorkflowRunner:
         except Exception as e:
             console.print(f"⚠️ Could not create project record: {e}")
     
-    def _run_phase(self, phase_name: str) -> bool:
+    async def _run_phase(self, phase_name: str) -> Dict[str, Any]:
         """Run a specific SPARC phase using universal agent runner"""
         from run_agent import UniversalAgentRunner
         
+        console.print(f"\\n🚀 [bold]Starting Phase: {phase_name}[/bold]")
+        
         try:
             runner = UniversalAgentRunner(self.base_path)
             
@@ -134,13 +166,11 @@ class AutonomousWorkflowRunner:
             if phase_name == 'goal-clarification':
                 kwargs['goal'] = 'Build a comprehensive grocery planning app'
             
-            result = runner.run_orchestrator_phase(phase_name, self.namespace, **kwargs)
-            
-            return result['success']
+            return await runner.run_orchestrator_phase_async(phase_name, self.namespace, **kwargs)
             
         except Exception as e:
             console.print(f"❌ Error running {phase_name}: {e}")
-            return False
+            return {'success': False, 'error': str(e)}
     
     def _update_project_phase(self, phase_name: str):
         """Update project phase in database"""
@@ -204,8 +234,14 @@ class AutonomousWorkflowRunner:
 
 def main():
     """Main entry point"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Full autonomous SPARC workflow")
+    parser.add_argument('--resume', metavar='RUN_ID', help='Resume a journaled run')
+    args = parser.parse_args()
+    
     runner = AutonomousWorkflowRunner()
-    runner.run_autonomous_workflow()
+    runner.run_autonomous_workflow(args.resume)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
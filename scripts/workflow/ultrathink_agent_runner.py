@@ -2,6 +2,10 @@
 """
 Ultrathink Agent Runner - Comprehensive solution for all SPARC agent interfaces
 Detects and adapts to both CLI and JSON agent interfaces automatically
+
+Phase orchestrators run their delegated subtasks in-process by default, within this
+runner's timeout. With `orchestrator.py --dispatch` running for the namespace, set
+SPARC_EXTERNAL_DISPATCH=1 to leave the subtasks to that dispatcher instead.
 """
 
 import os
@@ -14,14 +18,22 @@ from typing import Optional, List, Dict, Any
 from rich.console import Console
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'lib'))
+from agent_worker_pool import AgentWorkerPool, runner_result
+from dag_executor import TIMEOUT_ENV
+
 console = Console()
 
+AGENT_TIMEOUT = 300  # seconds (default --task-timeout); passed to agents so their subtask waits finish first
+
 class UltrathinkAgentRunner:
     """Intelligent agent runner that adapts to all agent interface types"""
     
-    def __init__(self, base_path: Optional[Path] = None):
+    def __init__(self, base_path: Optional[Path] = None, pool=None, task_timeout: float = AGENT_TIMEOUT):
         self.base_path = base_path or Path.cwd()
         self.agents_dir = self.base_path / "agents"
+        self.pool = pool  # optional AgentWorkerPool; falls back to uv per agent
+        self.task_timeout = task_timeout  # per agent, on both paths
         
         # Agent interface detection patterns
         self.cli_patterns = [
@@ -81,9 +93,17 @@ class UltrathinkAgentRunner:
     def run_json_agent(self, agent_path: Path, namespace: str, **kwargs) -> Dict[str, Any]:
         """Run JSON-interface agent with proper task payload"""
         
-        # Create proper task payload for JSON agents with ALL required fields
-        task_payload = {
-            "task_id": f"task_{datetime.now().isoformat()}",
+        # Convert to JSON string
+        task_json = json.dumps(self._build_task_payload(namespace, **kwargs))
+        
+        cmd = ['uv', 'run', str(agent_path), task_json]
+        
+        return self._execute_command(cmd, agent_path)
+    
+    def _build_task_payload(self, namespace: str, **kwargs) -> Dict[str, Any]:
+        """Task payload with ALL required TaskPayload fields"""
+        return {
+            "task_id": str(kwargs.get('task_id') or f"task_{datetime.now().isoformat()}"),
             "description": kwargs.get('goal', 'Execute specialized task'),
             "context": {
                 "namespace": namespace,
@@ -104,13 +124,22 @@ class UltrathinkAgentRunner:
             "phase": kwargs.get('phase', 'execution'),
             "priority": kwargs.get('priority', 5)
         }
+    
+    def run_pool_agent(self, agent_path: Path, namespace: str, **kwargs) -> Dict[str, Any]:
+        """Run agent on a warm pool worker - no uv resolution or interpreter start per agent"""
         
-        # Convert to JSON string
-        task_json = json.dumps(task_payload)
+        console.print(f"🤖 Running in worker pool: {agent_path.name}")
+        response = self.pool.run(agent_path, self._build_task_payload(namespace, **kwargs), self.task_timeout)
         
-        cmd = ['uv', 'run', str(agent_path), task_json]
+        if response.get('load_error'):
+            return response
         
-        return self._execute_command(cmd, agent_path)
+        if response['success']:
+            console.print(f"✅ {agent_path.name} completed successfully (dispatch {response['dispatch_ms']:.1f} ms)")
+        else:
+            console.print(f"❌ {agent_path.name} failed: {response.get('error', 'see result')}")
+        
+        return runner_result(response, agent_path)
     
     def _execute_command(self, cmd: List[str], agent_path: Path) -> Dict[str, Any]:
         """Execute command and return structured result"""
@@ -123,8 +152,9 @@ class UltrathinkAgentRunner:
                 cmd,
                 capture_output=True,
                 text=True,
-                timeout=300,  # 5 minute timeout
-                cwd=self.base_path
+                timeout=self.task_timeout,
+                cwd=self.base_path,
+                env={**os.environ, TIMEOUT_ENV: str(int(self.task_timeout))}
             )
             
             success = result.returncode == 0
@@ -151,7 +181,7 @@ class UltrathinkAgentRunner:
                 'success': False,
                 'error': 'Timeout',
                 'output': '',
-                'stderr': 'Agent execution timed out after 5 minutes'
+                'stderr': f'Agent execution timed out after {self.task_timeout:g}s'
             }
         except Exception as e:
             console.print(f"💥 Error running {agent_path.name}: {e}")
@@ -178,6 +208,13 @@ class UltrathinkAgentRunner:
                 'interface_type': 'unknown'
             }
         
+        # Warm workers call the agent directly, whatever its CLI looks like
+        if self.pool:
+            result = self.run_pool_agent(full_path, namespace, **kwargs)
+            if not result.get('load_error'):
+                result['interface_type'] = 'pool'
+                return result
+        
         # Detect interface type
         interface_type = self.detect_agent_interface(full_path)
         console.print(f"🔍 Detected interface: {interface_type}")
@@ -313,10 +350,23 @@ def main():
     parser.add_argument('--agent', help='Specific agent to run')
     parser.add_argument('--workflow', action='store_true', help='Run complete workflow')
     parser.add_argument('--fix-prereqs', action='store_true', help='Fix prerequisite checking')
+    parser.add_argument('--pool', type=int, default=0, help='Run agents on N warm in-process workers')
+    parser.add_argument('--task-timeout', type=float, default=AGENT_TIMEOUT, help='Per-agent timeout in seconds')
     
     args = parser.parse_args()
     
-    runner = UltrathinkAgentRunner()
+    pool = None
+    if args.pool > 0:
+        pool = AgentWorkerPool(args.pool, task_timeout=args.task_timeout)
+    
+    try:
+        run_cli(args, UltrathinkAgentRunner(pool=pool, task_timeout=args.task_timeout), parser)
+    finally:
+        if pool:
+            pool.close()
+
+def run_cli(args, runner: UltrathinkAgentRunner, parser):
+    """Dispatch the parsed CLI arguments"""
     
     if args.fix_prereqs:
         result = runner.fix_prerequisite_checking(args.namespace)